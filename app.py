@@ -1,10 +1,9 @@
+import time
+
 import streamlit as st
-import pandas as pd
-import pdfplumber
-import io
-from pathlib import Path
-import sys
-import importlib
+from procesadores import ejecucion, registro, reporte
+from procesadores import exportar
+from procesadores.presupuesto import Cancelado, PresupuestoExcedido
 
 # Configuración de la página
 st.set_page_config(
@@ -25,21 +24,144 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Diccionario de entidades bancarias
-ENTIDADES = {
-    "BCP": ["Prestamo", "Estado de cuenta"],
-    "INTERBANK": ["Prestamo", "Estado de cuenta"],
-    "PICHINCHA": ["Prestamo"],
-    "SCOTIABANK": ["Prestamo", "Estado de cuenta"],
-    "BBVA": ["Prestamo", "Estado de cuenta"],
-    "RIPLEY": ["Estado de cuenta"],
-    "FALABELLA": ["Estado de cuenta"],
-    "DINNERS": ["Estado de cuenta"],
+@st.cache_resource
+def cargar_registro():
+    """
+    Valida el registro de procesadores una sola vez por proceso del servidor.
+    El módulo registro conserva los procesadores ya importados entre reruns.
+    Returns:
+        tuple: (dict de entidades y tipos, lista de errores de validación)
+    """
+    return registro.entidades(), registro.validar()
+
+def elegir_segmentos(entidad, tipo_doc, uploaded_file):
+    """
+    Lista los estados de cuenta de un PDF consolidado para extraer solo algunos.
+    El índice se construye una vez por archivo (y queda en caché por hash del
+    documento) en un proceso de trabajo con presupuesto (ejecucion.indexar):
+    si no alcanza, se procesa el documento completo.
+    Returns:
+        list: Etiquetas elegidas (vacía = todo el documento)
+    """
+    from procesadores import indice
+
+    clave = f"indice_{uploaded_file.name}_{uploaded_file.size}_{entidad}_{tipo_doc}"
+    if clave not in st.session_state:
+        # Otro archivo o procesador: lo que estaba en curso ya no se usa
+        trabajo_key = f"trabajo_{clave}"
+        cancelar_otros(trabajo_key)
+        if trabajo_key not in st.session_state:
+            cancelacion = ejecucion.nueva_cancelacion()
+            st.session_state[trabajo_key] = ejecucion.EnCurso(
+                ejecucion.en_hilo(ejecucion.indexar, entidad, tipo_doc, uploaded_file.getvalue(),
+                                  cancelacion=cancelacion),
+                cancelacion
+            )
+        # Si un rerun interrumpe la espera, el trabajo sigue en session_state
+        try:
+            segmentos = esperar(st.session_state[trabajo_key].futuro, st.empty(),
+                                "Buscando los estados de cuenta del archivo...")
+        except Cancelado:
+            segmentos = None
+        except PresupuestoExcedido as e:
+            st.warning(f"⚠️ El archivo es demasiado grande para listar sus estados de cuenta ({str(e)}); "
+                       "se procesará completo.")
+            segmentos = []
+        except Exception as e:
+            st.warning(f"⚠️ No se pudo indexar el archivo, se procesará completo: {str(e)}")
+            segmentos = []
+        st.session_state.pop(trabajo_key, None)
+        if segmentos is None:
+            return []
+        st.session_state[clave] = segmentos
+    segmentos = st.session_state[clave]
+    if len(segmentos) <= 1:
+        return []
+    descripciones = {s.etiqueta: indice.descripcion(s) for s in segmentos}
+    return st.multiselect(
+        f"El archivo tiene {len(segmentos)} estados de cuenta. Elija cuáles extraer (vacío = todos)",
+        options=list(descripciones),
+        format_func=descripciones.get
+    )
+
+def cancelar_otros(actual=None):
+    """
+    Cancela los procesamientos en curso de la sesión salvo 'actual': nadie va a
+    descargar su resultado y liberan la CPU en menos de un segundo.
+    """
+    for clave in [c for c in st.session_state if c.startswith("trabajo_") and c != actual]:
+        ejecucion.cancelar(st.session_state.pop(clave))
+        st.session_state.pop(clave.replace("trabajo_", "previa_", 1), None)
+
+def esperar(futuro, status_text, mensaje):
+    """
+    Espera un futuro de ejecucion de a poco: cada actualización de la página
+    deja que Streamlit atienda un clic en Cancelar o un cambio de selección.
+    Returns:
+        La salida del futuro (o lanza su excepción)
+    """
+    inicio = time.monotonic()
+    while not futuro.done():
+        status_text.text(f"{mensaje} {time.monotonic() - inicio:.0f} s")
+        time.sleep(0.25)
+    return futuro.result()
 
-}
+def mostrar_vista_previa(previa):
+    """
+    Primeras filas de cada hoja (ejecucion.vista_previa) mientras se procesa
+    el documento completo, para confirmar el banco y el tipo elegidos.
+    """
+    if previa is None:
+        st.info("ℹ️ No se alcanzó a leer una vista previa a tiempo (los documentos que se leen de una "
+                "sola pasada no la tienen). El procesamiento completo sigue en curso.")
+        return
+    interrupcion = reporte.leer(previa).get('interrupcion')
+    if interrupcion:
+        st.subheader(f"Vista previa ({interrupcion['paginas_procesadas']} de "
+                     f"{interrupcion['paginas_totales']} páginas)")
+    else:
+        st.subheader("Vista previa")
+    st.caption(f"Primeras {ejecucion.FILAS_VISTA_PREVIA} filas de cada hoja. Si no corresponden al banco o tipo "
+               "de documento, cambie la selección.")
+    for hoja, df in previa.items():
+        st.markdown(f"**{hoja}**")
+        # Como texto: las hojas 'Resumen' mezclan tipos en cada columna
+        st.dataframe(df.astype("string"), use_container_width=True)
+
+def descargar(resultado, clave, nombre):
+    """
+    Botón de descarga en el formato elegido. Cada formato se genera recién
+    cuando se elige y queda en session_state para los siguientes reruns.
+    """
+    etiquetas = {
+        exportar.EXCEL: "Excel (.xlsx)",
+        exportar.PARQUET: "Parquet (.zip, un archivo por hoja)",
+        exportar.FEATHER: "Arrow/Feather (.zip, un archivo por hoja)",
+        exportar.CSV: "CSV (.zip, un archivo por hoja)",
+    }
+    formato = st.selectbox("Formato de descarga", options=list(etiquetas), format_func=etiquetas.get,
+                           key=f"formato_{clave}")
+    clave_archivo = f"{clave}_{formato}"
+    if clave_archivo not in st.session_state:
+        try:
+            with st.spinner("Generando el archivo..."):
+                st.session_state[clave_archivo] = exportar.exportar(resultado, formato)
+        except ImportError:
+            st.error("⚠️ Este formato requiere pyarrow (pip install pyarrow)")
+            return
+    contenido, extension, mime = st.session_state[clave_archivo]
+    st.download_button(
+        label=f"📥 Descargar {etiquetas[formato].split(' ')[0]}",
+        data=contenido,
+        file_name=f"{nombre}.{extension}",
+        mime=mime
+    )
 
 def main():
     st.title("📊 Extractor de Estados de Cuenta y Préstamos")
+    entidades, errores_registro = cargar_registro()
+    for error in errores_registro:
+        st.warning(f"⚠️ {error}")
     
     # Sidebar para controles
     with st.sidebar:
@@ -48,15 +170,22 @@ def main():
         # Selector de entidad
         entidad = st.selectbox(
             "Seleccione la entidad bancaria",
-            options=list(ENTIDADES.keys())
+            options=list(entidades.keys())
         )
         
         # Selector de tipo de documento
         tipo_doc = st.radio(
             "Seleccione el tipo de documento",
-            options=ENTIDADES[entidad]
+            options=entidades[entidad]
         )
         
+        vista_previa = st.checkbox(
+            "Vista previa rápida",
+            value=True,
+            help=f"Muestra las primeras filas de lo leído en {ejecucion.SEGUNDOS_VISTA_PREVIA} s "
+                 "mientras se procesa el documento completo"
+        )
+
         # Información adicional
         st.info("💡 Esta aplicación procesa archivos PDF de estados de cuenta y préstamos bancarios.")
         
@@ -67,6 +196,9 @@ def main():
         help="Máximo 300MB"
     )
     
+    if uploaded_file is None:
+        cancelar_otros()
+
     # Usar session_state para evitar reprocesar el archivo
     if uploaded_file is not None:
         file_size = uploaded_file.size / (1024 * 1024)  # Convertir a MB
@@ -74,8 +206,24 @@ def main():
             st.error("⚠️ El archivo excede el límite de 300MB")
             return
 
+        # En PDFs consolidados se puede extraer solo algunos estados de cuenta
+        seleccion = []
+        if registro.buscar(entidad, tipo_doc).segmentos:
+            seleccion = elegir_segmentos(entidad, tipo_doc, uploaded_file)
+
         # Clave única para el estado de sesión
-        session_key = f"{uploaded_file.name}_{entidad}_{tipo_doc}"
+        session_key = f"{uploaded_file.name}_{entidad}_{tipo_doc}_{'-'.join(seleccion)}"
+
+        # Un cambio de banco, tipo, archivo o segmentos deja sin uso el procesamiento anterior
+        trabajo_key = f"trabajo_{session_key}"
+        cancelar_otros(trabajo_key)
+
+        cancelado_key = f"cancelado_{session_key}"
+        if st.session_state.get(cancelado_key):
+            st.info("Procesamiento cancelado.")
+            if not st.button("🔄 Procesar de nuevo", key=f"reintentar_{session_key}"):
+                return
+            del st.session_state[cancelado_key]
 
         # Procesar solo si no está en session_state
         if session_key not in st.session_state:
@@ -84,59 +232,100 @@ def main():
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
-                # Construir el nombre del módulo a importar
-                module_name = f"procesadores.{entidad.lower().replace(' ', '_')}_{tipo_doc.lower().replace(' ', '_')}"
-                
                 try:
-                    # Importar el módulo correspondiente
-                    processor = importlib.import_module(module_name)
-                    
                     # Procesar el archivo
                     status_text.text("Procesando el archivo PDF...")
                     progress_bar.progress(30)
                     
                     # Leer el PDF
-                    pdf_bytes = uploaded_file.read()
-                    
-                    # Procesar según el tipo de documento
-                    df_result = processor.procesar_documento(pdf_bytes)
-                    
-                    progress_bar.progress(70)
-                    status_text.text("Generando archivo Excel...")
+                    pdf_bytes = uploaded_file.getvalue()
                     
-                    # Generar Excel en memoria
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        if isinstance(df_result, dict):
-                            for sheet_name, df in df_result.items():
-                                # Resetear el índice antes de exportar
-                                df_reset = df.reset_index(drop=True)
-                                df_reset.to_excel(writer, sheet_name=sheet_name, index=False)
-                        else:
-                            # Resetear el índice antes de exportar
-                            df_result_reset = df_result.reset_index(drop=True)
-                            df_result_reset.to_excel(writer, index=False)
+                    # Procesar en un proceso de trabajo con presupuesto de tiempo,
+                    # memoria y páginas (variables EXTRACTOR_MAX_*), sin esperarlo:
+                    # el trabajo sobrevive a los reruns mientras se muestra la vista previa
+                    opciones = {"segmentos": seleccion} if seleccion else {}
+                    if trabajo_key not in st.session_state:
+                        st.session_state[trabajo_key] = ejecucion.en_segundo_plano(
+                            entidad, tipo_doc, pdf_bytes, **opciones
+                        )
+                    trabajo = st.session_state[trabajo_key]
+                    previa_key = f"previa_{session_key}"
+                    if st.button("⏹️ Cancelar", key=f"cancelar_{session_key}"):
+                        ejecucion.cancelar(st.session_state.pop(trabajo_key))
+                        st.session_state.pop(previa_key, None)
+                        st.session_state[cancelado_key] = True
+                        st.info("Procesamiento cancelado.")
+                        return
+                    if vista_previa and not trabajo.futuro.done():
+                        if previa_key not in st.session_state:
+                            st.session_state[previa_key] = ejecucion.en_hilo(
+                                ejecucion.vista_previa, entidad, tipo_doc, pdf_bytes,
+                                cancelacion=trabajo.cancelacion, **opciones
+                            )
+                        try:
+                            previa = esperar(st.session_state[previa_key], status_text,
+                                             "Leyendo las primeras páginas...")
+                        except Cancelado:
+                            raise
+                        except Exception:
+                            # Si el documento no se puede procesar, lo informa el procesamiento completo
+                            previa = None
+                        mostrar_vista_previa(previa)
+                    progress_bar.progress(60)
+                    try:
+                        df_result = esperar(trabajo.futuro, status_text, "Procesando el documento completo...")
+                    finally:
+                        # Terminado, también con error (el próximo rerun vuelve a intentarlo); si
+                        # un rerun interrumpió la espera, el trabajo sigue en session_state
+                        if trabajo.futuro.done():
+                            st.session_state.pop(trabajo_key, None)
+                            st.session_state.pop(previa_key, None)
+                    datos_reporte = reporte.leer(df_result)
+                    omitidas = datos_reporte.get('paginas_omitidas')
+                    if omitidas:
+                        st.info(f"ℹ️ Cronograma completo: se omitieron {omitidas} páginas finales (anexos)")
+                    simplificadas = datos_reporte.get('paginas_simplificadas')
+                    if simplificadas:
+                        st.info(
+                            "ℹ️ Páginas leídas de forma simplificada por ser demasiado lentas "
+                            f"(revise sus movimientos): {', '.join(map(str, simplificadas))}"
+                        )
+                    sin_procesar = datos_reporte.get('paginas_sin_procesar')
+                    if sin_procesar:
+                        st.warning(
+                            "⚠️ Páginas omitidas por exceder el tiempo máximo por página: "
+                            f"{', '.join(map(str, sin_procesar))}"
+                        )
+                    interrupcion = datos_reporte.get('interrupcion')
+                    if interrupcion:
+                        st.warning(
+                            f"⚠️ Resultado parcial: {interrupcion['mensaje']}. Se procesaron "
+                            f"{interrupcion['paginas_procesadas']} de {interrupcion['paginas_totales']} páginas."
+                        )
+                    elif datos_reporte.get('modo') == ejecucion.POR_LOTES:
+                        st.info("ℹ️ Documento grande: se procesó por lotes de estados de cuenta")
                     
                     progress_bar.progress(100)
                     status_text.text("¡Proceso completado!")
                     
-                    # Guardar en session_state
-                    st.session_state[session_key] = output.getvalue()
+                    # Guardar en session_state; el archivo se genera al elegir el formato
+                    st.session_state[session_key] = df_result
                     
-                except ImportError:
+                except (KeyError, ImportError):
                     st.error(f"⚠️ Procesador no encontrado para {entidad} - {tipo_doc}")
                     return
+                except PresupuestoExcedido as e:
+                    st.error(f"⚠️ Se detuvo el procesamiento: {str(e)}. Pruebe con menos páginas o segmentos.")
+                    return
+                except Cancelado:
+                    st.info("Procesamiento cancelado.")
+                    return
             except Exception as e:
                 st.error(f"⚠️ Error al procesar el archivo: {str(e)}")
                 return
 
         # Ofrecer el archivo para descarga desde session_state
-        st.download_button(
-            label="📥 Descargar Excel",
-            data=st.session_state[session_key],
-            file_name=f"{entidad}_{tipo_doc}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        descargar(st.session_state[session_key], session_key, f"{entidad}_{tipo_doc}")
 
 if __name__ == "__main__":
     main()
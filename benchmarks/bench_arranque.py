@@ -0,0 +1,77 @@
+"""
+Benchmark del tiempo de arranque de la app, del CLI y de los procesos de trabajo.
+
+Cada escenario corre en un intérprete nuevo (como un proceso recién lanzado)
+varias veces y se reporta la mediana. Además lista los módulos pesados
+(pandas, pdfplumber, streamlit) que quedaron importados al terminar, para
+detectar importaciones que deberían ser perezosas.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+PESADOS = ["pandas", "pdfplumber", "numpy", "streamlit", "openpyxl"]
+
+# Código que ejecuta cada escenario; al final imprime los módulos pesados cargados
+ESCENARIOS = {
+    "registro (validar)": "from procesadores import registro; registro.validar()",
+    "cli --listar": "import cli; cli.main(['--listar'])",
+    "app (import)": "import app",
+    "trabajador (precargar)": "from procesadores import registro; registro.precargar()",
+}
+
+_SUFIJO = (
+    "\nimport sys, json\n"
+    f"print(json.dumps([m for m in {PESADOS!r} if m in sys.modules]))\n"
+)
+
+
+def medir(codigo, repeticiones):
+    """
+    Returns:
+        tuple: (mediana en segundos, módulos pesados cargados) o (None, error)
+    """
+    script = (
+        "import time, io, contextlib\n"
+        "_inicio = time.perf_counter()\n"
+        "with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):\n"
+        f"    {codigo}\n"
+        "print(time.perf_counter() - _inicio)\n"
+    ) + _SUFIJO
+    tiempos, pesados = [], []
+    for _ in range(repeticiones):
+        r = subprocess.run([sys.executable, "-c", script], cwd=RAIZ, capture_output=True, text=True)
+        if r.returncode != 0:
+            ultima = (r.stderr.strip().splitlines() or ["error"])[-1]
+            return None, ultima
+        lineas = r.stdout.strip().splitlines()
+        tiempos.append(float(lineas[-2]))
+        pesados = json.loads(lineas[-1])
+    return statistics.median(tiempos), pesados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mediana (ms)':>12}  {'escenario':<24} módulos pesados cargados")
+    for nombre, codigo in ESCENARIOS.items():
+        mediana, detalle = medir(codigo, args.repeticiones)
+        if mediana is None:
+            print(f"{'-':>12}  {nombre:<24} no disponible: {detalle}")
+        else:
+            print(f"{mediana * 1000:>12.1f}  {nombre:<24} {', '.join(detalle) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Excel de un resultado sintético con más filas que las que admite una hoja.
+
+Arma una hoja 'Resumen' con --filas filas (por defecto, 1.000 más que el
+máximo de Excel) y una hoja chica, las escribe con exportar.a_excel (hojas de
+continuación) y con exportar.guardar(desborde=...) (archivo aparte), mide el
+tiempo y verifica que las filas de todos los tramos sumen las originales y
+que la hoja 'Partes' indique dónde quedó cada uno.
+
+Uso:
+    python benchmarks/bench_excel_grande.py [--filas 1049576] [--desborde parquet] [--carpeta /tmp]
+"""
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import pandas as pd  # noqa: E402
+
+from procesadores import exportar  # noqa: E402
+
+
+def _resultado(filas):
+    return {
+        "Resumen": pd.DataFrame({
+            "Pagina": [i // 40 + 1 for i in range(filas)],
+            "Descripción": [f"CONSUMO {i}" for i in range(filas)],
+            "Monto": [i / 100 for i in range(filas)],
+        }),
+        "Cuotas": pd.DataFrame({"Descripción": ["CUOTA"], "Monto": [1.0]}),
+    }
+
+
+def _filas_del_libro(contenido):
+    """Filas de datos de cada hoja del libro (sin el encabezado), sin cargar las celdas."""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(contenido, read_only=True)
+    return {hoja.title: hoja.max_row - 1 for hoja in libro.worksheets}, libro
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=exportar.MAX_FILAS_EXCEL + 1000)
+    parser.add_argument("--desborde", choices=[f for f, d in exportar.FORMATOS.items() if d.columnar],
+                        default=exportar.PARQUET)
+    parser.add_argument("--carpeta", type=Path, help="Dónde escribir el libro con desborde (por defecto, temporal)")
+    args = parser.parse_args()
+
+    resultado = _resultado(args.filas)
+    fallas = 0
+
+    inicio = time.perf_counter()
+    contenido = exportar.a_excel(resultado)
+    segundos = time.perf_counter() - inicio
+    filas, libro = _filas_del_libro(io.BytesIO(contenido))
+    partes = list(libro[exportar.HOJA_PARTES].iter_rows(min_row=2, values_only=True))
+    tramos = sum(filas[destino] for hoja, destino, _, _ in partes if hoja == "Resumen")
+    print(f"Hojas de continuación: {segundos:.1f} s, hojas {filas}")
+    if tramos != args.filas or filas["Cuotas"] != 1:
+        print(f"  DIFERENTE: {tramos} filas en los tramos de 'Resumen', se esperaban {args.filas}")
+        fallas += 1
+
+    with tempfile.TemporaryDirectory() as temporal:
+        destino = (args.carpeta or Path(temporal)) / "grande.xlsx"
+        inicio = time.perf_counter()
+        rutas = exportar.guardar(resultado, exportar.EXCEL, destino, desborde=args.desborde)
+        segundos = time.perf_counter() - inicio
+        filas, libro = _filas_del_libro(destino)
+        aparte = rutas[1:]
+        print(f"Desborde a {args.desborde}: {segundos:.1f} s, hojas {filas}, aparte {[r.name for r in aparte]}")
+        if len(aparte) != 1 or "Resumen" in filas or filas["Cuotas"] != 1:
+            print("  DIFERENTE: 'Resumen' debía quedar completa en un archivo aparte")
+            fallas += 1
+        elif args.desborde == exportar.PARQUET and len(pd.read_parquet(aparte[0])) != args.filas:
+            print("  DIFERENTE: el archivo aparte no tiene todas las filas")
+            fallas += 1
+    print("OK" if not fallas else f"{fallas} verificaciones fallidas")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Consolidación incremental (incremental.py y exportar.agregar).
+
+Procesa cada PDF de la carpeta (misma estructura que paridad.py: una
+subcarpeta por módulo procesador) y arma una salida "del mes anterior" con
+la mitad de sus movimientos y cuotas. Después, en cada formato y con las
+hojas del banco y las canónicas, agrega el documento completo como si fuera
+el del mes siguiente y verifica que:
+  - sin_repetidos() quite exactamente las filas que ya estaban
+  - agregar() deje en cada hoja las filas anteriores más las nuevas
+  - pendientes() omita los PDF que la salida ya tiene
+
+Uso:
+    python benchmarks/bench_incremental.py carpeta_pdfs [--formatos excel csv parquet]
+"""
+import argparse
+import importlib
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.paridad import _pdfs  # noqa: E402
+from procesadores import esquema, exportar, incremental, registro, tanda, trabajos  # noqa: E402
+
+
+def _metadatos(modulo):
+    return next(p for p in registro.REGISTRO if p.modulo == modulo)
+
+
+def _tanda(resultado, archivo, clave, canonica):
+    """Hojas como las de tanda.unir_resultados o unir_canonico para un solo documento."""
+    hojas = {}
+    for hoja, df in resultado.items():
+        df = df.reset_index(drop=True)
+        if canonica:
+            df["documento"] = pd.Series(archivo, index=df.index, dtype=esquema.TEXTO)
+        else:
+            df.insert(0, "Archivo", archivo, allow_duplicates=True)
+        hojas[hoja] = df
+    hojas[tanda.HOJA_DOCUMENTOS] = tanda._hoja_documentos([tanda.Documento(archivo, tanda.PROCESADO, "", clave)])
+    return hojas
+
+
+def _mitad(resultado, canonica):
+    """La primera mitad de las hojas con nombres de columna (las apiladas no se parten) y cuántas filas faltan."""
+    anterior, faltan = {}, {}
+    for hoja, df in resultado.items():
+        partir = hoja in (esquema.MOVIMIENTOS.nombre, esquema.CUOTAS.nombre) if canonica \
+            else hoja != tanda.HOJA_DOCUMENTOS and not incremental._apilada(df)
+        anterior[hoja] = df.iloc[:len(df) // 2] if partir else df
+        faltan[hoja] = len(df) - len(anterior[hoja]) if partir else None
+    return anterior, faltan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpeta", type=Path, help="Carpeta con una subcarpeta de PDFs por módulo procesador")
+    parser.add_argument("--formatos", nargs="+", choices=list(exportar.FORMATOS),
+                        default=[exportar.EXCEL, exportar.CSV, exportar.PARQUET])
+    args = parser.parse_args()
+
+    fallas = 0
+    with tempfile.TemporaryDirectory() as temporal:
+        for modulo, pdf in _pdfs(args.carpeta):
+            metadatos = _metadatos(modulo)
+            pdf_bytes = pdf.read_bytes()
+            clave = trabajos.clave(metadatos, pdf_bytes)
+            salida = importlib.import_module(f"procesadores.{modulo}").procesar_documento(pdf_bytes)
+            for canonica in (False, True):
+                resultado = esquema.canonico(metadatos, salida, pdf.name) if canonica else salida
+                anterior, faltan = _mitad(_tanda(resultado, "anterior.pdf", clave + "0", canonica), canonica)
+                nuevo = _tanda(resultado, pdf.name, clave, canonica)
+                for formato in args.formatos:
+                    destino = Path(temporal) / f"{modulo}-{canonica}-{formato}"
+                    destino = destino.with_suffix(".xlsx") if not exportar.FORMATOS[formato].columnar else destino
+                    exportar.guardar(anterior, formato, destino)
+                    inicio = time.perf_counter()
+                    filtrado, quitadas = incremental.sin_repetidos(metadatos, nuevo, destino, formato, canonica)
+                    exportar.agregar(filtrado, formato, destino)
+                    milisegundos = (time.perf_counter() - inicio) * 1000
+                    nombre = f"{modulo}/{pdf.name} {'canónica' if canonica else 'banco'} {formato}"
+                    print(f"{nombre:<60} {quitadas:>6} filas repetidas {milisegundos:>8.0f} ms")
+                    for hoja, df in filtrado.items():
+                        guardada = exportar.leer_hoja(destino, formato, hoja)
+                        if faltan.get(hoja) is not None and len(df) != faltan[hoja]:
+                            print(f"  DIFERENTE: {hoja} agregó {len(df)} filas, faltaban {faltan[hoja]}")
+                            fallas += 1
+                        if len(guardada) != len(anterior[hoja]) + len(df):
+                            print(f"  DIFERENTE: {hoja} tiene {len(guardada)} filas, se esperaban "
+                                  f"{len(anterior[hoja])} + {len(df)}")
+                            fallas += 1
+                    pendientes, omitidos = incremental.pendientes([pdf], destino, formato)
+                    if pendientes or omitidos != [pdf]:
+                        print(f"  DIFERENTE: {pdf.name} sigue pendiente después de agregarlo")
+                        fallas += 1
+    print("OK" if not fallas else f"{fallas} verificaciones fallidas")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Carga y consulta del libro mayor (libro_mayor.LibroMayor).
+
+Procesa cada PDF de la carpeta (misma estructura que paridad.py: una
+subcarpeta por módulo procesador), guarda sus tablas canónicas en un libro
+nuevo y verifica que:
+  - consultar() devuelva las mismas filas y tipos que esquema.canonico()
+  - guardar dos veces el mismo documento no duplique filas
+Después repite las tablas con --copias huellas inventadas (un libro con
+muchos documentos), mide el tiempo de las consultas por entidad, cliente y
+período, de la búsqueda de texto y de los agregados, y verifica que la
+búsqueda no distinga tildes y que los agregados sumen lo mismo que las filas
+(sin contar dos veces los documentos guardados dos veces).
+
+Uso:
+    python benchmarks/bench_libro.py carpeta_pdfs [--copias 500] [--libro /tmp/libro.sqlite]
+"""
+import argparse
+import hashlib
+import importlib
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks.paridad import _pdfs  # noqa: E402
+from procesadores import esquema, registro  # noqa: E402
+from procesadores.libro_mayor import LibroMayor  # noqa: E402
+
+
+def _metadatos(modulo):
+    return next(p for p in registro.REGISTRO if p.modulo == modulo)
+
+
+def _iguales(esperado, obtenido):
+    return esperado.reset_index(drop=True).equals(obtenido.drop(columns="huella").reset_index(drop=True))
+
+
+def _medir(libro, descripcion, consulta=None, **filtros):
+    inicio = time.perf_counter()
+    df = libro.buscar(consulta, **filtros) if consulta else libro.consultar(**filtros)
+    milisegundos = (time.perf_counter() - inicio) * 1000
+    print(f"  {descripcion:<55} {len(df):>8} filas {milisegundos:>8.1f} ms")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpeta", type=Path, help="Carpeta con una subcarpeta de PDFs por módulo procesador")
+    parser.add_argument("--copias", type=int, default=500, help="Documentos inventados por cada PDF")
+    parser.add_argument("--libro", type=Path, help="Archivo del libro (por defecto, temporal)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporal:
+        libro = LibroMayor(args.libro or Path(temporal) / "libro.sqlite")
+        fallas = 0
+        cargados = []
+        for modulo, pdf in _pdfs(args.carpeta):
+            metadatos = _metadatos(modulo)
+            pdf_bytes = pdf.read_bytes()
+            procesador = importlib.import_module(f"procesadores.{modulo}")
+            tablas = esquema.canonico(metadatos, procesador.procesar_documento(pdf_bytes), pdf.name)
+            huella = hashlib.sha256(pdf_bytes).hexdigest()
+            libro.guardar(metadatos, huella, tablas, pdf.name)
+            filas = libro.guardar(metadatos, huella, tablas, pdf.name)
+            cargados.append((metadatos, tablas))
+            for tabla in esquema.TABLAS:
+                obtenido = libro.consultar(tabla.nombre, huella=huella)
+                if len(obtenido) != filas[tabla.nombre] or not _iguales(tablas[tabla.nombre], obtenido):
+                    print(f"DIFERENTE: {modulo}/{pdf.name} {tabla.nombre}")
+                    fallas += 1
+            print(f"{modulo + '/' + pdf.name:<45} "
+                  + ", ".join(f"{n} {tabla}" for tabla, n in filas.items() if n))
+
+        inicio = time.perf_counter()
+        for copia in range(args.copias):
+            for metadatos, tablas in cargados:
+                huella = hashlib.sha256(f"{metadatos.modulo}-{copia}".encode()).hexdigest()
+                libro.guardar(metadatos, huella, tablas, f"copia-{copia}.pdf")
+        segundos = time.perf_counter() - inicio
+        documentos = libro.documentos()
+        print(f"\n{len(documentos)} documentos en el libro ({args.copias * len(cargados)} cargas en {segundos:.1f} s)")
+
+        if cargados:
+            metadatos, tablas = cargados[0]
+            # La tabla con filas del primer documento (Cronograma en los préstamos) y el año de su primera fecha
+            tabla = next((t for t in esquema.TABLAS[1:] if len(tablas[t.nombre])), esquema.MOVIMIENTOS)
+            fechas = libro.consultar(tabla.nombre, entidad=metadatos.entidad).filter(like="fecha")
+            año = str(fechas.stack().min().year) if fechas.notna().any().any() else "2025"
+            _medir(libro, f"{tabla.nombre} de {metadatos.entidad}", tabla=tabla.nombre, entidad=metadatos.entidad)
+            _medir(libro, f"{tabla.nombre} de {metadatos.entidad} en {año}", tabla=tabla.nombre,
+                   entidad=metadatos.entidad, desde=año, hasta=año)
+            clientes = libro.consultar("Cabeceras")["cliente"].dropna()
+            if len(clientes):
+                cliente = clientes.iloc[0]
+                _medir(libro, f"Cabeceras del cliente {cliente[:25]}", tabla="Cabeceras", cliente=cliente)
+                _medir(libro, f"{tabla.nombre} del cliente {cliente[:25]} en {año}", tabla=tabla.nombre,
+                       cliente=cliente, desde=año, hasta=año)
+            _medir(libro, "Movimientos de un documento", huella=documentos["huella"].iloc[-1])
+
+            textos = [t for t in libro.consultar(tabla.nombre, huella=documentos["huella"].iloc[-1])
+                      .get("descripcion", []) if isinstance(t, str)] + list(clientes[:1])
+            if textos:
+                palabra = textos[0].split()[0]
+                prefijo = palabra[:max(2, len(palabra) // 2)]
+                encontrados = _medir(libro, f"Búsqueda '{prefijo}' (100 primeros)", prefijo, limite=100)
+                todos = _medir(libro, f"Búsqueda '{prefijo}' (todos)", prefijo, limite=None)
+                # Las mismas letras con tilde dan los mismos resultados
+                con_tildes = prefijo.lower().translate(str.maketrans("aeiou", "áéíóú"))
+                tildes = _medir(libro, f"Búsqueda '{con_tildes}' (todos)", con_tildes, limite=None)
+                if not len(encontrados) or len(tildes) != len(todos):
+                    print(f"DIFERENTE: '{con_tildes}' encontró {len(tildes)}, '{prefijo}' {len(todos)}")
+                    fallas += 1
+
+            for descripcion, resumen in (("Resumen mensual", libro.resumen_mensual),
+                                         ("Deuda en cuotas", libro.deuda_cuotas),
+                                         ("Saldo de préstamos", libro.saldo_prestamos)):
+                inicio = time.perf_counter()
+                df = resumen()
+                print(f"  {descripcion:<55} {len(df):>8} filas {(time.perf_counter() - inicio) * 1000:>8.1f} ms")
+            # Se guarda de nuevo el primer documento: los totales no cambian
+            libro.guardar(metadatos, documentos["huella"].iloc[0], tablas, "repetido.pdf")
+            mensual = libro.resumen_mensual()
+            conexion = sqlite3.connect(libro.ruta)
+            filas, soles = conexion.execute("SELECT count(*), total(monto_soles) FROM movimientos").fetchone()
+            conexion.close()
+            if mensual["movimientos"].sum() != filas or abs(mensual["monto_soles"].sum() - soles) > 0.01 * filas:
+                print(f"DIFERENTE: el resumen mensual suma {mensual['movimientos'].sum()} movimientos y "
+                      f"{mensual['monto_soles'].sum():.2f} soles; las filas, {filas} y {soles:.2f}")
+                fallas += 1
+        print("OK" if not fallas else f"{fallas} verificaciones fallidas")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
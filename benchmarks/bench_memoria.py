@@ -0,0 +1,82 @@
+"""
+Memoria de la salida de cada procesador antes y después de compactar sus tipos.
+
+Para cada PDF de la carpeta (misma estructura que paridad.py: una subcarpeta
+por módulo procesador) reporta, hoja por hoja, las filas, la memoria con los
+tipos que arma el procesador y con los de tipos.compactar (categorías, cadenas
+de Arrow) y, con --centavos, pasando además los montos a centavos. Verifica
+que compactar no cambie el texto de ninguna celda (las vacías pueden pasar de
+None/NaN a <NA>) ni convierta texto en números, que cambiaría las celdas del
+Excel y del CSV.
+
+Uso:
+    python benchmarks/bench_memoria.py carpeta_pdfs [--centavos]
+"""
+import argparse
+import importlib
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.paridad import _pdfs, salida_comparable  # noqa: E402
+from procesadores import esquema, tipos  # noqa: E402
+
+
+# Celdas vacías: None/NaN pasan a <NA> en las columnas con tipos de pandas
+_VACIAS = {"None", "nan", "NaT", "<NA>"}
+
+
+def _texto(salida):
+    return {hoja: [["" if celda in _VACIAS else celda for celda in fila] for fila in filas]
+            for hoja, filas in salida_comparable(salida).items()}
+
+
+def _mismos_tipos(antes, despues):
+    """Si cada columna sigue siendo numérica o de texto, como la armó el procesador."""
+    numerica = pd.api.types.is_numeric_dtype
+    return all(numerica(df[columna].dtype) == numerica(despues[hoja][columna].dtype)
+               for hoja, df in antes.items() for columna in df.columns)
+
+
+def _mb(n):
+    return n / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpeta", type=Path, help="Carpeta con una subcarpeta de PDFs por módulo procesador")
+    parser.add_argument("--centavos", action="store_true", help="Pasa también los montos a centavos (Int64)")
+    args = parser.parse_args()
+
+    total_antes = total_despues = 0
+    print(f"{'documento':<45} {'hoja':<12} {'filas':>8} {'antes MB':>9} {'después MB':>10} {'ahorro':>7}  "
+          f"{'seg':>5}  texto")
+    for modulo, pdf in _pdfs(args.carpeta):
+        procesador = importlib.import_module(f"procesadores.{modulo}")
+        salida = procesador.procesar_documento(pdf.read_bytes())
+        inicio = time.perf_counter()
+        compacta = tipos.compactar_salida(salida, esquema.montos(procesador.ESQUEMA), args.centavos)
+        segundos = time.perf_counter() - inicio
+        # Con centavos los montos cambian de valor a propósito: no se compara el texto
+        igual = "-" if args.centavos else \
+            ("igual" if _texto(compacta) == _texto(salida) and _mismos_tipos(salida, compacta) else "DIFERENTE")
+        antes, despues = tipos.memoria(salida), tipos.memoria(compacta)
+        for hoja, df in salida.items():
+            ahorro = 1 - despues[hoja] / antes[hoja] if antes[hoja] else 0
+            print(f"{modulo + '/' + pdf.name:<45} {hoja:<12} {len(df):>8} {_mb(antes[hoja]):>9.2f} "
+                  f"{_mb(despues[hoja]):>10.2f} {ahorro:>7.0%}  {segundos:>5.2f}  {igual}")
+            total_antes += antes[hoja]
+            total_despues += despues[hoja]
+    if total_antes:
+        print(f"\nTotal: {_mb(total_antes):.2f} MB -> {_mb(total_despues):.2f} MB "
+              f"({1 - total_despues / total_antes:.0%} menos)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
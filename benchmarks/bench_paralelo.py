@@ -0,0 +1,46 @@
+"""
+Escalamiento del procesamiento en dos fases según la cantidad de procesos.
+
+Procesa un PDF consolidado con distintos valores de 'trabajadores' y reporta
+el tiempo de cada corrida y la aceleración respecto a un solo proceso.
+Verifica además que la salida sea idéntica en todos los casos.
+
+Uso:
+    python benchmarks/bench_paralelo.py dinners_estado_de_cuenta consolidado.pdf [--trabajadores 1 2 4 8]
+"""
+import argparse
+import importlib
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks.paridad import salida_comparable  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modulo", help="Módulo procesador, p. ej. scotiabank_estado_de_cuenta")
+    parser.add_argument("pdf", type=Path)
+    parser.add_argument("--trabajadores", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    procesador = importlib.import_module(f"procesadores.{args.modulo}")
+    pdf_bytes = args.pdf.read_bytes()
+    base = referencia = None
+    print(f"{'procesos':>8}  {'segundos':>9}  {'aceleración':>11}  salida")
+    for n in args.trabajadores:
+        inicio = time.perf_counter()
+        salida = salida_comparable(procesador.procesar_documento(pdf_bytes, trabajadores=n))
+        segundos = time.perf_counter() - inicio
+        if base is None:
+            base, referencia = segundos, salida
+        igual = "igual" if salida == referencia else "DIFERENTE"
+        print(f"{n:>8}  {segundos:>9.2f}  {base / segundos:>10.2f}x  {igual}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
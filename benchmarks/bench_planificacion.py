@@ -0,0 +1,91 @@
+"""
+Latencia de una carga mixta según el orden de atención.
+
+Procesa cada PDF una vez para medir su duración real y simula que todos llegan
+juntos a una cola atendida por N trabajadores, en tres órdenes:
+  llegada:   el orden de los archivos (primero los que estén primero)
+  estimado:  el más corto primero según costos.estimar (lo que usa tanda/cola)
+  ideal:     el más corto primero según la duración medida (cota inferior)
+Reporta la latencia p50/p95/máxima de cada orden y el error de la estimación.
+
+Los PDFs se organizan como en paridad.py (subcarpetas con el nombre del
+módulo). Para ver el efecto, mezclar consolidados grandes con cronogramas
+cortos y pasar --calentar, que registra una primera medición de cada
+procesador antes de estimar.
+
+Uso:
+    python benchmarks/bench_planificacion.py pdfs/ [--trabajadores 1 2] [--calentar]
+"""
+import argparse
+import heapq
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from procesadores import costos, ejecucion, registro  # noqa: E402
+from procesadores.paralelo import numero_de_paginas  # noqa: E402
+
+
+def _latencias(duraciones, orden, trabajadores):
+    """Momento en que termina cada documento si se atienden en 'orden'."""
+    libres = [0.0] * trabajadores
+    latencias = []
+    for i in orden:
+        inicio = heapq.heappop(libres)
+        heapq.heappush(libres, inicio + duraciones[i])
+        latencias.append(inicio + duraciones[i])
+    return latencias
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", type=Path)
+    parser.add_argument("--trabajadores", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--calentar", action="store_true",
+                        help="Procesa antes un documento por procesador para tener historial")
+    args = parser.parse_args()
+
+    por_modulo = {p.modulo: p for p in registro.REGISTRO}
+    documentos = [(por_modulo[pdf.parent.name], pdf) for pdf in sorted(args.pdfs.glob("*/*.pdf"))]
+    if args.calentar:
+        primeros = {}
+        for procesador, pdf in documentos:
+            primeros.setdefault(procesador.modulo, (procesador, pdf))
+        for procesador, pdf in primeros.values():
+            ejecucion.procesar_aqui(procesador.entidad, procesador.tipo, pdf.read_bytes())
+
+    estimados, duraciones = [], []
+    for procesador, pdf in documentos:
+        pdf_bytes = pdf.read_bytes()
+        estimados.append(costos.estimar(procesador.modulo, numero_de_paginas(pdf_bytes), len(pdf_bytes)))
+        inicio = time.perf_counter()
+        ejecucion.procesar_aqui(procesador.entidad, procesador.tipo, pdf_bytes)
+        duraciones.append(time.perf_counter() - inicio)
+        print(f"{duraciones[-1]:8.2f} s  estimado {estimados[-1]:8.2f} s  {pdf.parent.name}/{pdf.name}")
+
+    error = sum(abs(e - d) / d for e, d in zip(estimados, duraciones)) / len(duraciones)
+    print(f"\nerror medio de la estimación: {error:.0%}\n")
+    ordenes = {
+        "llegada": list(range(len(documentos))),
+        "estimado": sorted(range(len(documentos)), key=lambda i: estimados[i]),
+        "ideal": sorted(range(len(documentos)), key=lambda i: duraciones[i]),
+    }
+    print(f"{'procesos':>8}  {'orden':<9} {'p50':>8} {'p95':>8} {'máx':>8}")
+    for n in args.trabajadores:
+        for nombre, orden in ordenes.items():
+            latencias = _latencias(duraciones, orden, n)
+            print(f"{n:>8}  {nombre:<9} {_percentil(latencias, 50):8.2f} {_percentil(latencias, 95):8.2f} "
+                  f"{max(latencias):8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
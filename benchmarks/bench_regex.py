@@ -0,0 +1,251 @@
+"""
+Benchmark adversarial de los patrones regex de los procesadores.
+
+Recorre el código de cada módulo en `procesadores/`, recolecta los patrones
+(constantes compiladas a nivel de módulo y literales pasados a re.compile,
+re.match, re.search, etc.) y los alimenta con líneas patológicas de tamaño
+creciente: corridas largas de dígitos, espacios, fechas repetidas, montos sin
+cierre... Reporta el peor tiempo de cada patrón y su exponente de crecimiento
+(1 ~ lineal, 2 ~ cuadrático). Cada patrón corre en un proceso aparte con
+límite de tiempo, así un retroceso catastrófico no congela el benchmark.
+
+Uso:
+    python benchmarks/bench_regex.py [--tamanos 500 1000 2000 4000] [--limite 1.0]
+
+Devuelve código de salida 1 si algún patrón supera el límite de tiempo.
+"""
+import argparse
+import ast
+import importlib
+import math
+import multiprocessing as mp
+import pkgutil
+import re
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import procesadores  # noqa: E402
+
+FUNCIONES_RE = {"compile", "match", "search", "fullmatch", "findall", "finditer", "sub", "split"}
+
+# Generadores de texto patológico: reciben n y devuelven una línea de ~n caracteres
+GENERADORES = {
+    "digitos": lambda n: "1 01/01/2024 1 2 3 " + "1" * n + " x",
+    "montos": lambda n: "01/01/2024 01/01/2024 " + "1,234.56 " * (n // 9) + "x",
+    "separadores": lambda n: "1" + ",." * (n // 2) + "%",
+    "espacios": lambda n: "1 01/01/2024" + " " * n + "x",
+    "fechas": lambda n: "01/01/2024 " * (n // 11) + "x",
+    "cuotas": lambda n: "01/01/2024 01/01/2024 " + "DETALLE 12/34 " * (n // 14) + "1.00 x",
+    "mayusculas": lambda n: "ABC " * (n // 4) + "1",
+    "etiquetas": lambda n: "TASA DE INTERES COMPENSATORIA EFECTIVA ANUAL: 1.00% " * (n // 52) + "COSTO",
+    "soles": lambda n: "S/ 1.00 US$ " * (n // 12) + "x",
+    "ancla": lambda n: "llamando al 311 6000 desde Lima o " * (n // 34) + "x",
+    "tea": lambda n: "TEA regular " * (n // 12) + "x",
+}
+
+
+def _valor_flags(nodo):
+    """Evalúa expresiones de flags como re.I | re.VERBOSE."""
+    if isinstance(nodo, ast.Attribute) and isinstance(nodo.value, ast.Name) and nodo.value.id == "re":
+        return int(getattr(re, nodo.attr, 0))
+    if isinstance(nodo, ast.BinOp) and isinstance(nodo.op, ast.BitOr):
+        return _valor_flags(nodo.left) | _valor_flags(nodo.right)
+    return 0
+
+
+def _usos_por_nombre(arbol):
+    """
+    Cómo se usa cada variable que guarda un patrón: re.match(nombre, ...) o
+    nombre.search(...). Sirve para medir con la misma operación que el código.
+    """
+    usos = {}
+    for nodo in ast.walk(arbol):
+        if not (isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Attribute)):
+            continue
+        funcion = nodo.func.attr
+        if funcion not in FUNCIONES_RE:
+            continue
+        if (isinstance(nodo.func.value, ast.Name) and nodo.func.value.id == "re"
+                and nodo.args and isinstance(nodo.args[0], ast.Name)):
+            usos.setdefault(nodo.args[0].id, set()).add(funcion)
+        elif isinstance(nodo.func.value, ast.Name):
+            usos.setdefault(nodo.func.value.id, set()).add(funcion)
+    return usos
+
+
+def _operacion(funciones):
+    """Reduce un conjunto de usos a la operación más costosa."""
+    funciones = set(funciones or ()) - {"compile"}
+    if not funciones or funciones - {"match", "fullmatch"}:
+        return "search"
+    return "match" if "match" in funciones else "fullmatch"
+
+
+def _patrones_de_fuente(ruta):
+    """Literales regex encontrados en el código fuente de un módulo."""
+    arbol = ast.parse(ruta.read_text(encoding="utf-8"))
+    usos = _usos_por_nombre(arbol)
+    destinos = {}
+    for nodo in ast.walk(arbol):
+        if isinstance(nodo, ast.Assign):
+            for t in nodo.targets:
+                if isinstance(t, ast.Name):
+                    destinos[id(nodo.value)] = t.id
+    encontrados = []
+    for nodo in ast.walk(arbol):
+        if (isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Attribute)
+                and isinstance(nodo.func.value, ast.Name) and nodo.func.value.id == "re"
+                and nodo.func.attr in FUNCIONES_RE and nodo.args
+                and isinstance(nodo.args[0], ast.Constant) and isinstance(nodo.args[0].value, str)):
+            flags = 0
+            for arg in nodo.args[1:]:
+                flags |= _valor_flags(arg)
+            for kw in nodo.keywords:
+                if kw.arg == "flags":
+                    flags |= _valor_flags(kw.value)
+            if nodo.func.attr == "compile":
+                operacion = _operacion(usos.get(destinos.get(id(nodo))))
+            else:
+                operacion = _operacion({nodo.func.attr})
+            encontrados.append((nodo.args[0].value, flags, operacion, nodo.lineno))
+        elif (isinstance(nodo, ast.Assign) and isinstance(nodo.value, ast.Constant)
+              and isinstance(nodo.value.value, str)):
+            for t in nodo.targets:
+                if isinstance(t, ast.Name) and "pat" in t.id.lower():
+                    encontrados.append((nodo.value.value, 0, _operacion(usos.get(t.id)), nodo.lineno))
+    return encontrados, usos
+
+
+def recolectar_patrones():
+    """
+    Returns:
+        list: Tuplas (origen, patrón, flags, operación) sin repetir
+    """
+    vistos, patrones = set(), []
+
+    def agregar(origen, patron, flags, operacion):
+        if (patron, flags, operacion) in vistos:
+            return
+        try:
+            re.compile(patron, flags)
+        except re.error:
+            return
+        vistos.add((patron, flags, operacion))
+        patrones.append((origen, patron, flags, operacion))
+
+    for info in pkgutil.iter_modules(procesadores.__path__):
+        nombre = info.name
+        ruta = Path(procesadores.__path__[0]) / f"{nombre}.py"
+        literales, usos = _patrones_de_fuente(ruta)
+        try:
+            modulo = importlib.import_module(f"procesadores.{nombre}")
+        except ImportError:
+            modulo = None
+        if modulo is not None:
+            for atributo, valor in vars(modulo).items():
+                valores = valor if isinstance(valor, (list, tuple)) else [valor]
+                for i, v in enumerate(valores):
+                    if isinstance(v, re.Pattern):
+                        agregar(f"{nombre}.{atributo}" + (f"[{i}]" if valor is not v else ""),
+                                v.pattern, v.flags & ~re.UNICODE, _operacion(usos.get(atributo)))
+        for patron, flags, operacion, linea in literales:
+            agregar(f"{nombre}:{linea}", patron, flags, operacion)
+    return patrones
+
+
+def _medir(patron, flags, operacion, tamanos, limite, salida):
+    regex = re.compile(patron, flags)
+    operar = getattr(regex, operacion)
+    for nombre, generar in GENERADORES.items():
+        tiempos = []
+        for n in tamanos:
+            texto = generar(n)
+            inicio = time.perf_counter()
+            operar(texto)
+            tiempos.append(time.perf_counter() - inicio)
+            if tiempos[-1] > limite:
+                break
+        salida.put((nombre, tiempos))
+    salida.put(None)
+
+
+def medir_patron(patron, flags, operacion, tamanos, limite):
+    """
+    Mide un patrón contra todos los generadores en un proceso aparte.
+    Returns:
+        dict: {generador: [tiempos por tamaño]}, con None si se agotó el límite
+    """
+    cola = mp.Queue()
+    proceso = mp.Process(target=_medir, args=(patron, flags, operacion, tamanos, limite, cola), daemon=True)
+    proceso.start()
+    resultados = {}
+    plazo = time.monotonic() + limite * len(GENERADORES) * 2 + 5
+    while True:
+        restante = plazo - time.monotonic()
+        try:
+            item = cola.get(timeout=max(restante, 0.01))
+        except Exception:
+            proceso.terminate()
+            pendientes = [g for g in GENERADORES if g not in resultados]
+            if pendientes:
+                resultados[pendientes[0]] = None
+            break
+        if item is None:
+            break
+        resultados[item[0]] = item[1]
+    proceso.join(1)
+    return resultados
+
+
+def _exponente(tamanos, tiempos):
+    """Pendiente log-log entre los dos últimos tamaños medidos."""
+    if not tiempos or len(tiempos) < 2:
+        return None
+    t1, t2 = tiempos[-2], tiempos[-1]
+    n1, n2 = tamanos[len(tiempos) - 2], tamanos[len(tiempos) - 1]
+    if t1 <= 1e-5 or t2 <= 1e-5:
+        return None
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--limite", type=float, default=1.0, help="Segundos máximos por búsqueda")
+    parser.add_argument("--filtro", default="", help="Solo patrones cuyo origen contenga este texto")
+    args = parser.parse_args()
+
+    filas = []
+    for origen, patron, flags, operacion in recolectar_patrones():
+        if args.filtro not in origen:
+            continue
+        resultados = medir_patron(patron, flags, operacion, args.tamanos, args.limite)
+        peor_generador, peor_tiempo, peor_exp = None, 0.0, None
+        for generador, tiempos in resultados.items():
+            if tiempos is None:
+                peor_generador, peor_tiempo, peor_exp = generador, math.inf, None
+                break
+            if max(tiempos) >= peor_tiempo:
+                peor_generador, peor_tiempo = generador, max(tiempos)
+                peor_exp = _exponente(args.tamanos, tiempos)
+        filas.append((peor_tiempo, origen, operacion, peor_generador, peor_exp))
+
+    filas.sort(reverse=True)
+    print(f"{'peor (ms)':>10}  {'exp':>5}  {'op':<9} {'entrada':<12} origen")
+    excedidos = 0
+    for peor_tiempo, origen, operacion, generador, exponente in filas:
+        if peor_tiempo > args.limite:
+            excedidos += 1
+        ms = "TIMEOUT" if math.isinf(peor_tiempo) else f"{peor_tiempo * 1000:.2f}"
+        exp = f"{exponente:.1f}" if exponente is not None else "-"
+        print(f"{ms:>10}  {exp:>5}  {operacion:<9} {generador or '-':<12} {origen}")
+    print(f"\n{len(filas)} patrones, {excedidos} sobre el límite de {args.limite}s")
+    return 1 if excedidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Comparación de salidas contra resultados de referencia (golden outputs).
+
+Sirve para verificar que un cambio interno (por ejemplo, portar un procesador
+a una especificación declarativa) no altera el Excel generado. Los PDFs se
+organizan en subcarpetas con el nombre del módulo procesador:
+
+    pdfs/
+      interbank_prestamo/cronograma_1.pdf
+      pichincha_prestamo/...
+
+Uso:
+    python benchmarks/paridad.py generar pdfs/ referencias/   # con el código de referencia
+    python benchmarks/paridad.py comparar pdfs/ referencias/  # con el código nuevo
+
+Devuelve código de salida 1 si alguna salida difiere de su referencia.
+"""
+import argparse
+import importlib
+import json
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def salida_comparable(resultado):
+    """Convierte el resultado de un procesador en {hoja: filas de texto}."""
+    if not isinstance(resultado, dict):
+        resultado = {"Hoja1": resultado}
+    # str() celda por celda: NaN y None quedan como 'nan'/'None' y se pueden comparar
+    return {
+        hoja: [list(map(str, df.columns))] + [[str(v) for v in fila] for fila in df.values.tolist()]
+        for hoja, df in resultado.items()
+    }
+
+
+def _pdfs(carpeta):
+    for pdf in sorted(Path(carpeta).glob("*/*.pdf")):
+        yield pdf.parent.name, pdf
+
+
+def _procesar(modulo, pdf):
+    procesador = importlib.import_module(f"procesadores.{modulo}")
+    return salida_comparable(procesador.procesar_documento(pdf.read_bytes()))
+
+
+def generar(carpeta_pdfs, carpeta_ref):
+    for modulo, pdf in _pdfs(carpeta_pdfs):
+        destino = Path(carpeta_ref) / modulo / f"{pdf.stem}.json"
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_text(json.dumps(_procesar(modulo, pdf), ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"referencia: {destino}")
+    return 0
+
+
+def _primera_diferencia(esperado, obtenido):
+    for hoja in sorted(set(esperado) | set(obtenido)):
+        if hoja not in esperado or hoja not in obtenido:
+            return f"hoja {hoja} solo en una de las salidas"
+        a, b = esperado[hoja], obtenido[hoja]
+        for i, (fila_a, fila_b) in enumerate(zip(a, b)):
+            if fila_a != fila_b:
+                return f"hoja {hoja}, fila {i}: {fila_a} != {fila_b}"
+        if len(a) != len(b):
+            return f"hoja {hoja}: {len(a)} filas esperadas, {len(b)} obtenidas"
+    return None
+
+
+def comparar(carpeta_pdfs, carpeta_ref):
+    fallas = 0
+    for modulo, pdf in _pdfs(carpeta_pdfs):
+        referencia = Path(carpeta_ref) / modulo / f"{pdf.stem}.json"
+        if not referencia.exists():
+            print(f"SIN REFERENCIA  {modulo}/{pdf.name}")
+            continue
+        diferencia = _primera_diferencia(json.loads(referencia.read_text(encoding="utf-8")), _procesar(modulo, pdf))
+        if diferencia:
+            fallas += 1
+            print(f"DIFIERE  {modulo}/{pdf.name}: {diferencia}")
+        else:
+            print(f"OK       {modulo}/{pdf.name}")
+    return 1 if fallas else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=["generar", "comparar"])
+    parser.add_argument("pdfs", type=Path)
+    parser.add_argument("referencias", type=Path)
+    args = parser.parse_args()
+    if args.accion == "generar":
+        return generar(args.pdfs, args.referencias)
+    return comparar(args.pdfs, args.referencias)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""
+Procesa un PDF de estado de cuenta o préstamo desde la línea de comandos.
+
+Uso:
+    python cli.py BBVA Prestamo cronograma.pdf -o cronograma.xlsx
+    python cli.py DINNERS "Estado de cuenta" consolidado.pdf --indice
+    python cli.py DINNERS "Estado de cuenta" consolidado.pdf --vista-previa
+    python cli.py DINNERS "Estado de cuenta" consolidado.pdf --segmentos EC-03 EC-07
+    python cli.py BBVA "Estado de cuenta" carpeta_de_pdfs/ -o tanda.xlsx
+    python cli.py BBVA "Estado de cuenta" carpeta_de_pdfs/ -o tanda --formato parquet
+    python cli.py BCP Prestamo cronograma.pdf --formato csv
+    python cli.py BBVA "Estado de cuenta" pdfs_del_mes/ -o tanda.xlsx --incremental
+    python cli.py BBVA "Estado de cuenta" carpeta_de_pdfs/ --canonica
+    python cli.py BCP "Estado de cuenta" estado.pdf --normalizada
+    python cli.py BBVA "Estado de cuenta" carpeta_de_pdfs/ --cola /compartido/cola.sqlite
+    python cli.py --trabajador --cola /compartido/cola.sqlite
+    python cli.py RIPLEY "Estado de cuenta" carpeta_de_pdfs/ --libro libro.sqlite
+    python cli.py RIPLEY --libro libro.sqlite --consultar Movimientos --cliente "JUAN PEREZ%" --desde 2025
+    python cli.py --libro libro.sqlite --buscar "farmacia univ"
+    python cli.py --libro libro.sqlite --resumen mensual --cliente "JUAN PEREZ%" --desde 2025
+    python cli.py --listar
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from procesadores import (costos, distribuido, ejecucion, esquema, exportar, incremental, presupuesto, registro,
+                         reporte, tanda, tipos)
+from procesadores.cola import ColaSQLite
+from procesadores.libro_mayor import LibroMayor
+
+
+def _lista(paginas):
+    return ", ".join(str(pg) for pg in paginas)
+
+
+def _archivos(rutas):
+    """PDFs a procesar: los archivos indicados y los .pdf de las carpetas indicadas."""
+    archivos = []
+    for ruta in rutas:
+        if ruta.is_dir():
+            archivos.extend(sorted(p for p in ruta.iterdir() if p.suffix.lower() == ".pdf"))
+        else:
+            archivos.append(ruta)
+    return archivos
+
+
+def _en_centavos(metadatos, resultado, canonica):
+    """Montos de dinero del resultado (hojas del banco o tablas canónicas) en centavos enteros."""
+    origenes = None if canonica else registro.modulo(metadatos.entidad, metadatos.tipo).ESQUEMA
+    return tipos.compactar_salida(resultado, esquema.montos(origenes), centavos=True)
+
+
+def _formato(args, tanda):
+    """Formato de salida: --formato, la extensión de -o o, por defecto, Parquet en una tanda y Excel si no."""
+    if args.formato:
+        return args.formato
+    if args.salida and exportar.formato_de_ruta(args.salida):
+        return exportar.formato_de_ruta(args.salida)
+    return exportar.PARQUET if tanda else exportar.EXCEL
+
+
+def _salida(args, formato, por_defecto):
+    """Ruta del .xlsx o carpeta de los archivos por hoja (-o sin la extensión del formato, si la trae)."""
+    extension = "." + exportar.FORMATOS[formato].extension
+    if not exportar.FORMATOS[formato].columnar:
+        return args.salida or por_defecto.with_suffix(extension)
+    salida = args.salida or por_defecto
+    return salida.with_suffix("") if salida.suffix.lower() == extension else salida
+
+
+def _escribir(resultado, formato, salida, desborde=None):
+    """Escribe el resultado y devuelve la descripción de lo generado."""
+    rutas = exportar.guardar(resultado, formato, salida, desborde)
+    if formato == exportar.EXCEL:
+        aparte = f" (hojas demasiado largas en {', '.join(str(ruta) for ruta in rutas[1:])})" if rutas[1:] else ""
+        return f"Excel generado: {salida}{aparte}"
+    return f"Archivos {formato} generados en {salida}/: {', '.join(ruta.name for ruta in rutas)}"
+
+
+def _procesar_tanda(metadatos, archivos, args, limites, cola):
+    formato = _formato(args, tanda=True)
+    salida = _salida(args, formato, Path("tanda"))
+    # Con --incremental y una salida existente, su formato manda y solo se procesan los PDF que no tiene
+    existente = exportar.formato_guardado(salida) if args.incremental else None
+    if existente:
+        formato = existente
+        archivos, omitidos = incremental.pendientes(archivos, salida, formato)
+        print(f"Salida existente {salida}: {len(omitidos)} documentos ya consolidados, {len(archivos)} nuevos")
+        if not archivos:
+            return 0
+    ruta = args.trabajo or salida.with_suffix(".trabajo")
+    print(f"Almacén de trabajos: {ruta} (relanzar el mismo comando retoma lo pendiente)")
+
+    def avisar(documento):
+        detalle = f": {documento.mensaje}" if documento.mensaje else ""
+        print(f"[{documento.estado}] {documento.archivo}{detalle}",
+              file=sys.stderr if documento.estado == tanda.ERROR else sys.stdout)
+
+    documentos = tanda.procesar(metadatos.entidad, metadatos.tipo, archivos, ruta, limites,
+                                args.trabajadores, avisar, cola)
+    if args.canonica:
+        resultado = tanda.unir_canonico(metadatos.entidad, metadatos.tipo, ruta, documentos)
+    else:
+        resultado = tanda.unir_resultados(ruta, documentos)
+    if existente:
+        resultado, repetidas = incremental.sin_repetidos(metadatos, resultado, salida, formato, args.canonica)
+        print(f"{repetidas} movimientos y cuotas ya consolidados se omiten")
+    if args.centavos:
+        resultado = _en_centavos(metadatos, resultado, args.canonica)
+    if existente:
+        # La hoja de documentos al final: anota los PDF consolidados recién con sus filas escritas
+        resultado[tanda.HOJA_DOCUMENTOS] = resultado.pop(tanda.HOJA_DOCUMENTOS)
+        try:
+            rutas = exportar.agregar(resultado, formato, salida)
+        except ValueError as e:
+            print(f"⚠️ {e}", file=sys.stderr)
+            return 2
+        generado = f"Filas agregadas a {', '.join(str(ruta) for ruta in rutas)}"
+    else:
+        generado = _escribir(resultado, formato, salida, args.desborde)
+    fallidos = sum(d.estado == tanda.ERROR for d in documentos)
+    print(f"{generado} ({len(documentos) - fallidos} de {len(documentos)} documentos)")
+    if args.libro:
+        guardados, incompletos = tanda.guardar_en_libro(metadatos.entidad, metadatos.tipo, ruta, documentos,
+                                                        LibroMayor(args.libro))
+        print(f"Libro mayor {args.libro}: {len(guardados)} documentos agregados o actualizados")
+        for archivo, motivo in incompletos:
+            print(f"⚠️ {archivo}: no se agregó al libro mayor ({motivo})", file=sys.stderr)
+    return 4 if fallidos else 0
+
+
+def _consultar(args):
+    """Consulta o busca en el libro mayor: escribe las filas en -o o muestra las primeras."""
+    entidad, producto = (args.entidad.upper() if args.entidad else None), args.tipo
+    if entidad and producto:
+        try:
+            metadatos = registro.buscar(entidad, producto)
+        except KeyError as e:
+            print(f"⚠️ {e.args[0]}", file=sys.stderr)
+            return 2
+        entidad, producto = metadatos.entidad, metadatos.tipo
+    libro = LibroMayor(args.libro)
+    if args.buscar:
+        hoja, df = "Busqueda", libro.buscar(args.buscar, entidad, producto, limite=None)
+    elif args.resumen == "mensual":
+        hoja, df = "Mensual", libro.resumen_mensual(args.cliente, entidad, args.desde, args.hasta)
+    elif args.resumen == "cuotas":
+        hoja, df = "Deuda en cuotas", libro.deuda_cuotas(args.cliente, entidad, args.hasta)
+    elif args.resumen == "prestamos":
+        hoja, df = "Saldo de prestamos", libro.saldo_prestamos(args.cliente, entidad, args.desde)
+    else:
+        hoja, df = args.consultar, libro.consultar(args.consultar, entidad, producto, args.cliente, args.desde,
+                                                   args.hasta)
+    print(f"{len(df)} filas de {hoja}")
+    if not args.salida:
+        print(df.to_string(max_rows=20))
+        return 0
+    resultado = {hoja: df}
+    if args.centavos:
+        resultado = _en_centavos(None, resultado, canonica=True)
+    formato = _formato(args, tanda=False)
+    print(_escribir(resultado, formato, _salida(args, formato, args.salida), args.desborde))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entidad", nargs="?", help="Entidad bancaria, p. ej. BCP")
+    parser.add_argument("tipo", nargs="?", help="Tipo de documento: 'Prestamo' o 'Estado de cuenta'")
+    parser.add_argument("pdf", nargs="*", type=Path,
+                        help="Archivo PDF a procesar; varios archivos o una carpeta procesan una tanda")
+    parser.add_argument("-o", "--salida", type=Path,
+                        help="Archivo Excel o carpeta de salida (por defecto, junto al PDF; 'tanda' en una tanda)")
+    parser.add_argument("--trabajo", type=Path, metavar="CARPETA",
+                        help="Almacén de trabajos de la tanda para reanudarla (por defecto, junto a la salida)")
+    parser.add_argument("--trabajadores", type=int, default=None,
+                        help="Procesos para extraer páginas en PDFs consolidados (por defecto, automático)")
+    parser.add_argument("--indice", action="store_true",
+                        help="Lista los estados de cuenta de un PDF consolidado sin extraerlos")
+    parser.add_argument("--segmentos", nargs="+", metavar="EC",
+                        help="Extrae solo esos estados de cuenta de un PDF consolidado, p. ej. EC-03")
+    parser.add_argument("--vista-previa", action="store_true",
+                        help=f"Muestra las primeras {ejecucion.FILAS_VISTA_PREVIA} filas de cada hoja con lo que se "
+                             f"lea en {ejecucion.SEGUNDOS_VISTA_PREVIA} s, para confirmar ENTIDAD y TIPO")
+    parser.add_argument("--max-segundos", type=int, help="Tiempo máximo de procesamiento (EXTRACTOR_MAX_SEGUNDOS)")
+    parser.add_argument("--max-memoria", type=int, metavar="MB",
+                        help="Memoria máxima por proceso en MB (EXTRACTOR_MAX_MEMORIA_MB)")
+    parser.add_argument("--max-paginas", type=int,
+                        help="Páginas máximas por extracción; más páginas se procesan por lotes (EXTRACTOR_MAX_PAGINAS)")
+    parser.add_argument("--max-segundos-pagina", type=int, metavar="SEGUNDOS",
+                        help="Tiempo máximo por página; las más lentas se simplifican u omiten "
+                             "(EXTRACTOR_SEGUNDOS_POR_PAGINA)")
+    parser.add_argument("--cola", type=Path, metavar="ARCHIVO",
+                        help="Cola compartida (SQLite en una carpeta común a los nodos) para repartir el "
+                             "procesamiento entre trabajadores")
+    parser.add_argument("--trabajador", action="store_true",
+                        help="Atiende la cola indicada con --cola hasta Ctrl+C (se lanza en cada nodo)")
+    parser.add_argument("--solo-pequenos", action="store_true",
+                        help="Con --trabajador: atiende solo documentos cortos (capacidad reservada para ellos)")
+    parser.add_argument("--canonica", action="store_true",
+                        help="Exporta las tablas del esquema común a todos los bancos (Cabeceras, Movimientos, "
+                             "Cuotas, Cronograma) en lugar de las hojas propias del banco")
+    parser.add_argument("--normalizada", action="store_true",
+                        help="Cabeceras del estado de cuenta una vez por ciclo o segmento y movimientos en otra "
+                             "hoja con la referencia, en lugar de repetir la cabecera en cada movimiento")
+    parser.add_argument("--formato", choices=list(exportar.FORMATOS),
+                        help="Formato de salida; parquet, feather y csv escriben un archivo por hoja en una carpeta "
+                             "(por defecto, según la extensión de -o; excel para un PDF y parquet para una tanda)")
+    parser.add_argument("--desborde", choices=[f for f, d in exportar.FORMATOS.items() if d.columnar],
+                        help="En Excel, las hojas con más filas que las de Excel (1.048.576) van completas a un "
+                             "archivo aparte en este formato (por defecto, siguen en hojas Resumen_2, Resumen_3...)")
+    parser.add_argument("--centavos", action="store_true",
+                        help="Montos de dinero en centavos enteros (sin errores de redondeo) en lugar de decimales")
+    parser.add_argument("--libro", type=Path, metavar="ARCHIVO",
+                        help="Libro mayor (SQLite) al que se agregan las tablas canónicas de cada documento "
+                             "procesado; volver a procesar un PDF reemplaza sus filas")
+    parser.add_argument("--consultar", choices=[t.nombre for t in esquema.TABLAS], metavar="TABLA",
+                        help="Consulta una tabla del libro mayor (--libro) en lugar de procesar PDFs; ENTIDAD y "
+                             "TIPO, si se indican, filtran por procesador")
+    parser.add_argument("--buscar", metavar="TEXTO",
+                        help="Busca en el libro mayor (--libro) comercios, clientes o números de préstamo, sin "
+                             "distinguir tildes; cada palabra puede ser el comienzo de una palabra")
+    parser.add_argument("--resumen", choices=["mensual", "cuotas", "prestamos"],
+                        help="Totales del libro mayor (--libro) sin recorrer sus filas: montos y pagos por cliente, "
+                             "entidad y mes; deuda en cuotas del último estado de cuenta (hasta --hasta); o capital "
+                             "pendiente de los préstamos (cuotas desde --desde, por defecto el mes actual)")
+    parser.add_argument("--cliente",
+                        help="Con --consultar o --resumen: cliente de la cabecera (admite %%, p. ej. 'JUAN%%')")
+    parser.add_argument("--desde", metavar="FECHA",
+                        help="Con --consultar o --resumen: desde AAAA, AAAA-MM o AAAA-MM-DD")
+    parser.add_argument("--hasta", metavar="FECHA",
+                        help="Con --consultar o --resumen: hasta AAAA, AAAA-MM o AAAA-MM-DD (inclusive)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="En una tanda, si la salida (-o) ya existe: procesa solo los PDF que no tiene y agrega "
+                             "sus filas al final de cada hoja, sin repetir movimientos ni cuotas ya consolidados")
+    parser.add_argument("--listar", action="store_true", help="Lista las entidades y tipos soportados")
+    args = parser.parse_args(argv)
+
+    errores = registro.validar()
+    for error in errores:
+        print(f"⚠️ {error}", file=sys.stderr)
+
+    if args.listar:
+        for entidad, documentos in registro.entidades().items():
+            print(f"{entidad}: {', '.join(documentos)}")
+        return 1 if errores else 0
+
+    if args.trabajador:
+        if not args.cola:
+            parser.error("--trabajador requiere --cola")
+        print(f"Atendiendo la cola {args.cola} (Ctrl+C para terminar)")
+        costo_maximo = costos.PEQUENO if args.solo_pequenos else None
+        try:
+            distribuido.trabajar(ColaSQLite(args.cola), trabajadores=args.trabajadores, costo_maximo=costo_maximo)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.consultar or args.buscar or args.resumen:
+        if not args.libro:
+            parser.error("--consultar, --buscar y --resumen requieren --libro")
+        return _consultar(args)
+
+    if not (args.entidad and args.tipo and args.pdf):
+        parser.error("se requieren ENTIDAD, TIPO y PDF")
+
+    try:
+        metadatos = registro.buscar(args.entidad.upper(), args.tipo)
+        registro.obtener(metadatos.entidad, metadatos.tipo)
+    except KeyError as e:
+        print(f"⚠️ {e.args[0]}", file=sys.stderr)
+        return 2
+    except ImportError as e:
+        print(f"⚠️ No se pudo cargar el procesador: {e}", file=sys.stderr)
+        return 2
+
+    if (args.indice or args.segmentos) and not metadatos.segmentos:
+        print(f"⚠️ {metadatos.entidad} - {metadatos.tipo} no tiene índice de segmentos", file=sys.stderr)
+        return 2
+    if args.normalizada and not metadatos.normalizada:
+        print(f"⚠️ {metadatos.entidad} - {metadatos.tipo} no tiene salida normalizada", file=sys.stderr)
+        return 2
+
+    por_defecto = presupuesto.desde_entorno()
+    limites = presupuesto.Presupuesto(
+        segundos=args.max_segundos or por_defecto.segundos,
+        memoria_mb=args.max_memoria or por_defecto.memoria_mb,
+        paginas=args.max_paginas or por_defecto.paginas,
+        segundos_por_pagina=args.max_segundos_pagina or por_defecto.segundos_por_pagina,
+    )
+
+    cola = ColaSQLite(args.cola) if args.cola else None
+    if len(args.pdf) > 1 or args.pdf[0].is_dir() or args.incremental:
+        if args.indice or args.segmentos or args.normalizada or args.vista_previa:
+            print("⚠️ --indice, --segmentos, --normalizada y --vista-previa se usan con un solo PDF "
+                  "(para una tanda, --canonica)", file=sys.stderr)
+            return 2
+        return _procesar_tanda(metadatos, _archivos(args.pdf), args, limites, cola)
+    if args.libro and args.segmentos:
+        print("⚠️ --libro guarda documentos completos: no se combina con --segmentos", file=sys.stderr)
+        return 2
+    if cola is not None and (args.segmentos or args.normalizada):
+        print("⚠️ --segmentos y --normalizada no se pueden combinar con --cola", file=sys.stderr)
+        return 2
+
+    pdf = args.pdf[0]
+    pdf_bytes = pdf.read_bytes()
+    opciones = {"trabajadores": args.trabajadores} if metadatos.paralelo else {}
+    if args.normalizada:
+        opciones["normalizada"] = True
+    if args.indice or args.segmentos:
+        from procesadores import indice
+        segmentos = indice.construir(registro.modulo(metadatos.entidad, metadatos.tipo), pdf_bytes,
+                                     args.trabajadores)
+        if args.indice:
+            for segmento in segmentos:
+                print(indice.descripcion(segmento))
+            return 0
+        opciones["segmentos"] = [s.upper() for s in args.segmentos]
+        faltan = sorted(set(opciones["segmentos"]) - {s.etiqueta for s in segmentos})
+        if faltan:
+            print(f"⚠️ El documento no tiene los segmentos {', '.join(faltan)}", file=sys.stderr)
+            return 2
+
+    if args.vista_previa:
+        try:
+            previa = ejecucion.vista_previa(metadatos.entidad, metadatos.tipo, pdf_bytes, **opciones)
+        except RuntimeError as e:
+            print(f"⚠️ {e}", file=sys.stderr)
+            return 4
+        if previa is None:
+            print(f"⚠️ Sin resultado en {ejecucion.SEGUNDOS_VISTA_PREVIA} s: el procesador lee el documento de "
+                  "una sola pasada", file=sys.stderr)
+            return 3
+        interrupcion = reporte.leer(previa).get("interrupcion")
+        if interrupcion:
+            print(f"Vista previa: {interrupcion['paginas_procesadas']} de {interrupcion['paginas_totales']} páginas")
+        for hoja, df in previa.items():
+            print(f"\n{hoja}\n{df.to_string()}")
+        return 0
+
+    try:
+        if cola is not None:
+            trabajo = distribuido.repartir(cola, metadatos.entidad, metadatos.tipo, pdf_bytes, limites.paginas,
+                                           args.trabajadores)
+            print(f"Trabajo {trabajo} encolado en {args.cola}; esperando a los trabajadores...")
+            resultado = distribuido.esperar(cola, trabajo)
+        else:
+            resultado = ejecucion.procesar_aqui(metadatos.entidad, metadatos.tipo, pdf_bytes, limites, **opciones)
+    except presupuesto.PresupuestoExcedido as e:
+        print(f"⚠️ Se detuvo el procesamiento: {e}", file=sys.stderr)
+        return 3
+    except RuntimeError as e:
+        print(f"⚠️ {e}", file=sys.stderr)
+        return 4
+    formato = _formato(args, tanda=False)
+    salida = _salida(args, formato, pdf.with_suffix(""))
+    canonicas = esquema.canonico(metadatos, resultado, pdf.name) if args.canonica or args.libro else None
+    tablas = canonicas if args.canonica else resultado
+    if args.centavos:
+        tablas = _en_centavos(metadatos, tablas, args.canonica)
+    generado = _escribir(tablas, formato, salida, args.desborde)
+    datos_reporte = reporte.leer(resultado)
+    incompleto = reporte.incompleto(resultado)
+    if args.libro and incompleto:
+        print(f"⚠️ Resultado parcial ({incompleto}): no se agregó al libro mayor {args.libro}", file=sys.stderr)
+    elif args.libro:
+        from procesadores.indice import huella_documento
+        filas = LibroMayor(args.libro).guardar(metadatos, huella_documento(pdf_bytes), canonicas, pdf.name)
+        print(f"Libro mayor {args.libro}: " + ", ".join(f"{n} {tabla}" for tabla, n in filas.items() if n))
+    omitidas = datos_reporte.get("paginas_omitidas")
+    if omitidas:
+        print(f"Cronograma completo: se omitieron {omitidas} páginas finales")
+    if datos_reporte.get("modo") == ejecucion.POR_LOTES:
+        print("Documento grande: se procesó por lotes de estados de cuenta")
+    elif datos_reporte.get("modo") == distribuido.DISTRIBUIDO:
+        print(f"Documento repartido en {datos_reporte['partes']} partes entre los trabajadores")
+    simplificadas = datos_reporte.get("paginas_simplificadas")
+    if simplificadas:
+        print(f"Páginas leídas de forma simplificada (demasiado lentas): {_lista(simplificadas)}")
+    sin_procesar = datos_reporte.get("paginas_sin_procesar")
+    if sin_procesar:
+        print(f"⚠️ Páginas omitidas por exceder el tiempo por página: {_lista(sin_procesar)}", file=sys.stderr)
+    interrupcion = datos_reporte.get("interrupcion")
+    if interrupcion:
+        print(f"⚠️ Resultado parcial: {interrupcion['mensaje']} "
+              f"({interrupcion['paginas_procesadas']} de {interrupcion['paginas_totales']} páginas)",
+              file=sys.stderr)
+    print(generado)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
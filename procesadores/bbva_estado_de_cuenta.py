@@ -1,69 +1,206 @@
-import pdfplumber
 import pandas as pd
 import re
-import io
+import sys
+from procesadores import indice, reporte
+from procesadores.esquema import CABECERAS, CUOTAS, MOVIMIENTOS, Origen
+from procesadores.layout import texto_rapido
+from procesadores.paralelo import diagnostico, por_pagina
 
-def procesar_documento(pdf_bytes):
+PATRON_MOVIMIENTO = re.compile(r'^(\d{2}/\d{2}/\d{4})\s+(.+?)\s+(-?[\d,]+\.\d{2})\s+(-?[\d,]+\.\d{2})$')
+PATRON_FIN_MOVIMIENTOS = re.compile(r'INTERESES?\s*SI\s*PAGA\s*MINIMO', re.IGNORECASE)
+PATRON_MONTO_CUOTA = re.compile(
+    r'(?<!\d)(\d+\.\d{2})(?:\s*)(\d{1,2})\s*de\s*(\d{2,3})',
+    re.IGNORECASE
+)
+
+# Columnas de la salida en el esquema canónico (ver esquema.py). El importe de
+# la cuota puede estar en soles o en dólares: va a 'importe'
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Segmento': 'segmento', 'Página': 'pagina', 'Fecha de Cierre': 'fecha_cierre',
+        'Último Día de Pago': 'fecha_limite_pago', 'Pago Mínimo Soles': 'pago_minimo_soles',
+        'Pago Total Soles': 'pago_total_soles', 'Pago Mínimo Dólares': 'pago_minimo_dolares',
+        'Pago Total Dólares': 'pago_total_dolares',
+    }, '%d/%m/%Y'),
+    Origen(MOVIMIENTOS, {
+        'Segmento': 'segmento', 'Página': 'pagina', 'Fecha Consumo': 'fecha_consumo',
+        'Descripción': 'descripcion', 'Monto Soles': 'monto_soles', 'Monto USD': 'monto_dolares',
+    }, '%d/%m/%Y'),
+    Origen(CUOTAS, {
+        'Segmento': 'segmento', 'Página': 'pagina', 'Fecha': 'fecha_consumo', 'Concepto': 'descripcion',
+        'Monto Original': 'monto_original', 'Número de cuota': 'cuota', 'Tasa de cuota': 'tasa',
+        'Capital de cuota': 'capital', 'Interés de cuota': 'interes', 'Importe cuota (S/ o USD)': 'importe',
+    }, '%d/%m/%Y'),
+]
+
+def _informacion_de_pagina(text):
     """
-    Procesa un archivo PDF de estado de cuenta del BBVA
+    Fechas de cierre y último día de pago y montos de pago de una página.
+    Returns:
+        list: [fecha_cierre, ultimo_diapago, pago mínimo y total en soles y dólares] o None
+    """
+    lines = text.splitlines()
+    fecha_cierre = None
+    ultimo_diapago = None
+    pago_mínimo_soles = pago_total_soles = None
+    pago_mínimo_dolares = pago_total_dolares = None
+    registro_idx = 0
+
+    for line in lines:
+        # Buscar fechas de cierre y último día de pago
+        if not fecha_cierre or not ultimo_diapago:
+            fechas = re.findall(r'\d{2}/\d{2}/\d{4}', line)
+            if len(fechas) >= 2:
+                fecha_cierre, ultimo_diapago = fechas[:2]
+
+        # Detectar línea con 7 montos
+        valores = re.findall(r'-?\d{1,3}(?:,\d{3})*\.\d{2}', line)
+        if len(valores) == 7:
+            if registro_idx == 0:
+                pago_mínimo_soles = valores[5].replace(',', '')
+                pago_total_soles = valores[6].replace(',', '')
+            elif registro_idx == 1:
+                pago_mínimo_dolares = valores[5].replace(',', '')
+                pago_total_dolares = valores[6].replace(',', '')
+            registro_idx += 1
+
+    if not (fecha_cierre and ultimo_diapago):
+        return None
+    return [fecha_cierre, ultimo_diapago, pago_mínimo_soles, pago_total_soles,
+            pago_mínimo_dolares, pago_total_dolares]
+
+def _movimientos_de_pagina(text):
+    """Movimientos de una página: [fecha, comercio, monto soles, monto USD]."""
+    data = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if PATRON_FIN_MOVIMIENTOS.search(line.replace(" ", "").upper()):
+            break
+        match = PATRON_MOVIMIENTO.match(line)
+        if match:
+            fecha = match.group(1)
+            comercio = match.group(2)
+            monto_soles = float(match.group(3).replace(',', ''))
+            monto_usd = float(match.group(4).replace(',', ''))
+            data.append([fecha, comercio, monto_soles, monto_usd])
+    return data
+
+def _cuotas_de_pagina(text):
+    """Cuotas de una página, sin segmento ni página."""
+    data = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if re.search(r'TOTAL\s+CUOTAS\s+DEL\s+MES\s+LINEA\s+DE\s+CREDITO', line, re.IGNORECASE):
+            break
+        if not re.match(r'^\d{2}/\d{2}/\d{4}', line):
+            continue
+        try:
+            fecha_match = re.match(r'^(\d{2}/\d{2}/\d{4})', line)
+            if not fecha_match:
+                continue
+            fecha = fecha_match.group(1)
+            match_combo = PATRON_MONTO_CUOTA.search(line)
+            if not match_combo:
+                continue
+            monto_original = float(match_combo.group(1))
+            cuota_raw_1 = match_combo.group(2)
+            cuota_raw_2 = match_combo.group(3)
+            concepto_raw = line[len(fecha):match_combo.start()].strip()
+            concepto = re.sub(r'\s+', ' ', concepto_raw)
+            tasa_match = re.search(r'(\d{1,3}\.\d{2})%', line)
+            tasa_valida = ""
+            if tasa_match:
+                parte_entera, parte_decimal = tasa_match.group(1).split(".")
+                if len(parte_entera) >= 1 and len(parte_decimal) == 2:
+                    tasa_valida = f"{tasa_match.group(1)}%"
+            tasa_inicio = tasa_valida[0] if tasa_valida else ""
+            if len(cuota_raw_2) == 3 and cuota_raw_2[-2:] == tasa_valida[:2]:
+                cuota_raw_2 = cuota_raw_2[:-2]
+            elif cuota_raw_2[-1] == tasa_inicio:
+                cuota_raw_2 = cuota_raw_2[:-1]
+            cuota = f"{cuota_raw_1} de {cuota_raw_2}"
+            decimales = re.findall(r'(?:(?<!\d)|(?<=\.\d\d))\d+\.\d{2}', line)
+            if len(decimales) < 4:
+                continue
+            capital = float(decimales[-3])
+            interes = float(decimales[-2])
+            importe = float(decimales[-1])
+            data.append([
+                fecha, concepto, monto_original,
+                cuota, tasa_valida, capital, interes, importe
+            ])
+        except:
+            continue
+    return data
+
+def _lectura_de_texto(pg, text):
+    return {
+        "pg": pg,
+        "informacion": _informacion_de_pagina(text) if text else None,
+        "movimientos": _movimientos_de_pagina(text) if text else [],
+        "cuotas": _cuotas_de_pagina(text or ''),
+    }
+
+def leer_pagina(page):
+    """
+    Fase 1: todo lo que depende solo de la página (se puede correr en paralelo).
+    Returns:
+        dict: página, información general, movimientos y cuotas sin segmento
+    """
+    return _lectura_de_texto(page.page_number, page.extract_text())
+
+def leer_pagina_rapida(page):
+    """Lectura alternativa para páginas que superan su tiempo: el mismo parseo sobre layout.texto_rapido."""
+    return _lectura_de_texto(page.page_number, texto_rapido(page))
+
+# Lecturas más baratas para páginas que superan su tiempo (ver paralelo.por_pagina)
+LECTURAS_ALTERNATIVAS = (leer_pagina_rapida,)
+
+def pagina_de_indice(page):
+    """Índice de segmentos: par (fecha de cierre, último día de pago) de la página, sin layout."""
+    informacion = _informacion_de_pagina(texto_rapido(page))
+    return {"pg": page.page_number, "par": informacion[:2] if informacion else None}
+
+def segmentos_de_indice(paginas):
+    """Páginas de cada segmento: un segmento por par de fechas, numerado por primera aparición."""
+    segmentos, numeros = {}, {}
+    for pagina in paginas:
+        if pagina["par"] is None:
+            continue
+        par = tuple(pagina["par"])
+        numero = numeros.setdefault(par, len(numeros) + 1)
+        segmentos.setdefault(numero, []).append(pagina["pg"])
+    return list(segmentos.items())
+
+def cabecera_de_segmento(text):
+    """El EC del BBVA no trae el nombre del cliente: solo la fecha de cierre."""
+    informacion = _informacion_de_pagina(text)
+    return None, f"Cierre {informacion[0]}" if informacion else None
+
+def tablas_de_paginas(paginas, etiqueta=indice.etiqueta):
+    """
+    Fase 2: asigna los segmentos en orden de página y arma las tablas.
     Args:
-        pdf_bytes: Bytes del archivo PDF
+        paginas: Resultados de leer_pagina en orden de página
+        etiqueta: Función (número de segmento) -> etiqueta
     Returns:
-        dict: Diccionario con DataFrames de información general, movimientos y cuotas
+        tuple: DataFrames de información general, movimientos y cuotas
     """
-    # Crear un objeto BytesIO para trabajar con los bytes del PDF
-    pdf_stream = io.BytesIO(pdf_bytes)
-    
     # INFORMACIÓN GENERAL
+    # Las etiquetas EC-NN se asignan en orden de página por el par
+    # (fecha de cierre, último día de pago)
     registros = []
     segmentos_por_pagina, etiquetas, n = {}, {}, 1
-    with pdfplumber.open(pdf_stream) as pdf_file:
-        for page in pdf_file.pages:
-            text = page.extract_text()
-            if not text:
-                continue
-
-            lines = text.splitlines()
-            fecha_cierre = None
-            ultimo_diapago = None
-            pago_mínimo_soles = pago_total_soles = None
-            pago_mínimo_dolares = pago_total_dolares = None
-            registro_idx = 0
-
-            for line in lines:
-                # Buscar fechas de cierre y último día de pago
-                if not fecha_cierre or not ultimo_diapago:
-                    fechas = re.findall(r'\d{2}/\d{2}/\d{4}', line)
-                    if len(fechas) >= 2:
-                        fecha_cierre, ultimo_diapago = fechas[:2]
-
-                # Detectar línea con 7 montos
-                valores = re.findall(r'-?\d{1,3}(?:,\d{3})*\.\d{2}', line)
-                if len(valores) == 7:
-                    if registro_idx == 0:
-                        pago_mínimo_soles = valores[5].replace(',', '')
-                        pago_total_soles = valores[6].replace(',', '')
-                    elif registro_idx == 1:
-                        pago_mínimo_dolares = valores[5].replace(',', '')
-                        pago_total_dolares = valores[6].replace(',', '')
-                    registro_idx += 1
-
-            if fecha_cierre and ultimo_diapago:
-                par = (fecha_cierre, ultimo_diapago)
-                if par not in etiquetas:
-                    etiquetas[par] = f"EC-{n:02d}"
-                    n += 1
-                segmentos_por_pagina[str(page.page_number)] = etiquetas[par]
-                registros.append([
-                    etiquetas[par],
-                    page.page_number,
-                    fecha_cierre,
-                    ultimo_diapago,
-                    pago_mínimo_soles,
-                    pago_total_soles,
-                    pago_mínimo_dolares,
-                    pago_total_dolares
-                ])
+    for pagina in paginas:
+        if pagina["informacion"] is None:
+            continue
+        fecha_cierre, ultimo_diapago = pagina["informacion"][:2]
+        par = (fecha_cierre, ultimo_diapago)
+        if par not in etiquetas:
+            etiquetas[par] = etiqueta(n)
+            n += 1
+        segmentos_por_pagina[str(pagina["pg"])] = etiquetas[par]
+        registros.append([etiquetas[par], pagina["pg"]] + pagina["informacion"])
 
     df_general = pd.DataFrame(registros, columns=[
         'Segmento',
@@ -75,35 +212,14 @@ def procesar_documento(pdf_bytes):
         'Pago Mínimo Dólares',
         'Pago Total Dólares'
     ])
-    # Un único registro por (Fecha de Cierre, Último Día de Pago)
-    df_general = df_general.sort_values('Página').drop_duplicates(
-        subset=['Fecha de Cierre', 'Último Día de Pago'], keep='first'
-    )
 
     # MOVIMIENTOS
-    pattern = r'^(\d{2}/\d{2}/\d{4})\s+(.+?)\s+(-?[\d,]+\.\d{2})\s+(-?[\d,]+\.\d{2})$'
     data = []
-    stop_pattern = re.compile(r'INTERESES?\s*SI\s*PAGA\s*MINIMO', re.IGNORECASE)
-
-    pdf_stream.seek(0)
-    with pdfplumber.open(pdf_stream) as pdf_file:
-        for page in pdf_file.pages:
-            text = page.extract_text()
-            pg = str(page.page_number)
-            if not text:
-                continue
-            for line in text.split('\n'):
-                line = line.strip()
-                if stop_pattern.search(line.replace(" ", "").upper()):
-                    break
-                match = re.match(pattern, line)
-                if match:
-                    fecha = match.group(1)
-                    comercio = match.group(2)
-                    monto_soles = float(match.group(3).replace(',', ''))
-                    monto_usd = float(match.group(4).replace(',', ''))
-                    segmento = segmentos_por_pagina.get(pg, "")
-                    data.append([segmento, pg, fecha, comercio, monto_soles, monto_usd])
+    for pagina in paginas:
+        pg = str(pagina["pg"])
+        segmento = segmentos_por_pagina.get(pg, "")
+        for fila in pagina["movimientos"]:
+            data.append([segmento, pg] + fila)
 
     df_montos = pd.DataFrame(data, columns=[
         'Segmento',
@@ -115,65 +231,12 @@ def procesar_documento(pdf_bytes):
     ])
 
     # CUOTAS
-    pattern_monto_cuota = re.compile(
-        r'(\d+\.\d{2})(?:\s*)(\d{1,2})\s*de\s*(\d{2,3})',
-        re.IGNORECASE
-    )
     data = []
-
-    pdf_stream.seek(0)
-    with pdfplumber.open(pdf_stream) as pdf_file:
-        for page in pdf_file.pages:
-            pg = str(page.page_number)
-            segmento = segmentos_por_pagina.get(pg, "")
-            lines = page.extract_text().split('\n')
-            stop = False
-            for line in lines:
-                line = line.strip()
-                if re.search(r'TOTAL\s+CUOTAS\s+DEL\s+MES\s+LINEA\s+DE\s+CREDITO', line, re.IGNORECASE):
-                    stop = True
-                    break
-                if not re.match(r'^\d{2}/\d{2}/\d{4}', line):
-                    continue
-                try:
-                    fecha_match = re.match(r'^(\d{2}/\d{2}/\d{4})', line)
-                    if not fecha_match:
-                        continue
-                    fecha = fecha_match.group(1)
-                    match_combo = pattern_monto_cuota.search(line)
-                    if not match_combo:
-                        continue
-                    monto_original = float(match_combo.group(1))
-                    cuota_raw_1 = match_combo.group(2)
-                    cuota_raw_2 = match_combo.group(3)
-                    concepto_raw = line[len(fecha):match_combo.start()].strip()
-                    concepto = re.sub(r'\s+', ' ', concepto_raw)
-                    tasa_match = re.search(r'(\d{1,3}\.\d{2})%', line)
-                    tasa_valida = ""
-                    if tasa_match:
-                        parte_entera, parte_decimal = tasa_match.group(1).split(".")
-                        if len(parte_entera) >= 1 and len(parte_decimal) == 2:
-                            tasa_valida = f"{tasa_match.group(1)}%"
-                    tasa_inicio = tasa_valida[0] if tasa_valida else ""
-                    if len(cuota_raw_2) == 3 and cuota_raw_2[-2:] == tasa_valida[:2]:
-                        cuota_raw_2 = cuota_raw_2[:-2]
-                    elif cuota_raw_2[-1] == tasa_inicio:
-                        cuota_raw_2 = cuota_raw_2[:-1]
-                    cuota = f"{cuota_raw_1} de {cuota_raw_2}"
-                    decimales = re.findall(r'\d+\.\d{2}', line)
-                    if len(decimales) < 4:
-                        continue
-                    capital = float(decimales[-3])
-                    interes = float(decimales[-2])
-                    importe = float(decimales[-1])
-                    data.append([
-                        segmento, pg, fecha, concepto, monto_original,
-                        cuota, tasa_valida, capital, interes, importe
-                    ])
-                except:
-                    continue
-            if stop:
-                continue
+    for pagina in paginas:
+        pg = str(pagina["pg"])
+        segmento = segmentos_por_pagina.get(pg, "")
+        for fila in pagina["cuotas"]:
+            data.append([segmento, pg] + fila)
 
     df_cuotas = pd.DataFrame(data, columns=[
         'Segmento',
@@ -203,8 +266,28 @@ def procesar_documento(pdf_bytes):
                 return pd.Series([f"{cuota1} de {cuota2_fixed}", tasa_fixed])
         return pd.Series([cuota, tasa])
 
-    df_cuotas[["Número de cuota", "Tasa de cuota"]] = df_cuotas.apply(separar_cuota_y_tasa, axis=1)
-    df_cuotas["Tasa de cuota"] = df_cuotas["Tasa de cuota"].str.replace("%%", "%", regex=False)
+    if not df_cuotas.empty:
+        df_cuotas[["Número de cuota", "Tasa de cuota"]] = df_cuotas.apply(separar_cuota_y_tasa, axis=1)
+        df_cuotas["Tasa de cuota"] = df_cuotas["Tasa de cuota"].str.replace("%%", "%", regex=False)
+    return df_general, df_montos, df_cuotas
+
+def armar_salida(df_general, df_montos, df_cuotas, normalizada=False):
+    """
+    Hojas de salida: 'Resumen' (información general y movimientos) y 'Cuotas'.
+    Con normalizada=True: 'Cabeceras', 'Movimientos' y 'Cuotas' por separado,
+    enlazadas por la etiqueta del segmento, sin la hoja combinada.
+    """
+    # Un único registro por (Fecha de Cierre, Último Día de Pago)
+    df_general = df_general.sort_values('Página').drop_duplicates(
+        subset=['Fecha de Cierre', 'Último Día de Pago'], keep='first'
+    )
+    if normalizada:
+        return {
+            'Cabeceras': df_general.reset_index(drop=True),
+            'Movimientos': df_montos.reset_index(drop=True),
+            'Cuotas': df_cuotas.reset_index(drop=True)
+        }
+
 
     # Unir df_general y df_montos en una sola página tipo Excel
     # Convertir ambos DataFrames a listas de filas
@@ -226,3 +309,19 @@ def procesar_documento(pdf_bytes):
 
     return output
 
+def procesar_documento(pdf_bytes, trabajadores=None, segmentos=None, normalizada=False):
+    """
+    Procesa un archivo PDF de estado de cuenta del BBVA
+    Args:
+        pdf_bytes: Bytes del archivo PDF
+        trabajadores: Procesos para extraer páginas (None = automático, 1 = sin paralelismo)
+        segmentos: Etiquetas de los EC a extraer (ver indice.construir); None = todos
+        normalizada: Si True, cabeceras y movimientos en hojas separadas (ver armar_salida)
+    Returns:
+        dict: Diccionario con DataFrames de información general, movimientos y cuotas
+    """
+    if segmentos:
+        return indice.extraer(sys.modules[__name__], pdf_bytes, segmentos, trabajadores, normalizada=normalizada)
+    paginas = por_pagina(pdf_bytes, leer_pagina, trabajadores, alternativas=LECTURAS_ALTERNATIVAS)
+    return reporte.anotar(armar_salida(*tablas_de_paginas(paginas), normalizada=normalizada),
+                          **diagnostico(paginas))
@@ -3,6 +3,47 @@ import pandas as pd
 import re
 import io
 from datetime import datetime
+from procesadores import presupuesto, reporte
+from procesadores.esquema import CABECERAS, CRONOGRAMA, Origen
+from procesadores.columnas import Columna, filas_por_columnas
+from procesadores.cronograma import cronograma_completo, paginas_restantes, tiene_marcador
+
+# Cuota, vencimiento, saldo, amortización (puede venir vacía), interés, comisión,
+# seguro desgravamen y otros seguros (opcionales) y total. Cada columna es un token
+# separado por espacios, así ningún número puede repartirse entre dos grupos y el
+# patrón no retrocede exponencialmente ante líneas largas o malformadas.
+PATRON_CUOTA = re.compile(
+    r'^(\d+)\s+(\d{2}/\d{2}/\d{4})\s+([\d\.,]+)\s+(?:([\d\.,]+)\s+|\s)'
+    r'([\d\.,]+)\s+(\d+(?:\.\d*)?)(?:\s+([\d\.,]+))?(?:\s+([\d\.,]+))?\s+([\d\.,]+)$'
+)
+
+# Columnas del cronograma, identificadas por su texto en la fila de encabezado
+COLUMNAS_CUOTAS = [
+    Columna('Cuota', 'CUOTA', r'\d+', False),
+    Columna('Fecha Vencimiento', 'VENCIMIENTO', r'\d{2}/\d{2}/\d{4}', False),
+    Columna('Saldo', 'SALDO', r'[\d\.,]+', False),
+    Columna('Amortización', 'AMORTIZACION', r'[\d\.,]+', True),
+    Columna('Interés', 'INTERES', r'[\d\.,]+', False),
+    Columna('Comisión', 'COMISION', r'\d+(?:\.\d*)?', False),
+    Columna('Seguro Desgrav.', 'DESGRAV', r'[\d\.,]+', True),
+    Columna('Otros Seguros', 'OTROS', r'[\d\.,]+', True),
+    Columna('Total a Pagar', 'TOTAL', r'[\d\.,]+', False),
+]
+
+# Columnas de la salida en el esquema canónico (ver esquema.py)
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Página': 'pagina', 'Cliente': 'cliente', 'Nro. Prestamo': 'cuenta',
+        'Fecha de Formalización': 'fecha_inicio', 'Importe Concedido': 'monto_prestamo',
+        'Tasa Efectiva Anual': 'tasa_anual', 'Tasa Costo Efectivo Anual REF.OPER.': 'tasa_costo_efectivo',
+        'Plazo': 'cuotas_pactadas',
+    }),
+    Origen(CRONOGRAMA, {
+        'Página': 'pagina', 'Cuota': 'cuota', 'Fecha Vencimiento': 'fecha_vencimiento', 'Saldo': 'saldo',
+        'Amortización': 'capital', 'Interés': 'interes', 'Comisión': 'comisiones',
+        'Seguro Desgrav.': 'seguros', 'Otros Seguros': 'seguros', 'Total a Pagar': 'total',
+    }),
+]
 
 def procesar_documento(pdf_bytes):
     """
@@ -18,6 +59,7 @@ def procesar_documento(pdf_bytes):
     datos = []
     with pdfplumber.open(pdf_stream) as pdf_file:
         for page in pdf_file.pages:
+            presupuesto.revisar_cancelacion()
             text = page.extract_text()
             if not text:
                 continue
@@ -57,36 +99,43 @@ def procesar_documento(pdf_bytes):
     df_general = df_general.drop_duplicates(subset=[col for col in df_general.columns if col != 'Página'])
 
     # DETALLE DE CUOTAS
-    pattern = r'^\s*(\d+)\s+(\d{2}/\d{2}/\d{4})\s+([\d\.,]+)\s+([\d\.,]+|)\s+([\d\.,]+)\s+(\d+\.?\d*)\s*([\d\.,]*)\s*([\d\.,]*)\s+([\d\.,]+)\s*$'
     data = []
+    plazo = int(df_general['Plazo'].iloc[0]) if not df_general.empty else None
+    cuotas_leidas = set()
+    paginas_omitidas = 0
 
     pdf_stream.seek(0)
     with pdfplumber.open(pdf_stream) as pdf_file:
-        for page in pdf_file.pages:
-            text = page.extract_text()
+        for page, filas in filas_por_columnas(pdf_file.pages, COLUMNAS_CUOTAS):
             pg = page.page_number
-            lines = text.split('\n')
-
-            for line in lines:
-                match = re.match(pattern, line.strip())
-                if match:
-                    valores = []
-                    for i in range(1, 10):
-                        valor = match.group(i).strip()
-                        valores.append(valor if valor != '' else '0')
-                    
-                    data.append([
-                        pg,
-                        int(valores[0]),     # Cuota
-                        valores[1],          # Fecha Vencimiento
-                        valores[2],          # Saldo
-                        valores[3],          # Amortización
-                        valores[4],          # Interés
-                        valores[5],          # Comisión
-                        valores[6],          # Seguro Desgrav.
-                        valores[7],          # Otros Seguros
-                        valores[8]           # Total a Pagar
-                    ])
+            if filas is None:
+                # Página sin encabezado reconocible: se usa el texto con layout
+                filas = []
+                for line in (page.extract_text() or '').split('\n'):
+                    match = PATRON_CUOTA.match(line.strip())
+                    if match:
+                        filas.append([match.group(i) or '' for i in range(1, 10)])
+
+            for fila in filas:
+                valores = [valor.strip() or '0' for valor in fila]
+                data.append([
+                    pg,
+                    int(valores[0]),     # Cuota
+                    valores[1],          # Fecha Vencimiento
+                    valores[2],          # Saldo
+                    valores[3],          # Amortización
+                    valores[4],          # Interés
+                    valores[5],          # Comisión
+                    valores[6],          # Seguro Desgrav.
+                    valores[7],          # Otros Seguros
+                    valores[8]           # Total a Pagar
+                ])
+                cuotas_leidas.add(int(valores[0]))
+
+            # Cronograma completo o fila de totales: el resto son anexos
+            if cronograma_completo(cuotas_leidas, plazo) or tiene_marcador(page, "TOTALES--->"):
+                paginas_omitidas = paginas_restantes(pdf_file, page)
+                break
 
     df_detalle = pd.DataFrame(data, columns=['Página', 'Cuota', 'Fecha Vencimiento', 
                                            'Saldo', 'Amortización', 'Interés', 'Comisión', 
@@ -118,4 +167,4 @@ def procesar_documento(pdf_bytes):
         'Resumen': df_resumen_completo.reset_index(drop=True)
     }
 
-    return output
+    return reporte.anotar(output, paginas_omitidas=paginas_omitidas)
@@ -3,6 +3,29 @@ import pandas as pd
 import re
 import os
 from io import BytesIO
+from procesadores import presupuesto
+from procesadores.esquema import CABECERAS, CUOTAS, MOVIMIENTOS, Origen
+from procesadores.layout import region_seccion
+
+# Columnas de la salida en el esquema canónico (ver esquema.py). La cabecera
+# del ciclo viene repetida en cada movimiento; esquema.canonico deja una fila
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Pagina': 'pagina', 'Inicio ciclo facturación': 'fecha_inicio', 'Fin ciclo facturación': 'fecha_cierre',
+        'Fecha límite de pago': 'fecha_limite_pago', 'Pago mínimo S/': 'pago_minimo_soles',
+        'Pago total S/.': 'pago_total_soles', 'Pago mínimo US$': 'pago_minimo_dolares',
+        'Pago total US$': 'pago_total_dolares', 'Saldo Anterior': 'saldo_anterior',
+    }),
+    Origen(MOVIMIENTOS, {
+        'Pagina': 'pagina', 'Fecha de Consumo': 'fecha_consumo', 'Fecha de Proceso': 'fecha_proceso',
+        'Descripción': 'descripcion', 'Monto': 'monto_soles',
+    }),
+    Origen(CUOTAS, {
+        'Pagina': 'pagina', 'Fecha de Consumo': 'fecha_consumo', 'Fecha de Proceso': 'fecha_proceso',
+        'Descripción': 'descripcion', 'Compras': 'monto_original', 'NroCuota': 'cuota', 'TEA%': 'tasa',
+        'capital': 'capital', 'intereses': 'interes', 'total': 'importe_soles',
+    }),
+]
 
 def split_transaction(transaction_string):
     pattern = r'(\d{1,2}\w{3})\s+(\d{1,2}\w{3})\s+(.+?)\s+([\d,\.]+-?)$'
@@ -26,7 +49,9 @@ def separar_transaccion(transaction_line):
     return None
 
 def extraer_montos(text):
-    pattern = r'[\d,]+\.\d{2}'
+    # Solo se empieza al inicio de un número o justo después de otro monto:
+    # mismo resultado que r'[\d,]+\.\d{2}' sin retroceso cuadrático en corridas de dígitos
+    pattern = r'(?:(?<![\d,])|(?<=\.\d\d))[\d,]+\.\d{2}'
     text_clean = text.replace(',', '')
     montos = re.findall(pattern, text_clean)
     return montos
@@ -44,10 +69,70 @@ def abrir_pdf(pdf_input):
     else:
         raise ValueError("pdf_input debe ser una ruta, bytes o file-like object.")
 
-def procesar_movimientos(pdf_input):
+# Datos de cabecera del ciclo de facturación; en la salida ancha se repiten en
+# cada movimiento, en la normalizada van una vez por ciclo
+COLUMNAS_CICLO = [
+    'Tarjeta', 'Inicio ciclo facturación', 'Fin ciclo facturación', 'Fecha límite de pago', 'Pago mínimo S/',
+    'Pago total S/.', 'Pago mínimo US$', 'Pago total US$', 'Saldo Anterior'
+]
+
+MESES = {
+    'Ene': 'Jan', 'Feb': 'Feb', 'Mar': 'Mar', 'Abr': 'Apr', 'May': 'May', 'Jun': 'Jun',
+    'Jul': 'Jul', 'Ago': 'Aug', 'Set': 'Sep', 'Sep': 'Sep', 'Oct': 'Oct', 'Nov': 'Nov', 'Dic': 'Dec'
+}
+
+def _mes_en_ingles(fecha_str):
+    for esp, eng in MESES.items():
+        if esp in fecha_str:
+            return fecha_str.replace(esp, eng)
+    return fecha_str
+
+def _fechas_con_año(fechas, años):
+    """
+    Fechas '05Ene' con el año de su ciclo, en una sola pasada.
+    Args:
+        fechas: Serie de textos día + mes abreviado en español
+        años: Serie (mismo índice) con el año de cada fila; NaN si no se conoce
+    Returns:
+        Serie datetime64 (NaT si no se pudo convertir)
+    """
+    con_año = años.notna()
+    textos = fechas.astype(str).map(_mes_en_ingles) + años.astype('Int64').astype(str)
+    return pd.to_datetime(textos.where(con_año), format="%d%b%Y", errors='coerce')
+
+def _limpiar_a_float(valor):
+    if pd.isna(valor):
+        return None
+    return float(str(valor).replace(',', '').replace('S/.', '').replace('$', '').strip())
+
+def _procesar_monto(valor):
+    if pd.isna(valor):
+        return None
+    valor_str = str(valor).strip()
+    negativo = valor_str.endswith('-')
+    valor_str = valor_str.replace('-', '')
+    try:
+        valor_float = float(valor_str.replace(',', ''))
+    except:
+        return None
+    return -valor_float if negativo else valor_float
+
+def leer_ciclos_y_movimientos(pdf_input):
+    """
+    Lee los movimientos y la cabecera del ciclo vigente en cada uno. Cada
+    cabecera distinta se convierte una sola vez, no en cada movimiento.
+    Args:
+        pdf_input: Ruta, bytes o file-like del PDF
+    Returns:
+        tuple: (ciclos, movimientos). ciclos tiene una fila por cabecera distinta
+               ('Ciclo', 'Pagina' donde aparece primero y COLUMNAS_CICLO);
+               movimientos tiene 'Ciclo' como referencia a esa tabla
+    """
     transactions = []
+    ciclos = {}
     with abrir_pdf(pdf_input) as pdf:
         for page in pdf.pages:
+            presupuesto.revisar_cancelacion()
             pg = str(page.page_number)
             text = page.extract_text()
             lines = text.split('\n')
@@ -77,68 +162,40 @@ def procesar_movimientos(pdf_input):
                 if any(keyword in line for keyword in ['CONSUMO', 'PAGOSERVIC', ' PAGO','CARGO','DEVOLUCIÓN']):
                     columns = split_transaction(line)
                     if columns:
+                        cabecera = (tarjeta, inicio, fin, limite, pago_min_soles, pago_total_soles,
+                                    pago_min_usd, pago_total_usd, saldo_anterior)
+                        if cabecera not in ciclos:
+                            ciclos[cabecera] = (len(ciclos) + 1, pg)
                         columns.append(pg)
-                        columns.append(tarjeta)
-                        columns.append(inicio)
-                        columns.append(fin)
-                        columns.append(limite)
-                        columns.append(pago_min_soles)
-                        columns.append(pago_total_soles)
-                        columns.append(pago_min_usd)
-                        columns.append(pago_total_usd)
-                        columns.append(saldo_anterior)
+                        columns.append(ciclos[cabecera][0])
                         transactions.append(columns)
                 i += 1
-    df = pd.DataFrame(transactions, columns=[
-        'Fecha de Proceso', 'Fecha de Consumo', 'Descripción', 'Monto','Pagina', 'Tarjeta',
-        'Inicio ciclo facturación', 'Fin ciclo facturación', 'Fecha límite de pago', 'Pago mínimo S/',
-        'Pago total S/.', 'Pago mínimo US$', 'Pago total US$','Saldo Anterior'
-    ])
+    df_ciclos = pd.DataFrame(list(ciclos), columns=COLUMNAS_CICLO)
+    df_ciclos.insert(0, 'Pagina', [pg for _, pg in ciclos.values()])
+    df_ciclos.insert(0, 'Ciclo', pd.Series([numero for numero, _ in ciclos.values()], dtype='int64'))
     columnas_fecha = ['Inicio ciclo facturación', 'Fin ciclo facturación', 'Fecha límite de pago']
     for col in columnas_fecha:
-        df[col] = pd.to_datetime(df[col], dayfirst=True, errors='coerce')
-    meses = {
-        'Ene': 'Jan', 'Feb': 'Feb', 'Mar': 'Mar', 'Abr': 'Apr', 'May': 'May', 'Jun': 'Jun',
-        'Jul': 'Jul', 'Ago': 'Aug', 'Set': 'Sep', 'Sep': 'Sep', 'Oct': 'Oct', 'Nov': 'Nov', 'Dic': 'Dec'
-    }
-    def convertir_fecha(fecha_str, inicio_str):
-        if not isinstance(fecha_str, str) or not isinstance(inicio_str, str):
-            return pd.NaT
-        for esp, eng in meses.items():
-            if esp in fecha_str:
-                fecha_str = fecha_str.replace(esp, eng)
-                break
-        try:
-            año = pd.to_datetime(inicio_str, dayfirst=True).year
-            return pd.to_datetime(f"{fecha_str}{año}", format="%d%b%Y", errors='coerce')
-        except:
-            return pd.NaT
-    df['Fecha de Proceso'] = df.apply(lambda row: convertir_fecha(row['Fecha de Proceso'], str(row['Inicio ciclo facturación'])), axis=1)
-    df['Fecha de Consumo'] = df.apply(lambda row: convertir_fecha(row['Fecha de Consumo'], str(row['Inicio ciclo facturación'])), axis=1)
-    df['Inicio ciclo facturación'] = df['Inicio ciclo facturación'].dt.date
-    df['Fin ciclo facturación'] = df['Fin ciclo facturación'].dt.date
-    df['Fecha límite de pago'] = df['Fecha límite de pago'].dt.date
-    df['Fecha de Proceso'] = df['Fecha de Proceso'].dt.date
-    df['Fecha de Consumo'] = df['Fecha de Consumo'].dt.date
-    columnas_monto = ['Pago mínimo S/', 'Pago total S/.', 'Pago mínimo US$', 'Pago total US$', 'Saldo Anterior']
-    def limpiar_a_float(valor):
-        if pd.isna(valor):
-            return None
-        return float(str(valor).replace(',', '').replace('S/.', '').replace('$', '').strip())
-    for col in columnas_monto:
-        df[col] = df[col].apply(limpiar_a_float)
-    def procesar_monto(valor):
-        if pd.isna(valor):
-            return None
-        valor_str = str(valor).strip()
-        negativo = valor_str.endswith('-')
-        valor_str = valor_str.replace('-', '')
-        try:
-            valor_float = float(valor_str.replace(',', ''))
-        except:
-            return None
-        return -valor_float if negativo else valor_float
-    df['Monto'] = df['Monto'].apply(procesar_monto)
+        df_ciclos[col] = pd.to_datetime(df_ciclos[col], dayfirst=True, errors='coerce')
+    años = df_ciclos['Inicio ciclo facturación'].dt.year
+    for col in columnas_fecha:
+        df_ciclos[col] = df_ciclos[col].dt.date
+    for col in COLUMNAS_CICLO[4:]:
+        df_ciclos[col] = df_ciclos[col].apply(_limpiar_a_float)
+
+    df = pd.DataFrame(transactions, columns=['Fecha de Proceso', 'Fecha de Consumo', 'Descripción', 'Monto',
+                                             'Pagina', 'Ciclo']).astype({'Ciclo': 'int64'})
+    # El año de las fechas sale del inicio del ciclo de cada movimiento
+    años_movimiento = pd.Series(años.to_numpy(), index=df_ciclos['Ciclo']).reindex(df['Ciclo'])
+    años_movimiento.index = df.index
+    df['Fecha de Proceso'] = _fechas_con_año(df['Fecha de Proceso'], años_movimiento).dt.date
+    df['Fecha de Consumo'] = _fechas_con_año(df['Fecha de Consumo'], años_movimiento).dt.date
+    df['Monto'] = df['Monto'].apply(_procesar_monto)
+    return df_ciclos, df[['Ciclo', 'Pagina', 'Fecha de Proceso', 'Fecha de Consumo', 'Descripción', 'Monto']]
+
+def procesar_movimientos(pdf_input):
+    df_ciclos, df = leer_ciclos_y_movimientos(pdf_input)
+    # Salida ancha: la cabecera de su ciclo en cada movimiento
+    df = df.merge(df_ciclos.drop(columns='Pagina'), on='Ciclo', how='left')
     base_movimiento = [ 'Pagina', 'Inicio ciclo facturación', 'Fin ciclo facturación', 'Fecha límite de pago', 'Pago mínimo S/', 'Pago total S/.','Pago mínimo US$',
                    'Pago total US$','Fecha de Proceso', 'Fecha de Consumo', 'Saldo Anterior','Descripción','Monto']
     df_movimientos = df[base_movimiento]
@@ -148,8 +205,14 @@ def procesar_cuotas(pdf_input, df_mov):
     transactions = []
     with abrir_pdf(pdf_input) as pdf:
         for page in pdf.pages:
+            presupuesto.revisar_cancelacion()
             pg = str(page.page_number)
-            text = page.extract_text()
+            # Las páginas sin plan de cuotas se descartan sin layout; en las demás
+            # solo se extrae el texto desde el encabezado del plan hacia abajo
+            bbox = region_seccion(page, "DETALLE PLAN CUOTAS SOLES")
+            if bbox is None:
+                continue
+            text = page.crop(bbox).extract_text() or ''
             lines = text.split('\n')
             i = 0
             for line in lines:
@@ -209,10 +272,26 @@ def procesar_cuotas(pdf_input, df_mov):
     df_cuotas.rename(columns={'TEA': 'TEA%'}, inplace=True)
     return df_cuotas
 
-def procesar_documento(pdf_input):
+def procesar_documento(pdf_input, normalizada=False):
     """
     Procesa el documento PDF y retorna un diccionario con DataFrames de resumen y cuotas.
+    Args:
+        pdf_input: Ruta, bytes o file-like del PDF
+        normalizada: Si True, en lugar de repetir la cabecera del ciclo en cada
+                     movimiento devuelve 'Cabeceras' (una fila por ciclo),
+                     'Movimientos' (con la columna 'Ciclo' como referencia) y 'Cuotas'
     """
+    if normalizada:
+        df_ciclos, df_hechos = leer_ciclos_y_movimientos(pdf_input)
+        paginas = df_hechos[['Pagina', 'Ciclo']].merge(df_ciclos[['Ciclo', 'Fin ciclo facturación']], on='Ciclo',
+                                                        how='left')
+        df_cuotas = procesar_cuotas(pdf_input, paginas.drop_duplicates())
+        return {
+            'Cabeceras': df_ciclos,
+            'Movimientos': df_hechos.reset_index(drop=True),
+            'Cuotas': df_cuotas.reset_index(drop=True)
+        }
+
     df_movimientos = procesar_movimientos(pdf_input)
     df_cuotas = procesar_cuotas(pdf_input, df_movimientos)
 
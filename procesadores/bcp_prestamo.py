@@ -3,6 +3,45 @@ import pandas as pd
 import re
 from datetime import datetime
 import io
+from procesadores import presupuesto
+from procesadores.columnas import Columna, filas_por_columnas
+from procesadores.esquema import CABECERAS, CRONOGRAMA, Origen
+from procesadores.regex_seguro import grupos_en_orden
+
+# Las cuatro tasas aparecen en este orden dentro de la página. Se buscan una
+# tras otra en lugar de unirlas con '.*?', que retrocede sin límite cuando
+# alguna de ellas falta en una página larga.
+PATRONES_TASAS = [
+    re.compile(r'TASA DE INTERES COMPENSATORIA EFECTIVA ANUAL\s*\(?\d*\)?:\s*([\d.,]+)%'),
+    re.compile(r'COSTO EFECTIVO\s*:\s*([\d.,]+)%'),
+    re.compile(r'TASA ANUAL SEGURO DESGRAVAMEN\s*:\s*([\d.,]+)%'),
+    re.compile(r'TASA ANUAL SEGURO INMUEBLE\s*:\s*([\d.,]+)%'),
+]
+
+# Columnas del cronograma, identificadas por su texto en la fila de encabezado
+COLUMNAS_CUOTAS = [
+    Columna('Fecha', 'FECHA', r'\d+', False),
+    Columna('Saldo', 'SALDO', r'[\d,]+\.\d{2}', False),
+    Columna('Amortizacion', 'AMORTIZACION', r'[\d,]+\.\d{2}', False),
+    Columna('Intereses', 'INTERES', r'[\d,]+\.\d{2}', False),
+    Columna('Seguro Desg.', 'DESGRAV', r'[\d,]+\.\d{2}', False),
+    Columna('Seguro Bien', 'BIEN', r'[\d,]+\.\d{2}', False),
+    Columna('Comisiones', 'COMISION', r'[\d,]+\.\d{2}', False),
+    Columna('Cuota', 'CUOTA', r'[\d,]+\.\d{2}', False),
+]
+
+# Columnas de la salida en el esquema canónico (ver esquema.py). El cronograma
+# no trae número de cuota; la fila de totales queda fuera por no tener fecha
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Nombre Cliente': 'cliente', 'FECHA DESEMBOLSO': 'fecha_inicio',
+        'TASA DE INTERES COMPENSATORIA EFECTIVA ANUAL': 'tasa_anual', 'COSTO EFECTIVO': 'tasa_costo_efectivo',
+    }),
+    Origen(CRONOGRAMA, {
+        'Fecha': 'fecha_vencimiento', 'Saldo': 'saldo', 'Amortizacion': 'capital', 'Intereses': 'interes',
+        'Seguro Desg.': 'seguros', 'Seguro Bien': 'seguros', 'Comisiones': 'comisiones', 'Cuota': 'total',
+    }),
+]
 
 def procesar_documento(pdf_bytes):
     """
@@ -16,17 +55,12 @@ def procesar_documento(pdf_bytes):
     pdf_stream = io.BytesIO(pdf_bytes)
     
     # INFORMACIÓN GENERAL
-    pattern_tasas = (
-        r'TASA DE INTERES COMPENSATORIA EFECTIVA ANUAL\s*\(?\d*\)?:\s*([\d.,]+)%.*?'
-        r'COSTO EFECTIVO\s*:\s*([\d.,]+)%.*?'
-        r'TASA ANUAL SEGURO DESGRAVAMEN\s*:\s*([\d.,]+)%.*?'
-        r'TASA ANUAL SEGURO INMUEBLE\s*:\s*([\d.,]+)%'
-    )
     pattern_fecha = r'FECHA DESEMBOLSO\s*:\s*(\d{2}/\d{2}/\d{2})'
     datos = []
     
     with pdfplumber.open(pdf_stream) as pdf_file:
         for page in pdf_file.pages:
+            presupuesto.revisar_cancelacion()
             text = page.extract_text()
             if not text:
                 continue
@@ -39,17 +73,17 @@ def procesar_documento(pdf_bytes):
                     break
                     
             full_text = ' '.join(lines)
-            match_tasas = re.search(pattern_tasas, full_text)
+            tasas = grupos_en_orden(PATRONES_TASAS, full_text)
             match_fecha = re.search(pattern_fecha, full_text)
             
-            if match_tasas and match_fecha:
+            if tasas and match_fecha:
                 fecha_str = match_fecha.group(1)
                 fecha_date = datetime.strptime(fecha_str, "%d/%m/%y").date()
                 
-                tasa_interes = float(match_tasas.group(1).replace(',', '.'))
-                costo_efectivo = float(match_tasas.group(2).replace(',', '.'))
-                seguro_desgravamen = float(match_tasas.group(3).replace(',', '.'))
-                seguro_inmueble = float(match_tasas.group(4).replace(',', '.'))
+                tasa_interes = float(tasas[0].replace(',', '.'))
+                costo_efectivo = float(tasas[1].replace(',', '.'))
+                seguro_desgravamen = float(tasas[2].replace(',', '.'))
+                seguro_inmueble = float(tasas[3].replace(',', '.'))
                 
                 datos.append([
                     nombre_cliente, fecha_date, tasa_interes, 
@@ -72,7 +106,11 @@ def procesar_documento(pdf_bytes):
     
     pdf_stream.seek(0)
     with pdfplumber.open(pdf_stream) as pdf_file:
-        for page in pdf_file.pages:
+        for page, filas in filas_por_columnas(pdf_file.pages, COLUMNAS_CUOTAS):
+            if filas is not None:
+                data.extend(filas)
+                continue
+
             text = page.extract_text()
             if not text:
                 continue
@@ -0,0 +1,305 @@
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from procesadores import costos
+
+# Colas de tareas para el modo distribuido (ver distribuido.py).
+#
+# Una cola guarda los PDF (por hash), las tareas de cada trabajo y sus
+# resultados. Cualquier objeto con los mismos métodos sirve de cola:
+#   guardar_documento(huella, pdf_bytes) / leer_documento(huella)
+#   encolar(trabajo, tareas):             tareas = [dict serializable a JSON]
+#   tomar(trabajador, costo_maximo=None): Tarea o None; la reserva por VENCIMIENTO s
+#   renovar(tarea, trabajador):           extiende la reserva (el trabajador sigue vivo)
+#   completar(tarea, resultado) / fallar(tarea, mensaje)
+#   estado(trabajo):                      {parte: (estado, mensaje)}
+#   datos(trabajo) / resultados(trabajo): datos y resultados de las tareas, en orden de parte
+#   borrar(trabajo)
+#
+# ColaSQLite es la cola por defecto: un archivo SQLite en una carpeta
+# compartida por todos los nodos. ColaMemoria es la versión local, en el
+# mismo proceso, para correr coordinador y trabajadores (hilos) en una máquina.
+#
+# Una tarea reservada cuyo trabajador deja de renovarla (proceso terminado,
+# nodo caído) vuelve a estar disponible al vencer la reserva, hasta
+# MAX_INTENTOS veces; después queda FALLIDA.
+#
+# Las tareas se atienden por costos.prioridad: primero las de menor costo
+# estimado ('costo' en sus datos), con envejecimiento para que las grandes no
+# esperen para siempre. Un trabajador con costo_maximo (p. ej. costos.PEQUENO)
+# solo toma tareas pequeñas: capacidad reservada para documentos cortos.
+Tarea = namedtuple("Tarea", ["trabajo", "parte", "datos"])
+
+PENDIENTE = "pendiente"
+TOMADA = "tomada"
+TERMINADA = "terminada"
+FALLIDA = "fallida"
+
+# Segundos que dura la reserva de una tarea sin renovarla
+VENCIMIENTO = 60
+
+MAX_INTENTOS = 3
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    huella TEXT PRIMARY KEY,
+    pdf BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tareas (
+    trabajo TEXT NOT NULL,
+    parte INTEGER NOT NULL,
+    datos TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    trabajador TEXT,
+    vence REAL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    resultado BLOB,
+    mensaje TEXT,
+    PRIMARY KEY (trabajo, parte)
+);
+CREATE INDEX IF NOT EXISTS tareas_por_estado ON tareas (estado, vence);
+"""
+
+
+def _agotada(intentos):
+    return f"La tarea se interrumpió {intentos} veces (¿el trabajador se quedó sin memoria?)"
+
+
+class ColaSQLite:
+    """Cola en un archivo SQLite (por defecto, en una carpeta compartida entre nodos)."""
+
+    def __init__(self, ruta, vencimiento=VENCIMIENTO):
+        self.ruta = str(ruta)
+        self.vencimiento = vencimiento
+        with self._conectar() as conexion:
+            conexion.executescript(_ESQUEMA)
+
+    def _conectar(self):
+        # Una conexión por operación: la cola se usa desde varios hilos y procesos.
+        # Sin WAL, que no funciona sobre sistemas de archivos en red
+        conexion = sqlite3.connect(self.ruta, timeout=60, isolation_level=None)
+        return _Conexion(conexion)
+
+    def guardar_documento(self, huella, pdf_bytes):
+        with self._conectar() as conexion:
+            conexion.execute("INSERT OR IGNORE INTO documentos VALUES (?, ?)", (huella, pdf_bytes))
+
+    def leer_documento(self, huella):
+        with self._conectar() as conexion:
+            fila = conexion.execute("SELECT pdf FROM documentos WHERE huella = ?", (huella,)).fetchone()
+        if fila is None:
+            raise KeyError(f"La cola no tiene el documento {huella}")
+        return bytes(fila[0])
+
+    def encolar(self, trabajo, tareas):
+        with self._conectar() as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            conexion.executemany(
+                "INSERT INTO tareas (trabajo, parte, datos, estado) VALUES (?, ?, ?, ?)",
+                [(trabajo, parte, json.dumps(datos), PENDIENTE) for parte, datos in enumerate(tareas)],
+            )
+            conexion.execute("COMMIT")
+
+    def tomar(self, trabajador, costo_maximo=None):
+        ahora = time.time()
+        with self._conectar() as conexion:
+            # BEGIN IMMEDIATE toma el bloqueo de escritura: dos trabajadores no
+            # pueden reservar la misma tarea
+            conexion.execute("BEGIN IMMEDIATE")
+            conexion.execute(
+                "UPDATE tareas SET estado = ?, mensaje = ? WHERE estado = ? AND vence < ? AND intentos >= ?",
+                (FALLIDA, _agotada(MAX_INTENTOS), TOMADA, ahora, MAX_INTENTOS),
+            )
+            # Misma fórmula que costos.prioridad, calculada en SQLite
+            fila = conexion.execute(
+                "SELECT trabajo, parte, datos FROM tareas"
+                " WHERE (estado = ? OR (estado = ? AND vence < ?))"
+                " AND (? IS NULL OR coalesce(json_extract(datos, '$.costo'), 0) <= ?)"
+                " ORDER BY coalesce(json_extract(datos, '$.costo'), 0)"
+                " - ? * (? - coalesce(json_extract(datos, '$.encolada'), ?)), rowid"
+                " LIMIT 1",
+                (PENDIENTE, TOMADA, ahora, costo_maximo, costo_maximo, costos.ENVEJECIMIENTO, ahora, ahora),
+            ).fetchone()
+            if fila is not None:
+                conexion.execute(
+                    "UPDATE tareas SET estado = ?, trabajador = ?, vence = ?, intentos = intentos + 1"
+                    " WHERE trabajo = ? AND parte = ?",
+                    (TOMADA, trabajador, ahora + self.vencimiento, fila[0], fila[1]),
+                )
+            conexion.execute("COMMIT")
+        return None if fila is None else Tarea(fila[0], fila[1], json.loads(fila[2]))
+
+    def renovar(self, tarea, trabajador):
+        with self._conectar() as conexion:
+            conexion.execute(
+                "UPDATE tareas SET vence = ? WHERE trabajo = ? AND parte = ? AND estado = ? AND trabajador = ?",
+                (time.time() + self.vencimiento, tarea.trabajo, tarea.parte, TOMADA, trabajador),
+            )
+
+    def completar(self, tarea, resultado):
+        datos = pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._conectar() as conexion:
+            conexion.execute(
+                "UPDATE tareas SET estado = ?, resultado = ?, mensaje = NULL WHERE trabajo = ? AND parte = ?",
+                (TERMINADA, datos, tarea.trabajo, tarea.parte),
+            )
+
+    def fallar(self, tarea, mensaje):
+        with self._conectar() as conexion:
+            conexion.execute(
+                "UPDATE tareas SET estado = ?, mensaje = ? WHERE trabajo = ? AND parte = ?",
+                (FALLIDA, mensaje, tarea.trabajo, tarea.parte),
+            )
+
+    def estado(self, trabajo):
+        ahora = time.time()
+        with self._conectar() as conexion:
+            filas = conexion.execute(
+                "SELECT parte, estado, mensaje, vence, intentos FROM tareas WHERE trabajo = ?", (trabajo,)
+            ).fetchall()
+        estados = {}
+        for parte, estado, mensaje, vence, intentos in filas:
+            if estado == TOMADA and vence < ahora and intentos >= MAX_INTENTOS:
+                estado, mensaje = FALLIDA, _agotada(intentos)
+            estados[parte] = (estado, mensaje)
+        return estados
+
+    def datos(self, trabajo):
+        with self._conectar() as conexion:
+            filas = conexion.execute(
+                "SELECT datos FROM tareas WHERE trabajo = ? ORDER BY parte", (trabajo,)
+            ).fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+
+    def resultados(self, trabajo):
+        with self._conectar() as conexion:
+            filas = conexion.execute(
+                "SELECT resultado FROM tareas WHERE trabajo = ? ORDER BY parte", (trabajo,)
+            ).fetchall()
+        return [pickle.loads(fila[0]) for fila in filas]
+
+    def borrar(self, trabajo):
+        with self._conectar() as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            conexion.execute("DELETE FROM tareas WHERE trabajo = ?", (trabajo,))
+            # Los PDF que ya no usa ninguna tarea
+            conexion.execute(
+                "DELETE FROM documentos WHERE huella NOT IN"
+                " (SELECT json_extract(datos, '$.huella') FROM tareas)"
+            )
+            conexion.execute("COMMIT")
+
+
+class _Conexion:
+    """Conexión SQLite que se cierra al salir del bloque 'with' (sqlite3 solo hace commit)."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        return self.conexion
+
+    def __exit__(self, *error):
+        if self.conexion.in_transaction:
+            self.conexion.execute("ROLLBACK")
+        self.conexion.close()
+
+
+class ColaMemoria:
+    """Cola en memoria del proceso actual, para coordinador y trabajadores en hilos."""
+
+    def __init__(self, vencimiento=VENCIMIENTO):
+        self.vencimiento = vencimiento
+        self._candado = threading.Lock()
+        self._documentos = {}
+        # (trabajo, parte) -> dict con datos, estado, trabajador, vence, intentos, resultado, mensaje
+        self._tareas = {}
+
+    def guardar_documento(self, huella, pdf_bytes):
+        with self._candado:
+            self._documentos.setdefault(huella, pdf_bytes)
+
+    def leer_documento(self, huella):
+        with self._candado:
+            try:
+                return self._documentos[huella]
+            except KeyError:
+                raise KeyError(f"La cola no tiene el documento {huella}") from None
+
+    def encolar(self, trabajo, tareas):
+        with self._candado:
+            for parte, datos in enumerate(tareas):
+                self._tareas[(trabajo, parte)] = {
+                    "datos": json.loads(json.dumps(datos)), "estado": PENDIENTE, "trabajador": None,
+                    "vence": None, "intentos": 0, "resultado": None, "mensaje": None,
+                }
+
+    def tomar(self, trabajador, costo_maximo=None):
+        ahora = time.time()
+        with self._candado:
+            candidatas = []
+            for orden, ((trabajo, parte), tarea) in enumerate(self._tareas.items()):
+                vencida = tarea["estado"] == TOMADA and tarea["vence"] < ahora
+                if vencida and tarea["intentos"] >= MAX_INTENTOS:
+                    tarea.update(estado=FALLIDA, mensaje=_agotada(tarea["intentos"]))
+                    continue
+                costo = tarea["datos"].get("costo", 0)
+                if (tarea["estado"] == PENDIENTE or vencida) and (costo_maximo is None or costo <= costo_maximo):
+                    encolada = tarea["datos"].get("encolada", ahora)
+                    candidatas.append((costos.prioridad(costo, encolada, ahora), orden, trabajo, parte))
+            if not candidatas:
+                return None
+            _, _, trabajo, parte = min(candidatas)
+            tarea = self._tareas[(trabajo, parte)]
+            tarea.update(estado=TOMADA, trabajador=trabajador, vence=ahora + self.vencimiento,
+                         intentos=tarea["intentos"] + 1)
+            return Tarea(trabajo, parte, tarea["datos"])
+
+    def renovar(self, tarea, trabajador):
+        with self._candado:
+            datos = self._tareas.get((tarea.trabajo, tarea.parte))
+            if datos and datos["estado"] == TOMADA and datos["trabajador"] == trabajador:
+                datos["vence"] = time.time() + self.vencimiento
+
+    def completar(self, tarea, resultado):
+        with self._candado:
+            self._tareas[(tarea.trabajo, tarea.parte)].update(estado=TERMINADA, resultado=resultado, mensaje=None)
+
+    def fallar(self, tarea, mensaje):
+        with self._candado:
+            self._tareas[(tarea.trabajo, tarea.parte)].update(estado=FALLIDA, mensaje=mensaje)
+
+    def estado(self, trabajo):
+        ahora = time.time()
+        with self._candado:
+            estados = {}
+            for (t, parte), tarea in self._tareas.items():
+                if t != trabajo:
+                    continue
+                estado, mensaje = tarea["estado"], tarea["mensaje"]
+                if estado == TOMADA and tarea["vence"] < ahora and tarea["intentos"] >= MAX_INTENTOS:
+                    estado, mensaje = FALLIDA, _agotada(tarea["intentos"])
+                estados[parte] = (estado, mensaje)
+            return estados
+
+    def datos(self, trabajo):
+        with self._candado:
+            partes = sorted(parte for t, parte in self._tareas if t == trabajo)
+            return [self._tareas[(trabajo, parte)]["datos"] for parte in partes]
+
+    def resultados(self, trabajo):
+        with self._candado:
+            partes = sorted(parte for t, parte in self._tareas if t == trabajo)
+            return [self._tareas[(trabajo, parte)]["resultado"] for parte in partes]
+
+    def borrar(self, trabajo):
+        with self._candado:
+            for clave in [c for c in self._tareas if c[0] == trabajo]:
+                del self._tareas[clave]
+            usadas = {tarea["datos"]["huella"] for tarea in self._tareas.values()}
+            for huella in [h for h in self._documentos if h not in usadas]:
+                del self._documentos[huella]
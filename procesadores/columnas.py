@@ -0,0 +1,210 @@
+import re
+from bisect import bisect_right
+from collections import namedtuple
+
+from procesadores import presupuesto
+from procesadores.texto import normalizar
+
+# Extracción de tablas de ancho fijo (cronogramas de préstamos) a partir de
+# page.chars, sin pasar por el layout de extract_text() ni por el regex de
+# 9 a 17 grupos por línea. Las fronteras de cada columna se aprenden una vez
+# desde la fila de encabezado y se reutilizan mientras el encabezado no cambie.
+#
+# Cada columna declara:
+#   nombre:   nombre de la columna en el DataFrame de salida
+#   ancla:    texto del encabezado que la identifica (sin tildes, mayúsculas)
+#   patron:   regex que debe cumplir la celda completa
+#   opcional: si la celda puede venir vacía
+Columna = namedtuple("Columna", ["nombre", "ancla", "patron", "opcional"])
+
+PlantillaColumnas = namedtuple("PlantillaColumnas", ["centros", "limites", "fondo_encabezado"])
+
+# Una línea que empieza con un número es candidata a fila (nro. de cuota o fecha)
+_INICIO_FILA = re.compile(r"\d+")
+
+
+def lineas_de_caracteres(chars, y_tol=3, x_tol=3):
+    """
+    Agrupa los caracteres de la página en líneas y palabras por posición.
+    Args:
+        chars: page.chars de pdfplumber
+        y_tol: Diferencia máxima de 'top' entre caracteres de una misma línea
+        x_tol: Separación horizontal mínima para cortar una palabra
+    Returns:
+        list: Líneas ordenadas de arriba abajo; cada una es un dict con
+              'top', 'bottom' y 'palabras' (dicts con text, x0, x1)
+    """
+    chars = [c for c in chars if c.get("upright", True) and c["text"].strip()]
+    chars.sort(key=lambda c: (round(c["top"]), c["x0"]))
+    grupos, actual, top_actual = [], [], None
+    for c in chars:
+        if top_actual is None or c["top"] - top_actual > y_tol:
+            if actual:
+                grupos.append(actual)
+            actual, top_actual = [], c["top"]
+        actual.append(c)
+    if actual:
+        grupos.append(actual)
+
+    lineas = []
+    for grupo in grupos:
+        grupo.sort(key=lambda c: c["x0"])
+        palabras, texto, x0, x1 = [], "", None, None
+        for c in grupo:
+            if x1 is not None and c["x0"] - x1 > x_tol:
+                palabras.append({"text": texto, "x0": x0, "x1": x1})
+                texto, x0 = "", None
+            if x0 is None:
+                x0 = c["x0"]
+            texto += c["text"]
+            x1 = c["x1"]
+        palabras.append({"text": texto, "x0": x0, "x1": x1})
+        lineas.append({
+            "top": min(c["top"] for c in grupo),
+            "bottom": max(c["bottom"] for c in grupo),
+            "palabras": palabras,
+        })
+    return lineas
+
+
+def _compactar(linea):
+    """Texto normalizado de la línea sin espacios y el rango x de cada carácter (se calcula una vez)."""
+    if "compacto" not in linea:
+        compacto, posiciones = [], []
+        for w in linea["palabras"]:
+            texto = normalizar(w["text"]).upper()
+            ancho = (w["x1"] - w["x0"]) / max(len(texto), 1)
+            for i, ch in enumerate(texto):
+                compacto.append(ch)
+                posiciones.append((w["x0"] + i * ancho, w["x0"] + (i + 1) * ancho))
+        linea["compacto"], linea["posiciones"] = "".join(compacto), posiciones
+    return linea["compacto"], linea["posiciones"]
+
+
+def _ubicar_ancla(lineas, ancla, desde_x=None):
+    """Centro x de la primera aparición del ancla (a la derecha de desde_x) en las líneas dadas."""
+    objetivo = ancla.replace(" ", "")
+    for linea in lineas:
+        compacto, posiciones = _compactar(linea)
+        i = compacto.find(objetivo)
+        while i >= 0:
+            centro = (posiciones[i][0] + posiciones[i + len(objetivo) - 1][1]) / 2
+            if desde_x is None or centro > desde_x:
+                return centro
+            i = compacto.find(objetivo, i + 1)
+    return None
+
+
+def aprender_plantilla(lineas, columnas, max_alto_encabezado=15):
+    """
+    Busca la fila de encabezado (una línea o dos líneas contiguas) que contenga
+    todas las anclas en orden de izquierda a derecha y calcula las fronteras
+    entre columnas como el punto medio entre los centros de cada encabezado.
+    Returns:
+        PlantillaColumnas o None si el encabezado no está en la página
+    """
+    primera = columnas[0].ancla.replace(" ", "")
+    for i, linea in enumerate(lineas):
+        bloques = [[linea]]
+        if i + 1 < len(lineas) and lineas[i + 1]["top"] - linea["bottom"] <= max_alto_encabezado:
+            bloques.append([linea, lineas[i + 1]])
+        bloques = [b for b in bloques if any(primera in _compactar(l)[0] for l in b)]
+        for bloque in bloques:
+            centros = []
+            for col in columnas:
+                x = _ubicar_ancla(bloque, col.ancla, centros[-1] if centros else None)
+                if x is None:
+                    break
+                centros.append(x)
+            if len(centros) == len(columnas):
+                limites = [(a + b) / 2 for a, b in zip(centros, centros[1:])]
+                return PlantillaColumnas(centros, limites, bloque[-1]["bottom"])
+    return None
+
+
+def misma_plantilla(a, b, tolerancia=2.0):
+    """Dos plantillas son equivalentes si sus centros coinciden dentro de la tolerancia."""
+    return (a is not None and b is not None and len(a.centros) == len(b.centros)
+            and all(abs(x - y) <= tolerancia for x, y in zip(a.centros, b.centros)))
+
+
+def repite_encabezado(lineas, plantilla, columnas, max_alto_encabezado=15, tolerancia=2.0):
+    """
+    Si la página tiene el encabezado de la plantilla a la misma altura y con
+    los mismos centros. Solo revisa la línea que termina en fondo_encabezado y
+    la anterior, sin recorrer la página como aprender_plantilla().
+    """
+    for j, linea in enumerate(lineas):
+        if abs(linea["bottom"] - plantilla.fondo_encabezado) > tolerancia:
+            continue
+        bloque = [linea]
+        if j > 0 and linea["top"] - lineas[j - 1]["bottom"] <= max_alto_encabezado:
+            bloque.insert(0, lineas[j - 1])
+        centros = []
+        for col in columnas:
+            x = _ubicar_ancla(bloque, col.ancla, centros[-1] if centros else None)
+            if x is None:
+                return False
+            centros.append(x)
+        return misma_plantilla(plantilla, PlantillaColumnas(centros, None, None), tolerancia)
+    return False
+
+
+def cortar_filas(lineas, plantilla, columnas):
+    """
+    Reparte las palabras de cada línea bajo el encabezado en celdas según su
+    centro x y valida cada celda con el patrón de su columna.
+    Returns:
+        tuple: (filas, completo). filas es una lista de (top, [celdas]);
+               completo es False si alguna línea que parece fila no pudo validarse,
+               en cuyo caso conviene procesar la página por el camino de texto.
+    """
+    patrones = [re.compile(col.patron) for col in columnas]
+    filas, completo = [], True
+    for linea in lineas:
+        if linea["top"] < plantilla.fondo_encabezado:
+            continue
+        palabras = linea["palabras"]
+        if not _INICIO_FILA.match(palabras[0]["text"]):
+            continue
+        celdas = [[] for _ in columnas]
+        for w in palabras:
+            celdas[bisect_right(plantilla.limites, (w["x0"] + w["x1"]) / 2)].append(w["text"])
+        celdas = [" ".join(c) for c in celdas]
+        valida = all(
+            (col.opcional and celda == "") or patron.fullmatch(celda)
+            for col, patron, celda in zip(columnas, patrones, celdas)
+        )
+        if valida:
+            filas.append((linea["top"], celdas))
+        else:
+            completo = False
+    return filas, completo
+
+
+def filas_por_columnas(pages, columnas):
+    """
+    Recorre las páginas y entrega, por cada una, las filas cortadas por columnas.
+    La plantilla se aprende una vez, en la primera página con encabezado; las
+    siguientes solo verifican que repitan el encabezado en la misma posición
+    (repite_encabezado) y se vuelve a aprender cuando no lo hacen.
+    Yields:
+        tuple: (page, filas) donde filas es una lista de listas de celdas, o None
+               si la página no tiene encabezado reconocible o alguna fila no
+               cuadra con la plantilla (el llamador debe usar extract_text()).
+    """
+    plantilla = None
+    for page in pages:
+        presupuesto.revisar_cancelacion()
+        lineas = lineas_de_caracteres(page.chars)
+        if plantilla is None or not repite_encabezado(lineas, plantilla, columnas):
+            encontrada = aprender_plantilla(lineas, columnas)
+            if encontrada is None:
+                yield page, None
+                continue
+            if not misma_plantilla(plantilla, encontrada):
+                plantilla = encontrada
+            else:
+                plantilla = plantilla._replace(fondo_encabezado=encontrada.fondo_encabezado)
+        filas, completo = cortar_filas(lineas, plantilla, columnas)
+        yield page, [celdas for _, celdas in filas] if completo else None
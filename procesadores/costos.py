@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Estimación del costo (segundos) de procesar un documento, para ordenar el
+# trabajo: el primero el más corto (tanda.py, cola distribuida) y así un
+# cronograma de dos páginas no espera detrás de un consolidado de miles.
+#
+# Se estima con datos baratos del documento: páginas, tamaño del archivo y el
+# procesador. Cada procesamiento completo registra su tiempo (ejecucion.py)
+# y se guarda, por procesador, un promedio móvil de segundos por página y de
+# bytes por página. Un documento con más bytes por página que lo habitual
+# (imágenes, gráficos vectoriales) se estima proporcionalmente más caro.
+#
+# El historial vive en memoria y en un JSON en disco (EXTRACTOR_COSTOS; en modo
+# distribuido conviene una ruta compartida, así el coordinador aprende de los
+# trabajadores). Si el disco no es escribible se sigue solo en memoria.
+RUTA_COSTOS = Path(os.environ.get(
+    "EXTRACTOR_COSTOS",
+    Path.home() / ".cache" / "extractor_pdf" / "costos.json",
+))
+
+# Sin historial: ritmo típico de pdfplumber en estados de cuenta
+SEGUNDOS_POR_PAGINA = 0.08
+
+# Apertura del PDF y armado de tablas (el procesador ya importado)
+SEGUNDOS_FIJOS = 0.05
+
+# Peso de cada nueva medición en el promedio móvil
+PESO_MEDICION = 0.2
+
+# Límites del ajuste por bytes por página (un PDF escaneado no es 50 veces más lento)
+AJUSTE_MINIMO = 0.5
+AJUSTE_MAXIMO = 4.0
+
+# Documentos estimados por debajo de esto son "pequeños": un trabajador
+# reservado para ellos no toma otros (ver cola.py)
+PEQUENO = 5.0
+
+# Segundos de costo que descuenta cada segundo de espera en la cola: una tarea
+# grande termina pasando adelante de las pequeñas que siguen llegando
+ENVEJECIMIENTO = 0.5
+
+_HISTORIAL = None
+
+
+def _cargar():
+    global _HISTORIAL
+    if _HISTORIAL is None:
+        try:
+            _HISTORIAL = json.loads(RUTA_COSTOS.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _HISTORIAL = {}
+    return _HISTORIAL
+
+
+def _guardar():
+    try:
+        RUTA_COSTOS.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=RUTA_COSTOS.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(_HISTORIAL, f, indent=1)
+        os.replace(temporal, RUTA_COSTOS)
+    except OSError:
+        pass
+
+
+def estimar(modulo, paginas, tamano):
+    """
+    Segundos estimados de procesamiento.
+    Args:
+        modulo: Nombre del módulo procesador (registro.Procesador.modulo)
+        paginas: Páginas a procesar
+        tamano: Bytes del archivo (o de la parte a procesar)
+    Returns:
+        float: Segundos estimados
+    """
+    historial = _cargar().get(modulo)
+    if not historial or not paginas:
+        return SEGUNDOS_FIJOS + paginas * SEGUNDOS_POR_PAGINA
+    ajuste = 1.0
+    if historial["bytes_por_pagina"]:
+        ajuste = (tamano / paginas) / historial["bytes_por_pagina"]
+        ajuste = min(max(ajuste, AJUSTE_MINIMO), AJUSTE_MAXIMO)
+    return SEGUNDOS_FIJOS + paginas * historial["segundos_por_pagina"] * ajuste
+
+
+def registrar(modulo, paginas, tamano, segundos):
+    """
+    Agrega una medición de un procesamiento completo al historial.
+    Args:
+        modulo: Nombre del módulo procesador
+        paginas: Páginas procesadas
+        tamano: Bytes del archivo
+        segundos: Duración total
+    """
+    global _HISTORIAL
+    if not paginas:
+        return
+    por_pagina = max(segundos - SEGUNDOS_FIJOS, 0) / paginas
+    # Se relee el archivo: otros procesos pueden haber registrado mediciones
+    _HISTORIAL = None
+    historial = _cargar()
+    anterior = historial.get(modulo)
+    if anterior is None:
+        historial[modulo] = {
+            "segundos_por_pagina": por_pagina,
+            "bytes_por_pagina": tamano / paginas,
+            "documentos": 1,
+        }
+    else:
+        for campo, valor in (("segundos_por_pagina", por_pagina), ("bytes_por_pagina", tamano / paginas)):
+            anterior[campo] += PESO_MEDICION * (valor - anterior[campo])
+        anterior["documentos"] += 1
+    _guardar()
+
+
+def prioridad(costo, encolada, ahora=None):
+    """
+    Orden de atención de una tarea en la cola (menor primero): su costo
+    estimado menos ENVEJECIMIENTO por cada segundo de espera.
+    """
+    return costo - ENVEJECIMIENTO * ((ahora or time.time()) - encolada)
@@ -0,0 +1,31 @@
+from procesadores.layout import ubicar_texto
+
+# Corte temprano de cronogramas de préstamos. Las últimas páginas de estos PDFs
+# suelen ser anexos de seguros y cláusulas del contrato: una vez leídas todas
+# las cuotas que anuncia la cabecera (plazo / número de cuotas), o al llegar a
+# la fila de totales, no hace falta seguir extrayendo páginas.
+
+
+def cronograma_completo(cuotas, esperadas):
+    """
+    Indica si las cuotas leídas cubren el cronograma completo y consistente:
+    están todas las cuotas de 1 a 'esperadas' y ninguna mayor.
+    Args:
+        cuotas: Conjunto de números de cuota leídos hasta ahora
+        esperadas: Número de cuotas del préstamo o None si no se conoce
+    Returns:
+        bool: True si se puede dejar de leer páginas
+    """
+    if not esperadas or not cuotas:
+        return False
+    return max(cuotas) == esperadas and all(n in cuotas for n in range(1, esperadas + 1))
+
+
+def tiene_marcador(page, marcador):
+    """Indica si la página contiene el marcador de fin de cronograma (p. ej. la fila de totales)."""
+    return marcador is not None and ubicar_texto(page, marcador) is not None
+
+
+def paginas_restantes(pdf, page):
+    """Cantidad de páginas del documento posteriores a 'page'."""
+    return len(pdf.pages) - page.page_number
@@ -3,26 +3,123 @@ import pandas as pd
 import re
 import unicodedata
 import numpy as np
-import io
+import sys
 from collections import defaultdict
+from procesadores import indice, plantillas, presupuesto, reporte
+from procesadores.esquema import CABECERAS, CUOTAS, MOVIMIENTOS, Origen
+from procesadores.layout import texto_rapido
+from procesadores.paralelo import diagnostico, por_pagina
+from procesadores.texto import normalizar
+from procesadores.regex_seguro import buscar_en_orden
 
-# --- INFORMACIÓN GENERAL ---
-def extract_multi_ec(pdf_stream, drop_if_no_name=True):
-    def _norm(s):
-        s = unicodedata.normalize("NFD", s)
-        s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-        return s.replace("\xa0", " ")
+# Pie de cada estado de cuenta: "TEA regular ... www.dinersclub.pe"
+FIN_DE_SEGMENTO = [re.compile(r"TEA\s+regular", re.I), re.compile(r"www\.dinersclub\.pe", re.I)]
+
+# Columnas de la salida en el esquema canónico (ver esquema.py). Las fechas
+# de movimientos y cuotas no traen año ('1 ENE'): sale del último día de pago
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Segmento': 'segmento', 'Página': 'pagina', 'Cliente': 'cliente', 'Periodo facturado': 'periodo',
+        'Último día de pago': 'fecha_limite_pago', 'Pago Total Soles': 'pago_total_soles',
+        'Pago Total USD': 'pago_total_dolares', 'Pago Mínimo Soles': 'pago_minimo_soles',
+        'Pago Mínimo USD': 'pago_minimo_dolares',
+    }, '%d/%m/%Y'),
+    Origen(MOVIMIENTOS, {
+        'EC': 'segmento', 'Página': 'pagina', 'Fecha consumo': 'fecha_consumo', 'Fecha proceso': 'fecha_proceso',
+        'Detalle de movimientos': 'descripcion', 'Soles': 'monto_soles', 'Dolares': 'monto_dolares',
+    }, '%d %b'),
+    Origen(CUOTAS, {
+        'EC': 'segmento', 'Página': 'pagina', 'Fecha consumo': 'fecha_consumo', 'Fecha proceso': 'fecha_proceso',
+        'Descripción': 'descripcion', 'Nro. Cuota': 'cuota', 'TEA': 'tasa', 'Importe': 'monto_original',
+        'Saldo': 'saldo', 'Capital': 'capital', 'Interés': 'interes',
+        'Cuota del mes Soles': 'importe_soles', 'Cuota del mes Dólares': 'importe_dolares',
+    }, '%d %b'),
+]
+
+def _es_fin_de_segmento(linea):
+    return buscar_en_orden(FIN_DE_SEGMENTO, linea) is not None
+
+def _quitar_montos_finales(desc):
+    r"""
+    Elimina los montos al final de una descripción, como "CONSUMO 1,234.50 (12.00)".
+    Recorre la cadena desde la derecha: equivale a re.sub(r"([\s\-]*\(?-?[\d\.,]+\)?\s*)+$", "", desc)
+    pero sin los cuantificadores anidados, cuyo retroceso es exponencial.
+    """
+    fin = len(desc)
+    while True:
+        j = fin
+        while j > 0 and desc[j-1].isspace(): j -= 1
+        if j > 0 and desc[j-1] == ")": j -= 1
+        k = j
+        while k > 0 and desc[k-1] in "0123456789.,": k -= 1
+        if k == j:
+            return desc[:fin]
+        if k > 0 and desc[k-1] == "-": k -= 1
+        if k > 0 and desc[k-1] == "(": k -= 1
+        while k > 0 and (desc[k-1].isspace() or desc[k-1] == "-"): k -= 1
+        fin = k
 
+def leer_pagina(page):
+    """
+    Fase 1: texto y palabras de una página (se puede correr en paralelo).
+    Movimientos y cuotas usan las mismas palabras, así se extraen una sola vez.
+    """
+    words = page.extract_words(x_tolerance=2, y_tolerance=3, use_text_flow=True)
+    return {
+        "pg": page.page_number,
+        "texto": page.extract_text() or "",
+        "palabras": [{k: w[k] for k in ("text", "x0", "x1", "top")} for w in words],
+        "tamano": (page.width, page.height),
+    }
+
+def leer_pagina_liviana(page):
+    """
+    Primera alternativa para páginas que superan su tiempo: palabras con
+    tolerancias más amplias y sin use_text_flow, texto de layout.texto_rapido.
+    """
+    words = page.extract_words(x_tolerance=3, y_tolerance=5)
+    return {
+        "pg": page.page_number,
+        "texto": texto_rapido(page),
+        "palabras": [{k: w[k] for k in ("text", "x0", "x1", "top")} for w in words],
+        "tamano": (page.width, page.height),
+    }
+
+def leer_pagina_rapida(page):
+    """Última alternativa: solo el texto de layout.texto_rapido (información general, sin tablas)."""
+    return {
+        "pg": page.page_number,
+        "texto": texto_rapido(page),
+        "palabras": [],
+        "tamano": (page.width, page.height),
+    }
+
+# Lecturas más baratas para páginas que superan su tiempo (ver paralelo.por_pagina)
+LECTURAS_ALTERNATIVAS = (leer_pagina_liviana, leer_pagina_rapida)
+
+def _leer_paginas(pdf_stream, paginas):
+    """Páginas ya leídas por el llamador o, si no hay, lectura secuencial del PDF."""
+    if paginas is not None:
+        return paginas
+    with pdfplumber.open(pdf_stream) as pdf:
+        leidas = []
+        for page in pdf.pages:
+            presupuesto.revisar_cancelacion()
+            leidas.append(leer_pagina(page))
+        return leidas
+
+# --- INFORMACIÓN GENERAL ---
+def extract_multi_ec(pdf_stream, drop_if_no_name=True, paginas=None, etiqueta=indice.etiqueta):
     def _txt_lines_with_pages(pdf_stream):
         lines_raw, lines_norm, pages = [], [], []
-        with pdfplumber.open(pdf_stream) as pdf:
-            for pageno, page in enumerate(pdf.pages, start=1):
-                text = page.extract_text() or ""
-                raw_lines  = text.splitlines()
-                norm_lines = _norm(text).splitlines()
-                lines_raw.extend(raw_lines)
-                lines_norm.extend(norm_lines)
-                pages.extend([pageno] * len(raw_lines))
+        for pagina in _leer_paginas(pdf_stream, paginas):
+            pageno = pagina["pg"]
+            text = pagina["texto"]
+            raw_lines  = text.splitlines()
+            norm_lines = normalizar(text).splitlines()
+            lines_raw.extend(raw_lines)
+            lines_norm.extend(norm_lines)
+            pages.extend([pageno] * len(raw_lines))
         return lines_raw, lines_norm, pages
 
     def _is_structured_name(line):
@@ -74,10 +171,9 @@ def extract_multi_ec(pdf_stream, drop_if_no_name=True):
     def _split_segments(lines_raw, lines_norm, pages):
         segs = []
         cur_raw, cur_norm, cur_pages = [], [], []
-        boundary = re.compile(r"TEA\s+regular.*?www\.dinersclub\.pe", re.I)
         for lr, ln, pg in zip(lines_raw, lines_norm, pages):
             cur_raw.append(lr); cur_norm.append(ln); cur_pages.append(pg)
-            if boundary.search(ln):
+            if _es_fin_de_segmento(ln):
                 segs.append((cur_raw, cur_norm, cur_pages))
                 cur_raw, cur_norm, cur_pages = [], [], []
         if cur_raw:
@@ -110,7 +206,7 @@ def extract_multi_ec(pdf_stream, drop_if_no_name=True):
         if len(pairs) >= 1: tot_pen, tot_usd = pairs[0]
         if len(pairs) >= 2: min_pen, min_usd = pairs[1]
         rows.append({
-            "Segmento": f"EC-{i:02d}",
+            "Segmento": etiqueta(i),
             "Página": page_for_segment,
             "Cliente": cliente,
             "Periodo facturado": periodo,
@@ -126,41 +222,35 @@ def extract_multi_ec(pdf_stream, drop_if_no_name=True):
     df = df[[c for c in desired if c in df.columns]]
     return df
 
-def extract_ec_movements(pdf_stream):
+def extract_ec_movements(pdf_stream, paginas=None, etiqueta=indice.etiqueta):
     TARGET_HEADERS = [
         "PAGOS/ABONOS REALIZADOS EN EL MES",
         "COMISIONES Y OTROS CARGOS",
     ]
     _TARGET_HEADERS_NORM = { unicodedata.normalize("NFD", h.upper()).replace("\xa0"," ").replace("\u00A0","") for h in TARGET_HEADERS }
-    def _norm(s):
-        s = unicodedata.normalize("NFD", s)
-        s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-        return s.replace("\xa0", " ")
     def _words_by_lines(pdf_stream):
         lines = []
-        with pdfplumber.open(pdf_stream) as pdf:
-            for pageno, page in enumerate(pdf.pages, start=1):
-                words = page.extract_words(x_tolerance=2, y_tolerance=3, use_text_flow=True)
-                groups = defaultdict(list)
-                for w in words:
-                    groups[round(w["top"], 1)].append(w)
-                for top in sorted(groups.keys()):
-                    ws = sorted(groups[top], key=lambda w: w["x0"])
-                    text = " ".join(w["text"] for w in ws)
-                    lines.append({
-                        "page": pageno,
-                        "top": top,
-                        "text": text,
-                        "norm": _norm(text.upper()),
-                        "words": ws
-                    })
+        for pagina in _leer_paginas(pdf_stream, paginas):
+            pageno = pagina["pg"]
+            groups = defaultdict(list)
+            for w in pagina["palabras"]:
+                groups[round(w["top"], 1)].append(w)
+            for top in sorted(groups.keys()):
+                ws = sorted(groups[top], key=lambda w: w["x0"])
+                text = " ".join(w["text"] for w in ws)
+                lines.append({
+                    "page": pageno,
+                    "top": top,
+                    "text": text,
+                    "norm": normalizar(text.upper()),
+                    "words": ws
+                })
         return lines
     def _split_segments(lines):
         segs, cur = [], []
-        boundary = re.compile(r"TEA\s+REGULAR.*?WWW\.DINERSCLUB\.PE", re.I)
         for ln in lines:
             cur.append(ln)
-            if boundary.search(ln["norm"]):
+            if _es_fin_de_segmento(ln["norm"]):
                 segs.append(cur); cur = []
         if cur: segs.append(cur)
         return segs
@@ -169,7 +259,7 @@ def extract_ec_movements(pdf_stream):
         tok = tok.replace(".", "")
         return int(tok) if tok.isdigit() and 1 <= int(tok) <= 31 else None
     def _parse_month_abbr(tok):
-        t = _norm(tok.upper()).replace(".","")
+        t = normalizar(tok.upper()).replace(".","")
         t = {"SET":"SEP"}.get(t, t)[:3]
         return t if t in MONTH_ABBRS else None
     def _extract_dates_tokens_to_str(words):
@@ -239,7 +329,7 @@ def extract_ec_movements(pdf_stream):
     for seg_idx, seg in enumerate(segments, start=1):
         rows = []
         for hdr in TARGET_HEADERS:
-            rows.extend(_extract_section_rows(seg, _norm(hdr.upper())))
+            rows.extend(_extract_section_rows(seg, normalizar(hdr.upper())))
         rows = [r for r in rows if not re.match(r"^(SUB\s+TOTAL|TOTAL|SALDO)", r["norm"])]
         if not rows:
             continue
@@ -266,9 +356,9 @@ def extract_ec_movements(pdf_stream):
                         right = max(amts, key=lambda t: t[1])[0]
                         soles, dolares = left, right
             desc = " ".join(toks[start_desc:]).strip()
-            desc = re.sub(r"([\s\-]*\(?-?[\d\.,]+\)?\s*)+$", "", desc).strip()
+            desc = _quitar_montos_finales(desc).strip()
             all_rows.append({
-                "EC": f"EC-{seg_idx:02d}",
+                "EC": etiqueta(seg_idx),
                 "Página": ln["page"],
                 "Fecha consumo": fcons,
                 "Fecha proceso": fproc,
@@ -282,35 +372,30 @@ def extract_ec_movements(pdf_stream):
         df = df[["EC","Página","Fecha consumo","Fecha proceso","Detalle de movimientos","Soles","Dolares"]]
     return df
 
-def extract_ec_cuotas(pdf_stream):
+def extract_ec_cuotas(pdf_stream, paginas=None, etiqueta=indice.etiqueta):
     NMONTHS = {"ENE","FEB","MAR","ABR","MAY","JUN","JUL","AGO","SET","SEP","OCT","NOV","DIC"}
-    def norm(s):
-        s = unicodedata.normalize("NFD", s)
-        return "".join(ch for ch in s if unicodedata.category(ch)!="Mn").replace("\xa0"," ").upper()
     def words_by_lines(pdf_stream):
         out=[]
-        with pdfplumber.open(pdf_stream) as pdf:
-            for p,pg in enumerate(pdf.pages, start=1):
-                ws = pg.extract_words(x_tolerance=2, y_tolerance=3, use_text_flow=True)
-                rows=defaultdict(list)
-                for w in ws: rows[round(w["top"],1)].append(w)
-                for top in sorted(rows):
-                    line=sorted(rows[top], key=lambda w:w["x0"])
-                    out.append({"page":p,"top":top,"words":line,"norm":" ".join(w["text"] for w in line)})
-        for r in out: r["norm"]=norm(r["norm"])
+        for pg in _leer_paginas(pdf_stream, paginas):
+            p=pg["pg"]
+            rows=defaultdict(list)
+            for w in pg["palabras"]: rows[round(w["top"],1)].append(w)
+            for top in sorted(rows):
+                line=sorted(rows[top], key=lambda w:w["x0"])
+                out.append({"page":p,"size":pg["tamano"],"top":top,"words":line,"norm":" ".join(w["text"] for w in line)})
+        for r in out: r["norm"]=normalizar(r["norm"]).upper()
         return out
     def split_segments(lines):
         segs,cur=[],[]
-        cut=re.compile(r"TEA\s+REGULAR.*?WWW\.DINERSCLUB\.PE")
         for ln in lines:
             cur.append(ln)
-            if cut.search(ln["norm"]): segs.append(cur); cur=[]
+            if _es_fin_de_segmento(ln["norm"]): segs.append(cur); cur=[]
         if cur: segs.append(cur)
         return segs
     def dates_tokens(words):
         toks=[w["text"] for w in words]; pos=0; found=[]
         def day(t): t=t.replace(".",""); return t.isdigit() and 1<=int(t)<=31
-        def mon(t): t=norm(t).replace(".","")[:3]; t={"SET":"SEP"}.get(t,t); return t if t in NMONTHS else None
+        def mon(t): t=normalizar(t).upper().replace(".","")[:3]; t={"SET":"SEP"}.get(t,t); return t if t in NMONTHS else None
         while pos<len(toks)-1 and len(found)<2:
             if day(toks[pos]) and mon(toks[pos+1]): found.append(f"{int(toks[pos])} {mon(toks[pos+1])}"); pos+=2
             else: pos+=1
@@ -357,13 +442,36 @@ def extract_ec_cuotas(pdf_stream):
             else: clusters.append(cur); cur=[x]
         clusters.append(cur)
         return sorted(float(np.median(c)) for c in clusters)
+    def template_key(seg):
+        # Huella del layout de cuotas: tamaño de página y x0 de las palabras del encabezado
+        for ln in seg:
+            if looks_header(ln["norm"]):
+                return plantillas.huella("dinners_cuotas", *ln["size"], [w["x0"] for w in ln["words"]])
+        return None
+    def template_fits(centers, rows):
+        # Cada monto del segmento debe caer en alguna de las columnas guardadas
+        for ln in rows:
+            for w in ln["words"]:
+                if parse_amt(w["text"]) is None: continue
+                x=(w["x0"]+w["x1"])/2
+                if x>250 and min(abs(x-c) for c in centers)>12: return False
+        return True
+    def centers_for(seg, rows):
+        key=template_key(seg)
+        stored=plantillas.obtener(key) if key else None
+        if stored and template_fits(stored["centros"], rows): return stored["centros"]
+        centers=learn_centers(rows)
+        # Solo se guarda una plantilla completa: con columnas faltantes el índice
+        # de cada centro no corresponde a su columna
+        if key and len(centers)==len(cols): plantillas.guardar(key, {"centros": centers})
+        return centers
     lines=words_by_lines(pdf_stream)
     segments=split_segments(lines)
     cols=["Importe","Saldo","Capital","Interés","Cuota del mes Soles","Cuota del mes Dólares"]
     out=[]
     for si,seg in enumerate(segments, start=1):
         rows=find_rows(seg)
-        centers=learn_centers(rows)
+        centers=centers_for(seg, rows)
         for ln in rows:
             toks=[w["text"] for w in ln["words"]]
             fcons,fproc,i0=dates_tokens(ln["words"])
@@ -382,7 +490,7 @@ def extract_ec_cuotas(pdf_stream):
                 idx=int(np.argmin([abs(x-c) for c in centers]))
                 if idx<len(cols) and vals[cols[idx]] is None: vals[cols[idx]]=v
             out.append({
-                "EC": f"EC-{si:02d}",
+                "EC": etiqueta(si),
                 "Página": ln["page"],
                 "Fecha consumo": fcons,
                 "Fecha proceso": fproc,
@@ -396,11 +504,64 @@ def extract_ec_cuotas(pdf_stream):
         df=df.sort_values(["EC","Página"]).reset_index(drop=True)
     return df
 
-def procesar_documento(pdf_bytes):
-    pdf_stream = io.BytesIO(pdf_bytes)
-    df_general = extract_multi_ec(pdf_stream, drop_if_no_name=True)
-    df_movs = extract_ec_movements(pdf_stream)
-    df_cuotas = extract_ec_cuotas(pdf_stream)
+def pagina_de_indice(page):
+    """Índice de segmentos: pies de fin de segmento de la página, sin layout."""
+    lineas = [normalizar(ln) for ln in texto_rapido(page).splitlines() if ln.strip()]
+    fines = [i for i, ln in enumerate(lineas) if _es_fin_de_segmento(ln)]
+    return {
+        "pg": page.page_number,
+        "lineas": len(lineas),
+        "fines": len(fines),
+        # Si después del último pie empieza otro segmento en la misma página
+        "resto": bool(fines) and fines[-1] < len(lineas) - 1,
+    }
+
+def segmentos_de_indice(paginas):
+    """Páginas de cada segmento: cada uno termina en la línea del pie."""
+    segmentos, numero = {}, 1
+    for pagina in paginas:
+        if not pagina["lineas"]:
+            continue
+        segmentos.setdefault(numero, []).append(pagina["pg"])
+        for k in range(pagina["fines"]):
+            numero += 1
+            if k < pagina["fines"] - 1 or pagina["resto"]:
+                segmentos.setdefault(numero, []).append(pagina["pg"])
+    return list(segmentos.items())
+
+def cabecera_de_segmento(text):
+    """Cliente y periodo facturado desde la primera página del segmento."""
+    df = extract_multi_ec(None, drop_if_no_name=False, paginas=[{"pg": 0, "texto": text}])
+    if df.empty:
+        return None, None
+    return df["Cliente"].iloc[0], df["Periodo facturado"].iloc[0]
+
+def tablas_de_paginas(paginas, etiqueta=indice.etiqueta):
+    """
+    Fase 2: corta los segmentos sobre las líneas en orden y arma las tablas.
+    Args:
+        paginas: Resultados de leer_pagina en orden de página
+        etiqueta: Función (número de segmento) -> etiqueta
+    Returns:
+        tuple: DataFrames de información general, movimientos y cuotas
+    """
+    df_general = extract_multi_ec(None, drop_if_no_name=True, paginas=paginas, etiqueta=etiqueta)
+    df_movs = extract_ec_movements(None, paginas=paginas, etiqueta=etiqueta)
+    df_cuotas = extract_ec_cuotas(None, paginas=paginas, etiqueta=etiqueta)
+    return df_general, df_movs, df_cuotas
+
+def armar_salida(df_general, df_movs, df_cuotas, normalizada=False):
+    """
+    Hojas de salida: 'Resumen' (información general y movimientos) y 'Cuotas'.
+    Con normalizada=True: 'Cabeceras', 'Movimientos' y 'Cuotas' por separado,
+    enlazadas por la etiqueta del segmento, sin la hoja combinada.
+    """
+    if normalizada:
+        return {
+            'Cabeceras': df_general.reset_index(drop=True),
+            'Movimientos': df_movs.reset_index(drop=True),
+            'Cuotas': df_cuotas.reset_index(drop=True)
+        }
 
     # Unir df_general y df_movs en una sola hoja tipo Excel (igual que en bbva)
     resumen_rows = [df_general.columns.tolist()] + df_general.astype(str).values.tolist()
@@ -416,3 +577,20 @@ def procesar_documento(pdf_bytes):
     }
     return output
 
+def procesar_documento(pdf_bytes, trabajadores=None, segmentos=None, normalizada=False):
+    """
+    Procesa un archivo PDF de estado de cuenta de Diners (uno o varios EC consolidados).
+    Args:
+        pdf_bytes: Bytes del archivo PDF
+        trabajadores: Procesos para extraer páginas (None = automático, 1 = sin paralelismo)
+        segmentos: Etiquetas de los EC a extraer (ver indice.construir); None = todos
+        normalizada: Si True, cabeceras y movimientos en hojas separadas (ver armar_salida)
+    Returns:
+        dict: Diccionario con DataFrames de información general, movimientos y cuotas
+    """
+    if segmentos:
+        return indice.extraer(sys.modules[__name__], pdf_bytes, segmentos, trabajadores, normalizada=normalizada)
+    # Fase 1 en paralelo; los segmentos se cortan después sobre las líneas en orden
+    paginas = por_pagina(pdf_bytes, leer_pagina, trabajadores, alternativas=LECTURAS_ALTERNATIVAS)
+    return reporte.anotar(armar_salida(*tablas_de_paginas(paginas), normalizada=normalizada),
+                          **diagnostico(paginas))
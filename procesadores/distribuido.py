@@ -0,0 +1,201 @@
+import os
+import socket
+import threading
+import time
+import uuid
+
+from procesadores import cola as colas
+from procesadores import costos, ejecucion, presupuesto, registro, reporte, tipos
+
+# Modo distribuido: un coordinador reparte los documentos en tareas sobre una
+# cola compartida (cola.py) y trabajadores en otros nodos las resuelven con
+# los mismos procesadores.
+#
+# Un PDF consolidado de más de PAGINAS_POR_PARTE páginas se parte en lotes de
+# segmentos: el coordinador construye el índice (una pasada liviana) y encola
+# un lote por tarea junto con el índice completo, así el trabajador no lo
+# rehace. Al terminar todas las partes, el coordinador las une en orden de
+# página con indice.unir; el resultado es el mismo que procesar el documento
+# en una sola máquina. Los demás documentos son una sola tarea.
+#
+# Cada trabajador aplica su propio presupuesto (variables EXTRACTOR_MAX_*)
+# y renueva la reserva de su tarea mientras la procesa. Cada tarea lleva su
+# costo estimado (costos.py) y la cola atiende primero las más cortas.
+DISTRIBUIDO = "distribuido"
+
+# Páginas a partir de las cuales un documento con índice se reparte por lotes
+PAGINAS_POR_PARTE = 200
+
+# Segundos entre consultas a la cola (trabajadores sin tareas, coordinador esperando)
+ESPERA = 1.0
+
+
+def repartir(cola, entidad, tipo, pdf_bytes, paginas_por_parte=None, trabajadores=None):
+    """
+    Encola el documento como una o más tareas.
+    Args:
+        cola: Cola de tareas (ColaSQLite, ColaMemoria u otra con los mismos métodos)
+        entidad, tipo: Procesador registrado
+        pdf_bytes: Bytes del archivo PDF
+        paginas_por_parte: Páginas por tarea en documentos con índice (por defecto, PAGINAS_POR_PARTE)
+        trabajadores: Procesos del coordinador para construir el índice
+    Returns:
+        str: Identificador del trabajo (para esperar())
+    """
+    from procesadores.indice import huella_documento
+    from procesadores.paralelo import numero_de_paginas
+
+    metadatos = registro.buscar(entidad, tipo)
+    paginas_por_parte = paginas_por_parte or PAGINAS_POR_PARTE
+    huella = huella_documento(pdf_bytes)
+    total = numero_de_paginas(pdf_bytes)
+    base = {"entidad": metadatos.entidad, "tipo": metadatos.tipo, "huella": huella, "encolada": time.time()}
+    tareas = [dict(base, costo=costos.estimar(metadatos.modulo, total, len(pdf_bytes)))]
+    if metadatos.segmentos and total > paginas_por_parte:
+        from procesadores import indice
+        segmentos = indice.construir(registro.modulo(entidad, tipo), pdf_bytes, trabajadores)
+        completo = [list(s) for s in segmentos]
+        tareas = []
+        for lote in indice.lotes(segmentos, paginas_por_parte):
+            paginas = len({pg for s in lote for pg in s.paginas})
+            costo = costos.estimar(metadatos.modulo, paginas, len(pdf_bytes) * paginas / total)
+            tareas.append(dict(base, lote=[s.etiqueta for s in lote], indice=completo, costo=costo))
+    trabajo = uuid.uuid4().hex
+    cola.guardar_documento(huella, pdf_bytes)
+    cola.encolar(trabajo, tareas)
+    return trabajo
+
+
+def ejecutar(cola, datos, trabajadores=None):
+    """
+    Resuelve una tarea en el proceso actual.
+    Returns:
+        dict de DataFrames (documento completo) o tablas del lote (ver indice.unir)
+    """
+    pdf_bytes = cola.leer_documento(datos["huella"])
+    entidad, tipo = datos["entidad"], datos["tipo"]
+    if "lote" not in datos:
+        opciones = {"trabajadores": trabajadores} if registro.buscar(entidad, tipo).paralelo else {}
+        return ejecucion.procesar_aqui(entidad, tipo, pdf_bytes, **opciones)
+
+    from procesadores.indice import Segmento
+    segmentos = [Segmento(*s) for s in datos["indice"]]
+    lote = [s for s in segmentos if s.etiqueta in set(datos["lote"])]
+    return ejecucion.extraer_lote(entidad, tipo, pdf_bytes, lote, trabajadores=trabajadores, segmentos=segmentos)
+
+
+def _renovar(cola, tarea, nombre, terminada):
+    while not terminada.wait(cola.vencimiento / 3):
+        try:
+            cola.renovar(tarea, nombre)
+        except Exception:
+            # Un corte momentáneo de la carpeta compartida no detiene la tarea;
+            # si dura más que la reserva, otro trabajador la retoma
+            pass
+
+
+def trabajar(cola, nombre=None, detener=None, salir_si_vacia=False, trabajadores=None, espera=ESPERA,
+             costo_maximo=None):
+    """
+    Bucle de un trabajador: toma tareas de la cola y guarda sus resultados.
+    Args:
+        cola: Cola de tareas
+        nombre: Identificador del trabajador (por defecto, máquina:pid:hilo)
+        detener: threading.Event opcional para terminar el bucle
+        salir_si_vacia: Terminar cuando no haya tareas disponibles
+        trabajadores: Procesos para extraer páginas dentro de cada tarea
+        espera: Segundos entre consultas cuando la cola está vacía
+        costo_maximo: Tomar solo tareas de hasta ese costo estimado (trabajador
+                      reservado para documentos pequeños, p. ej. costos.PEQUENO)
+    Returns:
+        int: Tareas resueltas (terminadas o fallidas)
+    """
+    nombre = nombre or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    resueltas = 0
+    while not (detener and detener.is_set()):
+        tarea = cola.tomar(nombre, costo_maximo)
+        if tarea is None:
+            if salir_si_vacia:
+                break
+            time.sleep(espera)
+            continue
+        terminada = threading.Event()
+        renovacion = threading.Thread(target=_renovar, args=(cola, tarea, nombre, terminada), daemon=True)
+        renovacion.start()
+        try:
+            resultado = ejecutar(cola, tarea.datos, trabajadores)
+        except presupuesto.PresupuestoExcedido as e:
+            cola.fallar(tarea, str(e))
+        except Exception as e:
+            cola.fallar(tarea, f"{type(e).__name__}: {e}")
+        else:
+            cola.completar(tarea, resultado)
+        finally:
+            terminada.set()
+            renovacion.join()
+        resueltas += 1
+    return resueltas
+
+
+def listo(cola, trabajo):
+    """Si todas las tareas del trabajo terminaron. Lanza RuntimeError si alguna falló."""
+    estados = cola.estado(trabajo)
+    if not estados:
+        raise KeyError(f"La cola no tiene el trabajo {trabajo}")
+    fallidas = {parte: mensaje for parte, (estado, mensaje) in estados.items() if estado == colas.FALLIDA}
+    if fallidas:
+        parte, mensaje = min(fallidas.items())
+        raise RuntimeError(f"Falló la parte {parte + 1} de {len(estados)}: {mensaje}")
+    return all(estado == colas.TERMINADA for estado, _ in estados.values())
+
+
+def unir(cola, trabajo):
+    """
+    Resultado del trabajo, uniendo sus partes en orden de página.
+    Returns:
+        dict: La misma salida que procesar_documento sobre el documento completo
+    """
+    datos, resultados = cola.datos(trabajo), cola.resultados(trabajo)
+    if "lote" not in datos[0]:
+        return resultados[0]
+
+    from procesadores import indice
+
+    partes, lecturas = [], []
+    for tablas, lectura in resultados:
+        partes.extend(tablas)
+        lecturas.append(lectura)
+    modulo = registro.modulo(datos[0]["entidad"], datos[0]["tipo"])
+    etiquetas = [etiqueta for parte in datos for etiqueta in parte["lote"]]
+    resultado = tipos.compactar_salida(indice.unir(modulo, partes, lecturas, etiquetas))
+    return reporte.anotar(resultado, modo=DISTRIBUIDO, partes=len(datos), interrupcion=None)
+
+
+def esperar(cola, trabajo, espera=ESPERA, limite=None, borrar=True):
+    """
+    Espera a que terminen todas las tareas del trabajo y devuelve el resultado unido.
+    Args:
+        cola: Cola de tareas
+        trabajo: Identificador devuelto por repartir()
+        espera: Segundos entre consultas
+        limite: Segundos máximos de espera (None = sin límite)
+        borrar: Quitar las tareas de la cola al terminar
+    Raises:
+        RuntimeError: Si alguna tarea falló
+        TimeoutError: Si se superó 'limite'
+    """
+    fin = time.time() + limite if limite else None
+    while not listo(cola, trabajo):
+        if fin is not None and time.time() > fin:
+            raise TimeoutError(f"El trabajo {trabajo} no terminó en {limite} s")
+        time.sleep(espera)
+    resultado = unir(cola, trabajo)
+    if borrar:
+        cola.borrar(trabajo)
+    return resultado
+
+
+def vigente(cola, trabajo):
+    """Si la cola conserva el trabajo y ninguna de sus tareas falló (se puede seguir esperando)."""
+    estados = cola.estado(trabajo)
+    return bool(estados) and all(estado != colas.FALLIDA for estado, _ in estados.values())
@@ -0,0 +1,380 @@
+import multiprocessing
+import os
+import signal
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from procesadores import costos, plantillas, presupuesto, registro, reporte, tipos
+
+# Ejecución de un procesador con presupuesto de recursos (ver presupuesto.py).
+#
+# procesar() corre el procesador en un proceso de trabajo aparte, así un PDF
+# que agota la memoria o no termina nunca afecta solo a ese proceso y no al
+# servidor de Streamlit. Dentro del trabajador, el presupuesto degrada el
+# procesamiento en este orden:
+#   1. Más páginas que el máximo por extracción y procesador con índice de
+#      segmentos: se procesa por lotes de segmentos (indice.extraer), que solo
+#      retiene las tablas de cada lote y no el texto de todas las páginas.
+#   2. Tiempo o memoria agotados durante la lectura de páginas: se arma el
+#      resultado con las páginas ya leídas (resultado parcial).
+#   3. Sin forma de cortar (procesadores de una sola pasada) o fuera de los
+#      puntos de revisión: el proceso padre termina al trabajador cuando pasa
+#      el presupuesto con MARGEN_DURO y lanza PresupuestoExcedido.
+# El resultado lleva en el reporte el modo usado y, si fue parcial, el motivo
+# y las páginas procesadas; sus tablas vienen con tipos compactos (ver
+# tipos.py), así pesan menos al volver del proceso de trabajo. Los
+# procesamientos completos registran su duración en el historial de costos
+# (costos.py) para estimar los siguientes.
+#
+# vista_previa() corre el mismo procesamiento con un presupuesto de pocos
+# segundos y devuelve las primeras filas de cada hoja; en_segundo_plano()
+# lanza el procesamiento completo sin esperarlo, así la app puede mostrar la
+# vista previa mientras tanto. indexar() construye el índice de segmentos de
+# un consolidado en un proceso de trabajo con el mismo presupuesto.
+#
+# Cancelación: procesar() recibe un aviso (nueva_cancelacion()) que el
+# proceso de trabajo y los procesos del pool revisan entre páginas (ver
+# presupuesto.revisar_cancelacion); además, el padre lo revisa cada
+# INTERVALO_REVISION y termina al grupo de procesos de inmediato, así la CPU
+# queda libre en menos de un segundo aunque el procesador esté a mitad de
+# una página o no tenga lectura por páginas.
+
+# Factor sobre el presupuesto a partir del cual el padre termina al trabajador:
+# el corte suave entre páginas debería llegar antes. Con presupuestos cortos
+# (la vista previa) el margen es de al menos MARGEN_MINIMO segundos, para el
+# arranque del proceso y el armado de las tablas con las páginas leídas
+MARGEN_DURO = 1.25
+MARGEN_MINIMO = 3
+
+# Vista previa: lo que se alcance a leer en estos segundos, con a lo sumo
+# estas filas por hoja (ver vista_previa)
+SEGUNDOS_VISTA_PREVIA = 2
+FILAS_VISTA_PREVIA = 50
+
+# Segundos entre revisiones del proceso de trabajo
+INTERVALO_REVISION = 0.5
+
+COMPLETO = "completo"
+POR_LOTES = "por lotes"
+
+# Hilos que esperan a los procesos de trabajo de en_segundo_plano (se crea al primer uso)
+_SEGUNDO_PLANO = None
+
+# Procesamiento lanzado con en_segundo_plano:
+#   futuro:      concurrent.futures.Future con la salida de procesar() o su excepción
+#   cancelacion: aviso para cancelarlo (ver cancelar)
+EnCurso = namedtuple("EnCurso", ["futuro", "cancelacion"])
+
+
+def procesar_aqui(entidad, tipo, pdf_bytes, limites=None, cancelacion=None, **opciones):
+    """
+    Procesa el documento en el proceso actual con el presupuesto activo.
+    Args:
+        entidad, tipo: Procesador registrado
+        pdf_bytes: Bytes del archivo PDF
+        limites: Presupuesto (por defecto, presupuesto.desde_entorno())
+        cancelacion: Aviso de cancelación (nueva_cancelacion()), revisado entre páginas
+        **opciones: Argumentos de procesar_documento (trabajadores, segmentos, normalizada)
+    Returns:
+        dict: Salida del procesador; el reporte incluye 'modo' e 'interrupcion'
+    Raises:
+        presupuesto.Cancelado: Si se marcó el aviso de cancelación
+    """
+    from procesadores.paralelo import numero_de_paginas
+
+    limites = limites or presupuesto.desde_entorno()
+    metadatos = registro.buscar(entidad, tipo)
+    total = numero_de_paginas(pdf_bytes)
+    inicio = time.perf_counter()
+    presupuesto.activar(limites, cancelacion=cancelacion)
+    try:
+        modo = COMPLETO
+        if limites.paginas:
+            if total > limites.paginas and metadatos.segmentos:
+                modo = POR_LOTES
+            elif total > limites.paginas and not metadatos.paralelo:
+                # Sin lectura por páginas no hay forma de cortar a tiempo
+                raise presupuesto.PresupuestoExcedido(
+                    presupuesto.PAGINAS,
+                    f"El documento tiene {total} páginas; el máximo es {limites.paginas}",
+                )
+        if modo == POR_LOTES:
+            from procesadores import indice
+            modulo = registro.modulo(entidad, tipo)
+            trabajadores = opciones.get("trabajadores")
+            etiquetas = opciones.get("segmentos") or [
+                s.etiqueta for s in indice.construir(modulo, pdf_bytes, trabajadores)
+            ]
+            resultado = indice.extraer(modulo, pdf_bytes, etiquetas, trabajadores,
+                                       paginas_por_lote=limites.paginas,
+                                       normalizada=opciones.get("normalizada", False))
+        else:
+            resultado = registro.obtener(entidad, tipo)(pdf_bytes, **opciones)
+        interrupcion = presupuesto.interrupcion()
+    finally:
+        presupuesto.activar(None)
+        plantillas.escribir()
+    if modo == COMPLETO and interrupcion is None and not opciones.get("segmentos"):
+        costos.registrar(metadatos.modulo, total, len(pdf_bytes), time.perf_counter() - inicio)
+    return reporte.anotar(tipos.compactar_salida(resultado), modo=modo, interrupcion=interrupcion)
+
+
+def extraer_lote(entidad, tipo, pdf_bytes, lote, limites=None, trabajadores=None, segmentos=None):
+    """
+    Extrae un lote de segmentos (indice.extraer_lote) con el presupuesto activo.
+    Un lote cortado por el presupuesto no se devuelve a medias: quien guarda
+    los lotes (tanda, cola distribuida) lo vuelve a intentar completo.
+    Args:
+        entidad, tipo: Procesador registrado (con índice de segmentos)
+        pdf_bytes: Bytes del archivo PDF
+        lote: Segmentos del índice a extraer
+        limites: Presupuesto (por defecto, presupuesto.desde_entorno()); el
+                 máximo de páginas no se aplica, el lote ya lo respeta
+        trabajadores: Procesos para extraer páginas (None = automático)
+        segmentos: Índice completo del documento (por defecto, se construye)
+    Returns:
+        tuple: Tablas de los tramos del lote y páginas problemáticas (ver indice.unir)
+    Raises:
+        PresupuestoExcedido: Si el tiempo o la memoria se agotaron durante el lote
+    """
+    from procesadores import indice
+
+    limites = limites or presupuesto.desde_entorno()
+    modulo = registro.modulo(entidad, tipo)
+    presupuesto.activar(limites._replace(paginas=None))
+    try:
+        resultado = indice.extraer_lote(modulo, pdf_bytes, lote, trabajadores, segmentos)
+        corte = presupuesto.interrupcion()
+    finally:
+        presupuesto.activar(None)
+    if corte:
+        raise presupuesto.PresupuestoExcedido(corte["motivo"], corte["mensaje"])
+    return resultado
+
+
+def indexar_aqui(entidad, tipo, pdf_bytes, limites=None, cancelacion=None):
+    """
+    Índice de segmentos (indice.construir) con el presupuesto activo, sin
+    máximo de páginas: el índice es lo que permite procesar por lotes.
+    Args:
+        entidad, tipo: Procesador registrado (con índice de segmentos)
+        pdf_bytes: Bytes del archivo PDF
+        limites: Presupuesto (por defecto, presupuesto.desde_entorno())
+        cancelacion: Aviso de cancelación (nueva_cancelacion()), revisado entre páginas
+    Returns:
+        list: Segmentos del documento (indice.Segmento)
+    Raises:
+        PresupuestoExcedido: Si el tiempo o la memoria se agotaron antes de terminar el índice
+        presupuesto.Cancelado: Si se marcó el aviso de cancelación
+    """
+    from procesadores import indice
+
+    limites = limites or presupuesto.desde_entorno()
+    presupuesto.activar(limites._replace(paginas=None), cancelacion=cancelacion)
+    try:
+        return indice.construir(registro.modulo(entidad, tipo), pdf_bytes)
+    finally:
+        presupuesto.activar(None)
+
+
+def _trabajador(conexion, funcion, entidad, tipo, pdf_bytes, limites, cancelacion, opciones):
+    # Grupo de procesos propio: el padre puede terminar también a los procesos
+    # del pool de extracción
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    try:
+        conexion.send(("ok", funcion(entidad, tipo, pdf_bytes, limites, cancelacion, **opciones)))
+    except presupuesto.Cancelado as e:
+        conexion.send(("cancelado", str(e)))
+    except presupuesto.PresupuestoExcedido as e:
+        conexion.send(("presupuesto", (e.motivo, str(e))))
+    except MemoryError:
+        conexion.send(("presupuesto", (presupuesto.MEMORIA, "El documento no entra en la memoria disponible")))
+    except Exception as e:
+        conexion.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conexion.close()
+
+
+def _memoria_de_grupo(pgid):
+    """RSS total en MB de los procesos del grupo (0 si el sistema no expone /proc)."""
+    total = 0
+    pagina = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # El nombre del proceso va entre paréntesis y puede tener espacios
+            campos = stat.read_text().rsplit(")", 1)[1].split()
+            if int(campos[2]) == pgid:
+                total += int((stat.parent / "statm").read_text().split()[1]) * pagina
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / 2**20
+
+
+def _terminar(proceso):
+    if proceso.is_alive():
+        try:
+            os.killpg(proceso.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            proceso.kill()
+    proceso.join()
+
+
+def nueva_cancelacion():
+    """Aviso de cancelación para procesar() y los procesos que lance: .set() lo cancela."""
+    return multiprocessing.get_context("spawn").Event()
+
+
+def procesar(entidad, tipo, pdf_bytes, limites=None, cancelacion=None, **opciones):
+    """
+    Procesa el documento en un proceso de trabajo con presupuesto de recursos.
+    Args:
+        entidad, tipo: Procesador registrado
+        pdf_bytes: Bytes del archivo PDF
+        limites: Presupuesto (por defecto, presupuesto.desde_entorno())
+        cancelacion: Aviso de nueva_cancelacion(); al marcarlo se termina al trabajador
+        **opciones: Argumentos de procesar_documento (trabajadores, segmentos, normalizada)
+    Returns:
+        dict: Salida del procesador (posiblemente parcial, ver reporte 'interrupcion')
+    Raises:
+        PresupuestoExcedido: Si hubo que terminar al trabajador sin resultado
+        presupuesto.Cancelado: Si se marcó el aviso de cancelación
+        RuntimeError: Si el procesador falló (con el mensaje del error original)
+    """
+    return _en_trabajador(procesar_aqui, entidad, tipo, pdf_bytes, limites, cancelacion, opciones)
+
+
+def indexar(entidad, tipo, pdf_bytes, limites=None, cancelacion=None):
+    """
+    indexar_aqui() en un proceso de trabajo con presupuesto de recursos, como
+    procesar(): un PDF enorme no afecta al servidor de Streamlit.
+    Args:
+        entidad, tipo: Procesador registrado (con índice de segmentos)
+        pdf_bytes: Bytes del archivo PDF
+        limites: Presupuesto (por defecto, presupuesto.desde_entorno(); sin máximo de páginas)
+        cancelacion: Aviso de nueva_cancelacion(); al marcarlo se termina al trabajador
+    Returns:
+        list: Segmentos del documento (indice.Segmento)
+    Raises:
+        PresupuestoExcedido: Si no alcanzó el presupuesto (conviene procesar el documento completo)
+        presupuesto.Cancelado: Si se marcó el aviso de cancelación
+        RuntimeError: Si el índice falló (con el mensaje del error original)
+    """
+    return _en_trabajador(indexar_aqui, entidad, tipo, pdf_bytes, limites, cancelacion, {})
+
+
+def _en_trabajador(funcion, entidad, tipo, pdf_bytes, limites, cancelacion, opciones):
+    """Corre funcion (procesar_aqui o indexar_aqui) en un proceso de trabajo vigilado."""
+    limites = limites or presupuesto.desde_entorno()
+    registro.buscar(entidad, tipo)
+    if cancelacion is not None and cancelacion.is_set():
+        raise presupuesto.Cancelado()
+    contexto = multiprocessing.get_context("spawn")
+    receptor, emisor = contexto.Pipe(duplex=False)
+    proceso = contexto.Process(target=_trabajador,
+                               args=(emisor, funcion, entidad, tipo, pdf_bytes, limites, cancelacion, opciones))
+    proceso.start()
+    emisor.close()
+    limite = None
+    if limites.segundos:
+        limite = time.time() + limites.segundos + max(limites.segundos * (MARGEN_DURO - 1), MARGEN_MINIMO)
+    try:
+        while not receptor.poll(INTERVALO_REVISION):
+            if not proceso.is_alive():
+                break
+            if cancelacion is not None and cancelacion.is_set():
+                raise presupuesto.Cancelado()
+            if limite is not None and time.time() > limite:
+                raise presupuesto.PresupuestoExcedido(
+                    presupuesto.TIEMPO, f"El procesamiento superó el tiempo máximo de {limites.segundos} s"
+                )
+            if limites.memoria_mb and _memoria_de_grupo(proceso.pid) > limites.memoria_mb * MARGEN_DURO:
+                raise presupuesto.PresupuestoExcedido(
+                    presupuesto.MEMORIA, f"El procesamiento superó la memoria máxima de {limites.memoria_mb} MB"
+                )
+        try:
+            estado, valor = receptor.recv()
+        except EOFError:
+            proceso.join()
+            raise RuntimeError(f"El proceso de extracción terminó inesperadamente (código {proceso.exitcode})")
+    finally:
+        _terminar(proceso)
+        receptor.close()
+
+    if estado == "cancelado":
+        raise presupuesto.Cancelado(valor)
+    if estado == "presupuesto":
+        raise presupuesto.PresupuestoExcedido(*valor)
+    if estado == "error":
+        raise RuntimeError(valor)
+    return valor
+
+
+def vista_previa(entidad, tipo, pdf_bytes, segundos=SEGUNDOS_VISTA_PREVIA, filas=FILAS_VISTA_PREVIA, cancelacion=None,
+                 **opciones):
+    """
+    Primeras filas de cada hoja con lo que se alcance a leer en 'segundos',
+    para confirmar el banco y el tipo antes de esperar el documento completo.
+    Los procesadores con lectura por páginas devuelven un resultado parcial
+    al vencer el tiempo (el reporte indica las páginas leídas); los de una
+    sola pasada solo tienen vista previa si terminan a tiempo.
+    Args:
+        entidad, tipo: Procesador registrado
+        pdf_bytes: Bytes del archivo PDF
+        segundos: Tiempo de lectura (sin contar el arranque del proceso de trabajo)
+        filas: Filas por hoja
+        cancelacion: Aviso de nueva_cancelacion() (p. ej. el del procesamiento completo)
+        **opciones: Argumentos de procesar_documento (trabajadores, segmentos, normalizada)
+    Returns:
+        dict: {hoja: primeras filas} con el reporte del procesamiento, o None
+              si no hubo resultado a tiempo
+    Raises:
+        presupuesto.Cancelado: Si se marcó el aviso de cancelación
+        RuntimeError: Si el procesador falló (con el mensaje del error original)
+    """
+    # Sin máximo de páginas (procesar por lotes lleva más) y sin esperar más que
+    # la vista previa por una página lenta
+    limites = presupuesto.desde_entorno()._replace(segundos=segundos, paginas=None, segundos_por_pagina=segundos)
+    try:
+        resultado = procesar(entidad, tipo, pdf_bytes, limites, cancelacion, **opciones)
+    except presupuesto.PresupuestoExcedido:
+        return None
+    return reporte.anotar({hoja: df.head(filas) for hoja, df in resultado.items()}, **reporte.leer(resultado))
+
+
+def en_hilo(funcion, *args, **kwargs):
+    """
+    Ejecuta funcion(*args, **kwargs) en un hilo de fondo (p. ej. la vista previa
+    que la app espera sin dejar de atender el botón Cancelar).
+    Returns:
+        concurrent.futures.Future: El futuro con la salida de la función
+    """
+    global _SEGUNDO_PLANO
+    if _SEGUNDO_PLANO is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _SEGUNDO_PLANO = ThreadPoolExecutor(thread_name_prefix="extraccion")
+    return _SEGUNDO_PLANO.submit(funcion, *args, **kwargs)
+
+
+def en_segundo_plano(entidad, tipo, pdf_bytes, limites=None, **opciones):
+    """
+    procesar() sin bloquear: p. ej. la app muestra la vista previa mientras
+    el documento completo se sigue procesando.
+    Args:
+        entidad, tipo, pdf_bytes, limites, **opciones: Los de procesar()
+    Returns:
+        EnCurso: El futuro con la salida y el aviso para cancelarlo
+    """
+    cancelacion = nueva_cancelacion()
+    return EnCurso(en_hilo(procesar, entidad, tipo, pdf_bytes, limites, cancelacion, **opciones), cancelacion)
+
+
+def cancelar(en_curso):
+    """
+    Cancela un procesamiento de en_segundo_plano: su proceso de trabajo y los
+    del pool terminan en menos de un segundo (ver INTERVALO_REVISION) y el
+    futuro termina con presupuesto.Cancelado.
+    """
+    en_curso.cancelacion.set()
+    en_curso.futuro.cancel()
@@ -0,0 +1,207 @@
+import io
+import re
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+import pdfplumber
+
+from procesadores import presupuesto, reporte
+from procesadores.columnas import filas_por_columnas
+from procesadores.cronograma import cronograma_completo, paginas_restantes, tiene_marcador
+
+# Motor de especificaciones declarativas para cronogramas de préstamos.
+#
+# Los procesadores de préstamos repiten el mismo esqueleto: abrir el PDF, buscar
+# los datos de cabecera página por página, recorrer el cronograma (por columnas
+# o por regex sobre el texto), convertir cada celda, agregar una fila de totales
+# y unir cabecera y detalle en la hoja 'Resumen'. Una especificación describe
+# solo lo que cambia entre bancos; el motor implementa el esqueleto una vez, así
+# cada optimización (corte por columnas, corte temprano, texto compartido entre
+# pasadas) se aplica a todos los formatos portados.
+
+# Dato de cabecera:
+#   nombre:    columna en la tabla de información general
+#   patron:    regex con el valor en el grupo 'grupo'
+#   grupo:     número de grupo a tomar (varios campos pueden compartir patrón)
+#   convertir: función que recibe el texto capturado
+#   fuente:    'texto' (extract_text con saltos de línea) o 'linea' (líneas unidas con espacios)
+Campo = namedtuple("Campo", ["nombre", "patron", "grupo", "convertir", "fuente"], defaults=[1, str, "linea"])
+
+# Fila de totales: columna donde va la etiqueta, la etiqueta y columnas a sumar
+Totales = namedtuple("Totales", ["columna_etiqueta", "etiqueta", "columnas"])
+
+# Especificación de un cronograma de préstamo:
+#   campos:           Campos de cabecera en el orden de salida
+#   columnas:         Columnas del cronograma (columnas.Columna) para el corte por posición
+#   convertir:        Una función por columna para convertir cada celda
+#   patron_fila:      Regex de una fila en el texto, para páginas sin encabezado reconocible
+#   buscar_fila:      'match' o 'search' del patrón sobre cada línea
+#   preparar_linea:   Transformación de la línea antes de aplicar el patrón
+#   pagina_texto:     Si la columna 'Página' va como texto (True) o número
+#   reportar_fila:    Función (celdas) -> bool; las filas descartadas cuentan para el cronograma
+#   campo_cuotas:     Campo de cabecera con la cantidad de cuotas, para el corte temprano
+#   marcador_fin:     Texto que marca el final del cronograma (fila de totales)
+#   totales:          Totales o None
+Especificacion = namedtuple("Especificacion", [
+    "campos", "columnas", "convertir", "patron_fila", "buscar_fila", "preparar_linea",
+    "pagina_texto", "reportar_fila", "campo_cuotas", "marcador_fin", "totales",
+], defaults=["match", None, True, None, None, None, None])
+
+
+def a_fecha(formato):
+    """Convertidor de texto a date con el formato indicado."""
+    return lambda valor: datetime.strptime(valor, formato).date()
+
+
+def a_numero(valor):
+    """Monto con ',' de miles y '.' decimal."""
+    return float(valor.replace(',', ''))
+
+
+def a_numero_con_signo(valor):
+    """Monto con '.' de miles, ',' decimal y '-' final si es negativo (p. ej. 1.234,50-)."""
+    valor = valor.strip()
+    negativo = valor.endswith('-')
+    valor = valor.replace('-', '').replace('.', '').replace(',', '.')
+    return -float(valor) if negativo else float(valor)
+
+
+def leer_cabecera(spec, pages, textos):
+    """
+    Busca la primera página que contenga todos los campos de cabecera.
+    Args:
+        spec: Especificacion
+        pages: Páginas de pdfplumber
+        textos: dict {page_number: texto} que se completa con lo extraído
+    Returns:
+        list: Valores convertidos de los campos o None si ninguna página los tiene
+    """
+    patrones = {}
+    for campo in spec.campos:
+        patrones.setdefault(campo.patron, re.compile(campo.patron))
+    for page in pages:
+        presupuesto.revisar_cancelacion()
+        text = page.extract_text()
+        textos[page.page_number] = text
+        if not text:
+            continue
+        fuentes = {'texto': text, 'linea': ' '.join(text.split('\n'))}
+        matches = {}
+        for campo in spec.campos:
+            clave = (campo.patron, campo.fuente)
+            if clave not in matches:
+                matches[clave] = patrones[campo.patron].search(fuentes[campo.fuente])
+        if all(matches.values()):
+            return [
+                campo.convertir(matches[(campo.patron, campo.fuente)].group(campo.grupo))
+                for campo in spec.campos
+            ]
+    return None
+
+
+def _filas_de_texto(spec, text, patron):
+    filas = []
+    for line in text.split('\n'):
+        if spec.preparar_linea:
+            line = spec.preparar_linea(line)
+        match = getattr(patron, spec.buscar_fila)(line)
+        if match:
+            filas.append([g or '' for g in match.groups()])
+    return filas
+
+
+def leer_cronograma(spec, pdf_file, textos, esperadas=None):
+    """
+    Recorre el cronograma página por página: corte por columnas cuando hay
+    encabezado reconocible y regex sobre el texto en otro caso.
+    Args:
+        spec: Especificacion
+        pdf_file: PDF abierto con pdfplumber
+        textos: Textos ya extraídos en la pasada de cabecera (se reutilizan)
+        esperadas: Cantidad de cuotas del préstamo para el corte temprano
+    Returns:
+        tuple: (filas convertidas con la página al inicio, páginas omitidas)
+    """
+    patron = re.compile(spec.patron_fila)
+    data, cuotas_leidas = [], set()
+    for page, filas in filas_por_columnas(pdf_file.pages, spec.columnas):
+        pg = str(page.page_number) if spec.pagina_texto else page.page_number
+        if filas is None:
+            text = textos.get(page.page_number)
+            if text is None:
+                text = page.extract_text()
+            filas = _filas_de_texto(spec, text or '', patron)
+        for fila in filas:
+            cuotas_leidas.add(int(fila[0]))
+            if spec.reportar_fila and not spec.reportar_fila(fila):
+                continue
+            data.append([pg] + [convertir(valor) for convertir, valor in zip(spec.convertir, fila)])
+        # Cronograma completo o fila de totales: el resto del PDF son anexos
+        if cronograma_completo(cuotas_leidas, esperadas) or tiene_marcador(page, spec.marcador_fin):
+            return data, paginas_restantes(pdf_file, page)
+    return data, 0
+
+
+def agregar_totales(df_detalle, totales):
+    """Agrega la fila de totales al detalle según la especificación."""
+    suma = df_detalle[totales.columnas].sum()
+    fila_total = []
+    for col in df_detalle.columns:
+        if col == totales.columna_etiqueta:
+            fila_total.append(totales.etiqueta)
+        elif col in totales.columnas:
+            fila_total.append(suma[col])
+        else:
+            fila_total.append('')
+    total_row = pd.DataFrame([fila_total], columns=df_detalle.columns)
+    return pd.concat([df_detalle, total_row], ignore_index=True)
+
+
+def combinar_resumen(df_general, df_detalle):
+    """
+    Une cabecera y detalle en una sola hoja, separados por una fila vacía.
+    Returns:
+        DataFrame: Hoja 'Resumen' con todas las celdas como texto
+    """
+    resumen_rows = [df_general.columns.tolist()] + df_general.astype(str).values.tolist()
+    detalle_rows = [df_detalle.columns.tolist()] + df_detalle.astype(str).values.tolist()
+
+    # Insertar fila vacía entre bloques
+    combined_rows = resumen_rows + [[""] * len(resumen_rows[0])] + detalle_rows
+
+    # Asegurar mismo número de columnas
+    max_cols = max(len(row) for row in combined_rows)
+    combined_rows = [row + [""] * (max_cols - len(row)) for row in combined_rows]
+    return pd.DataFrame(combined_rows).reset_index(drop=True)
+
+
+def ejecutar(spec, pdf_bytes):
+    """
+    Procesa un PDF de préstamo según su especificación.
+    Args:
+        spec: Especificacion del formato del banco
+        pdf_bytes: Bytes del archivo PDF
+    Returns:
+        dict: Diccionario con la hoja 'Resumen' (información general y detalle de cuotas)
+    """
+    textos = {}
+    # El PDF se abre una sola vez: la pasada del cronograma reutiliza las
+    # páginas ya parseadas y el texto extraído al buscar la cabecera
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf_file:
+        cabecera = leer_cabecera(spec, pdf_file.pages, textos)
+        nombres = [campo.nombre for campo in spec.campos]
+        esperadas = None
+        if cabecera and spec.campo_cuotas:
+            esperadas = cabecera[nombres.index(spec.campo_cuotas)]
+        data, paginas_omitidas = leer_cronograma(spec, pdf_file, textos, esperadas)
+
+    df_general = pd.DataFrame([cabecera] if cabecera else [], columns=nombres)
+    df_detalle = pd.DataFrame(data, columns=['Página'] + [col.nombre for col in spec.columnas])
+    if spec.totales:
+        df_detalle = agregar_totales(df_detalle, spec.totales)
+
+    output = {
+        'Resumen': combinar_resumen(df_general, df_detalle)
+    }
+    return reporte.anotar(output, paginas_omitidas=paginas_omitidas)
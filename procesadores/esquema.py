@@ -0,0 +1,345 @@
+import re
+from collections import namedtuple
+
+# Esquema canónico: las mismas tablas, columnas y tipos para todos los bancos.
+#
+# Cada procesador arma las hojas del Excel a su manera ('Monto' o
+# 'monto_soles', 'Pagina' o 'Página', montos como texto o como número), así
+# que juntar documentos de varios bancos obligaba a reacomodar cada archivo.
+# Cada procesador declara en ESQUEMA de qué columnas de su salida sale cada
+# campo canónico, y canonico() convierte la salida en cuatro tablas tipadas:
+#   Cabeceras:   una fila por estado de cuenta o préstamo
+#   Movimientos: consumos, pagos y cargos de los estados de cuenta
+#   Cuotas:      compras en cuotas (plan de cuotas de la tarjeta)
+#   Cronograma:  cuotas del cronograma de un préstamo
+# Las tablas de miles de documentos se concatenan sin conversiones
+# (concatenar()) y se consultan por columna. Las filas se relacionan con su
+# cabecera por (documento, segmento).
+#
+# pandas se importa dentro de las funciones: la definición del esquema es
+# liviana y se puede importar al arrancar el CLI.
+
+# Campo de una tabla canónica: nombre y tipo de pandas
+Campo = namedtuple("Campo", ["nombre", "tipo"])
+
+# Tabla canónica:
+#   nombre:     nombre de la tabla (hoja al exportarla)
+#   campos:     Campo en el orden de salida
+#   requeridos: campos de los que cada fila debe tener al menos uno (las
+#               filas de totales de los cronogramas no tienen ninguno)
+Tabla = namedtuple("Tabla", ["nombre", "campos", "requeridos"], defaults=[()])
+
+# Origen de una tabla en la salida de un procesador:
+#   tabla:    Tabla canónica
+#   columnas: {columna de la salida del procesador: campo canónico}; varias
+#             columnas de montos hacia un mismo campo se suman
+#   formato:  formato de las fechas (strftime; '%b' acepta meses en español);
+#             None si ya vienen como fecha o en ISO. Sin año ('%d %b'), el año
+#             se toma de la fecha de cierre o de pago de su cabecera
+Origen = namedtuple("Origen", ["tabla", "columnas", "formato"], defaults=[None])
+
+TEXTO = "string"
+FECHA = "datetime64[ns]"
+MONTO = "Float64"
+ENTERO = "Int32"
+
+_CLAVES = [
+    Campo("documento", TEXTO),
+    Campo("entidad", TEXTO),
+    Campo("producto", TEXTO),
+    Campo("segmento", TEXTO),
+    Campo("pagina", ENTERO),
+]
+
+CABECERAS = Tabla("Cabeceras", _CLAVES + [
+    Campo("cliente", TEXTO),
+    Campo("cuenta", TEXTO),
+    Campo("periodo", TEXTO),
+    Campo("fecha_emision", FECHA),
+    Campo("fecha_inicio", FECHA),
+    Campo("fecha_cierre", FECHA),
+    Campo("fecha_limite_pago", FECHA),
+    Campo("pago_minimo_soles", MONTO),
+    Campo("pago_total_soles", MONTO),
+    Campo("pago_minimo_dolares", MONTO),
+    Campo("pago_total_dolares", MONTO),
+    Campo("saldo_anterior", MONTO),
+    Campo("monto_prestamo", MONTO),
+    Campo("saldo_prestamo", MONTO),
+    Campo("tasa_anual", MONTO),
+    Campo("tasa_costo_efectivo", MONTO),
+    Campo("cuotas_pactadas", ENTERO),
+])
+
+MOVIMIENTOS = Tabla("Movimientos", _CLAVES + [
+    Campo("fecha_consumo", FECHA),
+    Campo("fecha_proceso", FECHA),
+    Campo("descripcion", TEXTO),
+    Campo("monto_soles", MONTO),
+    Campo("monto_dolares", MONTO),
+])
+
+# 'importe' es la cuota del mes cuando el banco no separa soles y dólares
+CUOTAS = Tabla("Cuotas", _CLAVES + [
+    Campo("fecha_consumo", FECHA),
+    Campo("fecha_proceso", FECHA),
+    Campo("descripcion", TEXTO),
+    Campo("referencia", TEXTO),
+    Campo("monto_original", MONTO),
+    Campo("cuota", ENTERO),
+    Campo("total_cuotas", ENTERO),
+    Campo("tasa", MONTO),
+    Campo("capital", MONTO),
+    Campo("interes", MONTO),
+    Campo("saldo", MONTO),
+    Campo("importe", MONTO),
+    Campo("importe_soles", MONTO),
+    Campo("importe_dolares", MONTO),
+])
+
+CRONOGRAMA = Tabla("Cronograma", _CLAVES + [
+    Campo("cuota", ENTERO),
+    Campo("fecha_vencimiento", FECHA),
+    Campo("fecha_pago", FECHA),
+    Campo("saldo", MONTO),
+    Campo("capital", MONTO),
+    Campo("interes", MONTO),
+    Campo("seguros", MONTO),
+    Campo("comisiones", MONTO),
+    Campo("otros", MONTO),
+    Campo("total", MONTO),
+    Campo("estado", TEXTO),
+], requeridos=("cuota", "fecha_vencimiento"))
+
+TABLAS = [CABECERAS, MOVIMIENTOS, CUOTAS, CRONOGRAMA]
+
+# Textos que las hojas del Excel dejan en celdas vacías (astype(str) de None/NaN)
+_VACIOS = ["", "None", "nan", "NaN", "NaT", "<NA>"]
+
+_MESES = {
+    "ENE": "01", "JAN": "01", "FEB": "02", "MAR": "03", "ABR": "04", "APR": "04",
+    "MAY": "05", "JUN": "06", "JUL": "07", "AGO": "08", "AUG": "08", "SET": "09",
+    "SEP": "09", "OCT": "10", "NOV": "11", "DIC": "12", "DEC": "12",
+}
+_PATRON_MES = re.compile(r"[A-Z]{3,}")
+
+
+def montos(origenes=None):
+    """
+    Columnas de montos de dinero (campos MONTO que no son tasas), p. ej. para
+    pasarlas a centavos con tipos.compactar.
+    Args:
+        origenes: ESQUEMA de un procesador; None para los campos canónicos
+    Returns:
+        set: Nombres de las columnas canónicas o de la salida del procesador
+    """
+    campos = {campo.nombre for tabla in TABLAS for campo in tabla.campos
+              if campo.tipo == MONTO and not campo.nombre.startswith("tasa")}
+    if origenes is None:
+        return campos
+    return {columna for origen in origenes for columna, campo in origen.columnas.items() if campo in campos}
+
+
+def vacia(tabla):
+    """DataFrame sin filas con las columnas y tipos de la tabla."""
+    import pandas as pd
+
+    return pd.DataFrame({campo.nombre: pd.Series(dtype=campo.tipo) for campo in tabla.campos})
+
+
+def _bloques(df):
+    """
+    Tablas contenidas en una hoja de salida. Las hojas 'Resumen' apilan varias
+    tablas (encabezado en la primera fila, separadas por una fila vacía); las
+    demás hojas son una tabla con sus columnas.
+    """
+    import pandas as pd
+
+    if not all(isinstance(c, int) for c in df.columns):
+        return [df]
+    bloques, filas = [], df.astype(str).values.tolist()
+    inicio = 0
+    for i in range(len(filas) + 1):
+        if i == len(filas) or all(celda == "" for celda in filas[i]):
+            if i > inicio:
+                encabezado = filas[inicio]
+                ancho = max((j + 1 for j, c in enumerate(encabezado) if c != ""), default=0)
+                bloques.append(pd.DataFrame([f[:ancho] for f in filas[inicio + 1:i]], columns=encabezado[:ancho]))
+            inicio = i + 1
+    return bloques
+
+
+def _texto(serie):
+    serie = serie.astype("string").str.strip()
+    return serie.mask(serie.isin(_VACIOS))
+
+
+def a_montos(serie):
+    """
+    Montos y tasas a Float64: acepta números, 'S/ 1,200.00', 'US$ 15.00',
+    '1,234.56-' (negativo al final) y '15.50%'.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(MONTO)
+    serie = _texto(serie)
+    negativo = serie.str.endswith("-") | serie.str.startswith("-")
+    numeros = pd.to_numeric(serie.str.replace(r"[^\d.]", "", regex=True), errors="coerce").astype(MONTO)
+    return numeros.where(~negativo.fillna(False), -numeros)
+
+
+def a_enteros(serie, posicion=0):
+    """Entero en 'posicion' dentro del texto: '1 de 12', '(01/12)' y '01/12' dan 1 (o 12 con posicion=1)."""
+    import pandas as pd
+
+    numeros = _texto(serie).str.extractall(r"(\d+)")[0]
+    numeros = numeros[numeros.index.get_level_values("match") == posicion].droplevel("match")
+    return pd.to_numeric(numeros, errors="coerce").reindex(serie.index).astype(ENTERO)
+
+
+def a_fechas(serie, formato=None, referencia=None):
+    """
+    Fechas a datetime64.
+    Args:
+        serie: Textos, date o Timestamp
+        formato: Formato de strptime ('%b' acepta ENE, Set, DIC...); None = ISO
+        referencia: Serie de fechas (mismo índice) para completar el año cuando
+                    el formato no lo trae: el de la referencia, o el anterior si
+                    la fecha quedaría después de ella
+    """
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.astype(FECHA)
+    serie = _texto(serie)
+    if formato is None:
+        return pd.to_datetime(serie, format="ISO8601", errors="coerce").astype(FECHA)
+    if "%b" in formato:
+        serie = serie.str.upper().str.replace(
+            _PATRON_MES, lambda m: _MESES.get(m.group(0)[:3], m.group(0)), regex=True
+        )
+        formato = formato.replace("%b", "%m")
+    if "%y" in formato or "%Y" in formato:
+        return pd.to_datetime(serie, format=formato, errors="coerce").astype(FECHA)
+    if referencia is None:
+        return pd.Series(pd.NaT, index=serie.index, dtype=FECHA)
+    anio = referencia.dt.year.astype("string")
+    fechas = pd.to_datetime(serie + " " + anio, format=formato + " %Y", errors="coerce")
+    anterior = fechas - pd.DateOffset(years=1)
+    return fechas.where(~(fechas > referencia), anterior).astype(FECHA)
+
+
+def _convertir(bloque, origen, referencias):
+    import pandas as pd
+
+    tipos = {campo.nombre: campo.tipo for campo in origen.tabla.campos}
+    fuentes = {}
+    for columna, campo in origen.columnas.items():
+        fuentes.setdefault(campo, []).append(columna)
+    tabla = pd.DataFrame(index=bloque.index)
+    for campo in ("segmento", "pagina"):
+        if campo in fuentes:
+            tabla[campo] = _texto(bloque[fuentes[campo][0]])
+    referencia = None
+    if referencias is not None:
+        if "segmento" in tabla:
+            referencia = tabla["segmento"].map(referencias).astype(FECHA)
+        elif len(referencias):
+            referencia = pd.Series(referencias.iloc[0], index=bloque.index, dtype=FECHA)
+    for campo, columnas in fuentes.items():
+        tipo = tipos[campo]
+        if tipo == MONTO:
+            valores = [a_montos(bloque[c]) for c in columnas]
+            tabla[campo] = valores[0] if len(valores) == 1 else pd.concat(valores, axis=1).sum(axis=1, min_count=1)
+        elif tipo == ENTERO:
+            tabla[campo] = a_enteros(bloque[columnas[0]])
+            # '1 de 12': el total de cuotas viene en la misma celda
+            if campo == "cuota" and "total_cuotas" in tipos and "total_cuotas" not in fuentes:
+                tabla["total_cuotas"] = a_enteros(bloque[columnas[0]], posicion=1)
+        elif tipo == FECHA:
+            tabla[campo] = a_fechas(bloque[columnas[0]], origen.formato, referencia)
+        else:
+            tabla[campo] = _texto(bloque[columnas[0]])
+    if origen.tabla.requeridos:
+        presentes = [c for c in origen.tabla.requeridos if c in tabla]
+        if presentes:
+            tabla = tabla[tabla[presentes].notna().any(axis=1)]
+    return tabla
+
+
+def _ordenar(tabla, df):
+    import pandas as pd
+
+    columnas = {}
+    for campo in tabla.campos:
+        if campo.nombre in df:
+            columnas[campo.nombre] = df[campo.nombre].astype(campo.tipo)
+        else:
+            columnas[campo.nombre] = pd.Series(pd.NA, index=df.index, dtype=campo.tipo)
+    return pd.DataFrame(columnas).reset_index(drop=True)
+
+
+def canonico(procesador, output, documento=None):
+    """
+    Convierte la salida de un procesador al esquema canónico.
+    Args:
+        procesador: Metadatos del registro (registro.Procesador)
+        output: Diccionario de DataFrames devuelto por procesar_documento
+        documento: Identificador del documento (p. ej. el nombre del archivo)
+    Returns:
+        dict: {nombre de tabla: DataFrame} con las cuatro tablas de TABLAS, en
+              ese orden y con sus tipos (vacías si el procesador no las tiene)
+    """
+    import pandas as pd
+
+    from procesadores import registro
+
+    origenes = registro.modulo(procesador.entidad, procesador.tipo).ESQUEMA
+    bloques = [bloque for df in output.values() for bloque in _bloques(df)]
+    partes = {tabla.nombre: [] for tabla in TABLAS}
+    referencias = None
+    # Primero las cabeceras: dan el año a las fechas que no lo traen
+    for origen in sorted(origenes, key=lambda o: o.tabla is not CABECERAS):
+        bloque = next((b for b in bloques if set(origen.columnas) <= set(b.columns)), None)
+        if bloque is None:
+            continue
+        partes[origen.tabla.nombre].append(_convertir(bloque, origen, referencias))
+        if origen.tabla is CABECERAS:
+            cabeceras = _ordenar(CABECERAS, partes[CABECERAS.nombre][-1])
+            fechas = cabeceras["fecha_cierre"].fillna(cabeceras["fecha_limite_pago"])
+            referencias = fechas.groupby(cabeceras["segmento"].fillna(""), sort=False).first()
+    fijos = {"documento": documento, "entidad": procesador.entidad, "producto": procesador.tipo}
+    resultado = {}
+    for tabla in TABLAS:
+        df = _ordenar(tabla, pd.concat(partes[tabla.nombre], ignore_index=True)) if partes[tabla.nombre] \
+            else vacia(tabla)
+        for campo, valor in fijos.items():
+            df[campo] = pd.Series(valor, index=df.index, dtype=TEXTO)
+        if tabla is CABECERAS:
+            # Una fila por estado de cuenta aunque el procesador repita la cabecera
+            df = df.drop_duplicates(subset=[c for c in df.columns if c != "pagina"]).reset_index(drop=True)
+        resultado[tabla.nombre] = df
+    return resultado
+
+
+def concatenar(resultados):
+    """
+    Une las tablas canónicas de varios documentos, tabla por tabla.
+    Args:
+        resultados: Iterable de dicts devueltos por canonico()
+    Returns:
+        dict: {nombre de tabla: DataFrame} con los tipos del esquema
+    """
+    import pandas as pd
+
+    partes = {tabla.nombre: [] for tabla in TABLAS}
+    for resultado in resultados:
+        for tabla in TABLAS:
+            if len(resultado.get(tabla.nombre, ())):
+                partes[tabla.nombre].append(resultado[tabla.nombre])
+    return {
+        tabla.nombre: _ordenar(tabla, pd.concat(partes[tabla.nombre], ignore_index=True))
+        if partes[tabla.nombre] else vacia(tabla)
+        for tabla in TABLAS
+    }
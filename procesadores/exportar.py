@@ -0,0 +1,403 @@
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from collections import namedtuple
+from pathlib import Path
+
+# Formatos de exportación del resultado de un procesador ({hoja: DataFrame}).
+#
+# Excel es el formato de siempre, pero es el más lento de escribir, admite a
+# lo sumo 1.048.576 filas por hoja y es lento de leer desde otros procesos.
+# Los formatos columnares guardan cada hoja en su propio archivo:
+#   parquet: comprimido (zstd), el más chico y rápido de leer por columnas
+#   feather: Arrow IPC sin conversión, el más rápido de escribir y leer
+#   csv:     texto UTF-8, para cualquier herramienta
+# parquet y feather requieren pyarrow. Cada archivo se genera solo cuando se
+# pide (botón de descarga o CLI); pandas se importa al exportar, no al
+# arrancar la app o el CLI.
+#
+# Metadatos de cada formato:
+#   extension: extensión del archivo (de cada hoja, en los columnares)
+#   mime:      tipo para la descarga
+#   columnar:  si cada hoja va en un archivo aparte
+Formato = namedtuple("Formato", ["extension", "mime", "columnar"])
+
+EXCEL = "excel"
+PARQUET = "parquet"
+FEATHER = "feather"
+CSV = "csv"
+
+FORMATOS = {
+    EXCEL: Formato("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", False),
+    PARQUET: Formato("parquet", "application/vnd.apache.parquet", True),
+    FEATHER: Formato("feather", "application/vnd.apache.arrow.file", True),
+    CSV: Formato("csv", "text/csv", True),
+}
+
+# Compresión de los archivos Parquet
+COMPRESION_PARQUET = "zstd"
+
+# Filas de una hoja de Excel, contando la del encabezado. Una hoja más larga
+# se reparte en hojas de continuación (Resumen_2, Resumen_3, ...) o se lleva
+# completa a un archivo aparte (desborde), y la hoja HOJA_PARTES del libro
+# indica dónde quedó cada tramo. Se decide por la cantidad de filas antes de
+# escribir, no cuando openpyxl falla después de escribir el resto del libro.
+MAX_FILAS_EXCEL = 1_048_576
+MAX_NOMBRE_HOJA = 31
+HOJA_PARTES = "Partes"
+
+# Tramo de una hoja repartida:
+#   hoja:    hoja del resultado
+#   destino: hoja del libro o archivo aparte donde quedó
+#   desde:   primera fila de datos del tramo (desde 1)
+#   hasta:   última fila de datos del tramo
+Parte = namedtuple("Parte", ["hoja", "destino", "desde", "hasta"])
+
+
+def _nombre_continuacion(hoja, numero, usados):
+    """'Resumen_2', recortando el nombre para respetar los 31 caracteres de Excel."""
+    sufijo = f"_{numero}"
+    nombre = hoja[:MAX_NOMBRE_HOJA - len(sufijo)] + sufijo
+    while nombre in usados:
+        numero += 1
+        sufijo = f"_{numero}"
+        nombre = hoja[:MAX_NOMBRE_HOJA - len(sufijo)] + sufijo
+    return nombre
+
+
+def partir_hojas(resultado, max_filas=MAX_FILAS_EXCEL - 1):
+    """
+    Reparte en hojas de continuación las hojas con más filas que las de Excel.
+    Args:
+        resultado: Diccionario {nombre de hoja: DataFrame}
+        max_filas: Filas de datos por hoja (sin el encabezado)
+    Returns:
+        tuple: ({hoja del libro: DataFrame}, [Parte] de las hojas repartidas;
+               vacía si ninguna supera el límite)
+    """
+    hojas, partes = {}, []
+    usados = set(resultado)
+    for hoja, df in resultado.items():
+        if len(df) <= max_filas:
+            hojas[hoja] = df
+            continue
+        for numero, inicio in enumerate(range(0, len(df), max_filas), start=1):
+            destino = hoja if numero == 1 else _nombre_continuacion(hoja, numero, usados)
+            usados.add(destino)
+            hojas[destino] = df.iloc[inicio:inicio + max_filas]
+            partes.append(Parte(hoja, destino, inicio + 1, min(inicio + max_filas, len(df))))
+    return hojas, partes
+
+
+def _hoja_partes(partes):
+    import pandas as pd
+
+    return pd.DataFrame(partes, columns=["Hoja", "Ubicación", "Desde fila", "Hasta fila"])
+
+
+def a_excel(resultado, max_filas=MAX_FILAS_EXCEL - 1, externas=()):
+    """
+    Genera el Excel en memoria con el resultado de un procesador.
+    pandas se importa aquí para no cargarlo al arrancar la app o el CLI.
+    Las hojas con más filas que las de Excel se reparten (ver partir_hojas).
+    Args:
+        resultado: Diccionario {nombre de hoja: DataFrame} o un DataFrame
+        max_filas: Filas de datos por hoja (sin el encabezado)
+        externas: Parte de las hojas que se guardaron en archivos aparte
+    Returns:
+        bytes: Contenido del archivo .xlsx
+    """
+    import pandas as pd
+
+    if not isinstance(resultado, dict):
+        resultado = {"Sheet1": resultado}
+    hojas, partes = partir_hojas(resultado, max_filas)
+    partes = list(externas) + partes
+    if partes:
+        nombre = HOJA_PARTES if HOJA_PARTES not in hojas else _nombre_continuacion(HOJA_PARTES, 2, set(hojas))
+        hojas[nombre] = _hoja_partes(partes)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, df in hojas.items():
+            # Resetear el índice antes de exportar
+            df.reset_index(drop=True).to_excel(writer, sheet_name=sheet_name, index=False)
+    return output.getvalue()
+
+
+def _para_arrow(df):
+    """
+    Copia de la hoja que Arrow puede escribir: columnas con nombre de texto
+    (las hojas 'Resumen' usan posiciones) y sin columnas de tipos mezclados,
+    que pasan a texto conservando los vacíos.
+    """
+    import pyarrow as pa
+
+    df = df.reset_index(drop=True)
+    df.columns = [str(c) for c in df.columns]
+    df.attrs = {}
+    for columna in df.columns:
+        if df[columna].dtype == object:
+            try:
+                pa.array(df[columna], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                df[columna] = df[columna].astype("string").where(df[columna].notna())
+    return df
+
+
+def hoja_a_bytes(df, formato):
+    """
+    Contenido de una hoja en un formato columnar.
+    Args:
+        df: DataFrame de la hoja
+        formato: PARQUET, FEATHER o CSV
+    Returns:
+        bytes: Contenido del archivo
+    """
+    output = io.BytesIO()
+    if formato == PARQUET:
+        _para_arrow(df).to_parquet(output, index=False, compression=COMPRESION_PARQUET)
+    elif formato == FEATHER:
+        _para_arrow(df).to_feather(output)
+    elif formato == CSV:
+        df.reset_index(drop=True).to_csv(output, index=False, encoding="utf-8")
+    else:
+        raise ValueError(f"Formato columnar desconocido: {formato}")
+    return output.getvalue()
+
+
+def a_archivos(resultado, formato):
+    """
+    Archivos de cada hoja en un formato columnar, uno por vez.
+    Args:
+        resultado: Diccionario {nombre de hoja: DataFrame} o un DataFrame
+        formato: PARQUET, FEATHER o CSV
+    Yields:
+        tuple: (nombre de archivo, bytes), p. ej. ('Resumen.parquet', ...)
+    """
+    if not isinstance(resultado, dict):
+        resultado = {"Hoja1": resultado}
+    extension = FORMATOS[formato].extension
+    for hoja, df in resultado.items():
+        yield f"{hoja}.{extension}", hoja_a_bytes(df, formato)
+
+
+def exportar(resultado, formato):
+    """
+    Un solo archivo con el resultado, para descargarlo: el .xlsx en Excel y
+    un .zip con un archivo por hoja en los formatos columnares.
+    Args:
+        resultado: Diccionario {nombre de hoja: DataFrame} o un DataFrame
+        formato: Clave de FORMATOS
+    Returns:
+        tuple: (bytes, extensión del archivo, tipo mime)
+    """
+    if not FORMATOS[formato].columnar:
+        return a_excel(resultado), FORMATOS[formato].extension, FORMATOS[formato].mime
+    output = io.BytesIO()
+    # Parquet ya viene comprimido; el zip solo agrupa los archivos
+    compresion = zipfile.ZIP_STORED if formato == PARQUET else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(output, "w", compression=compresion) as archivo:
+        for nombre, contenido in a_archivos(resultado, formato):
+            archivo.writestr(nombre, contenido)
+    return output.getvalue(), "zip", "application/zip"
+
+
+def guardar(resultado, formato, destino, desborde=None, max_filas=MAX_FILAS_EXCEL - 1):
+    """
+    Guarda el resultado en disco: un .xlsx en Excel, o una carpeta con un
+    archivo por hoja en los formatos columnares.
+    Args:
+        resultado: Diccionario {nombre de hoja: DataFrame} o un DataFrame
+        formato: Clave de FORMATOS
+        destino: Ruta del .xlsx o de la carpeta
+        desborde: En Excel, formato columnar para las hojas con más de
+                  max_filas: van completas a '<libro>_<hoja>.<ext>' junto al
+                  libro. None las reparte en hojas de continuación
+        max_filas: Filas de datos por hoja de Excel (sin el encabezado)
+    Returns:
+        list: Rutas de los archivos escritos
+    """
+    destino = Path(destino)
+    if not FORMATOS[formato].columnar:
+        if not isinstance(resultado, dict):
+            resultado = {"Sheet1": resultado}
+        rutas, externas, libro = [], [], {}
+        for hoja, df in resultado.items():
+            if desborde is None or len(df) <= max_filas:
+                libro[hoja] = df
+                continue
+            ruta = destino.with_name(f"{destino.stem}_{hoja}.{FORMATOS[desborde].extension}")
+            ruta.write_bytes(hoja_a_bytes(df, desborde))
+            rutas.append(ruta)
+            externas.append(Parte(hoja, ruta.name, 1, len(df)))
+        destino.write_bytes(a_excel(libro, max_filas, externas))
+        return [destino] + rutas
+    destino.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for nombre, contenido in a_archivos(resultado, formato):
+        (destino / nombre).write_bytes(contenido)
+        rutas.append(destino / nombre)
+    return rutas
+
+
+def formato_guardado(destino):
+    """
+    Formato de una salida ya guardada con guardar(): el del .xlsx o el de los
+    archivos de la carpeta. None si no existe.
+    """
+    destino = Path(destino)
+    if destino.is_file():
+        return formato_de_ruta(destino)
+    if destino.is_dir():
+        return next((formato_de_ruta(ruta) for ruta in sorted(destino.iterdir()) if formato_de_ruta(ruta)), None)
+    return None
+
+
+def leer_hoja(destino, formato, hoja, columnas=None):
+    """
+    Una hoja de una salida guardada con guardar().
+    Args:
+        destino: Ruta del .xlsx o de la carpeta
+        formato: Clave de FORMATOS
+        hoja: Nombre de la hoja
+        columnas: Columnas a leer (None = todas; las que falten se ignoran)
+    Returns:
+        DataFrame o None si la salida no tiene esa hoja
+    """
+    import pandas as pd
+
+    destino = Path(destino)
+    if not FORMATOS[formato].columnar:
+        from openpyxl import load_workbook
+
+        libro = load_workbook(destino, read_only=True)
+        try:
+            if hoja not in libro.sheetnames:
+                return None
+            filas = libro[hoja].iter_rows(values_only=True)
+            encabezado = next(filas, ())
+            posiciones = [i for i, c in enumerate(encabezado) if columnas is None or c in columnas]
+            return pd.DataFrame([[fila[i] for i in posiciones] for fila in filas],
+                                columns=[encabezado[i] for i in posiciones])
+        finally:
+            libro.close()
+    ruta = destino / f"{hoja}.{FORMATOS[formato].extension}"
+    if not ruta.exists():
+        return None
+    if formato == CSV:
+        return pd.read_csv(ruta, usecols=lambda c: columnas is None or c in columnas, dtype=str, keep_default_na=False)
+    df = pd.read_parquet(ruta) if formato == PARQUET else pd.read_feather(ruta)
+    return df if columnas is None else df[[c for c in df.columns if c in columnas]]
+
+
+def _valores(df, columnas):
+    """Filas de df en el orden de 'columnas' para openpyxl: None en los vacíos y en las columnas que falten."""
+    df = df.reindex(columns=columnas).astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def _reemplazar(ruta, escribir):
+    """
+    Escribe en un temporal de la misma carpeta y lo renombra sobre 'ruta'
+    (os.replace): un corte a mitad de la escritura deja el archivo anterior
+    intacto. El temporal toma los permisos del archivo que reemplaza.
+    Args:
+        ruta: Archivo a reemplazar
+        escribir: Función que recibe la ruta del temporal y lo escribe
+    """
+    fd, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=f".{ruta.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        if ruta.exists():
+            shutil.copymode(ruta, temporal)
+        escribir(temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+
+
+def agregar(resultado, formato, destino, max_filas=MAX_FILAS_EXCEL - 1):
+    """
+    Agrega filas a una salida guardada con guardar(), sin volver a escribir
+    lo que ya tenía cuando el formato lo permite:
+      excel:   las filas se agregan al final de cada hoja con openpyxl (el
+               archivo se vuelve a comprimir, pero las celdas existentes no
+               pasan por pandas); las hojas nuevas se crean
+      csv:     las filas se agregan al final de una copia de cada archivo
+               (se copian los bytes, sin leer el archivo con pandas)
+      parquet, feather: no admiten agregar filas; solo se reescriben los
+               archivos de las hojas que reciben filas
+    El libro de Excel y cada archivo se reemplazan recién cuando la nueva
+    versión está completa (ver _reemplazar). Las hojas se escriben en el orden
+    de 'resultado': la que registra los documentos agregados va al final, así
+    un corte a mitad de camino no la deja anotando documentos sin sus filas.
+    Las columnas nuevas de una hoja van al final de su encabezado.
+    Args:
+        resultado: Diccionario {nombre de hoja: DataFrame} con las filas nuevas
+        formato: Formato de la salida existente (ver formato_guardado)
+        destino: Ruta del .xlsx o de la carpeta
+        max_filas: Filas de datos por hoja de Excel (sin el encabezado)
+    Returns:
+        list: Rutas de los archivos modificados
+    """
+    import pandas as pd
+
+    destino = Path(destino)
+    resultado = {hoja: df for hoja, df in resultado.items() if len(df) or not df.columns.empty}
+    if not FORMATOS[formato].columnar:
+        from openpyxl import load_workbook
+
+        libro = load_workbook(destino)
+        if HOJA_PARTES in libro.sheetnames:
+            raise ValueError(f"El libro tiene hojas repartidas (ver la hoja '{HOJA_PARTES}'): no se le pueden "
+                             "agregar filas; use un formato columnar")
+        for hoja, df in resultado.items():
+            df = df.reset_index(drop=True)
+            df.columns = [str(c) for c in df.columns]
+            if hoja in libro.sheetnames:
+                hoja_libro = libro[hoja]
+                # Las hojas 'Resumen' tienen posiciones (0, 1, ...) como encabezado
+                encabezado = [None if c.value is None else str(c.value) for c in hoja_libro[1]]
+                for columna in (c for c in df.columns if c not in encabezado):
+                    encabezado.append(columna)
+                    hoja_libro.cell(row=1, column=len(encabezado), value=columna)
+            else:
+                hoja_libro = libro.create_sheet(hoja)
+                encabezado = list(df.columns)
+                hoja_libro.append(encabezado)
+            if hoja_libro.max_row - 1 + len(df) > max_filas:
+                raise ValueError(f"La hoja '{hoja}' superaría las {max_filas} filas de Excel; "
+                                 "use un formato columnar (parquet, feather o csv)")
+            for fila in _valores(df, encabezado):
+                hoja_libro.append(fila)
+        _reemplazar(destino, libro.save)
+        return [destino]
+    rutas = []
+    for hoja, df in resultado.items():
+        ruta = destino / f"{hoja}.{FORMATOS[formato].extension}"
+        if formato == CSV and ruta.exists():
+            encabezado = list(pd.read_csv(ruta, nrows=0).columns)
+            if set(df.columns.astype(str)) <= set(encabezado):
+                def escribir(temporal, ruta=ruta, df=df, encabezado=encabezado):
+                    shutil.copyfile(ruta, temporal)
+                    with open(temporal, "a", encoding="utf-8", newline="") as archivo:
+                        df.rename(columns=str).reindex(columns=encabezado).to_csv(archivo, index=False, header=False)
+                _reemplazar(ruta, escribir)
+                rutas.append(ruta)
+                continue
+        if ruta.exists():
+            anterior = leer_hoja(destino, formato, hoja)
+            df = pd.concat([anterior, df.rename(columns=str)], ignore_index=True)
+        contenido = hoja_a_bytes(df, formato)
+        _reemplazar(ruta, lambda temporal: Path(temporal).write_bytes(contenido))
+        rutas.append(ruta)
+    return rutas
+
+
+def formato_de_ruta(ruta):
+    """Formato que corresponde a la extensión de la ruta (None si no es de ninguno)."""
+    sufijo = Path(ruta).suffix.lower().lstrip(".")
+    return next((clave for clave, formato in FORMATOS.items() if formato.extension == sufijo), None)
@@ -3,6 +3,63 @@ import pandas as pd
 import re
 import io
 from datetime import datetime
+from procesadores import presupuesto
+from procesadores.esquema import CABECERAS, CUOTAS, MOVIMIENTOS, Origen
+from procesadores.regex_seguro import grupos_en_orden
+
+# Prefijo de una línea de movimiento: fecha de transacción y fecha de proceso.
+PATRON_FECHAS = re.compile(r"(\d{2}/\d{2}/\d{4})\s+(\d{2}/\d{2}/\d{4})(\s+)(.*)")
+PATRON_MONTO = re.compile(r"-?\d{1,3}(?:,\d{3})*\.\d{2}")
+# Un detalle con NN/NN corresponde a una línea de cuotas, no a un movimiento simple
+PATRON_NRO_CUOTA = re.compile(r"\b\d{2}/\d{2}\b")
+
+# Pago mínimo y pago total del mes, en ese orden dentro del texto completo
+PATRONES_MONTOS = [
+    re.compile(r"S/ ([\d,]+\.\d{2})\s+Pago mínimo del mes\s+"),
+    re.compile(r"S/ ([\d,]+\.\d{2})\s+Pago total del mes"),
+]
+
+# Columnas de la salida en el esquema canónico (ver esquema.py). Las fechas
+# de los movimientos ya son date; las de las cuotas quedan como texto
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Cliente': 'cliente', 'Periodo de Facturación': 'periodo', 'Último Día de Pago': 'fecha_limite_pago',
+        'Pago Mínimo': 'pago_minimo_soles', 'Pago Total': 'pago_total_soles',
+    }, '%d/%m/%Y'),
+    Origen(MOVIMIENTOS, {
+        'Página': 'pagina', 'Fecha Transacción': 'fecha_consumo', 'Fecha Proceso': 'fecha_proceso',
+        'Detalle': 'descripcion', 'Monto (S/)': 'monto_soles',
+    }),
+    Origen(CUOTAS, {
+        'Página': 'pagina', 'Fecha Transacción': 'fecha_consumo', 'Fecha Proceso': 'fecha_proceso',
+        'Detalle Transacción': 'descripcion', 'Monto (S/)': 'monto_original', 'Nº Cuota Cargada': 'cuota',
+        '%TEA (*)': 'tasa', 'Capital (S/)': 'capital', 'Interés (S/)': 'interes', 'Total': 'importe_soles',
+    }, '%d/%m/%Y'),
+]
+
+def separar_movimiento(line):
+    """
+    Separa una línea de movimiento en fechas, detalle y monto.
+    Reemplaza al patrón con lookahead por carácter ((?:(?!NN/NN).)+?), que
+    retrocedía de forma cuadrática en líneas largas: aquí el monto se toma del
+    último token y el detalle se revisa una sola vez.
+    Returns:
+        tuple: (fecha transacción, fecha proceso, detalle, monto) o None
+    """
+    match = PATRON_FECHAS.match(line)
+    if not match:
+        return None
+    trans_date, proc_date, espacio, resto = match.groups()
+    partes = resto.rsplit(None, 1)
+    if len(partes) == 1 and len(espacio) >= 3:
+        # Sin detalle: el patrón original tomaba uno de los espacios como detalle
+        partes = [espacio[-2], partes[0]]
+    if len(partes) != 2 or not PATRON_MONTO.fullmatch(partes[1]):
+        return None
+    detalle = partes[0]
+    if PATRON_NRO_CUOTA.search(detalle):
+        return None
+    return trans_date, proc_date, detalle, partes[1]
 
 def procesar_documento(pdf_bytes):
    
@@ -11,24 +68,24 @@ def procesar_documento(pdf_bytes):
     page_texts = []
     with pdfplumber.open(pdf_stream) as pdf:
         for page in pdf.pages:
+            presupuesto.revisar_cancelacion()
             text = page.extract_text()
             if text:
                 full_text += "\n" + text
                 page_texts.append((page.page_number, text))
 
     # INFORMACIÓN GENERAL
-    pattern_montos = r"S/ ([\d,]+\.\d{2})\s+Pago mínimo del mes\s+.*?S/ ([\d,]+\.\d{2})\s+Pago total del mes"
     pattern_periodo = r"Periodo de facturación\s+(\d{2}/\d{2} al \d{2}/\d{2})"
     pattern_pago = r"Último día de pago\s+(\d{2}/\d{2}/\d{4})"
     pattern_cliente = r"Estado de Cuenta\s+([A-ZÁÉÍÓÚÑ ]+)"
 
-    match_montos = re.search(pattern_montos, full_text, re.DOTALL)
+    match_montos = grupos_en_orden(PATRONES_MONTOS, full_text)
     match_periodo = re.search(pattern_periodo, full_text)
     match_pago = re.search(pattern_pago, full_text)
     cliente_match = re.search(pattern_cliente, full_text)
 
-    pago_minimo = match_montos.group(1) if match_montos else None
-    pago_total = match_montos.group(2) if match_montos else None
+    pago_minimo = match_montos[0] if match_montos else None
+    pago_total = match_montos[1] if match_montos else None
     periodo_fact = match_periodo.group(1) if match_periodo else None
     ultimo_pago = match_pago.group(1) if match_pago else None
     cliente = cliente_match.group(1).strip() if cliente_match else None
@@ -42,22 +99,13 @@ def procesar_documento(pdf_bytes):
     }])
 
     # MOVIMIENTOS
-    pat_simple = re.compile(
-        r"""(?m)^
-            (\d{2}/\d{2}/\d{4})\s+          # fecha de transacción
-            (\d{2}/\d{2}/\d{4})\s+          # fecha de proceso
-            (                               # detalle
-                (?:(?!\b\d{2}/\d{2}\b).)+?  # NO debe contener NN/NN
-            )\s+
-            (-?\d{1,3}(?:,\d{3})*\.\d{2})   # monto
-            \s*$
-        """,
-        re.VERBOSE,
-    )
-
     movimientos = []
     for page_num, text in page_texts:
-        for trans_date, proc_date, detalle, monto in pat_simple.findall(text):
+        for line in text.splitlines():
+            partes = separar_movimiento(line)
+            if not partes:
+                continue
+            trans_date, proc_date, detalle, monto = partes
             try:
                 fecha_trans = datetime.strptime(trans_date, "%d/%m/%Y").date()
                 fecha_proc  = datetime.strptime(proc_date,  "%d/%m/%Y").date()
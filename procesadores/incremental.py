@@ -0,0 +1,265 @@
+import hashlib
+from pathlib import Path
+
+from procesadores import esquema, exportar, registro, tanda
+
+# Consolidación incremental: agregar los PDF del mes a una salida existente.
+#
+# Una salida consolidada (un .xlsx o una carpeta de archivos por hoja) se
+# arma una vez y cada mes llegan estados de cuenta nuevos, que a menudo se
+# superponen con los anteriores (el mismo movimiento en dos cortes, un PDF
+# consolidado que repite meses ya cargados). En lugar de volver a procesar y
+# escribir todo:
+#   - pendientes() descarta los PDF que la hoja 'Documentos' de la salida ya
+#     registra (por su hash SHA-256, o por el nombre en salidas anteriores a
+#     la columna 'Huella'); los que fallaron se vuelven a procesar
+#   - sin_repetidos() quita de las hojas nuevas los movimientos y compras en
+#     cuotas que ya están en la salida, comparando un hash de la fecha, la
+#     descripción, los montos y la tarjeta (cuenta o cliente, si la hoja la
+#     tiene)
+#   - exportar.agregar() agrega las filas que quedan al final de cada hoja
+# Un movimiento repetido dentro de un mismo estado de cuenta (dos consumos
+# iguales el mismo día) es legítimo: un documento nuevo agrega una fila solo
+# si trae más copias que cualquiera de los documentos ya consolidados.
+#
+# Las filas se reconocen con el ESQUEMA del procesador (esquema.py): en las
+# hojas propias del banco, los bloques con las columnas de un Origen de
+# Movimientos o Cuotas; en la salida canónica, las tablas del mismo nombre.
+#
+# pandas se importa dentro de las funciones, como en esquema.py.
+
+# Campos canónicos que identifican una fila en cualquier documento
+_CAMPOS_CLAVE = {
+    esquema.MOVIMIENTOS.nombre: ("fecha_consumo", "fecha_proceso", "descripcion", "monto_soles", "monto_dolares"),
+    esquema.CUOTAS.nombre: ("fecha_consumo", "descripcion", "monto_original", "cuota", "importe", "importe_soles",
+                            "importe_dolares"),
+}
+# Campos de la cabecera que identifican la tarjeta
+_CAMPOS_TARJETA = ("cuenta", "cliente")
+# Columna con el documento de cada fila: 'Archivo' en las hojas del banco, 'documento' en las canónicas
+_DOCUMENTO = ("Archivo", "documento")
+
+_TIPOS = {campo.nombre: campo.tipo for tabla in esquema.TABLAS for campo in tabla.campos}
+
+
+def huella_archivo(archivo):
+    """Hash SHA-256 del PDF (el de trabajos.huella e indice.huella_documento)."""
+    return hashlib.sha256(Path(archivo).read_bytes()).hexdigest()
+
+
+def pendientes(archivos, destino, formato):
+    """
+    PDF que la salida todavía no tiene.
+    Args:
+        archivos: Rutas de los PDF
+        destino: Ruta del .xlsx o de la carpeta de la salida existente
+        formato: Formato de la salida (exportar.formato_guardado)
+    Returns:
+        tuple: (PDF a procesar, PDF omitidos porque la salida ya los tiene)
+    """
+    documentos = exportar.leer_hoja(destino, formato, tanda.HOJA_DOCUMENTOS, ["Archivo", "Estado", "Huella"])
+    if documentos is None:
+        return list(archivos), []
+    documentos = documentos[documentos["Estado"].astype(str) != tanda.ERROR]
+    if "Huella" in documentos:
+        huellas = set(documentos["Huella"].dropna().astype(str))
+        omitidos = [a for a in archivos if huella_archivo(a) in huellas]
+    else:
+        nombres = set(documentos["Archivo"].dropna().astype(str))
+        omitidos = [a for a in archivos if Path(a).name in nombres]
+    return [a for a in archivos if a not in omitidos], omitidos
+
+
+def _apilada(df):
+    """Si la hoja apila tablas ('Resumen': columnas por posición, ver esquema._bloques)."""
+    columnas = [c for c in df.columns if c not in _DOCUMENTO]
+    return bool(columnas) and all(isinstance(c, int) or str(c).isdigit() for c in columnas)
+
+
+def _bloques(df):
+    """
+    Tablas de una hoja con la posición de sus filas.
+    Yields:
+        tuple: (encabezado, filas de datos, filas de encabezado y separación)
+    """
+    if not _apilada(df):
+        yield list(df.columns), list(range(len(df))), []
+        return
+    celdas = [c for c in df.columns if c not in _DOCUMENTO]
+    vacias = df[celdas].astype("string").fillna("").apply(lambda s: s.str.strip()).eq("").all(axis=1).tolist()
+    # En una tanda, las hojas de cada documento van una debajo de la otra sin fila vacía
+    documentos = _documentos(df).tolist()
+    inicio = 0
+    for i in range(len(df) + 1):
+        vacia = i < len(df) and vacias[i]
+        if i == len(df) or vacia or (i > 0 and documentos[i] != documentos[i - 1]):
+            if i > inicio:
+                encabezado = ["" if v is None else str(v) for v in df[celdas].iloc[inicio].tolist()]
+                yield encabezado, list(range(inicio + 1, i)), [inicio] + ([i] if vacia else [])
+            inicio = i + 1 if vacia else i
+
+
+def _columnas_clave(hoja, encabezado, origenes):
+    """
+    {campo canónico: [columnas]} de un bloque con movimientos o cuotas; vacío si no los tiene.
+    Args:
+        hoja: Nombre de la hoja
+        encabezado: Columnas del bloque
+        origenes: ESQUEMA del procesador; None en la salida canónica
+    """
+    if origenes is None:
+        campos = _CAMPOS_CLAVE.get(hoja, ())
+        return {campo: [campo] for campo in campos if campo in encabezado}
+    for origen in origenes:
+        if origen.tabla.nombre in _CAMPOS_CLAVE and set(origen.columnas) <= set(encabezado):
+            claves = {}
+            for columna, campo in origen.columnas.items():
+                if campo in _CAMPOS_CLAVE[origen.tabla.nombre] + _CAMPOS_TARJETA:
+                    claves.setdefault(campo, []).append(columna)
+            return claves
+    return {}
+
+
+def _normalizar(serie, tipo):
+    """Valores comparables entre el resultado en memoria y el leído de Excel, Parquet o CSV."""
+    import pandas as pd
+
+    if tipo == esquema.MONTO:
+        return esquema.a_montos(serie).round(2).astype("string").fillna("")
+    if tipo == esquema.FECHA:
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime("%Y-%m-%d")
+        else:
+            serie = serie.map(lambda v: v.strftime("%Y-%m-%d") if hasattr(v, "strftime") else v)
+            serie = esquema._texto(serie.astype(object)).str.replace(r"[ T]00:00:00$", "", regex=True)
+    elif tipo == esquema.ENTERO:
+        serie = esquema.a_enteros(serie)
+    texto = esquema._texto(serie.astype(object)).str.upper().str.replace(r"\s+", " ", regex=True)
+    return texto.fillna("")
+
+
+def _claves(df, hoja, origenes, tarjetas=None):
+    """
+    Hash de cada fila con movimientos o cuotas de una hoja.
+    Args:
+        df: DataFrame de la hoja
+        hoja: Nombre de la hoja
+        origenes: ESQUEMA del procesador; None en la salida canónica
+        tarjetas: En la salida canónica, Serie con la tarjeta de cada fila
+    Returns:
+        Series: uint64 con el índice de df, solo en las filas que se comparan
+    """
+    import pandas as pd
+
+    partes = []
+    for encabezado, filas, _ in _bloques(df):
+        claves = _columnas_clave(hoja, encabezado, origenes)
+        if not claves or not filas:
+            continue
+        bloque = df.iloc[filas]
+        if _apilada(df):
+            posiciones = {nombre: c for nombre, c in zip(encabezado, (c for c in df.columns if c not in _DOCUMENTO))}
+            columnas = {campo: [posiciones[c] for c in cols] for campo, cols in claves.items()}
+        else:
+            columnas = claves
+        valores = pd.DataFrame({f"{campo}{i}": _normalizar(bloque[c].reset_index(drop=True), _TIPOS[campo])
+                                for campo, cols in sorted(columnas.items()) for i, c in enumerate(cols)})
+        if tarjetas is not None:
+            valores["tarjeta"] = _normalizar(tarjetas.iloc[filas].reset_index(drop=True), esquema.TEXTO)
+        partes.append(pd.Series(pd.util.hash_pandas_object(valores, index=False).to_numpy(),
+                                index=bloque.index))
+    return pd.concat(partes) if partes else pd.Series(dtype="uint64")
+
+
+def _tarjetas(df, cabeceras):
+    """Tarjeta (cuenta o, si falta, cliente) de cada fila canónica según su cabecera (documento, segmento)."""
+    import pandas as pd
+
+    if cabeceras is None or not len(df) or not {"documento", "segmento"} <= set(df.columns):
+        return pd.Series("", index=df.index, dtype=object)
+    tarjeta = pd.Series("", index=cabeceras.index, dtype=object)
+    for campo in reversed(_CAMPOS_TARJETA):
+        if campo in cabeceras:
+            valores = _normalizar(cabeceras[campo], esquema.TEXTO)
+            tarjeta = tarjeta.where(valores == "", valores)
+    llaves = [_normalizar(cabeceras[c], esquema.TEXTO) for c in ("documento", "segmento")]
+    por_cabecera = tarjeta.groupby(llaves).first()
+    indice = pd.MultiIndex.from_arrays([_normalizar(df[c], esquema.TEXTO) for c in ("documento", "segmento")])
+    return pd.Series(por_cabecera.reindex(indice).fillna("").to_numpy(), index=df.index)
+
+
+def _documentos(df):
+    import pandas as pd
+
+    columna = next((c for c in _DOCUMENTO if c in df.columns), None)
+    return df[columna].astype(str) if columna else pd.Series("", index=df.index)
+
+
+def sin_repetidos(metadatos, resultado, destino, formato, canonica=False):
+    """
+    Quita del resultado nuevo las filas de movimientos y cuotas que la salida
+    existente ya tiene.
+    Args:
+        metadatos: Procesador del registro (registro.Procesador)
+        resultado: {hoja: DataFrame} de los documentos nuevos (tanda.unir_resultados o unir_canonico)
+        destino: Ruta del .xlsx o de la carpeta de la salida existente
+        formato: Formato de la salida (exportar.formato_guardado)
+        canonica: Si las hojas son las tablas canónicas
+    Returns:
+        tuple: ({hoja: DataFrame} sin las filas repetidas, filas quitadas)
+    """
+    origenes = None if canonica else registro.modulo(metadatos.entidad, metadatos.tipo).ESQUEMA
+    cabeceras = {}
+    if canonica:
+        cabeceras = {"nuevas": resultado.get(esquema.CABECERAS.nombre),
+                     "guardadas": exportar.leer_hoja(destino, formato, esquema.CABECERAS.nombre)}
+    salida, quitadas = {}, 0
+    for hoja, df in resultado.items():
+        if hoja == tanda.HOJA_DOCUMENTOS or (canonica and hoja not in _CAMPOS_CLAVE) or not len(df):
+            salida[hoja] = df
+            continue
+        df = df.reset_index(drop=True)
+        claves = _claves(df, hoja, origenes, _tarjetas(df, cabeceras["nuevas"]) if canonica else None)
+        guardada = exportar.leer_hoja(destino, formato, hoja) if len(claves) else None
+        if guardada is None or not len(guardada):
+            salida[hoja] = df
+            continue
+        anteriores = _claves(guardada, hoja, origenes,
+                             _tarjetas(guardada, cabeceras["guardadas"]) if canonica else None)
+        repetidas = _repetidas(claves, _documentos(df), anteriores, _documentos(guardada))
+        salida[hoja], quitadas = _quitar(df, repetidas), quitadas + len(repetidas)
+    return salida, quitadas
+
+
+def _repetidas(claves, documentos, anteriores, documentos_anteriores):
+    """
+    Índices de las filas nuevas que ya están en la salida. Cada documento nuevo
+    puede agregar tantas copias de una fila como las que tenga de más sobre el
+    máximo de cualquier documento anterior (guardado o nuevo ya recorrido).
+    """
+    import pandas as pd
+
+    vistas = pd.Series(anteriores.to_numpy()).groupby(documentos_anteriores.loc[anteriores.index].to_numpy()) \
+        .value_counts().groupby(level=1).max().to_dict() if len(anteriores) else {}
+    repetidas = []
+    por_documento = pd.Series(claves.to_numpy(), index=claves.index).groupby(documentos.loc[claves.index].to_numpy(),
+                                                                             sort=False)
+    for _, grupo in por_documento:
+        copia = grupo.groupby(grupo).cumcount()
+        limite = grupo.map(vistas).fillna(0)
+        repetidas.extend(grupo.index[copia < limite])
+        for clave, n in grupo.value_counts().items():
+            vistas[clave] = max(vistas.get(clave, 0), n)
+    return repetidas
+
+
+def _quitar(df, repetidas):
+    """df sin las filas repetidas ni, en las hojas apiladas, los encabezados de los bloques que quedan vacíos."""
+    if not repetidas:
+        return df
+    quitar = set(repetidas)
+    if _apilada(df):
+        for _, filas, marcas in _bloques(df):
+            if filas and quitar.issuperset(filas):
+                quitar.update(marcas)
+    return df.drop(index=sorted(quitar)).reset_index(drop=True)
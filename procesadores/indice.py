@@ -0,0 +1,266 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+import pdfplumber
+
+from procesadores import presupuesto, reporte
+from procesadores.paralelo import Paginas, diagnostico, por_pagina
+
+# Índice de segmentos de un PDF consolidado (EC-01..EC-NN): páginas, cliente y
+# periodo de cada estado de cuenta, para extraer solo los que se elijan.
+#
+# El índice es una pasada liviana: en cada página se buscan las anclas de fin
+# de segmento sobre layout.texto_rapido (sin los objetos por carácter de
+# pdfplumber), y solo la primera página de cada segmento se lee completa para
+# obtener cliente y periodo. Se guarda por hash del documento, en memoria
+# y en disco, así elegir segmentos sobre el mismo PDF no lo vuelve a recorrer.
+#
+# Un procesador con índice define, a nivel de módulo:
+#   pagina_de_indice(page):        datos baratos de la página (con 'pg'), se corre en paralelo
+#   segmentos_de_indice(paginas):  [(número de segmento, [páginas])] en orden
+#   cabecera_de_segmento(texto):   (cliente, periodo) desde el texto de la primera página
+#   leer_pagina(page):             fase 1 de la extracción (con 'pg')
+#   tablas_de_paginas(paginas, etiqueta):  fase 2; etiqueta(n) da la etiqueta del n-ésimo segmento
+#   armar_salida(*tablas, normalizada):  dict de DataFrames a partir de las tablas de fase 2
+#                                  (normalizada: cabeceras y movimientos en hojas separadas)
+#
+# Se asume que cada estado de cuenta empieza en una página nueva, como ocurre
+# al concatenar los PDF de cada cliente.
+Segmento = namedtuple("Segmento", ["etiqueta", "paginas", "cliente", "periodo"])
+
+RUTA_INDICES = Path(os.environ.get(
+    "EXTRACTOR_INDICES",
+    Path.home() / ".cache" / "extractor_pdf" / "indices",
+))
+
+# Cambia cuando cambia la detección de segmentos (invalida los índices guardados)
+VERSION_INDICE = "1"
+
+_INDICES = {}
+
+# Columnas con la etiqueta del segmento en las tablas de los procesadores
+_COLUMNAS_ETIQUETA = ("Segmento", "segmento", "EC")
+
+
+def etiqueta(numero):
+    """Etiqueta del segmento número 'numero' (desde 1), p. ej. EC-03."""
+    return f"EC-{numero:02d}"
+
+
+def huella_documento(pdf_bytes):
+    """Hash SHA-256 del archivo: identifica al documento en la caché de índices."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _clave(procesador, pdf_bytes):
+    nombre = procesador.__name__.rsplit(".", 1)[-1]
+    return f"{huella_documento(pdf_bytes)}_{nombre}_{VERSION_INDICE}"
+
+
+def _leer_guardado(clave):
+    try:
+        datos = json.loads((RUTA_INDICES / f"{clave}.json").read_text(encoding="utf-8"))
+        return [Segmento(*s) for s in datos]
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _guardar(clave, segmentos):
+    try:
+        RUTA_INDICES.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=RUTA_INDICES, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump([list(s) for s in segmentos], f, ensure_ascii=False)
+        os.replace(temporal, RUTA_INDICES / f"{clave}.json")
+    except OSError:
+        pass
+
+
+def construir(procesador, pdf_bytes, trabajadores=None):
+    """
+    Índice de segmentos del documento (desde la caché si ya se construyó).
+    Args:
+        procesador: Módulo del procesador (ver los requisitos al inicio del módulo)
+        pdf_bytes: Bytes del archivo PDF
+        trabajadores: Procesos para la pasada por páginas (None = automático)
+    Returns:
+        list: Segmento por cada estado de cuenta, en orden de página
+    """
+    clave = _clave(procesador, pdf_bytes)
+    if clave not in _INDICES:
+        segmentos = _leer_guardado(clave)
+        if segmentos is None:
+            # Un índice incompleto no se guarda: si el presupuesto corta la
+            # pasada, se lanza PresupuestoExcedido. Lo mismo si se omitió una
+            # página por superar su tiempo: pagina_de_indice ya es la lectura
+            # más barata y sin esa página dos segmentos quedarían en uno
+            paginas = por_pagina(pdf_bytes, procesador.pagina_de_indice, trabajadores, parcial=False)
+            if paginas.sin_procesar:
+                raise presupuesto.PresupuestoExcedido(
+                    presupuesto.TIEMPO,
+                    "Se omitieron páginas por superar su tiempo máximo "
+                    f"({', '.join(map(str, paginas.sin_procesar))}); el índice quedaría incompleto",
+                )
+            segmentos = []
+            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+                for numero, pgs in procesador.segmentos_de_indice(paginas):
+                    presupuesto.revisar_cancelacion()
+                    texto = pdf.pages[pgs[0] - 1].extract_text() or ""
+                    cliente, periodo = procesador.cabecera_de_segmento(texto)
+                    segmentos.append(Segmento(etiqueta(numero), pgs, cliente, periodo))
+            _guardar(clave, segmentos)
+        _INDICES[clave] = segmentos
+    return _INDICES[clave]
+
+
+def descripcion(segmento):
+    """Texto para listar un segmento, p. ej. 'EC-03 · JUAN PEREZ · 16 ENE - 15 FEB · págs. 5-7'."""
+    paginas = segmento.paginas
+    if len(paginas) == 1:
+        rango = f"pág. {paginas[0]}"
+    elif paginas[-1] - paginas[0] + 1 == len(paginas):
+        rango = f"págs. {paginas[0]}-{paginas[-1]}"
+    else:
+        rango = f"{len(paginas)} págs. entre la {paginas[0]} y la {paginas[-1]}"
+    partes = [segmento.etiqueta, segmento.cliente, segmento.periodo, rango]
+    return " · ".join(p for p in partes if p)
+
+
+def _bloques(paginas):
+    """Agrupa números de página ordenados en tramos contiguos."""
+    bloques = []
+    for pg in paginas:
+        if bloques and pg == bloques[-1][-1] + 1:
+            bloques[-1].append(pg)
+        else:
+            bloques.append([pg])
+    return bloques
+
+
+def _filtrar(df, etiquetas):
+    for columna in _COLUMNAS_ETIQUETA:
+        if columna in df.columns:
+            return df[df[columna].isin(etiquetas)].reset_index(drop=True)
+    return df
+
+
+def lotes(segmentos, paginas_por_lote):
+    """Agrupa segmentos consecutivos en lotes de hasta 'paginas_por_lote' páginas."""
+    if not paginas_por_lote:
+        return [segmentos]
+    grupos, paginas = [], set()
+    for segmento in segmentos:
+        nuevas = paginas | set(segmento.paginas)
+        if grupos and len(nuevas) <= paginas_por_lote:
+            grupos[-1].append(segmento)
+            paginas = nuevas
+        else:
+            grupos.append([segmento])
+            paginas = set(segmento.paginas)
+    return grupos
+
+
+def segmentos_pedidos(procesador, pdf_bytes, etiquetas, trabajadores=None):
+    """Segmentos del índice con esas etiquetas, en orden. Lanza KeyError si falta alguno."""
+    segmentos = construir(procesador, pdf_bytes, trabajadores)
+    etiquetas = set(etiquetas)
+    faltan = etiquetas - {s.etiqueta for s in segmentos}
+    if faltan:
+        raise KeyError(f"El documento no tiene los segmentos {', '.join(sorted(faltan))}")
+    return [s for s in segmentos if s.etiqueta in etiquetas]
+
+
+def extraer_lote(procesador, pdf_bytes, lote, trabajadores=None, segmentos=None):
+    """
+    Fase 1 y 2 de un lote de segmentos: lee solo sus páginas y arma las tablas
+    de cada tramo contiguo, sin unirlas (ver unir()).
+    Args:
+        procesador: Módulo del procesador
+        pdf_bytes: Bytes del archivo PDF
+        lote: Segmentos del índice a extraer
+        trabajadores: Procesos para extraer páginas (None = automático)
+        segmentos: Índice completo del documento (por defecto, construir());
+                   permite extraer el lote en otra máquina sin rehacer el índice
+    Returns:
+        tuple: ([(primera página, tablas) de cada tramo], Paginas sin resultados
+                con las páginas simplificadas y sin procesar, para paralelo.diagnostico)
+    """
+    if segmentos is None:
+        segmentos = construir(procesador, pdf_bytes, trabajadores)
+    paginas = sorted({pg for s in lote for pg in s.paginas})
+    lectura = por_pagina(pdf_bytes, procesador.leer_pagina, trabajadores, paginas,
+                         alternativas=getattr(procesador, "LECTURAS_ALTERNATIVAS", ()))
+    leidas = {pagina["pg"]: pagina for pagina in lectura}
+    partes = []
+    for bloque in _bloques(paginas):
+        # Sin las páginas que no se leyeron (presupuesto agotado o página omitida)
+        bloque = [pg for pg in bloque if pg in leidas]
+        if not bloque:
+            continue
+        # Segmentos presentes en el tramo, en el orden del documento: el n-ésimo
+        # segmento que vea la fase 2 es el n-ésimo de esta lista
+        en_bloque = set(bloque)
+        presentes = [s.etiqueta for s in segmentos if en_bloque.intersection(s.paginas)]
+        partes.append((bloque[0], procesador.tablas_de_paginas(
+            [leidas[pg] for pg in bloque],
+            lambda n, presentes=presentes: presentes[n - 1] if 0 < n <= len(presentes) else None,
+        )))
+    return partes, Paginas((), lectura.simplificadas, lectura.sin_procesar)
+
+
+def unir(procesador, partes, lecturas, etiquetas, normalizada=False):
+    """
+    Salida final a partir de las tablas de uno o más lotes (extraer_lote).
+    Args:
+        procesador: Módulo del procesador
+        partes: (primera página, tablas) de cada tramo; un segmento puede tener
+                páginas no contiguas, así que los tramos de distintos lotes se
+                intercalan en orden de página
+        lecturas: Paginas de cada lote (para el reporte de páginas problemáticas)
+        etiquetas: Etiquetas pedidas (filtra los segmentos vecinos que comparten página)
+        normalizada: Salida normalizada (ver armar_salida del procesador)
+    Returns:
+        dict: La misma salida que procesar_documento, solo con esos segmentos
+    """
+    if partes:
+        partes = [tablas for _, tablas in sorted(partes, key=lambda parte: parte[0])]
+    else:
+        # Nada leído (presupuesto agotado): tablas vacías con sus columnas
+        partes = [procesador.tablas_de_paginas([], lambda n: None)]
+    etiquetas = set(etiquetas)
+    tablas = [_filtrar(pd.concat(tabla, ignore_index=True), etiquetas) for tabla in zip(*partes)]
+    return reporte.anotar(procesador.armar_salida(*tablas, normalizada=normalizada), **diagnostico(*lecturas))
+
+
+def extraer(procesador, pdf_bytes, etiquetas, trabajadores=None, paginas_por_lote=None, normalizada=False):
+    """
+    Extrae solo los segmentos indicados, procesando únicamente sus páginas.
+    Cada tramo contiguo de páginas pasa por la fase 2 del procesador por
+    separado; sus segmentos se numeran con las etiquetas del índice, así la
+    salida coincide con la del documento completo filtrada a esos segmentos.
+    Args:
+        procesador: Módulo del procesador
+        pdf_bytes: Bytes del archivo PDF
+        etiquetas: Etiquetas de los segmentos a extraer, p. ej. ["EC-02", "EC-05"]
+        trabajadores: Procesos para extraer páginas (None = automático)
+        paginas_por_lote: Si se indica, los segmentos se procesan por lotes de
+                          hasta esas páginas y solo se retienen las tablas de
+                          cada lote, no el texto y las palabras de sus páginas
+        normalizada: Salida normalizada (ver armar_salida del procesador)
+    Returns:
+        dict: La misma salida que procesar_documento, solo con esos segmentos
+    """
+    segmentos = construir(procesador, pdf_bytes, trabajadores)
+    pedidos = segmentos_pedidos(procesador, pdf_bytes, etiquetas, trabajadores)
+    partes, lecturas = [], []
+    for lote in lotes(pedidos, paginas_por_lote):
+        tablas, lectura = extraer_lote(procesador, pdf_bytes, lote, trabajadores, segmentos)
+        partes.extend(tablas)
+        lecturas.append(lectura)
+    return unir(procesador, partes, lecturas, etiquetas, normalizada)
@@ -2,6 +2,23 @@ import pdfplumber
 import pandas as pd
 import re
 import io
+from procesadores import presupuesto
+from procesadores.esquema import CABECERAS, MOVIMIENTOS, Origen
+
+# Columnas de la salida en el esquema canónico (ver esquema.py); los montos
+# de la salida quedan como texto y aquí se convierten
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Nombre Cliente': 'cliente', 'Fecha Inicio': 'fecha_inicio', 'Fecha Cierre': 'fecha_cierre',
+        'Ultimo dia pago': 'fecha_limite_pago', 'Pago Total Soles': 'pago_total_soles',
+        'Pago Total USD': 'pago_total_dolares', 'Pago Minimo Soles': 'pago_minimo_soles',
+        'Pago Minimo USD': 'pago_minimo_dolares',
+    }, '%d/%m/%Y'),
+    Origen(MOVIMIENTOS, {
+        'Página': 'pagina', 'Fecha Consumo': 'fecha_consumo', 'Descripción': 'descripcion',
+        'Monto Soles': 'monto_soles', 'Monto USD': 'monto_dolares',
+    }, '%d-%b'),
+]
 
 def procesar_documento(pdf_bytes):
     """
@@ -15,6 +32,7 @@ def procesar_documento(pdf_bytes):
     full_text = ""
     with pdfplumber.open(pdf_stream) as pdf_file:
         for page in pdf_file.pages:
+            presupuesto.revisar_cancelacion()
             text = page.extract_text()
             if text:
                 full_text += "\n" + text
@@ -70,6 +88,7 @@ def procesar_documento(pdf_bytes):
     pdf_stream.seek(0)
     with pdfplumber.open(pdf_stream) as pdf_file:
         for page in pdf_file.pages:
+            presupuesto.revisar_cancelacion()
             text = page.extract_text()
             pg = str(page.page_number)
             if not text:
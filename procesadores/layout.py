@@ -0,0 +1,135 @@
+from functools import lru_cache
+
+from pdfminer import utils
+from pdfminer.pdfdevice import PDFDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter
+
+from procesadores import plantillas
+from procesadores.texto import normalizar
+
+# Recorte de páginas a la región de una sección (tabla de movimientos, plan de
+# cuotas...). Ubicar el encabezado en page.chars no requiere layout: solo se
+# compara el flujo de caracteres. Luego page.crop(bbox) hace que extract_text()
+# o extract_words() procesen únicamente los caracteres de esa región.
+#
+# La región sale directamente de la posición del encabezado (y del pie, si se
+# indica), así que no se guarda: calcularla cuesta menos que buscarla en el
+# almacén de plantillas. huella_layout() sirve a los procesadores que sí
+# guardan lo aprendido de la región (p. ej. los centros de sus columnas).
+
+
+@lru_cache(maxsize=None)
+def _plegar(ch):
+    return normalizar(ch).upper()
+
+
+def ubicar_texto(page, texto, desde_top=None):
+    """
+    Busca un texto en el flujo de caracteres de la página, sin layout.
+    Ignora espacios, tildes y mayúsculas.
+    Args:
+        page: Página de pdfplumber
+        texto: Texto a buscar
+        desde_top: Si se indica, solo cuenta apariciones por debajo de esa altura
+    Returns:
+        dict: El primer carácter de la aparición (con x0, top, ...) o None
+    """
+    objetivo = _plegar(texto).replace(" ", "")
+    chars = [c for c in page.chars if c["text"].strip()]
+    compacto = "".join(_plegar(c["text"]) for c in chars)
+    # Un carácter puede plegarse a más de una letra (ligaduras): se mapea cada
+    # posición del texto compacto al carácter que la originó
+    origen = []
+    for c in chars:
+        origen.extend([c] * len(_plegar(c["text"])))
+    i = compacto.find(objetivo)
+    while i >= 0:
+        if desde_top is None or origen[i]["top"] > desde_top:
+            return origen[i]
+        i = compacto.find(objetivo, i + 1)
+    return None
+
+
+class _DispositivoTexto(PDFDevice):
+    """
+    Dispositivo de pdfminer que solo decodifica el texto de cada operador y
+    su línea base. No crea un objeto por carácter (lo que hacen page.chars y
+    extract_text() de pdfplumber), que es la mayor parte del costo por página.
+    """
+
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self.fragmentos = []
+
+    def render_string(self, textstate, seq, ncs, graphicstate):
+        font = textstate.font
+        if font is None:
+            return
+        matrix = utils.mult_matrix(textstate.matrix, self.ctm)
+        y = utils.apply_matrix_pt(matrix, textstate.linematrix)[1]
+        texto = []
+        for obj in seq:
+            if isinstance(obj, bytes):
+                for cid in font.decode(obj):
+                    try:
+                        texto.append(font.to_unichr(cid))
+                    except PDFUnicodeNotDefined:
+                        pass
+            elif obj < -250:
+                # Desplazamiento grande dentro de TJ: equivale a un espacio
+                texto.append(" ")
+        self.fragmentos.append((y, "".join(texto)))
+
+
+def texto_rapido(page, y_tol=2):
+    """
+    Texto aproximado de la página: fragmentos agrupados por línea base, de
+    arriba abajo y en el orden del flujo dentro de cada línea. Es varias veces
+    más barato que extract_text(); sirve para detectar anclas y fechas (índice
+    de segmentos), no para parsear tablas.
+    Args:
+        page: Página de pdfplumber
+        y_tol: Diferencia máxima de línea base entre fragmentos de una misma línea
+    Returns:
+        str: Líneas separadas por '\\n'
+    """
+    dispositivo = _DispositivoTexto(page.pdf.rsrcmgr)
+    PDFPageInterpreter(page.pdf.rsrcmgr, dispositivo).process_page(page.page_obj)
+    lineas, y_actual = [], None
+    for y, texto in sorted(dispositivo.fragmentos, key=lambda f: -round(f[0])):
+        if y_actual is None or abs(y - y_actual) > y_tol:
+            lineas.append([])
+            y_actual = y
+        lineas[-1].append(texto)
+    return "\n".join(" ".join(linea) for linea in lineas)
+
+
+def huella_layout(page, clave, ancla):
+    """Huella barata del layout: sección, tamaño de página y posición del encabezado."""
+    return plantillas.huella(clave, page.width, page.height, (ancla["x0"], ancla["top"]))
+
+
+def region_seccion(page, inicio, fin=None, margen=15, ancla=None):
+    """
+    Región (bbox) de una sección: desde su encabezado hasta el pie o el final de página.
+    Args:
+        page: Página de pdfplumber
+        inicio: Texto del encabezado de la sección
+        fin: Texto que marca el final de la sección (opcional)
+        margen: Puntos a incluir por encima del encabezado (títulos de columna en dos líneas)
+        ancla: Carácter del encabezado si el llamador ya lo ubicó con ubicar_texto
+    Returns:
+        tuple: bbox (x0, top, x1, bottom) para page.crop o None si la sección no está en la página
+    """
+    if ancla is None:
+        ancla = ubicar_texto(page, inicio)
+    if ancla is None:
+        return None
+    x0, top, x1, bottom = page.bbox
+    limite = bottom
+    if fin:
+        pie = ubicar_texto(page, fin, desde_top=ancla["top"])
+        if pie is not None:
+            limite = pie["top"]
+    return (x0, max(top, ancla["top"] - margen), x1, min(bottom, limite))
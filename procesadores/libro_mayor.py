@@ -0,0 +1,588 @@
+import re
+import sqlite3
+import time
+
+from procesadores import esquema
+from procesadores.cola import _Conexion
+from procesadores.texto import normalizar
+
+# Libro mayor: las tablas canónicas de todos los documentos procesados en un
+# archivo SQLite local, para consultarlas sin volver a abrir cada Excel.
+#
+# Cada corrida genera su propio Excel; responder "los movimientos de Ripley
+# del cliente X en 2025" obligaba a reabrir cientos de archivos o a volver a
+# procesar los PDF. Con --libro el CLI agrega al libro las tablas de
+# esquema.TABLAS de cada documento procesado (una tabla SQLite por tabla
+# canónica, con la columna 'huella') y consultar() las filtra por entidad,
+# producto, cliente, período o documento usando índices.
+#
+# La clave de cada documento es el hash SHA-256 del PDF (huella): volver a
+# guardar un documento reemplaza sus filas en una sola transacción, así que
+# procesar dos veces el mismo archivo (o con una versión nueva del procesador)
+# no duplica nada. La tabla 'documentos' registra el archivo, el procesador y
+# su versión de cada huella.
+#
+# Las fechas se guardan como texto ISO ('2025-03-31'), que se ordena igual
+# que las fechas; los montos como REAL y los enteros como INTEGER.
+# Una conexión por operación, como en cola.ColaSQLite.
+#
+# Búsqueda: las descripciones de movimientos y cuotas, los clientes y los
+# números de cuenta o de préstamo de las cabeceras se copian a la tabla
+# 'textos' con la misma normalización de texto.normalizar (sin tildes) y se
+# indexan con FTS5 (tabla 'busqueda', sincronizada por triggers). buscar()
+# normaliza la consulta igual y busca cada palabra por prefijo: 'múltiple
+# tien' encuentra 'MULTIPLE TIENDAS S.A.'.
+#
+# Agregados: al guardar un documento se calculan sus totales por cliente,
+# entidad y mes (tablas resumen_mensual, deuda_cuotas y cronograma_mensual,
+# con la huella del documento). Volver a guardarlo reemplaza sus totales
+# como reemplaza sus filas, y resumen_mensual(), deuda_cuotas() y
+# saldo_prestamos() suman solo esas tablas, sin recorrer los movimientos.
+# Las filas de movimientos, cuotas y cronogramas toman el cliente y el mes
+# del estado de cuenta de su cabecera (ver _CABECERA).
+#
+# Al abrir un libro de una versión anterior de este módulo (PRAGMA
+# user_version) se recalculan la búsqueda y los agregados de todos sus documentos.
+
+# Columnas que dan el período de cada tabla (la primera que no esté vacía)
+_FECHAS = {
+    esquema.CABECERAS.nombre: ("fecha_cierre", "fecha_limite_pago", "fecha_emision"),
+    esquema.MOVIMIENTOS.nombre: ("fecha_consumo", "fecha_proceso"),
+    esquema.CUOTAS.nombre: ("fecha_consumo", "fecha_proceso"),
+    esquema.CRONOGRAMA.nombre: ("fecha_vencimiento",),
+}
+
+_SQL = {esquema.TEXTO: "TEXT", esquema.FECHA: "TEXT", esquema.MONTO: "REAL", esquema.ENTERO: "INTEGER"}
+
+# Versión de las tablas derivadas (1: búsqueda de texto; 2: agregados)
+VERSION = 2
+
+# Campos que se indexan para buscar
+_BUSCABLES = [
+    (esquema.CABECERAS, "cliente"),
+    (esquema.CABECERAS, "cuenta"),
+    (esquema.MOVIMIENTOS, "descripcion"),
+    (esquema.CUOTAS, "descripcion"),
+    (esquema.CUOTAS, "referencia"),
+]
+
+_BUSQUEDA = """
+CREATE TABLE IF NOT EXISTS textos (
+    id INTEGER PRIMARY KEY,
+    huella TEXT NOT NULL,
+    tabla TEXT NOT NULL,
+    fila INTEGER NOT NULL,
+    campo TEXT NOT NULL,
+    segmento TEXT,
+    pagina INTEGER,
+    texto TEXT NOT NULL,
+    normalizado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS textos_por_huella ON textos (huella);
+CREATE VIRTUAL TABLE IF NOT EXISTS busqueda USING fts5 (
+    normalizado, content='textos', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS textos_agregados AFTER INSERT ON textos BEGIN
+    INSERT INTO busqueda (rowid, normalizado) VALUES (new.id, new.normalizado);
+END;
+CREATE TRIGGER IF NOT EXISTS textos_borrados AFTER DELETE ON textos BEGIN
+    INSERT INTO busqueda (busqueda, rowid, normalizado) VALUES ('delete', old.id, old.normalizado);
+END;
+"""
+
+
+def _nombre(tabla):
+    return tabla.nombre.lower()
+
+
+def _fecha(tabla):
+    """Expresión SQL del período de la tabla (la misma en el índice y en las consultas)."""
+    columnas = _FECHAS[tabla.nombre]
+    return columnas[0] if len(columnas) == 1 else f"coalesce({', '.join(columnas)})"
+
+
+def _esquema_sql():
+    sentencias = ["""
+CREATE TABLE IF NOT EXISTS documentos (
+    huella TEXT PRIMARY KEY,
+    archivo TEXT,
+    entidad TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    modulo TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    guardado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documentos_por_entidad ON documentos (entidad, producto);
+"""]
+    for tabla in esquema.TABLAS:
+        nombre = _nombre(tabla)
+        columnas = ",\n    ".join(f"{campo.nombre} {_SQL[campo.tipo]}" for campo in tabla.campos)
+        sentencias.append(f"""
+CREATE TABLE IF NOT EXISTS {nombre} (
+    huella TEXT NOT NULL REFERENCES documentos (huella),
+    {columnas}
+);
+CREATE INDEX IF NOT EXISTS {nombre}_por_huella ON {nombre} (huella, segmento);
+CREATE INDEX IF NOT EXISTS {nombre}_por_entidad ON {nombre} (entidad, producto, {_fecha(tabla)});
+CREATE INDEX IF NOT EXISTS {nombre}_por_fecha ON {nombre} ({_fecha(tabla)});
+""")
+    sentencias.append(
+        f"CREATE INDEX IF NOT EXISTS cabeceras_por_cliente ON {_nombre(esquema.CABECERAS)}"
+        " (cliente COLLATE NOCASE);\n"
+    )
+    sentencias.append(_BUSQUEDA)
+    sentencias.append(_AGREGADOS)
+    return "".join(sentencias)
+
+
+def _indexar(conexion, huella=None):
+    """Copia a 'textos' (y al índice FTS5) los campos buscables de un documento o, sin huella, de todos."""
+    conexion.create_function("normalizar", 1, normalizar, deterministic=True)
+    filtro = "AND huella = ?" if huella is not None else ""
+    for tabla, campo in _BUSCABLES:
+        if tabla is esquema.CABECERAS:
+            # Las cabeceras repiten el cliente en cada ciclo: una vez por documento y segmento
+            origen = (f"SELECT huella, ?, min(rowid), ?, segmento, min(pagina), {campo}, normalizar({campo})"
+                      f" FROM {_nombre(tabla)} WHERE {campo} IS NOT NULL {filtro} GROUP BY huella, segmento, {campo}")
+        else:
+            origen = (f"SELECT huella, ?, rowid, ?, segmento, pagina, {campo}, normalizar({campo})"
+                      f" FROM {_nombre(tabla)} WHERE {campo} IS NOT NULL {filtro}")
+        conexion.execute(
+            f"INSERT INTO textos (huella, tabla, fila, campo, segmento, pagina, texto, normalizado) {origen}",
+            (tabla.nombre, campo) + ((huella,) if huella is not None else ()),
+        )
+
+
+_AGREGADOS = """
+CREATE TABLE IF NOT EXISTS resumen_mensual (
+    huella TEXT NOT NULL,
+    cliente TEXT,
+    entidad TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    mes TEXT,
+    movimientos INTEGER NOT NULL,
+    monto_soles REAL,
+    monto_dolares REAL,
+    pago_minimo_soles REAL,
+    pago_minimo_dolares REAL,
+    pago_total_soles REAL,
+    pago_total_dolares REAL
+);
+CREATE INDEX IF NOT EXISTS resumen_mensual_por_huella ON resumen_mensual (huella);
+CREATE INDEX IF NOT EXISTS resumen_mensual_por_cliente ON resumen_mensual (cliente COLLATE NOCASE, mes);
+CREATE TABLE IF NOT EXISTS deuda_cuotas (
+    huella TEXT NOT NULL,
+    cliente TEXT,
+    entidad TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    mes TEXT,
+    planes_abiertos INTEGER NOT NULL,
+    cuotas_pendientes INTEGER,
+    saldo REAL,
+    por_pagar_soles REAL,
+    por_pagar_dolares REAL
+);
+CREATE INDEX IF NOT EXISTS deuda_cuotas_por_huella ON deuda_cuotas (huella);
+CREATE INDEX IF NOT EXISTS deuda_cuotas_por_cliente ON deuda_cuotas (cliente COLLATE NOCASE, entidad, mes);
+CREATE TABLE IF NOT EXISTS cronograma_mensual (
+    huella TEXT NOT NULL,
+    cliente TEXT,
+    cuenta TEXT,
+    entidad TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    mes TEXT NOT NULL,
+    cuotas INTEGER NOT NULL,
+    capital REAL,
+    interes REAL,
+    total REAL
+);
+CREATE INDEX IF NOT EXISTS cronograma_mensual_por_huella ON cronograma_mensual (huella);
+"""
+
+# Tablas calculadas a partir de las tablas canónicas de cada documento
+_DERIVADAS = ["textos", "resumen_mensual", "deuda_cuotas", "cronograma_mensual"]
+
+# Cabecera de cada fila 't' (rowid en cabeceras): la del mismo documento y
+# segmento en su página o en la anterior más cercana (los PDF con varios
+# ciclos, como los de BCP, repiten la cabecera al comienzo de cada uno); si
+# no hay ninguna antes, la primera
+_CABECERA = (
+    "coalesce((SELECT k.rowid FROM cabeceras k WHERE k.huella = t.huella AND k.segmento IS t.segmento"
+    " AND k.pagina <= t.pagina ORDER BY k.pagina DESC LIMIT 1),"
+    " (SELECT k.rowid FROM cabeceras k WHERE k.huella = t.huella AND k.segmento IS t.segmento"
+    " ORDER BY k.pagina LIMIT 1))"
+)
+_MES_CABECERA = "substr(coalesce(c.fecha_cierre, c.fecha_limite_pago, c.fecha_emision), 1, 7)"
+
+
+def _agregar(conexion, huella=None):
+    """Calcula los agregados de un documento o, sin huella, de todos."""
+    filtro, parametros = ("t.huella = ?", (huella,)) if huella is not None else ("1", ())
+    # Movimientos por mes de consumo, y pagos mínimo y total por mes del estado de cuenta
+    conexion.execute(f"""
+        INSERT INTO resumen_mensual
+        SELECT huella, cliente, entidad, producto, mes, sum(movimientos), sum(monto_soles), sum(monto_dolares),
+               sum(pago_minimo_soles), sum(pago_minimo_dolares), sum(pago_total_soles), sum(pago_total_dolares)
+        FROM (
+            SELECT t.huella, c.cliente, t.entidad, t.producto,
+                   substr(coalesce(t.fecha_consumo, t.fecha_proceso), 1, 7) AS mes, count(*) AS movimientos,
+                   sum(t.monto_soles) AS monto_soles, sum(t.monto_dolares) AS monto_dolares,
+                   NULL AS pago_minimo_soles, NULL AS pago_minimo_dolares,
+                   NULL AS pago_total_soles, NULL AS pago_total_dolares
+            FROM movimientos t LEFT JOIN cabeceras c ON c.rowid = {_CABECERA}
+            WHERE {filtro}
+            GROUP BY 1, 2, 3, 4, 5
+            UNION ALL
+            SELECT t.huella, t.cliente, t.entidad, t.producto,
+                   substr(coalesce(t.fecha_cierre, t.fecha_limite_pago, t.fecha_emision), 1, 7), 0, NULL, NULL,
+                   sum(t.pago_minimo_soles), sum(t.pago_minimo_dolares),
+                   sum(t.pago_total_soles), sum(t.pago_total_dolares)
+            FROM cabeceras t
+            WHERE {filtro} AND coalesce(t.pago_minimo_soles, t.pago_minimo_dolares,
+                                         t.pago_total_soles, t.pago_total_dolares) IS NOT NULL
+            GROUP BY 1, 2, 3, 4, 5
+        )
+        GROUP BY huella, cliente, entidad, producto, mes
+    """, parametros * 2)
+    # Planes de cuotas de cada estado de cuenta: lo que falta pagar después de la cuota del mes
+    conexion.execute(f"""
+        INSERT INTO deuda_cuotas
+        SELECT huella, cliente, entidad, producto, mes, coalesce(sum(cuota < total_cuotas), 0), sum(restantes),
+               sum(saldo), sum(restantes * coalesce(importe_soles, importe)), sum(restantes * importe_dolares)
+        FROM (
+            SELECT t.*, c.cliente, {_MES_CABECERA} AS mes, max(t.total_cuotas - t.cuota, 0) AS restantes
+            FROM cuotas t LEFT JOIN cabeceras c ON c.rowid = {_CABECERA}
+            WHERE {filtro}
+        )
+        GROUP BY huella, cliente, entidad, producto, mes
+    """, parametros)
+    # Cuotas de los préstamos por mes de vencimiento
+    conexion.execute(f"""
+        INSERT INTO cronograma_mensual
+        SELECT huella, cliente, cuenta, entidad, producto, mes, count(*), sum(capital), sum(interes), sum(total)
+        FROM (
+            SELECT t.*, c.cliente, c.cuenta, substr(t.fecha_vencimiento, 1, 7) AS mes
+            FROM cronograma t LEFT JOIN cabeceras c ON c.rowid = {_CABECERA}
+            WHERE {filtro} AND t.fecha_vencimiento IS NOT NULL
+        )
+        GROUP BY huella, cliente, cuenta, entidad, producto, mes
+    """, parametros)
+
+
+def _filtros(cliente, entidad, desde, hasta):
+    """Condición SQL y parámetros para las tablas de agregados (columna 'mes' en 'AAAA-MM')."""
+    condiciones, parametros = ["1"], []
+    if cliente is not None:
+        condiciones.append("cliente LIKE ?")
+        parametros.append(cliente)
+    if entidad is not None:
+        condiciones.append("entidad = ?")
+        parametros.append(entidad)
+    if desde is not None:
+        condiciones.append("mes >= ?")
+        parametros.append(desde[:7])
+    if hasta is not None:
+        condiciones.append("mes <= ?")
+        parametros.append(_hasta(hasta))
+    return " AND ".join(condiciones), parametros
+
+
+def _expresion(consulta):
+    """Consulta FTS5: cada palabra de la consulta normalizada, por prefijo (todas deben estar)."""
+    return " ".join(f'"{palabra}"*' for palabra in re.findall(r"\w+", normalizar(consulta)))
+
+
+def _filas(tabla, df, huella):
+    """Filas de la tabla canónica listas para sqlite3: tipos de Python y None en los vacíos."""
+    columnas = [[huella] * len(df)]
+    for campo in tabla.campos:
+        serie = df[campo.nombre]
+        if campo.tipo == esquema.FECHA:
+            serie = serie.dt.strftime("%Y-%m-%d")
+        columnas.append(serie.astype(object).where(serie.notna(), None).tolist())
+    return list(zip(*columnas))
+
+
+def _hasta(hasta):
+    # '~' va después de los dígitos y del guion: '2025' incluye todo 2025 y
+    # '2025-03' todo marzo, sin dejar de usar el índice de la fecha
+    return f"{hasta}~"
+
+
+class LibroMayor:
+    """Tablas canónicas de los documentos procesados en un archivo SQLite."""
+
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+        with self._conectar() as conexion:
+            conexion.executescript(_esquema_sql())
+            if conexion.execute("PRAGMA user_version").fetchone()[0] < VERSION:
+                conexion.execute("BEGIN IMMEDIATE")
+                # Se vuelve a leer con el bloqueo tomado: otro proceso pudo completarlo
+                if conexion.execute("PRAGMA user_version").fetchone()[0] < VERSION:
+                    for derivada in _DERIVADAS:
+                        conexion.execute(f"DELETE FROM {derivada}")
+                    _indexar(conexion)
+                    _agregar(conexion)
+                    conexion.execute(f"PRAGMA user_version = {VERSION}")
+                conexion.execute("COMMIT")
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=60, isolation_level=None)
+        return _Conexion(conexion)
+
+    def guardar(self, procesador, huella, tablas, archivo=None):
+        """
+        Agrega (o reemplaza) las tablas canónicas de un documento.
+        Args:
+            procesador: Metadatos del registro (registro.Procesador)
+            huella: Hash SHA-256 del PDF (indice.huella_documento)
+            tablas: Tablas de esquema.canonico() del documento
+            archivo: Nombre del archivo, para la tabla 'documentos'
+        Returns:
+            dict: {nombre de tabla: filas guardadas}
+        """
+        filas = {tabla.nombre: _filas(tabla, tablas[tabla.nombre], huella) for tabla in esquema.TABLAS}
+        with self._conectar() as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            # Primero las filas de una carga anterior del mismo documento
+            for tabla in esquema.TABLAS:
+                conexion.execute(f"DELETE FROM {_nombre(tabla)} WHERE huella = ?", (huella,))
+            for derivada in _DERIVADAS:
+                conexion.execute(f"DELETE FROM {derivada} WHERE huella = ?", (huella,))
+            conexion.execute(
+                "INSERT OR REPLACE INTO documentos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (huella, archivo, procesador.entidad, procesador.tipo, procesador.modulo, procesador.version,
+                 time.time()),
+            )
+            for tabla in esquema.TABLAS:
+                marcas = ", ".join("?" * (len(tabla.campos) + 1))
+                conexion.executemany(f"INSERT INTO {_nombre(tabla)} VALUES ({marcas})", filas[tabla.nombre])
+            _indexar(conexion, huella)
+            _agregar(conexion, huella)
+            conexion.execute("COMMIT")
+        return {nombre: len(f) for nombre, f in filas.items()}
+
+    def consultar(self, tabla=esquema.MOVIMIENTOS.nombre, entidad=None, producto=None, cliente=None,
+                  desde=None, hasta=None, huella=None, documento=None):
+        """
+        Filas de una tabla canónica de todos los documentos guardados.
+        Args:
+            tabla: Nombre de la tabla ('Cabeceras', 'Movimientos', 'Cuotas' o 'Cronograma')
+            entidad, producto: Procesador, p. ej. 'RIPLEY', 'Estado de cuenta'
+            cliente: Nombre del cliente de la cabecera, sin distinguir
+                     mayúsculas; admite los comodines de LIKE ('JUAN%')
+            desde, hasta: Período inclusive: 'AAAA', 'AAAA-MM' o 'AAAA-MM-DD'
+                          (fecha de consumo, de cierre o de vencimiento, según la tabla)
+            huella: Hash del PDF
+            documento: Nombre del archivo
+        Returns:
+            DataFrame: Las columnas de la tabla con los tipos del esquema, más
+                       'huella', en el orden en que se guardaron
+        """
+        import pandas as pd
+
+        definicion = next((t for t in esquema.TABLAS if t.nombre.lower() == tabla.lower()), None)
+        if definicion is None:
+            raise KeyError(f"Tabla desconocida: {tabla}. Opciones: {', '.join(t.nombre for t in esquema.TABLAS)}")
+        condiciones, parametros = [], []
+        for columna, valor in (("entidad", entidad), ("producto", producto), ("huella", huella),
+                               ("documento", documento)):
+            if valor is not None:
+                condiciones.append(f"t.{columna} = ?")
+                parametros.append(valor)
+        if desde is not None:
+            condiciones.append(f"{_fecha(definicion)} >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append(f"{_fecha(definicion)} <= ?")
+            parametros.append(_hasta(hasta))
+        if cliente is not None:
+            if definicion is esquema.CABECERAS:
+                condiciones.append("t.cliente LIKE ?")
+            else:
+                # El cliente está en la cabecera del mismo documento y segmento; el
+                # IN por huella deja recorrer solo los documentos del cliente
+                condiciones.append(
+                    f"t.huella IN (SELECT huella FROM {_nombre(esquema.CABECERAS)} WHERE cliente LIKE ?)"
+                    f" AND EXISTS (SELECT 1 FROM {_nombre(esquema.CABECERAS)} c WHERE c.cliente LIKE ?"
+                    " AND c.huella = t.huella AND c.segmento IS t.segmento)"
+                )
+                parametros.append(cliente)
+            parametros.append(cliente)
+        columnas = ", ".join(f"t.{campo.nombre}" for campo in definicion.campos)
+        consulta = f"SELECT {columnas}, t.huella FROM {_nombre(definicion)} t"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += " ORDER BY t.rowid"
+        with self._conectar() as conexion:
+            filas = conexion.execute(consulta, parametros).fetchall()
+        df = pd.DataFrame(filas, columns=[campo.nombre for campo in definicion.campos] + ["huella"])
+        for campo in definicion.campos:
+            if campo.tipo == esquema.FECHA:
+                df[campo.nombre] = pd.to_datetime(df[campo.nombre], format="%Y-%m-%d").astype(campo.tipo)
+            else:
+                df[campo.nombre] = df[campo.nombre].astype(campo.tipo)
+        df["huella"] = df["huella"].astype(esquema.TEXTO)
+        return df
+
+    def buscar(self, consulta, entidad=None, producto=None, limite=1000):
+        """
+        Busca comercios, clientes o números de préstamo en todos los documentos.
+        Args:
+            consulta: Palabras a buscar, sin distinguir tildes ni mayúsculas; cada
+                      una puede ser el comienzo de una palabra ('farm' encuentra 'FARMACIA')
+            entidad, producto: Procesador, p. ej. 'FALABELLA', 'Estado de cuenta'
+            limite: Máximo de resultados (None = todos)
+        Returns:
+            DataFrame: entidad, producto, archivo, tabla, campo, segmento, pagina,
+                       texto, huella y fila (rowid en la tabla); primero lo último guardado
+        """
+        import pandas as pd
+
+        columnas = ["entidad", "producto", "archivo", "tabla", "campo", "segmento", "pagina", "texto", "huella",
+                    "fila"]
+        expresion = _expresion(consulta)
+        if not expresion:
+            return pd.DataFrame(columns=columnas)
+        consulta_sql = (
+            "SELECT d.entidad, d.producto, d.archivo, x.tabla, x.campo, x.segmento, x.pagina, x.texto,"
+            " x.huella, x.fila FROM busqueda JOIN textos x ON x.id = busqueda.rowid"
+            " JOIN documentos d ON d.huella = x.huella WHERE busqueda MATCH ?"
+        )
+        parametros = [expresion]
+        for columna, valor in (("entidad", entidad), ("producto", producto)):
+            if valor is not None:
+                consulta_sql += f" AND d.{columna} = ?"
+                parametros.append(valor)
+        consulta_sql += " ORDER BY busqueda.rowid DESC"
+        if limite is not None:
+            consulta_sql += " LIMIT ?"
+            parametros.append(limite)
+        with self._conectar() as conexion:
+            filas = conexion.execute(consulta_sql, parametros).fetchall()
+        df = pd.DataFrame(filas, columns=columnas)
+        df["pagina"] = df["pagina"].astype(esquema.ENTERO)
+        return df
+
+    def _leer(self, consulta, parametros, columnas):
+        """Filas de una consulta en un DataFrame con los tipos de 'columnas' ({nombre: tipo})."""
+        import pandas as pd
+
+        with self._conectar() as conexion:
+            filas = conexion.execute(consulta, parametros).fetchall()
+        return pd.DataFrame(filas, columns=list(columnas)).astype(columnas)
+
+    def resumen_mensual(self, cliente=None, entidad=None, desde=None, hasta=None):
+        """
+        Montos de los movimientos y pagos de los estados de cuenta por cliente,
+        entidad y mes, sumando los agregados de cada documento.
+        Args:
+            cliente: Cliente de la cabecera (LIKE, sin distinguir mayúsculas)
+            entidad: p. ej. 'RIPLEY'
+            desde, hasta: Meses inclusive: 'AAAA' o 'AAAA-MM'
+        Returns:
+            DataFrame: cliente, entidad, producto, mes, documentos, movimientos,
+                       monto_soles/dolares, pago_minimo_soles/dolares y pago_total_soles/dolares
+        """
+        condiciones, parametros = _filtros(cliente, entidad, desde, hasta)
+        montos = ["monto_soles", "monto_dolares", "pago_minimo_soles", "pago_minimo_dolares", "pago_total_soles",
+                  "pago_total_dolares"]
+        consulta = (
+            "SELECT cliente, entidad, producto, mes, count(DISTINCT huella), sum(movimientos), "
+            + ", ".join(f"sum({monto})" for monto in montos)
+            + f" FROM resumen_mensual WHERE {condiciones} GROUP BY cliente, entidad, producto, mes"
+            " ORDER BY cliente, entidad, producto, mes"
+        )
+        columnas = {"cliente": esquema.TEXTO, "entidad": esquema.TEXTO, "producto": esquema.TEXTO,
+                    "mes": esquema.TEXTO, "documentos": "Int64", "movimientos": "Int64"}
+        columnas.update({monto: esquema.MONTO for monto in montos})
+        return self._leer(consulta, parametros, columnas)
+
+    def deuda_cuotas(self, cliente=None, entidad=None, hasta=None):
+        """
+        Planes de cuotas abiertos según el último estado de cuenta de cada
+        cliente y entidad (hasta el mes indicado).
+        Args:
+            cliente: Cliente de la cabecera (LIKE, sin distinguir mayúsculas)
+            entidad: p. ej. 'DINNERS'
+            hasta: Último mes a considerar ('AAAA' o 'AAAA-MM'); None = el último guardado
+        Returns:
+            DataFrame: cliente, entidad, producto, mes, planes_abiertos,
+                       cuotas_pendientes, saldo (el que informa el banco) y
+                       por_pagar_soles/dolares (cuotas restantes por el importe de la cuota)
+        """
+        condiciones, parametros = _filtros(cliente, entidad, None, hasta)
+        consulta = f"""
+            WITH deuda AS (SELECT * FROM deuda_cuotas WHERE {condiciones}),
+                 ultimo AS (SELECT cliente, entidad, producto, max(mes) AS mes FROM deuda
+                            GROUP BY cliente, entidad, producto)
+            SELECT d.cliente, d.entidad, d.producto, d.mes, sum(d.planes_abiertos), sum(d.cuotas_pendientes),
+                   sum(d.saldo), sum(d.por_pagar_soles), sum(d.por_pagar_dolares)
+            FROM deuda d JOIN ultimo u ON d.cliente IS u.cliente AND d.entidad = u.entidad
+                 AND d.producto = u.producto AND d.mes IS u.mes
+            GROUP BY d.cliente, d.entidad, d.producto, d.mes
+            ORDER BY d.cliente, d.entidad, d.producto
+        """
+        columnas = {"cliente": esquema.TEXTO, "entidad": esquema.TEXTO, "producto": esquema.TEXTO,
+                    "mes": esquema.TEXTO, "planes_abiertos": "Int64", "cuotas_pendientes": "Int64",
+                    "saldo": esquema.MONTO, "por_pagar_soles": esquema.MONTO, "por_pagar_dolares": esquema.MONTO}
+        return self._leer(consulta, parametros, columnas)
+
+    def saldo_prestamos(self, cliente=None, entidad=None, desde=None):
+        """
+        Capital pendiente de cada préstamo según su cronograma más reciente
+        (por entidad y cuenta; sin cuenta, cada documento es un préstamo).
+        Args:
+            cliente: Cliente de la cabecera (LIKE, sin distinguir mayúsculas)
+            entidad: p. ej. 'BBVA'
+            desde: Mes desde el que las cuotas están pendientes ('AAAA-MM');
+                   None = el mes actual
+        Returns:
+            DataFrame: cliente, entidad, producto, cuenta, capital_pendiente,
+                       cuotas_pendientes, proximo_mes y ultimo_mes de vencimiento, huella
+        """
+        desde = (desde or time.strftime("%Y-%m"))[:7]
+        condiciones, parametros = _filtros(cliente, entidad, None, None)
+        consulta = f"""
+            WITH recientes AS (
+                SELECT huella FROM (
+                    SELECT p.huella, row_number() OVER (
+                        PARTITION BY p.entidad, p.producto, coalesce(p.cuenta, p.huella)
+                        ORDER BY d.guardado DESC) AS orden
+                    FROM (SELECT DISTINCT huella, entidad, producto, cuenta FROM cronograma_mensual) p
+                    JOIN documentos d ON d.huella = p.huella
+                ) WHERE orden = 1
+            )
+            SELECT cliente, entidad, producto, cuenta,
+                   sum(CASE WHEN mes >= ? THEN capital END), sum(CASE WHEN mes >= ? THEN cuotas ELSE 0 END),
+                   min(CASE WHEN mes >= ? THEN mes END), max(mes), huella
+            FROM cronograma_mensual
+            WHERE huella IN recientes AND {condiciones}
+            GROUP BY huella, cliente, entidad, producto, cuenta
+            ORDER BY cliente, entidad, producto, cuenta
+        """
+        columnas = {"cliente": esquema.TEXTO, "entidad": esquema.TEXTO, "producto": esquema.TEXTO,
+                    "cuenta": esquema.TEXTO, "capital_pendiente": esquema.MONTO, "cuotas_pendientes": "Int64",
+                    "proximo_mes": esquema.TEXTO, "ultimo_mes": esquema.TEXTO, "huella": esquema.TEXTO}
+        df = self._leer(consulta, [desde] * 3 + parametros, columnas)
+        # Préstamos ya pagados: sin cuotas pendientes no queda capital
+        df.loc[df["cuotas_pendientes"] == 0, "capital_pendiente"] = 0
+        return df
+
+    def documentos(self):
+        """
+        Documentos guardados en el libro.
+        Returns:
+            DataFrame: huella, archivo, entidad, producto, modulo, version y
+                       guardado (fecha y hora de la última carga)
+        """
+        import pandas as pd
+
+        with self._conectar() as conexion:
+            filas = conexion.execute("SELECT * FROM documentos ORDER BY guardado").fetchall()
+        df = pd.DataFrame(filas, columns=["huella", "archivo", "entidad", "producto", "modulo", "version",
+                                          "guardado"])
+        df["guardado"] = pd.to_datetime(df["guardado"], unit="s")
+        return df
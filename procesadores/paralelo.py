@@ -0,0 +1,244 @@
+import io
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import pdfplumber
+
+from procesadores import plantillas, presupuesto
+
+# Procesamiento en dos fases de PDFs consolidados (muchos estados de cuenta
+# EC-01..EC-NN en un solo archivo).
+#
+# Fase 1 (paralela): cada proceso abre el PDF una vez y recorre un bloque
+# contiguo de páginas aplicando una función por página: extracción de texto
+# y palabras, detección de anclas de inicio/fin de segmento y el parseo que
+# solo depende de la página. Es la parte cara (pdfminer) y no tiene estado.
+#
+# Fase 2 (secuencial): el procesador recorre los resultados en orden de página,
+# asigna las etiquetas de segmento a partir de las anclas y arma las tablas.
+# Es aritmética sobre datos ya extraídos, así que corre en el proceso principal.
+#
+# Las funciones por página deben estar definidas a nivel de módulo (se envían
+# por pickle a los procesos) y devolver datos simples (dict, list, str, float).
+#
+# Con un presupuesto activo (procesadores.presupuesto) la fase 1 se detiene al
+# vencer el tiempo o superar la memoria y devuelve las páginas leídas hasta
+# ahí, en orden y sin huecos; la fase 2 arma entonces un resultado parcial.
+# Si se cancela el procesamiento, cada proceso deja de leer en su próxima
+# página y por_pagina lanza presupuesto.Cancelado.
+#
+# Cada página se lee además con un tiempo máximo (presupuesto.segundos_por_pagina).
+# Si una página lo excede (gráficos vectoriales, miles de glifos diminutos) se
+# reintenta con las lecturas alternativas del procesador, de la más completa a
+# la más barata, y si ninguna termina a tiempo se omite. Las páginas leídas con
+# una alternativa y las omitidas se informan en el reporte (ver diagnostico()).
+
+# Por debajo de este número de páginas no vale la pena levantar procesos
+MIN_PAGINAS_PARALELO = 24
+
+_PDF_BYTES = None
+
+
+class PaginaDemorada(BaseException):
+    """
+    La lectura de una página superó su tiempo máximo. Hereda de BaseException
+    para atravesar los 'except Exception' de pdfminer y pdfplumber.
+    """
+
+
+class Paginas(list):
+    """
+    Resultados de la fase 1 en orden de página, con las páginas leídas con
+    una lectura alternativa ('simplificadas') y las omitidas ('sin_procesar').
+    """
+
+    def __init__(self, resultados=(), simplificadas=(), sin_procesar=()):
+        super().__init__(resultados)
+        self.simplificadas = list(simplificadas)
+        self.sin_procesar = list(sin_procesar)
+
+    def agregar(self, otras):
+        self.extend(otras)
+        self.simplificadas.extend(otras.simplificadas)
+        self.sin_procesar.extend(otras.sin_procesar)
+
+
+def _alarma(signum, frame):
+    raise PaginaDemorada()
+
+
+@contextmanager
+def _vigilancia(segundos):
+    """Lanza PaginaDemorada si el bloque tarda más de 'segundos' (SIGALRM; solo en el hilo principal)."""
+    if not segundos or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    anterior = signal.signal(signal.SIGALRM, _alarma)
+    signal.setitimer(signal.ITIMER_REAL, segundos)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, anterior)
+
+
+def _leer_pagina(lecturas, page, segundos):
+    """
+    Prueba cada lectura con tiempo máximo hasta que una termine.
+    Returns:
+        tuple: (posición de la lectura usada o None si ninguna terminó, resultado)
+    """
+    for intento, lectura in enumerate(lecturas):
+        try:
+            with _vigilancia(segundos):
+                return intento, lectura(page)
+        except PaginaDemorada:
+            # El layout de la página ya parseado se conserva: si lo lento fue
+            # el armado de palabras, la siguiente lectura lo reutiliza
+            continue
+    return None, None
+
+
+def _iniciar_trabajador(pdf_bytes, estado_presupuesto=None):
+    global _PDF_BYTES
+    _PDF_BYTES = pdf_bytes
+    if estado_presupuesto is not None:
+        presupuesto.activar(*estado_presupuesto)
+
+
+def _procesar_paginas(lecturas, indices, pdf_bytes=None):
+    """
+    Lee las páginas indicadas (índices desde 0) abriendo el PDF una vez.
+    Args:
+        lecturas: Función por página y sus alternativas más baratas, en orden
+    Returns:
+        tuple: (Paginas, (motivo, mensaje) si el presupuesto cortó el bloque o None)
+    """
+    resultados = Paginas()
+    segundos = presupuesto.segundos_por_pagina()
+    try:
+        with pdfplumber.open(io.BytesIO(pdf_bytes or _PDF_BYTES)) as pdf:
+            for i in indices:
+                try:
+                    presupuesto.revisar()
+                except presupuesto.PresupuestoExcedido as e:
+                    return resultados, (e.motivo, str(e))
+                page = pdf.pages[i]
+                intento, resultado = _leer_pagina(lecturas, page, segundos)
+                if intento is None:
+                    resultados.sin_procesar.append(i + 1)
+                else:
+                    resultados.append(resultado)
+                    if intento > 0:
+                        resultados.simplificadas.append(i + 1)
+                # Libera los objetos de layout ya usados de la página
+                page.close()
+    finally:
+        # Lo aprendido en el bloque (los procesos del pool no llegan a procesar_aqui)
+        plantillas.escribir()
+    return resultados, None
+
+
+def numero_de_paginas(pdf_bytes):
+    """Cantidad de páginas del PDF (solo lee la estructura, no el contenido)."""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return len(pdf.pages)
+
+
+def trabajadores_efectivos(trabajadores, paginas):
+    """
+    Cantidad de procesos a usar.
+    Args:
+        trabajadores: Pedido por el llamador; None = automático (núcleos disponibles)
+        paginas: Páginas del documento
+    Returns:
+        int: 1 si conviene procesar en el proceso actual
+    """
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+        if paginas < MIN_PAGINAS_PARALELO:
+            return 1
+    return max(1, min(trabajadores, paginas))
+
+
+def diagnostico(*lecturas):
+    """
+    Datos para reporte.anotar sobre páginas problemáticas de una o más lecturas (Paginas).
+    Returns:
+        dict: 'paginas_simplificadas' y 'paginas_sin_procesar' (números de página), si hubo
+    """
+    datos = {}
+    simplificadas = sorted(pg for lectura in lecturas for pg in lectura.simplificadas)
+    sin_procesar = sorted(pg for lectura in lecturas for pg in lectura.sin_procesar)
+    if simplificadas:
+        datos["paginas_simplificadas"] = simplificadas
+    if sin_procesar:
+        datos["paginas_sin_procesar"] = sin_procesar
+    return datos
+
+
+def por_pagina(pdf_bytes, funcion, trabajadores=None, paginas=None, parcial=True, alternativas=()):
+    """
+    Fase 1: aplica 'funcion(page)' a las páginas, en paralelo si conviene.
+    Args:
+        pdf_bytes: Bytes del archivo PDF
+        funcion: Función de módulo que recibe una página de pdfplumber
+        trabajadores: Procesos a usar (None = automático, 1 = sin paralelismo)
+        paginas: Números de página (desde 1) a procesar; None = todas
+        parcial: Si el presupuesto corta la lectura, devolver lo leído (True) o
+                 lanzar PresupuestoExcedido (False, sin límite de páginas)
+        alternativas: Funciones por página más baratas, para páginas que superan su tiempo
+    Returns:
+        Paginas: Resultado de cada página leída, en orden de página
+    """
+    lecturas = (funcion,) + tuple(alternativas)
+    if paginas is None:
+        indices = list(range(numero_de_paginas(pdf_bytes)))
+    else:
+        indices = sorted(p - 1 for p in paginas)
+    pedidas = len(indices)
+    maximo = presupuesto.maximo_de_paginas() if parcial else None
+    if maximo and pedidas > maximo:
+        indices = indices[:maximo]
+    total = len(indices)
+    n = trabajadores_efectivos(trabajadores, total)
+    if n <= 1:
+        resultados, corte = _procesar_paginas(lecturas, indices, pdf_bytes)
+    else:
+        # Rangos contiguos (más que procesos, para repartir páginas de costo desigual)
+        bloques = min(total, n * 4)
+        limites = [round(i * total / bloques) for i in range(bloques + 1)]
+        resultados, corte = Paginas(), None
+        with ProcessPoolExecutor(max_workers=n, initializer=_iniciar_trabajador,
+                                 initargs=(pdf_bytes, presupuesto.estado())) as pool:
+            futuros = [
+                pool.submit(_procesar_paginas, lecturas, indices[inicio:fin])
+                for inicio, fin in zip(limites, limites[1:]) if fin > inicio
+            ]
+            try:
+                for futuro in futuros:
+                    parciales, corte = futuro.result()
+                    resultados.agregar(parciales)
+                    if corte:
+                        # Lo que venga después dejaría huecos: se descarta
+                        for pendiente in futuros:
+                            pendiente.cancel()
+                        break
+            except presupuesto.Cancelado:
+                # Los bloques en curso ven el mismo aviso y terminan en su próxima página
+                for pendiente in futuros:
+                    pendiente.cancel()
+                raise
+
+    if corte and not parcial:
+        raise presupuesto.PresupuestoExcedido(*corte)
+    if corte:
+        presupuesto.registrar_interrupcion(*corte, len(resultados) + len(resultados.sin_procesar), pedidas)
+    elif total < pedidas:
+        presupuesto.registrar_interrupcion(
+            presupuesto.PAGINAS, f"Se superó el máximo de {maximo} páginas por extracción", total, pedidas
+        )
+    return resultados
@@ -0,0 +1,125 @@
+import atexit
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# Almacén de plantillas de layout (centros de columnas, regiones de tablas...)
+# indexadas por una huella barata: banco/sección, tamaño de página y posición
+# de las palabras del encabezado. Para un mismo banco y versión de formato esas
+# posiciones casi no cambian entre documentos, así que lo aprendido en un PDF
+# se reutiliza en los siguientes y solo se vuelve a aprender cuando la huella
+# no está guardada o la plantilla no pasa la validación del procesador.
+#
+# Las plantillas se guardan en memoria y en un JSON en disco para que
+# sobrevivan entre ejecuciones. La ruta se puede cambiar con la variable de
+# entorno EXTRACTOR_PLANTILLAS; si el disco no es escribible se sigue solo en
+# memoria.
+#
+# guardar() y olvidar() solo cambian la memoria; escribir() lleva los cambios
+# al disco una vez por documento (ejecucion.procesar_aqui) o por bloque de
+# páginas de un proceso del pool (paralelo.por_pagina), y al salir. Al
+# escribir se vuelve a leer el JSON y se le aplican solo los cambios propios,
+# así los procesos que aprenden en paralelo no se pisan, y se conservan las
+# MAX_PLANTILLAS guardadas más recientemente.
+RUTA_PLANTILLAS = Path(os.environ.get(
+    "EXTRACTOR_PLANTILLAS",
+    Path.home() / ".cache" / "extractor_pdf" / "plantillas.json",
+))
+
+# Plantillas que se conservan en disco (las más antiguas se descartan)
+MAX_PLANTILLAS = 500
+
+_PLANTILLAS = None
+# Cambios sin escribir: {huella: plantilla o None si se olvidó}
+_CAMBIOS = {}
+# Procesos que ya registraron escribir() al salir
+_SALIDA = set()
+
+
+def huella(clave, ancho, alto, posiciones=(), paso=2):
+    """
+    Huella de layout como texto (clave del JSON).
+    Args:
+        clave: Identificador de banco y sección, p. ej. "dinners_cuotas"
+        ancho, alto: Tamaño de la página
+        posiciones: Coordenadas de las palabras del encabezado
+        paso: Tamaño en puntos de la grilla a la que se redondean las posiciones
+    Returns:
+        str: Huella, p. ej. "dinners_cuotas|612x792|40,120"
+    """
+    coords = ",".join(str(int(round(p / paso)) * paso) for p in posiciones)
+    return f"{clave}|{round(ancho)}x{round(alto)}|{coords}"
+
+
+def _cargar():
+    global _PLANTILLAS
+    if _PLANTILLAS is None:
+        try:
+            _PLANTILLAS = json.loads(RUTA_PLANTILLAS.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _PLANTILLAS = {}
+    return _PLANTILLAS
+
+
+def obtener(clave_huella):
+    """Plantilla guardada para la huella o None si no se conoce."""
+    return _cargar().get(clave_huella)
+
+
+def guardar(clave_huella, plantilla):
+    """
+    Guarda (o reemplaza) la plantilla de una huella en memoria y en disco.
+    Args:
+        clave_huella: Resultado de huella()
+        plantilla: Valor serializable a JSON (dict, lista, números)
+    """
+    plantillas = _cargar()
+    if plantillas.get(clave_huella) == plantilla:
+        return
+    # Al final: la más reciente (ver MAX_PLANTILLAS)
+    plantillas.pop(clave_huella, None)
+    plantillas[clave_huella] = plantilla
+    _anotar(clave_huella, plantilla)
+
+
+def olvidar(clave_huella):
+    """Descarta una plantilla que dejó de validar."""
+    if _cargar().pop(clave_huella, None) is not None:
+        _anotar(clave_huella, None)
+
+
+def _anotar(clave_huella, plantilla):
+    if not _CAMBIOS and os.getpid() not in _SALIDA:
+        _SALIDA.add(os.getpid())
+        atexit.register(escribir)
+    _CAMBIOS.pop(clave_huella, None)
+    _CAMBIOS[clave_huella] = plantilla
+
+
+def escribir():
+    """
+    Lleva al JSON en disco los cambios hechos en memoria desde la última
+    escritura (no hace nada si no los hay).
+    """
+    if not _CAMBIOS:
+        return
+    try:
+        en_disco = json.loads(RUTA_PLANTILLAS.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        en_disco = {}
+    for clave_huella, plantilla in _CAMBIOS.items():
+        en_disco.pop(clave_huella, None)
+        if plantilla is not None:
+            en_disco[clave_huella] = plantilla
+    _CAMBIOS.clear()
+    if len(en_disco) > MAX_PLANTILLAS:
+        en_disco = dict(list(en_disco.items())[-MAX_PLANTILLAS:])
+    try:
+        RUTA_PLANTILLAS.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=RUTA_PLANTILLAS.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(en_disco, f, ensure_ascii=False, indent=1)
+        os.replace(temporal, RUTA_PLANTILLAS)
+    except OSError:
+        pass
@@ -0,0 +1,161 @@
+import os
+import time
+from collections import namedtuple
+
+# Presupuesto de recursos por documento: tiempo total, memoria (RSS) por
+# proceso, páginas por llamada de extracción y tiempo por página.
+#
+# Los límites se revisan entre páginas (paralelo.por_pagina, también dentro de
+# los procesos del pool). Al excederse uno, la extracción se detiene en esa
+# página y la fase 2 arma el resultado con lo ya leído: un resultado parcial en
+# vez de un proceso que crece hasta que el sistema lo mata. interrupcion()
+# informa qué límite se alcanzó y cuántas páginas se llegaron a procesar.
+#
+# El tiempo por página lo vigila paralelo.por_pagina: una página que lo excede
+# se reintenta con la lectura más barata del procesador o se omite.
+#
+# El mismo estado lleva el aviso de cancelación del procesamiento (un Event de
+# multiprocessing, que los procesos del pool reciben con el presupuesto): los
+# bucles por página de los procesadores llaman a revisar_cancelacion() y
+# paralelo.por_pagina a revisar(), que lanzan Cancelado apenas se pide. A
+# diferencia de un límite excedido, la cancelación no arma un resultado
+# parcial: nadie lo va a usar.
+#
+# Los valores por defecto se toman de variables de entorno; None o 0 = sin límite
+# (el tiempo por página usa SEGUNDOS_POR_PAGINA si no se indica):
+#   EXTRACTOR_MAX_SEGUNDOS, EXTRACTOR_MAX_MEMORIA_MB, EXTRACTOR_MAX_PAGINAS,
+#   EXTRACTOR_SEGUNDOS_POR_PAGINA
+Presupuesto = namedtuple("Presupuesto", ["segundos", "memoria_mb", "paginas", "segundos_por_pagina"],
+                         defaults=[None, None, None, None])
+
+# Ninguna página razonable tarda esto en pdfminer; más es un gráfico vectorial
+# o una nube de glifos que traba el documento entero
+SEGUNDOS_POR_PAGINA = 30
+
+TIEMPO = "tiempo"
+MEMORIA = "memoria"
+PAGINAS = "paginas"
+
+# Estado del proceso actual: (presupuesto, instante límite, aviso de cancelación) y la interrupción registrada
+_ACTIVO = None
+_INTERRUPCION = None
+
+
+class PresupuestoExcedido(Exception):
+    """Se alcanzó un límite del presupuesto; 'motivo' es TIEMPO, MEMORIA o PAGINAS."""
+
+    def __init__(self, motivo, mensaje):
+        super().__init__(mensaje)
+        self.motivo = motivo
+
+
+class Cancelado(Exception):
+    """Se pidió cancelar el procesamiento (ver activar)."""
+
+    def __init__(self, mensaje="Procesamiento cancelado"):
+        super().__init__(mensaje)
+
+
+def _entero_de_entorno(nombre):
+    valor = os.environ.get(nombre, "").strip()
+    return int(valor) if valor.isdigit() and int(valor) > 0 else None
+
+
+def desde_entorno():
+    """Presupuesto por defecto según las variables EXTRACTOR_MAX_*."""
+    return Presupuesto(
+        segundos=_entero_de_entorno("EXTRACTOR_MAX_SEGUNDOS"),
+        memoria_mb=_entero_de_entorno("EXTRACTOR_MAX_MEMORIA_MB"),
+        paginas=_entero_de_entorno("EXTRACTOR_MAX_PAGINAS"),
+        segundos_por_pagina=_entero_de_entorno("EXTRACTOR_SEGUNDOS_POR_PAGINA"),
+    )
+
+
+def memoria_mb():
+    """RSS actual del proceso en MB (pico, si el sistema no expone el actual)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        # Sin forma de medir (p. ej. Windows): el límite de memoria no se aplica
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def activar(presupuesto, limite=None, cancelacion=None):
+    """
+    Activa el presupuesto en el proceso actual y limpia la interrupción anterior.
+    Args:
+        presupuesto: Presupuesto o None para desactivar
+        limite: Instante (time.time()) en que vence el tiempo; por defecto, ahora + segundos.
+                Los procesos del pool reciben el del proceso principal.
+        cancelacion: Event que, al marcarse, cancela el procesamiento; los procesos del pool solo
+                     ven el de multiprocessing (ejecucion.nueva_cancelacion)
+    Returns:
+        tuple: Estado para activar el mismo presupuesto en otro proceso (ver estado())
+    """
+    global _ACTIVO, _INTERRUPCION
+    _INTERRUPCION = None
+    if presupuesto is None:
+        _ACTIVO = None
+        return None
+    if limite is None and presupuesto.segundos:
+        limite = time.time() + presupuesto.segundos
+    _ACTIVO = (presupuesto, limite, cancelacion)
+    return _ACTIVO
+
+
+def estado():
+    """(presupuesto, instante límite, aviso de cancelación) activo, para pasarlo a los procesos del pool."""
+    return _ACTIVO
+
+
+def maximo_de_paginas():
+    """Páginas por llamada de extracción según el presupuesto activo (None = sin límite)."""
+    return _ACTIVO[0].paginas if _ACTIVO else None
+
+
+def segundos_por_pagina():
+    """Tiempo máximo de lectura de una página según el presupuesto activo."""
+    if _ACTIVO and _ACTIVO[0].segundos_por_pagina:
+        return _ACTIVO[0].segundos_por_pagina
+    return _entero_de_entorno("EXTRACTOR_SEGUNDOS_POR_PAGINA") or SEGUNDOS_POR_PAGINA
+
+
+def revisar_cancelacion():
+    """Lanza Cancelado si se pidió cancelar el procesamiento."""
+    if _ACTIVO is not None and _ACTIVO[2] is not None and _ACTIVO[2].is_set():
+        raise Cancelado()
+
+
+def revisar():
+    """Lanza Cancelado si se pidió cancelar, o PresupuestoExcedido si se venció el tiempo o se superó la memoria."""
+    if _ACTIVO is None:
+        return
+    revisar_cancelacion()
+    presupuesto, limite, _ = _ACTIVO
+    if limite is not None and time.time() > limite:
+        raise PresupuestoExcedido(TIEMPO, f"Se superó el tiempo máximo de {presupuesto.segundos} s")
+    if presupuesto.memoria_mb and memoria_mb() > presupuesto.memoria_mb:
+        raise PresupuestoExcedido(MEMORIA, f"Se superó la memoria máxima de {presupuesto.memoria_mb} MB")
+
+
+def registrar_interrupcion(motivo, mensaje, procesadas, totales):
+    """Registra que la extracción se detuvo antes de terminar (se conserva la primera)."""
+    global _INTERRUPCION
+    if _INTERRUPCION is None:
+        _INTERRUPCION = {
+            "motivo": motivo,
+            "mensaje": mensaje,
+            "paginas_procesadas": procesadas,
+            "paginas_totales": totales,
+        }
+
+
+def interrupcion():
+    """Interrupción registrada desde la última activación o None si se procesó todo."""
+    return dict(_INTERRUPCION) if _INTERRUPCION else None
@@ -0,0 +1,61 @@
+import re
+
+# Utilidades para evitar patrones con retroceso catastrófico (ReDoS).
+# Una línea o página malformada no debe bloquear al proceso durante minutos:
+# los patrones de tabla se dividen en búsquedas acotadas que corren en
+# tiempo lineal respecto al largo del texto.
+
+
+def buscar_en_orden(patrones, texto, flags=0):
+    """
+    Busca una secuencia de patrones que deben aparecer en orden dentro del texto.
+    Equivale a unir los patrones con '.*?' pero sin el retroceso cuadrático
+    (o peor) que provoca esa construcción cuando la búsqueda falla.
+    Args:
+        patrones: Lista de patrones (str o compilados) en el orden esperado
+        texto: Texto donde buscar
+        flags: Flags de re para los patrones no compilados
+    Returns:
+        list: Lista de objetos Match (uno por patrón) o None si alguno no aparece
+    """
+    matches = []
+    pos = 0
+    for patron in patrones:
+        if isinstance(patron, str):
+            patron = re.compile(patron, flags)
+        match = patron.search(texto, pos)
+        if not match:
+            return None
+        matches.append(match)
+        pos = match.end()
+    return matches
+
+
+def grupos_en_orden(patrones, texto, flags=0):
+    """
+    Igual que buscar_en_orden pero devuelve la tupla con todos los grupos
+    capturados, en el mismo orden que tendría el patrón combinado.
+    """
+    matches = buscar_en_orden(patrones, texto, flags)
+    if matches is None:
+        return None
+    grupos = []
+    for match in matches:
+        grupos.extend(match.groups())
+    return tuple(grupos)
+
+
+def dividir_despues_de(patron, texto, flags=0):
+    """
+    Divide el texto inmediatamente después de cada coincidencia del patrón.
+    Reemplaza a re.split(r'(?<=...)') que no admite patrones de ancho variable.
+    """
+    if isinstance(patron, str):
+        patron = re.compile(patron, flags)
+    partes = []
+    inicio = 0
+    for match in patron.finditer(texto):
+        partes.append(texto[inicio:match.end()])
+        inicio = match.end()
+    partes.append(texto[inicio:])
+    return partes
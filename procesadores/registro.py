@@ -0,0 +1,141 @@
+import ast
+import importlib
+import importlib.util
+from collections import namedtuple
+
+# Registro de procesadores: (entidad, tipo de documento) -> módulo y metadatos.
+# Reemplaza a la construcción del nombre del módulo en cada solicitud, que solo
+# detectaba un módulo mal nombrado como ImportError después de subir el PDF.
+#
+# La validación (validar()) es barata: ubica cada módulo y revisa en su código
+# fuente que defina procesar_documento, sin importarlo. Así el arranque de la
+# app y del CLI no paga pandas/pdfplumber; el módulo se importa la primera vez
+# que se usa (obtener()) y queda en caché para las siguientes.
+#
+# Metadatos:
+#   modulo:    nombre del módulo dentro de procesadores
+#   anclas:    textos que identifican al documento (para reconocer el banco/tipo)
+#   salidas:   formatos de salida que soporta el procesador (CANONICA: declara
+#              ESQUEMA, la correspondencia de su salida con esquema.py)
+#   version:   versión del procesador; cambia cuando cambia su salida
+#   paralelo:  si procesar_documento acepta 'trabajadores' (extracción de páginas en paralelo)
+#   segmentos: si el módulo tiene índice de segmentos y procesar_documento acepta 'segmentos'
+#   normalizada: si procesar_documento acepta 'normalizada' (cabeceras una vez por
+#              ciclo o segmento y movimientos con la referencia, en hojas separadas)
+Procesador = namedtuple("Procesador", ["entidad", "tipo", "modulo", "anclas", "salidas", "version", "paralelo",
+                                       "segmentos", "normalizada"],
+                        defaults=[False, False, False])
+
+PRESTAMO = "Prestamo"
+ESTADO_DE_CUENTA = "Estado de cuenta"
+
+EXCEL = "excel"
+CANONICA = "canonica"
+
+REGISTRO = [
+    Procesador("BCP", PRESTAMO, "bcp_prestamo",
+               ["CREDITO NRO", "FECHA DESEMBOLSO"], [EXCEL, CANONICA], "1"),
+    Procesador("BCP", ESTADO_DE_CUENTA, "bcp_estado_de_cuenta",
+               ["Fecha límite de pago", "DETALLE PLAN CUOTAS SOLES"], [EXCEL, CANONICA], "1",
+               normalizada=True),
+    Procesador("INTERBANK", PRESTAMO, "interbank_prestamo",
+               ["Fecha Desembolso", "T.C.E."], [EXCEL, CANONICA], "1"),
+    Procesador("INTERBANK", ESTADO_DE_CUENTA, "interbank_estado_de_cuenta",
+               ["ÚLTIMO DÍA DE PAGO", "PAGO DEL MES"], [EXCEL, CANONICA], "1"),
+    Procesador("PICHINCHA", PRESTAMO, "pichincha_prestamo",
+               ["Numero de Cuotas", "Fecha de Generacion"], [EXCEL, CANONICA], "1"),
+    Procesador("SCOTIABANK", PRESTAMO, "scotiabank_prestamo",
+               ["Nro.Cuotas", "Tasa Efe Anual"], [EXCEL, CANONICA], "1"),
+    Procesador("SCOTIABANK", ESTADO_DE_CUENTA, "scotiabank_estado_de_cuenta",
+               ["Fecha Compra", "desde provincias"], [EXCEL, CANONICA], "1",
+               paralelo=True, segmentos=True, normalizada=True),
+    Procesador("BBVA", PRESTAMO, "bbva_prestamo",
+               ["NRO. PRESTAMO", "FECHA DE FORMALIZACION"], [EXCEL, CANONICA], "1"),
+    Procesador("BBVA", ESTADO_DE_CUENTA, "bbva_estado_de_cuenta",
+               ["TOTAL CUOTAS DEL MES", "SI PAGA MINIMO"], [EXCEL, CANONICA], "1",
+               paralelo=True, segmentos=True, normalizada=True),
+    Procesador("RIPLEY", ESTADO_DE_CUENTA, "ripley_estado_de_cuenta",
+               ["Ripley"], [EXCEL, CANONICA], "1"),
+    Procesador("FALABELLA", ESTADO_DE_CUENTA, "falabella_estado_de_cuenta",
+               ["Pago mínimo del mes", "Pago total del mes"], [EXCEL, CANONICA], "1"),
+    Procesador("DINNERS", ESTADO_DE_CUENTA, "dinners_estado_de_cuenta",
+               ["PERIODO FACTURADO", "www.dinersclub.pe"], [EXCEL, CANONICA], "1",
+               paralelo=True, segmentos=True, normalizada=True),
+]
+
+_POR_CLAVE = {(p.entidad, p.tipo): p for p in REGISTRO}
+_CARGADOS = {}
+
+
+def entidades():
+    """
+    Returns:
+        dict: {entidad: [tipos de documento]} en el orden del registro (para la UI)
+    """
+    resultado = {}
+    for p in REGISTRO:
+        resultado.setdefault(p.entidad, []).append(p.tipo)
+    return resultado
+
+
+def buscar(entidad, tipo):
+    """Metadatos del procesador de (entidad, tipo). Lanza KeyError si no está registrado."""
+    try:
+        return _POR_CLAVE[(entidad, tipo)]
+    except KeyError:
+        raise KeyError(f"No hay procesador registrado para {entidad} - {tipo}") from None
+
+
+def validar():
+    """
+    Verifica que cada módulo registrado exista y defina procesar_documento,
+    sin importarlo.
+    Returns:
+        list: Mensajes de error (vacía si todo está bien)
+    """
+    errores = []
+    for p in REGISTRO:
+        spec = importlib.util.find_spec(f"procesadores.{p.modulo}")
+        if spec is None or not spec.origin:
+            errores.append(f"{p.entidad} - {p.tipo}: no existe el módulo procesadores.{p.modulo}")
+            continue
+        try:
+            with open(spec.origin, encoding="utf-8") as f:
+                arbol = ast.parse(f.read())
+        except (OSError, SyntaxError) as e:
+            errores.append(f"{p.entidad} - {p.tipo}: no se pudo leer procesadores.{p.modulo} ({e})")
+            continue
+        funciones = {n.name for n in arbol.body if isinstance(n, ast.FunctionDef)}
+        if "procesar_documento" not in funciones:
+            errores.append(f"{p.entidad} - {p.tipo}: procesadores.{p.modulo} no define procesar_documento")
+        constantes = {t.id for n in arbol.body if isinstance(n, ast.Assign) for t in n.targets
+                      if isinstance(t, ast.Name)}
+        if CANONICA in p.salidas and "ESQUEMA" not in constantes:
+            errores.append(f"{p.entidad} - {p.tipo}: procesadores.{p.modulo} no define ESQUEMA")
+    return errores
+
+
+def modulo(entidad, tipo):
+    """
+    Módulo del procesador de (entidad, tipo), p. ej. para construir su índice de segmentos.
+    Se importa la primera vez y queda en caché.
+    """
+    p = buscar(entidad, tipo)
+    if p.modulo not in _CARGADOS:
+        _CARGADOS[p.modulo] = importlib.import_module(f"procesadores.{p.modulo}")
+    return _CARGADOS[p.modulo]
+
+
+def obtener(entidad, tipo):
+    """
+    Función procesar_documento del procesador de (entidad, tipo).
+    Returns:
+        callable: procesar_documento(pdf_bytes) -> dict de DataFrames
+    """
+    return modulo(entidad, tipo).procesar_documento
+
+
+def precargar():
+    """Importa todos los procesadores (para procesos de trabajo de larga vida)."""
+    for p in REGISTRO:
+        obtener(p.entidad, p.tipo)
@@ -0,0 +1,46 @@
+# Datos de diagnóstico del procesamiento (páginas omitidas, etc.). Viajan en
+# DataFrame.attrs de la hoja 'Resumen' (o de la primera hoja, en las salidas
+# normalizadas que no la tienen) para no alterar las hojas del Excel que
+# devuelve cada procesador.
+
+
+def _hoja(output):
+    return 'Resumen' if 'Resumen' in output else next(iter(output))
+
+
+def anotar(output, **datos):
+    """
+    Agrega datos de diagnóstico al resultado de un procesador.
+    Args:
+        output: Diccionario de DataFrames devuelto por procesar_documento
+        **datos: Pares clave/valor a registrar, p. ej. paginas_omitidas=12
+    Returns:
+        dict: El mismo output
+    """
+    output[_hoja(output)].attrs.setdefault('reporte', {}).update(datos)
+    return output
+
+
+def leer(output):
+    """Datos de diagnóstico registrados con anotar() (dict vacío si no hay)."""
+    if isinstance(output, dict) and output:
+        return dict(output[_hoja(output)].attrs.get('reporte', {}))
+    return {}
+
+
+def incompleto(output):
+    """
+    Motivo por el que el resultado no cubre todo el documento: presupuesto
+    agotado ('interrupcion') o páginas omitidas por exceder su tiempo
+    ('paginas_sin_procesar'). Las páginas finales de anexos que omiten los
+    cronogramas ('paginas_omitidas') no cuentan.
+    Returns:
+        str: El motivo, o None si el resultado está completo
+    """
+    datos = leer(output)
+    if datos.get('interrupcion'):
+        return datos['interrupcion']['mensaje']
+    if datos.get('paginas_sin_procesar'):
+        paginas = ', '.join(map(str, datos['paginas_sin_procesar']))
+        return f"páginas omitidas por exceder el tiempo por página ({paginas})"
+    return None
@@ -2,6 +2,23 @@ import pdfplumber
 import pandas as pd
 import re
 import io
+from procesadores import presupuesto
+from procesadores.esquema import CABECERAS, CUOTAS, Origen
+
+# Columnas de la salida en el esquema canónico (ver esquema.py). Todos los
+# movimientos de Ripley traen TEA y número de cuota: van a la tabla de cuotas
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Cliente': 'cliente', 'Periodo de Facturación': 'periodo', 'Último Día de Pago': 'fecha_limite_pago',
+        'Pago Mínimo': 'pago_minimo_soles', 'Pago Total': 'pago_total_soles',
+    }, '%d/%b/%Y'),
+    Origen(CUOTAS, {
+        'Página': 'pagina', 'Fecha de consumo': 'fecha_consumo', 'Fecha de proceso': 'fecha_proceso',
+        'N° Ticket': 'referencia', 'Descripción': 'descripcion', 'Monto': 'monto_original', 'TEA/TNA': 'tasa',
+        'N° de cuotas': 'cuota', 'Valor Cuota - Capital': 'capital', 'Valor Cuota - Interés': 'interes',
+        'Total': 'importe_soles',
+    }, '%d/%b/%Y'),
+]
 
 def procesar_documento(pdf_bytes):
     """
@@ -17,6 +34,7 @@ def procesar_documento(pdf_bytes):
     full_text = ""
     with pdfplumber.open(pdf_stream) as pdf:
         for page in pdf.pages:
+            presupuesto.revisar_cancelacion()
             text = page.extract_text()
             if text:
                 full_text += "\n" + text
@@ -106,6 +124,7 @@ def procesar_documento(pdf_bytes):
     pdf_stream.seek(0)
     with pdfplumber.open(pdf_stream) as pdf:
         for page in pdf.pages:
+            presupuesto.revisar_cancelacion()
             text = page.extract_text()
             if text:
                 for line in text.split("\n"):
@@ -1,210 +1,343 @@
-import pdfplumber
 import pandas as pd
 import re
-import io
+import sys
+from statistics import mean, median
+from procesadores import indice, plantillas, reporte
+from procesadores.esquema import CABECERAS, CUOTAS, MOVIMIENTOS, Origen
+from procesadores.layout import huella_layout, region_seccion, texto_rapido, ubicar_texto
+from procesadores.paralelo import diagnostico, por_pagina
+from procesadores.regex_seguro import dividir_despues_de
 
-def procesar_documento(pdf_bytes):
+# Pie de cada estado de cuenta ("...llamando al 311-6000 desde Lima o al
+# 0-801-1-6000 desde provincias"): separa los EC-NN de un PDF consolidado
+_SEP = r"[\s\u00A0\u2010\u2011\u2012\u2013\u2014\u2015-]*"
+_PAT_311 = rf"3{_SEP}1{_SEP}1{_SEP}6{_SEP}0{_SEP}0{_SEP}0"
+_PAT_0801 = rf"0{_SEP}801{_SEP}1{_SEP}6000"
+PATRON_ANCLA = re.compile(
+    r"llamando\s+al\s*" + _PAT_311 +
+    r"\s+desde\s+Lima\s+o\s+(?:al\s+)?" + _PAT_0801 +
+    r"\s+desde\s+provincias\.?",
+    re.I
+)
+
+# Columnas de una línea de cuotas después de la descripción: fecha de compra, TEA,
+# consumo, nro. de cuota, interés, capital y cuota del mes en soles y dólares
+PATRON_COLA_CUOTA = re.compile(
+    r'(\d{2}/\d{2}/\d{2}) ([\d\.]+) ([\d,]+\.\d{2}) (\d{2}/\d{2}) ([\d\.]+) '
+    r'([\d,]+\.\d{2}) ([\d,]+\.\d{2}) ([\d,]+\.\d{2})'
+)
+
+# Monto de la tabla de movimientos (con '-' final si es abono)
+PATRON_MONTO = re.compile(r"\d{1,3}(?:,\d{3})*\.\d{2}-?")
+
+# Tolerancias (en puntos) para reutilizar centros de columnas Soles/Dólares
+# aprendidos en otro documento con la misma huella de layout
+TOLERANCIA_TITULO = 5
+TOLERANCIA_MONTO = 40
+
+# Columnas de la salida en el esquema canónico (ver esquema.py)
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Segmento': 'segmento', 'Cliente': 'cliente', 'Fecha cierre': 'fecha_cierre',
+        'Ultimo dia de pago': 'fecha_limite_pago', 'Pago Total Soles': 'pago_total_soles',
+        'Pago Total USD': 'pago_total_dolares', 'Pago Minimo Soles': 'pago_minimo_soles',
+        'Pago Minimo USD': 'pago_minimo_dolares',
+    }, '%d-%m-%Y'),
+    Origen(MOVIMIENTOS, {
+        'segmento': 'segmento', 'fecha_compra': 'fecha_consumo', 'fecha_proceso': 'fecha_proceso',
+        'descripcion': 'descripcion', 'monto_soles': 'monto_soles', 'monto_dolares': 'monto_dolares',
+    }, '%d/%m/%y'),
+    Origen(CUOTAS, {
+        'Segmento': 'segmento', 'Descripción': 'descripcion', 'Fecha de compra': 'fecha_consumo',
+        'TEA': 'tasa', 'Consumo': 'monto_original', 'Nro. Cuota': 'cuota', 'Interés del mes': 'interes',
+        'Capital': 'capital', 'Cuota del mes Soles': 'importe_soles', 'Cuota del mes Dólares': 'importe_dolares',
+    }, '%d/%m/%y'),
+]
+
+def separar_cuota(line):
     """
-    Procesa un archivo PDF de estado de cuenta de Scotiabank.
+    Separa una línea de cuotas en descripción y las 8 columnas numéricas.
+    La descripción es todo lo anterior a los 8 últimos tokens; tomarlos con
+    rsplit evita el '(.+?)\\s+' inicial, que retrocede de forma cuadrática
+    en líneas largas o con muchos espacios.
+    Returns:
+        tuple: Los 9 campos como texto o None si la línea no es una cuota
+    """
+    partes = line.strip().rsplit(None, 8)
+    if len(partes) != 9:
+        return None
+    match = PATRON_COLA_CUOTA.fullmatch(" ".join(partes[1:]))
+    if not match:
+        return None
+    return (partes[0],) + match.groups()
+
+def _to_float(txt):
+    if not txt:
+        return None
+    txt = txt.replace(",", "")
+    neg = txt.endswith("-")
+    val = float(txt.rstrip("-"))
+    return -val if neg else val
+
+def _centro(word):
+    return (word["x0"] + word["x1"]) / 2
+
+def _plantilla_valida(plantilla, palabras):
+    # Los títulos de columna, si están en la página, deben seguir donde se
+    # aprendieron y cada monto debe caer cerca de alguna de las dos columnas.
+    # Una página sin títulos ni montos no valida (se omite como antes)
+    evidencia = False
+    for w in palabras:
+        if w["text"] == "Soles":
+            if abs(_centro(w) - plantilla["soles"]) > TOLERANCIA_TITULO:
+                return False
+            evidencia = True
+        elif "ólares" in w["text"]:
+            if abs(_centro(w) - plantilla["dolares"]) > TOLERANCIA_TITULO:
+                return False
+            evidencia = True
+        elif PATRON_MONTO.fullmatch(w["text"]):
+            distancia = min(abs(_centro(w) - plantilla["soles"]), abs(_centro(w) - plantilla["dolares"]))
+            if distancia > TOLERANCIA_MONTO:
+                return False
+            evidencia = True
+    return evidencia
+
+def _movimientos_de_pagina(page):
+    """
+    Movimientos de la tabla 'Fecha Compra' de una página, sin segmento.
+    Returns:
+        list: dicts con fecha_compra, fecha_proceso, descripcion y montos
+    """
+    filas = []
+    # Solo se extraen las palabras desde el encabezado de la tabla hacia abajo
+    ancla = ubicar_texto(page, "Fecha Compra")
+    bbox = region_seccion(page, "Fecha Compra", ancla=ancla)
+    palabras = (page.crop(bbox) if bbox else page).extract_words()
+    clave = huella_layout(page, "scotiabank_columnas", ancla) if ancla else None
+    guardada = plantillas.obtener(clave) if clave else None
+    if guardada and _plantilla_valida(guardada, palabras):
+        soles_x, dolares_x = guardada["soles"], guardada["dolares"]
+    else:
+        soles_x = dolares_x = None
+        for w in palabras:
+            if w["text"] == "Soles":
+                soles_x = _centro(w)
+            elif "ólares" in w["text"]:
+                dolares_x = _centro(w)
+        if soles_x is not None and dolares_x is not None:
+            # Solo se guardan las columnas de los títulos: el reparto por la
+            # mediana es una estimación para esta página
+            if clave:
+                plantillas.guardar(clave, {"soles": soles_x, "dolares": dolares_x})
+        else:
+            nums = [_centro(w) for w in palabras if PATRON_MONTO.fullmatch(w["text"])]
+            if not nums:
+                return filas
+            mid = median(nums)
+            soles_x   = mean([x for x in nums if x <  mid])
+            dolares_x = mean([x for x in nums if x >= mid])
+    line_dict = {}
+    for w in palabras:
+        y = round(w["top"], 1)
+        line_dict.setdefault(y, []).append(w)
+    for words in line_dict.values():
+        words.sort(key=lambda w: w["x0"])
+        tokens = [w["text"] for w in words]
+        line_text = " ".join(tokens)
+        if re.search(r"(?i)\bsaldo\s+anterior\b", line_text):
+            sa_soles = sa_dolares = None
+            for w in words:
+                if PATRON_MONTO.fullmatch(w["text"]):
+                    if abs(_centro(w) - soles_x) < abs(_centro(w) - dolares_x):
+                        sa_soles = _to_float(w["text"])
+                    else:
+                        sa_dolares = _to_float(w["text"])
+            if sa_soles is not None or sa_dolares is not None:
+                filas.append({
+                    "fecha_compra":  None,
+                    "fecha_proceso": None,
+                    "descripcion":   "Saldo Anterior",
+                    "monto_soles":   sa_soles,
+                    "monto_dolares": sa_dolares,
+                })
+            continue
+        if (len(tokens) < 3 or
+            not re.fullmatch(r"\d{2}/\d{2}/\d{2}", tokens[0]) or
+            not re.fullmatch(r"\d{2}/\d{2}/\d{2}", tokens[1])):
+            continue
+        compra, proceso = tokens[:2]
+        desc_parts, soles, dolares = [], None, None
+        for w in words[2:]:
+            if PATRON_MONTO.fullmatch(w["text"]):
+                if abs(_centro(w) - soles_x) < abs(_centro(w) - dolares_x):
+                    soles = _to_float(w["text"])
+                else:
+                    dolares = _to_float(w["text"])
+            else:
+                desc_parts.append(w["text"])
+        descripcion = " ".join(desc_parts).strip()
+        if not descripcion or descripcion.lower().startswith(("deuda total",)):
+            continue
+        filas.append({
+            "fecha_compra":  compra,
+            "fecha_proceso": proceso,
+            "descripcion":   descripcion,
+            "monto_soles":   soles,
+            "monto_dolares": dolares,
+        })
+    return filas
+
+def _cuotas_de_pagina(text):
+    """Cuotas de una página, sin segmento."""
+    datos = []
+    for line in text.split('\n'):
+        match = separar_cuota(line)
+        if match:
+            datos.append([
+                match[0],
+                match[1],
+                float(match[2]),
+                float(match[3].replace(',', '')),
+                match[4],
+                float(match[5]),
+                float(match[6].replace(',', '')),
+                float(match[7].replace(',', '')),
+                float(match[8].replace(',', ''))
+            ])
+    return datos
+
+def _datos_generales(seg):
+    """
+    Cliente, fechas y montos de pago del texto de un segmento.
+    Returns:
+        list: [cliente, fecha cierre, último día de pago, pago total y mínimo en soles y dólares]
+    """
+    lineas = seg.splitlines()
+    linea_3 = lineas[3].strip() if len(lineas) > 3 else ""
+    cliente = re.sub(r'S\/\s?[\d,]+\.\d{2}\s+US\$\s?[\d,]+\.\d{2}', '', linea_3).strip()
+    fecha_fin_ciclo = lineas[2].strip() if len(lineas) > 2 else None
+    if not (fecha_fin_ciclo and re.match(r'\d{2}-\d{2}-\d{4}', fecha_fin_ciclo)):
+        fecha_fin_ciclo = None
+    match_montos = re.search(r'S\/\s?([\d,]+\.\d{2})\s+US\$\s?([\d,]+\.\d{2})', linea_3)
+    pago_total_soles = match_montos.group(1) if match_montos else None
+    pago_total_usd = match_montos.group(2) if match_montos else None
+    ultimodia_pago = lineas[6].strip() if len(lineas) > 6 else None
+    if not (ultimodia_pago and re.match(r'\d{2}-\d{2}-\d{4}', ultimodia_pago)):
+        ultimodia_pago = None
+    match_pago_min_usd = re.findall(r'US\$ ([\d,]+\.\d{2})', seg)
+    pago_minimo_usd = match_pago_min_usd[1] if len(match_pago_min_usd) >= 2 else None
+    match_pago_min_soles = re.findall(r'S\/ ([\d,]+\.\d{2})', seg)
+    pago_minimo_soles = match_pago_min_soles[2] if len(match_pago_min_soles) >= 3 else None
+    return [cliente, fecha_fin_ciclo, ultimodia_pago,
+            pago_total_soles, pago_total_usd, pago_minimo_soles, pago_minimo_usd]
+
+def pagina_de_indice(page):
+    """Índice de segmentos: si la página tiene el ancla de fin de segmento (sin layout)."""
+    text = texto_rapido(page)
+    return {"pg": page.page_number, "ancla": bool(PATRON_ANCLA.search(text)), "vacia": not text.strip()}
+
+def segmentos_de_indice(paginas):
+    """Páginas de cada segmento: cada uno termina en la página con el ancla."""
+    segmentos, numero = {}, 1
+    for pagina in paginas:
+        if not pagina["vacia"]:
+            segmentos.setdefault(numero, []).append(pagina["pg"])
+        if pagina["ancla"]:
+            numero += 1
+    return list(segmentos.items())
+
+def cabecera_de_segmento(text):
+    """Cliente y fecha de cierre desde la primera página del segmento."""
+    cliente, fecha_cierre = _datos_generales(text.strip())[:2]
+    return cliente or None, fecha_cierre
+
+def leer_pagina(page):
+    """
+    Fase 1: texto, ancla de fin de segmento y filas de la página (se puede
+    correr en paralelo). Los segmentos se asignan después, en orden de página.
+    """
+    text = page.extract_text() or ""
+    return {
+        "pg": page.page_number,
+        "texto": text,
+        "ancla": bool(PATRON_ANCLA.search(text)),
+        "tabla": "Fecha Compra" in text,
+        "movimientos": _movimientos_de_pagina(page) if "Fecha Compra" in text else [],
+        "cuotas": _cuotas_de_pagina(text),
+    }
+
+def leer_pagina_rapida(page):
+    """
+    Lectura alternativa para páginas que superan su tiempo: texto de
+    layout.texto_rapido, sin la tabla de movimientos (necesita posiciones).
+    """
+    text = texto_rapido(page)
+    return {
+        "pg": page.page_number,
+        "texto": text,
+        "ancla": bool(PATRON_ANCLA.search(text)),
+        "tabla": "Fecha Compra" in text,
+        "movimientos": [],
+        "cuotas": _cuotas_de_pagina(text),
+    }
+
+# Lecturas más baratas para páginas que superan su tiempo (ver paralelo.por_pagina)
+LECTURAS_ALTERNATIVAS = (leer_pagina_rapida,)
+
+def tablas_de_paginas(paginas, etiqueta=indice.etiqueta):
+    """
+    Fase 2: asigna los segmentos en orden de página y arma las tablas.
     Args:
-        pdf_bytes: Bytes del archivo PDF
+        paginas: Resultados de leer_pagina en orden de página
+        etiqueta: Función (número de segmento) -> etiqueta
     Returns:
-        dict: Diccionario con DataFrames de información general, movimientos y cuotas
+        tuple: DataFrames de información general, movimientos y cuotas
     """
-    pdf_stream = io.BytesIO(pdf_bytes)
     # --- INFORMACIÓN GENERAL ---
-    with pdfplumber.open(pdf_stream) as pdf_file:
-        full_text = ""
-        for page in pdf_file.pages:
-            text = page.extract_text()
-            if text:
-                full_text += text + "\n"
-
-    sep = r"[\s\u00A0\u2010\u2011\u2012\u2013\u2014\u2015-]*"
-    pat_311 = rf"3{sep}1{sep}1{sep}6{sep}0{sep}0{sep}0"
-    pat_0801 = rf"0{sep}801{sep}1{sep}6000"
-    pat_anchor = (
-        r"llamando\s+al\s*" + pat_311 +
-        r"\s+desde\s+Lima\s+o\s+(?:al\s+)?" + pat_0801 +
-        r"\s+desde\s+provincias\.?"
-    )
-    if len(re.findall(pat_anchor, full_text, flags=re.I)) > 1:
-        segmentos = re.split(r"(?<=" + pat_anchor + r")", full_text, flags=re.I)
+    full_text = "".join(pagina["texto"] + "\n" for pagina in paginas if pagina["texto"])
+    if len(PATRON_ANCLA.findall(full_text)) > 1:
+        segmentos = dividir_despues_de(PATRON_ANCLA, full_text)
         segmentos = [s.strip() for s in segmentos if s and s.strip()]
     else:
         segmentos = [full_text.strip()]
-
-    registros = []
-    for i, seg in enumerate(segmentos, start=1):
-        lineas = seg.splitlines()
-        linea_3 = lineas[3].strip() if len(lineas) > 3 else ""
-        cliente = re.sub(r'S\/\s?[\d,]+\.\d{2}\s+US\$\s?[\d,]+\.\d{2}', '', linea_3).strip()
-        fecha_fin_ciclo = lineas[2].strip() if len(lineas) > 2 else None
-        if not (fecha_fin_ciclo and re.match(r'\d{2}-\d{2}-\d{4}', fecha_fin_ciclo)):
-            fecha_fin_ciclo = None
-        match_montos = re.search(r'S\/\s?([\d,]+\.\d{2})\s+US\$\s?([\d,]+\.\d{2})', linea_3)
-        pago_total_soles = match_montos.group(1) if match_montos else None
-        pago_total_usd = match_montos.group(2) if match_montos else None
-        ultimodia_pago = lineas[6].strip() if len(lineas) > 6 else None
-        if not (ultimodia_pago and re.match(r'\d{2}-\d{2}-\d{4}', ultimodia_pago)):
-            ultimodia_pago = None
-        match_pago_min_usd = re.findall(r'US\$ ([\d,]+\.\d{2})', seg)
-        pago_minimo_usd = match_pago_min_usd[1] if len(match_pago_min_usd) >= 2 else None
-        match_pago_min_soles = re.findall(r'S\/ ([\d,]+\.\d{2})', seg)
-        pago_minimo_soles = match_pago_min_soles[2] if len(match_pago_min_soles) >= 3 else None
-        registros.append([
-            f"EC-{i:02d}", cliente, fecha_fin_ciclo, ultimodia_pago,
-            pago_total_soles, pago_total_usd, pago_minimo_soles, pago_minimo_usd
-        ])
+    registros = [
+        [etiqueta(i)] + _datos_generales(seg)
+        for i, seg in enumerate(segmentos, start=1)
+    ]
     df_general = pd.DataFrame(
         registros,
         columns=['Segmento','Cliente','Fecha cierre','Ultimo dia de pago',
                  'Pago Total Soles','Pago Total USD','Pago Minimo Soles','Pago Minimo USD']
     )
 
-    # --- MOVIMIENTOS 
-    def _to_float(txt):
-        if not txt:
-            return None
-        txt = txt.replace(",", "")
-        neg = txt.endswith("-")
-        val = float(txt.rstrip("-"))
-        return -val if neg else val
-
-    def _centro(word):
-        return (word["x0"] + word["x1"]) / 2
-
+    # --- MOVIMIENTOS
+    # El segmento avanza con cada ancla; empieza en EC-01 en la
+    # primera página con tabla de movimientos
     filas = []
-    pdf_stream.seek(0)
-    with pdfplumber.open(pdf_stream) as pdf:
-        sep = r"[\s\u00A0\u2010\u2011\u2012\u2013\u2014\u2015-]*"
-        pat_311  = rf"3{sep}1{sep}1{sep}6{sep}0{sep}0{sep}0"
-        pat_0801 = rf"0{sep}801{sep}1{sep}6000"
-        pat_anchor = re.compile(
-            r"llamando\s+al\s*" + pat_311 +
-            r"\s+desde\s+Lima\s+o\s+(?:al\s+)?" + pat_0801 +
-            r"\s+desde\s+provincias\.?",
-            re.I
-        )
-        current_seg = 0
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            has_anchor = bool(pat_anchor.search(text))
-            if "Fecha Compra" in text:
-                if current_seg == 0:
-                    current_seg = 1
-                seg_label = f"EC-{current_seg:02d}"
-                soles_x = dolares_x = None
-                for w in page.extract_words():
-                    if w["text"] == "Soles":
-                        soles_x = _centro(w)
-                    elif "ólares" in w["text"]:
-                        dolares_x = _centro(w)
-                if soles_x is None or dolares_x is None:
-                    nums = [_centro(w) for w in page.extract_words()
-                            if re.fullmatch(r"^\d{1,3}(?:,\d{3})*\.\d{2}-?$", w["text"])]
-                    if not nums:
-                        if has_anchor:
-                            current_seg += 1
-                        continue
-                    from statistics import mean, median
-                    mid = median(nums)
-                    soles_x   = mean([x for x in nums if x <  mid])
-                    dolares_x = mean([x for x in nums if x >= mid])
-                line_dict = {}
-                for w in page.extract_words():
-                    y = round(w["top"], 1)
-                    line_dict.setdefault(y, []).append(w)
-                for words in line_dict.values():
-                    words.sort(key=lambda w: w["x0"])
-                    tokens = [w["text"] for w in words]
-                    line_text = " ".join(tokens)
-                    if re.search(r"(?i)\bsaldo\s+anterior\b", line_text):
-                        sa_soles = sa_dolares = None
-                        for w in words:
-                            if re.fullmatch(r"^\d{1,3}(?:,\d{3})*\.\d{2}-?$", w["text"]):
-                                if abs(_centro(w) - soles_x) < abs(_centro(w) - dolares_x):
-                                    sa_soles = _to_float(w["text"])
-                                else:
-                                    sa_dolares = _to_float(w["text"])
-                        if sa_soles is not None or sa_dolares is not None:
-                            filas.append({
-                                "segmento":      seg_label,
-                                "fecha_compra":  None,
-                                "fecha_proceso": None,
-                                "descripcion":   "Saldo Anterior",
-                                "monto_soles":   sa_soles,
-                                "monto_dolares": sa_dolares,
-                            })
-                        continue
-                    if (len(tokens) < 3 or
-                        not re.fullmatch(r"\d{2}/\d{2}/\d{2}", tokens[0]) or
-                        not re.fullmatch(r"\d{2}/\d{2}/\d{2}", tokens[1])):
-                        continue
-                    compra, proceso = tokens[:2]
-                    desc_parts, soles, dolares = [], None, None
-                    for w in words[2:]:
-                        if re.fullmatch(r"^\d{1,3}(?:,\d{3})*\.\d{2}-?$", w["text"]):
-                            if abs(_centro(w) - soles_x) < abs(_centro(w) - dolares_x):
-                                soles = _to_float(w["text"])
-                            else:
-                                dolares = _to_float(w["text"])
-                        else:
-                            desc_parts.append(w["text"])
-                    descripcion = " ".join(desc_parts).strip()
-                    if not descripcion or descripcion.lower().startswith(("deuda total",)):
-                        continue
-                    filas.append({
-                        "segmento":      seg_label,
-                        "fecha_compra":  compra,
-                        "fecha_proceso": proceso,
-                        "descripcion":   descripcion,
-                        "monto_soles":   soles,
-                        "monto_dolares": dolares,
-                    })
-            if has_anchor:
-                current_seg += 1
+    current_seg = 0
+    for pagina in paginas:
+        if pagina["tabla"]:
+            if current_seg == 0:
+                current_seg = 1
+            seg_label = etiqueta(current_seg)
+            for fila in pagina["movimientos"]:
+                filas.append({"segmento": seg_label, **fila})
+        if pagina["ancla"]:
+            current_seg += 1
     df_movimientos = pd.DataFrame(filas)
     cols = ["segmento", "fecha_compra", "fecha_proceso", "descripcion", "monto_soles", "monto_dolares"]
     df_movimientos = df_movimientos.reindex(columns=cols)
 
     # --- CUOTAS ---
-    pattern = r'^(.+?)\s+(\d{2}/\d{2}/\d{2})\s+([\d\.]+)\s+([\d,]+\.\d{2})\s+(\d{2}/\d{2})\s+([\d\.]+)\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})$'
     datos = []
-    pdf_stream.seek(0)
-    with pdfplumber.open(pdf_stream) as pdf:
-        sep = r"[\s\u00A0\u2010\u2011\u2012\u2013\u2014\u2015-]*"
-        pat_311  = rf"3{sep}1{sep}1{sep}6{sep}0{sep}0{sep}0"
-        pat_0801 = rf"0{sep}801{sep}1{sep}6000"
-        pat_anchor = re.compile(
-            r"llamando\s+al\s*" + pat_311 +
-            r"\s+desde\s+Lima\s+o\s+(?:al\s+)?" + pat_0801 +
-            r"\s+desde\s+provincias\.?",
-            re.I
-        )
-        current_seg = 1
-        for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            seg_label = f"EC-{current_seg:02d}"
-            lines = page_text.split('\n')
-            for line in lines:
-                match = re.match(pattern, line.strip())
-                if match:
-                    fila = [
-                        seg_label,
-                        match.group(1),
-                        match.group(2),
-                        float(match.group(3)),
-                        float(match.group(4).replace(',', '')),
-                        match.group(5),
-                        float(match.group(6)),
-                        float(match.group(7).replace(',', '')),
-                        float(match.group(8).replace(',', '')),
-                        float(match.group(9).replace(',', ''))
-                    ]
-                    datos.append(fila)
-            if pat_anchor.search(page_text):
-                current_seg += 1
+    current_seg = 1
+    for pagina in paginas:
+        seg_label = etiqueta(current_seg)
+        for fila in pagina["cuotas"]:
+            datos.append([seg_label] + fila)
+        if pagina["ancla"]:
+            current_seg += 1
     df_cuotas = pd.DataFrame(
         datos,
         columns=[
@@ -213,6 +346,20 @@ def procesar_documento(pdf_bytes):
             "Cuota del mes Soles", "Cuota del mes Dólares"
         ]
     )
+    return df_general, df_movimientos, df_cuotas
+
+def armar_salida(df_general, df_movimientos, df_cuotas, normalizada=False):
+    """
+    Hojas de salida: 'Resumen' (información general y movimientos) y 'Cuotas'.
+    Con normalizada=True: 'Cabeceras', 'Movimientos' y 'Cuotas' por separado,
+    enlazadas por la etiqueta del segmento, sin la hoja combinada.
+    """
+    if normalizada:
+        return {
+            'Cabeceras': df_general.reset_index(drop=True),
+            'Movimientos': df_movimientos.reset_index(drop=True),
+            'Cuotas': df_cuotas.reset_index(drop=True)
+        }
 
     # Unir df_general y df_movimientos en una sola página tipo Excel
     # Convertir ambos DataFrames a listas de filas
@@ -233,4 +380,19 @@ def procesar_documento(pdf_bytes):
     }
     return output
 
-
+def procesar_documento(pdf_bytes, trabajadores=None, segmentos=None, normalizada=False):
+    """
+    Procesa un archivo PDF de estado de cuenta de Scotiabank.
+    Args:
+        pdf_bytes: Bytes del archivo PDF
+        trabajadores: Procesos para extraer páginas (None = automático, 1 = sin paralelismo)
+        segmentos: Etiquetas de los EC a extraer (ver indice.construir); None = todos
+        normalizada: Si True, cabeceras y movimientos en hojas separadas (ver armar_salida)
+    Returns:
+        dict: Diccionario con DataFrames de información general, movimientos y cuotas
+    """
+    if segmentos:
+        return indice.extraer(sys.modules[__name__], pdf_bytes, segmentos, trabajadores, normalizada=normalizada)
+    paginas = por_pagina(pdf_bytes, leer_pagina, trabajadores, alternativas=LECTURAS_ALTERNATIVAS)
+    return reporte.anotar(armar_salida(*tablas_de_paginas(paginas), normalizada=normalizada),
+                          **diagnostico(paginas))
@@ -1,8 +1,66 @@
-import pdfplumber
-import pandas as pd
-import re
-import io
-from datetime import datetime
+from procesadores.columnas import Columna
+from procesadores.esquema import CABECERAS, CRONOGRAMA, Origen
+from procesadores.especificacion import Campo, Especificacion, a_fecha, a_numero_con_signo, ejecutar
+
+_MONTO = r'[\d.,\-]+'
+
+# Columnas del cronograma, identificadas por su texto en la fila de encabezado
+COLUMNAS_CUOTAS = [
+    Columna('Cuota', 'CUOTA', r'\d+', False),
+    Columna('Fecha Vencimiento', 'VENC', r'\d{2}/\d{2}/\d{2}', False),
+    Columna('Capital', 'CAPITAL', _MONTO, False),
+    Columna('Intereses', 'INTERES', _MONTO, False),
+    Columna('Comisión', 'COMISION', _MONTO, False),
+    Columna('Seguros', 'SEGURO', _MONTO, False),
+    Columna('Cuota Total', 'TOTAL', _MONTO, False),
+    Columna('Estado', 'ESTADO', r'[A-Z]+', False),
+    Columna('Fecha Pago', 'PAGO', r'\d{2}/\d{2}/\d{2}', True),
+]
+
+# Fila del cronograma en el texto, para páginas sin encabezado reconocible
+PATRON_CUOTA = r'^(\d+)\s+(\d{2}/\d{2}/\d{2})\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([A-Z]+)\s+(\d{2}/\d{2}/\d{2})$'
+
+# Los datos de la cuenta se buscan en el texto con saltos de línea: el nombre
+# del cliente es el resto de la línea de 'Cuenta'
+_PATRON_CUENTA = r'Cuenta\s*:\s*(\d+)\s+(.*)'
+
+ESPECIFICACION = Especificacion(
+    campos=[
+        Campo('Cliente', _PATRON_CUENTA, 2, str.title, 'texto'),
+        Campo('Cuenta', _PATRON_CUENTA, 1, str.title, 'texto'),
+        Campo('Fecha Inicio', r'Fecha Inicio\s*:\s*(\d{2}/\d{2}/\d{2})', 1, a_fecha("%d/%m/%y"), 'texto'),
+        Campo('Importe', r'Importe\s*:\s*S/\s*([\d.,]+)', 1,
+              lambda valor: float(valor.replace('.', '').replace(',', '.')), 'texto'),
+        Campo('Tasa Efe Anual', r'Tasa Efe Anual\s*:\s*([\d.,]+)', 1,
+              lambda valor: float(valor.replace(',', '.')), 'texto'),
+        Campo('Tasa Cos Efe Anual', r'Tasa Cos Efe Anual\s*:\s*([\d.,]+)', 1,
+              lambda valor: float(valor.replace(',', '.')), 'texto'),
+        Campo('Tasa U. Seg. Desg.', r'Tasa U\. Seg\. Desg\.\s*:\s*([\d.,]+)', 1,
+              lambda valor: float(valor.replace(',', '.')), 'texto'),
+        Campo('Nro.Cuotas', r'Nro\.Cuotas\s*:\s*(\d+)', 1, int, 'texto'),
+    ],
+    columnas=COLUMNAS_CUOTAS,
+    convertir=[int, a_fecha("%d/%m/%y")] + [a_numero_con_signo] * 5 + [str, a_fecha("%d/%m/%y")],
+    patron_fila=PATRON_CUOTA,
+    preparar_linea=str.strip,
+    pagina_texto=False,
+    # Las cuotas aún no pagadas no traen fecha de pago y no se reportan
+    reportar_fila=lambda fila: bool(fila[8]),
+    campo_cuotas='Nro.Cuotas',
+)
+
+# Columnas de la salida en el esquema canónico (ver esquema.py)
+ESQUEMA = [
+    Origen(CABECERAS, {
+        'Cliente': 'cliente', 'Cuenta': 'cuenta', 'Fecha Inicio': 'fecha_inicio', 'Importe': 'monto_prestamo',
+        'Tasa Efe Anual': 'tasa_anual', 'Tasa Cos Efe Anual': 'tasa_costo_efectivo', 'Nro.Cuotas': 'cuotas_pactadas',
+    }),
+    Origen(CRONOGRAMA, {
+        'Página': 'pagina', 'Cuota': 'cuota', 'Fecha Vencimiento': 'fecha_vencimiento', 'Capital': 'capital',
+        'Intereses': 'interes', 'Comisión': 'comisiones', 'Seguros': 'seguros', 'Cuota Total': 'total',
+        'Estado': 'estado', 'Fecha Pago': 'fecha_pago',
+    }),
+]
 
 def procesar_documento(pdf_bytes):
     """
@@ -12,107 +70,4 @@ def procesar_documento(pdf_bytes):
     Returns:
         dict: Diccionario con DataFrames de información general y detalle de cuotas
     """
-    pdf_stream = io.BytesIO(pdf_bytes)
-    
-    # INFORMACIÓN GENERAL
-    datos = []
-    with pdfplumber.open(pdf_stream) as pdf_file:
-        for page in pdf_file.pages:
-            text = page.extract_text()
-            if not text:
-                continue
-
-            full_text = ' '.join(text.split('\n'))
-
-            cuenta_match = re.search(r'Cuenta\s*:\s*(\d+)\s+(.*)', text)
-            fecha_inicio_match = re.search(r'Fecha Inicio\s*:\s*(\d{2}/\d{2}/\d{2})', text)
-            cuotas_match = re.search(r'Nro\.Cuotas\s*:\s*(\d+)', text)
-            importe_total_match = re.search(r'Importe\s*:\s*S/\s*([\d.,]+)', text)
-            tasa_efe_anual_match = re.search(r'Tasa Efe Anual\s*:\s*([\d.,]+)', text)
-            tasa_coste_anual_match = re.search(r'Tasa Cos Efe Anual\s*:\s*([\d.,]+)', text)
-            tasa_seguro_match = re.search(r'Tasa U\. Seg\. Desg\.\s*:\s*([\d.,]+)', text)
-
-            if all([cuenta_match, fecha_inicio_match, cuotas_match, importe_total_match, 
-                   tasa_efe_anual_match, tasa_coste_anual_match, tasa_seguro_match]):
-                fecha = datetime.strptime(fecha_inicio_match.group(1), "%d/%m/%y").date()
-                cuenta = cuenta_match.group(1).title()
-                cliente = cuenta_match.group(2).title()
-                importe = float(importe_total_match.group(1).replace('.', '').replace(',', '.'))
-                tasa_efectiva = float(tasa_efe_anual_match.group(1).replace(',', '.'))
-                tasa_coste = float(tasa_coste_anual_match.group(1).replace(',', '.'))
-                tasa_seguro = float(tasa_seguro_match.group(1).replace(',', '.'))
-                cuotas = int(cuotas_match.group(1))
-
-                datos.append([cliente, cuenta, fecha, importe, tasa_efectiva, tasa_coste, tasa_seguro, cuotas])
-                break
-
-    df_general = pd.DataFrame(datos, columns=['Cliente', 'Cuenta', 'Fecha Inicio', 'Importe', 
-                                            'Tasa Efe Anual', 'Tasa Cos Efe Anual', 
-                                            'Tasa U. Seg. Desg.', 'Nro.Cuotas'])
-
-    # DETALLE DE CUOTAS
-    pattern = r'^(\d+)\s+(\d{2}/\d{2}/\d{2})\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([\d.,\-]+)\s+([A-Z]+)\s+(\d{2}/\d{2}/\d{2})$'
-    data = []
-
-    def convertir_valor(valor):
-        valor = valor.strip()
-        negativo = valor.endswith('-')
-        valor = valor.replace('-', '')
-        valor = valor.replace('.', '').replace(',', '.')
-        return -float(valor) if negativo else float(valor)
-
-    pdf_stream.seek(0)
-    with pdfplumber.open(pdf_stream) as pdf_file:
-        for page in pdf_file.pages:
-            text = page.extract_text()
-            pg = page.page_number
-            lines = text.split('\n')
-
-            for line in lines:
-                match = re.match(pattern, line.strip())
-                if match:
-                    data.append([
-                        pg,
-                        int(match.group(1)),
-                        match.group(2),
-                        match.group(3),
-                        match.group(4),
-                        match.group(5),
-                        match.group(6),
-                        match.group(7),
-                        match.group(8),
-                        match.group(9)
-                    ])
-
-    df_detalle = pd.DataFrame(data, columns=['Página', 'Cuota', 'Fecha Vencimiento', 
-                                           'Capital', 'Intereses', 'Comisión', 'Seguros', 
-                                           'Cuota Total', 'Estado', 'Fecha Pago'])
-
-    # Convertir campos numéricos
-    columnas_numericas = ['Capital', 'Intereses', 'Comisión', 'Seguros', 'Cuota Total']
-    for col in columnas_numericas:
-        df_detalle[col] = df_detalle[col].apply(convertir_valor)
-
-    # Convertir fechas
-    df_detalle['Fecha Vencimiento'] = pd.to_datetime(df_detalle['Fecha Vencimiento'], 
-                                                    format='%d/%m/%y').dt.date
-    df_detalle['Fecha Pago'] = pd.to_datetime(df_detalle['Fecha Pago'], 
-                                             format='%d/%m/%y').dt.date
-
-    # Crear DataFrame combinado para la hoja de resumen
-    resumen_rows = [df_general.columns.tolist()] + df_general.astype(str).values.tolist()
-    detalle_rows = [df_detalle.columns.tolist()] + df_detalle.astype(str).values.tolist()
-    
-    # Insertar fila vacía entre bloques
-    combined_rows = resumen_rows + [[""] * len(resumen_rows[0])] + detalle_rows
-    
-    # Asegurar mismo número de columnas
-    max_cols = max(len(row) for row in combined_rows)
-    combined_rows = [row + [""] * (max_cols - len(row)) for row in combined_rows]
-    df_resumen_completo = pd.DataFrame(combined_rows)
-
-    output = {
-        'Resumen': df_resumen_completo.reset_index(drop=True)
-    }
-
-    return output
+    return ejecutar(ESPECIFICACION, pdf_bytes)
@@ -0,0 +1,250 @@
+from collections import namedtuple
+from pathlib import Path
+
+from procesadores import costos, distribuido, ejecucion, presupuesto, registro, reporte, tipos, trabajos
+
+# Procesamiento de una tanda de PDF del mismo banco y tipo, con reanudación.
+#
+# Cada documento se guarda en el almacén de trabajos (trabajos.py) apenas
+# termina, y un PDF consolidado de más de PAGINAS_POR_LOTE páginas (o del
+# máximo de páginas del presupuesto, si se indica) se procesa por lotes de
+# segmentos (indice.extraer_lote) que se guardan uno por uno. Al relanzar la
+# tanda con el mismo almacén, los documentos terminados se toman de disco y un
+# documento a medias sigue desde el primer lote sin guardar; el resultado es
+# el mismo que el de una corrida sin cortes.
+#
+# Un documento que falla o agota su presupuesto no detiene la tanda: queda
+# con estado ERROR y se reintenta en la próxima corrida. Un resultado parcial
+# (presupuesto agotado a mitad de la lectura) no se guarda como terminado.
+#
+# Los documentos se procesan del más corto al más largo según su costo
+# estimado (costos.py), así los resultados pequeños están listos primero; la
+# salida conserva el orden de los archivos.
+#
+# Con una cola (modo distribuido, ver distribuido.py) la tanda primero encola
+# todos los documentos pendientes y después espera y guarda cada resultado;
+# los trabajadores de otros nodos aplican su propio presupuesto. El trabajo de
+# la cola se recuerda en el almacén, así una tanda relanzada sigue esperando
+# los mismos trabajos en vez de encolarlos de nuevo.
+Documento = namedtuple("Documento", ["archivo", "estado", "mensaje", "clave"])
+
+# Páginas a partir de las cuales un documento con índice se guarda por lotes
+PAGINAS_POR_LOTE = 200
+
+PROCESADO = "procesado"
+GUARDADO = "tomado del almacén"
+ERROR = "error"
+
+# Hoja con el estado y el hash SHA-256 de cada archivo (ver incremental.py)
+HOJA_DOCUMENTOS = "Documentos"
+
+
+def _por_lotes(metadatos, pdf_bytes, ruta, clave, limites, trabajadores, paginas_por_lote):
+    from procesadores import indice
+
+    modulo = registro.modulo(metadatos.entidad, metadatos.tipo)
+    segmentos = indice.construir(modulo, pdf_bytes, trabajadores)
+    partes, lecturas = [], []
+    for numero, lote in enumerate(indice.lotes(segmentos, paginas_por_lote), 1):
+        guardado = trabajos.leer_lote(ruta, clave, numero)
+        if guardado is None:
+            # El presupuesto de tiempo y memoria rige para cada lote; un lote
+            # cortado no se guarda, así la próxima corrida lo lee completo
+            guardado = ejecucion.extraer_lote(metadatos.entidad, metadatos.tipo, pdf_bytes, lote, limites,
+                                              trabajadores, segmentos)
+            trabajos.guardar_lote(ruta, clave, numero, guardado)
+        partes.extend(guardado[0])
+        lecturas.append(guardado[1])
+    resultado = tipos.compactar_salida(indice.unir(modulo, partes, lecturas, [s.etiqueta for s in segmentos]))
+    return reporte.anotar(resultado, modo=ejecucion.POR_LOTES, interrupcion=None)
+
+
+def _procesar_documento(metadatos, pdf_bytes, ruta, clave, limites, trabajadores):
+    if metadatos.segmentos:
+        from procesadores.paralelo import numero_de_paginas
+        paginas_por_lote = limites.paginas or PAGINAS_POR_LOTE
+        if numero_de_paginas(pdf_bytes) > paginas_por_lote:
+            return _por_lotes(metadatos, pdf_bytes, ruta, clave, limites, trabajadores, paginas_por_lote)
+    opciones = {"trabajadores": trabajadores} if metadatos.paralelo else {}
+    return ejecucion.procesar_aqui(metadatos.entidad, metadatos.tipo, pdf_bytes, limites, **opciones)
+
+
+def _encolar(cola, metadatos, pdf_bytes, ruta, clave, limites, trabajadores):
+    trabajo = trabajos.leer_trabajo(ruta, clave)
+    if trabajo is None or not distribuido.vigente(cola, trabajo):
+        if trabajo is not None:
+            # Falló alguna parte: se vuelve a encolar el documento entero
+            cola.borrar(trabajo)
+        trabajo = distribuido.repartir(cola, metadatos.entidad, metadatos.tipo, pdf_bytes,
+                                       limites.paginas, trabajadores)
+        trabajos.guardar_trabajo(ruta, clave, trabajo)
+    return trabajo
+
+
+def _costo(metadatos, archivo):
+    from procesadores.paralelo import numero_de_paginas
+
+    pdf_bytes = Path(archivo).read_bytes()
+    try:
+        paginas = numero_de_paginas(pdf_bytes)
+    except Exception:
+        # No se puede abrir: falla enseguida, va primero
+        return 0.0
+    return costos.estimar(metadatos.modulo, paginas, len(pdf_bytes))
+
+
+def procesar(entidad, tipo, archivos, ruta, limites=None, trabajadores=None, avisar=None, cola=None,
+             mas_cortos_primero=True):
+    """
+    Procesa los PDF guardando cada resultado en el almacén de trabajos.
+    Args:
+        entidad, tipo: Procesador registrado
+        archivos: Rutas de los PDF
+        ruta: Carpeta del almacén de trabajos (se reutiliza para reanudar)
+        limites: Presupuesto por documento (por defecto, presupuesto.desde_entorno())
+        trabajadores: Procesos para extraer páginas (None = automático)
+        avisar: Función opcional que recibe cada Documento al terminarlo
+        cola: Cola de tareas para repartir los documentos entre nodos (None = en este proceso)
+        mas_cortos_primero: Procesar según el costo estimado (False = en el orden de 'archivos')
+    Returns:
+        list: Documento por archivo, en el mismo orden que 'archivos'
+    """
+    metadatos = registro.buscar(entidad, tipo)
+    limites = limites or presupuesto.desde_entorno()
+    orden = list(range(len(archivos)))
+    if mas_cortos_primero:
+        estimados = [_costo(metadatos, archivo) for archivo in archivos]
+        orden.sort(key=lambda i: estimados[i])
+    encolados = {}
+    if cola is not None:
+        for archivo in (archivos[i] for i in orden):
+            pdf_bytes = Path(archivo).read_bytes()
+            clave = trabajos.clave(metadatos, pdf_bytes)
+            if clave not in encolados and not trabajos.terminado(ruta, clave):
+                try:
+                    encolados[clave] = _encolar(cola, metadatos, pdf_bytes, ruta, clave, limites, trabajadores)
+                except Exception as e:
+                    # Se informa al recorrer los documentos, en su orden
+                    encolados[clave] = e
+    documentos = [None] * len(archivos)
+    for i in orden:
+        archivo = archivos[i]
+        pdf_bytes = Path(archivo).read_bytes()
+        clave = trabajos.clave(metadatos, pdf_bytes)
+        if trabajos.terminado(ruta, clave):
+            documento = Documento(str(archivo), GUARDADO, "", clave)
+        else:
+            try:
+                if isinstance(encolados.get(clave), Exception):
+                    raise encolados[clave]
+                if clave in encolados:
+                    resultado = distribuido.esperar(cola, encolados[clave])
+                else:
+                    resultado = _procesar_documento(metadatos, pdf_bytes, ruta, clave, limites, trabajadores)
+                corte = reporte.leer(resultado).get("interrupcion")
+                if corte:
+                    raise presupuesto.PresupuestoExcedido(corte["motivo"], corte["mensaje"])
+                trabajos.guardar_resultado(ruta, clave, resultado)
+                documento = Documento(str(archivo), PROCESADO, "", clave)
+            except presupuesto.PresupuestoExcedido as e:
+                documento = Documento(str(archivo), ERROR, str(e), clave)
+            except Exception as e:
+                documento = Documento(str(archivo), ERROR, f"{type(e).__name__}: {e}", clave)
+        documentos[i] = documento
+        trabajos.guardar_estado(ruta, [d._asdict() for d in documentos if d is not None])
+        if avisar:
+            avisar(documento)
+    return documentos
+
+
+def unir_resultados(ruta, documentos):
+    """
+    Une los resultados guardados de la tanda hoja por hoja.
+    Args:
+        ruta: Carpeta del almacén de trabajos
+        documentos: Lista de Documento devuelta por procesar()
+    Returns:
+        dict: {hoja: DataFrame} con la columna 'Archivo' al inicio de cada hoja,
+              más la hoja 'Documentos' con el estado de cada archivo
+    """
+    import pandas as pd
+
+    hojas = {}
+    for documento in documentos:
+        if documento.estado == ERROR:
+            continue
+        resultado = trabajos.leer_resultado(ruta, documento.clave)
+        for hoja, df in resultado.items():
+            df = df.reset_index(drop=True)
+            df.insert(0, "Archivo", Path(documento.archivo).name, allow_duplicates=True)
+            hojas.setdefault(hoja, []).append(df)
+    # Las categorías de cada documento se pierden al concatenar: se vuelven a compactar
+    salida = {hoja: tipos.compactar(pd.concat(partes, ignore_index=True)) for hoja, partes in hojas.items()}
+    salida[HOJA_DOCUMENTOS] = _hoja_documentos(documentos)
+    return salida
+
+
+def unir_canonico(entidad, tipo, ruta, documentos):
+    """
+    Une los resultados guardados de la tanda en las tablas del esquema canónico.
+    Args:
+        entidad, tipo: Procesador registrado
+        ruta: Carpeta del almacén de trabajos
+        documentos: Lista de Documento devuelta por procesar()
+    Returns:
+        dict: Tablas de esquema.TABLAS (la columna 'documento' es el nombre del
+              archivo), más la hoja 'Documentos' con el estado de cada archivo
+    """
+    from procesadores import esquema
+
+    metadatos = registro.buscar(entidad, tipo)
+    salida = esquema.concatenar(
+        esquema.canonico(metadatos, trabajos.leer_resultado(ruta, d.clave), Path(d.archivo).name)
+        for d in documentos if d.estado != ERROR
+    )
+    salida[HOJA_DOCUMENTOS] = _hoja_documentos(documentos)
+    return salida
+
+
+def guardar_en_libro(entidad, tipo, ruta, documentos, libro):
+    """
+    Agrega al libro mayor las tablas canónicas de los documentos de la tanda.
+    Los documentos con error (incluidos los que agotaron su presupuesto) no
+    se guardan: se agregarán al relanzar la tanda. Tampoco los que tienen
+    páginas omitidas (reporte.incompleto): el libro los tomaría por completos
+    y no habría forma de saber que les faltan filas.
+    Args:
+        entidad, tipo: Procesador registrado
+        ruta: Carpeta del almacén de trabajos
+        documentos: Lista de Documento devuelta por procesar()
+        libro: libro_mayor.LibroMayor
+    Returns:
+        tuple: (archivos guardados en el libro, [(archivo, motivo)] de los
+               documentos incompletos que no se guardaron)
+    """
+    from procesadores import esquema
+
+    metadatos = registro.buscar(entidad, tipo)
+    guardados, incompletos = [], []
+    for documento in documentos:
+        if documento.estado == ERROR:
+            continue
+        resultado = trabajos.leer_resultado(ruta, documento.clave)
+        motivo = reporte.incompleto(resultado)
+        if motivo:
+            incompletos.append((documento.archivo, motivo))
+            continue
+        nombre = Path(documento.archivo).name
+        libro.guardar(metadatos, trabajos.huella(documento.clave), esquema.canonico(metadatos, resultado, nombre),
+                      nombre)
+        guardados.append(documento.archivo)
+    return guardados, incompletos
+
+
+def _hoja_documentos(documentos):
+    import pandas as pd
+
+    return pd.DataFrame(
+        [(Path(d.archivo).name, d.estado, d.mensaje, trabajos.huella(d.clave)) for d in documentos],
+        columns=["Archivo", "Estado", "Mensaje", "Huella"],
+    )
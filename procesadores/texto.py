@@ -0,0 +1,12 @@
+import unicodedata
+
+
+def normalizar(s):
+    """
+    Quita tildes y espacios no separables para comparar textos de distintos PDFs.
+    La usan el procesador de Diners para reconocer sus encabezados y el libro
+    mayor para buscar sin distinguir tildes.
+    """
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+    return s.replace("\xa0", " ")
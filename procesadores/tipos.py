@@ -0,0 +1,96 @@
+import importlib.util
+
+# Tipos compactos para las tablas de salida.
+#
+# Los procesadores arman sus tablas con listas de textos: números de página
+# como str(page.page_number), la etiqueta del segmento ('EC-01') repetida en
+# cada fila, descripciones y montos como objetos de Python. Con cientos de
+# miles de filas eso ocupa varias veces lo necesario y hace lenta cada
+# operación posterior (unir documentos, exportar, consultar). compactar()
+# cambia solo el tipo de las columnas en memoria, no sus valores:
+#   - texto con pocos valores distintos (segmento, moneda, páginas): category
+#   - el resto del texto (descripciones): cadenas de Arrow (si está pyarrow)
+#   - montos, solo si se pide: centavos en Int64 (ver a_centavos y esquema.montos)
+# El texto sigue siendo texto (también los números de página o cuota que el
+# procesador arma como str), así el Excel y el CSV tienen las mismas celdas
+# que sin compactar. Las columnas con fechas, números o tipos mezclados
+# quedan como están.
+#
+# pandas se importa dentro de las funciones, como en esquema.py.
+
+# Una columna de texto pasa a category si sus valores distintos son a lo sumo
+# esta fracción de sus valores no nulos
+PROPORCION_CATEGORIA = 0.5
+
+
+def _tipo_texto():
+    """Cadenas de Arrow si pyarrow está instalado; si no, el 'string' de pandas."""
+    import pandas as pd
+
+    if importlib.util.find_spec("pyarrow") is None:
+        return "string"
+    return pd.StringDtype("pyarrow")
+
+
+def compactar(df, montos=(), centavos=False):
+    """
+    Tipos compactos para las columnas de un DataFrame, sin cambiar sus valores.
+    Args:
+        df: DataFrame de salida de un procesador
+        montos: Columnas de montos (se convierten solo con centavos=True)
+        centavos: Si True, los montos numéricos pasan a centavos en Int64
+    Returns:
+        DataFrame: Copia con los tipos compactos (conserva df.attrs)
+    """
+    import pandas as pd
+
+    tipos = {}
+    texto = None
+    for columna in df.columns:
+        serie = df[columna]
+        if not (pd.api.types.is_object_dtype(serie.dtype) or pd.api.types.is_string_dtype(serie.dtype)):
+            continue
+        valores = serie.dropna()
+        if not all(isinstance(v, str) for v in valores):
+            continue
+        if len(valores) > 1 and valores.nunique() <= PROPORCION_CATEGORIA * len(valores):
+            tipos[columna] = "category"
+        else:
+            texto = texto or _tipo_texto()
+            tipos[columna] = texto
+    resultado = df.astype(tipos) if tipos else df.copy()
+    if centavos:
+        for columna in montos:
+            if columna in resultado.columns and pd.api.types.is_float_dtype(resultado[columna].dtype):
+                resultado[columna] = a_centavos(resultado[columna])
+    resultado.attrs = dict(df.attrs)
+    return resultado
+
+
+def compactar_salida(output, montos=(), centavos=False):
+    """
+    compactar() en cada hoja de la salida de un procesador.
+    Args:
+        output: Diccionario {hoja: DataFrame}
+        montos: Columnas de montos de cualquier hoja (ver compactar)
+        centavos: Si True, los montos numéricos pasan a centavos en Int64
+    Returns:
+        dict: Las mismas hojas con tipos compactos (el reporte se conserva)
+    """
+    return {hoja: compactar(df, montos, centavos) for hoja, df in output.items()}
+
+
+def a_centavos(serie):
+    """Montos en unidades (1234.5) a centavos enteros (123450) en Int64; nulos como <NA>."""
+    import pandas as pd
+
+    return (pd.to_numeric(serie, errors="coerce") * 100).round().astype("Int64")
+
+
+def memoria(output):
+    """
+    Memoria de cada hoja, contando el contenido de los textos.
+    Returns:
+        dict: {hoja: bytes}
+    """
+    return {hoja: int(df.memory_usage(index=True, deep=True).sum()) for hoja, df in output.items()}
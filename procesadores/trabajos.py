@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+# Almacén de trabajos de una tanda (muchos PDF procesados en una corrida).
+#
+# Guarda en disco el resultado de cada documento apenas termina y, en los
+# documentos grandes con índice de segmentos, las tablas de cada lote de
+# segmentos. Si la tanda se corta (falta de memoria, reinicio del contenedor,
+# un proceso terminado a mano), al volver a lanzarla con el mismo almacén se
+# saltan los documentos terminados y los documentos a medias siguen desde el
+# primer lote que falta.
+#
+# Una carpeta por documento; la clave incluye el procesador, su versión y el
+# hash del archivo, así un cambio en el procesador no reutiliza resultados viejos:
+#   <ruta>/<clave>/resultado.pkl   salida de procesar_documento (marca de terminado)
+#   <ruta>/<clave>/lote-0003.pkl   (tablas, lectura) de un lote ya extraído
+#   <ruta>/<clave>/trabajo.txt     trabajo en la cola distribuida, si se encoló
+# Cada archivo se escribe en un temporal que luego se renombra (os.replace):
+# un corte a mitad de la escritura deja a lo sumo un temporal, que se ignora.
+
+_RESULTADO = "resultado.pkl"
+_TRABAJO = "trabajo.txt"
+
+
+def clave(procesador, pdf_bytes):
+    """
+    Clave del documento en el almacén.
+    Args:
+        procesador: Metadatos del registro (registro.Procesador)
+        pdf_bytes: Bytes del archivo PDF
+    Returns:
+        str: p. ej. 'bbva_estado_de_cuenta-v1-3f2a…'
+    """
+    return f"{procesador.modulo}-v{procesador.version}-{hashlib.sha256(pdf_bytes).hexdigest()}"
+
+
+def huella(clave_documento):
+    """Hash SHA-256 del PDF a partir de su clave en el almacén (el de indice.huella_documento)."""
+    return clave_documento.rsplit("-", 1)[-1]
+
+
+def _escribir(archivo, datos):
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=archivo.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(datos, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, archivo)
+    except BaseException:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+
+
+def _leer(archivo):
+    try:
+        with open(archivo, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def terminado(ruta, clave_documento):
+    """Si el documento ya tiene su resultado guardado."""
+    return (Path(ruta) / clave_documento / _RESULTADO).is_file()
+
+
+def leer_resultado(ruta, clave_documento):
+    """Resultado guardado del documento o None si no está terminado."""
+    return _leer(Path(ruta) / clave_documento / _RESULTADO)
+
+
+def guardar_resultado(ruta, clave_documento, resultado):
+    """Guarda el resultado del documento (lo marca como terminado) y borra sus lotes."""
+    carpeta = Path(ruta) / clave_documento
+    _escribir(carpeta / _RESULTADO, resultado)
+    for lote in carpeta.glob("lote-*.pkl"):
+        lote.unlink(missing_ok=True)
+    (carpeta / _TRABAJO).unlink(missing_ok=True)
+
+
+def leer_lote(ruta, clave_documento, numero):
+    """Tablas guardadas del lote número 'numero' o None si falta."""
+    return _leer(Path(ruta) / clave_documento / f"lote-{numero:04d}.pkl")
+
+
+def guardar_lote(ruta, clave_documento, numero, datos):
+    """Guarda las tablas de un lote de segmentos ya extraído."""
+    _escribir(Path(ruta) / clave_documento / f"lote-{numero:04d}.pkl", datos)
+
+
+def leer_trabajo(ruta, clave_documento):
+    """Identificador del trabajo en la cola distribuida o None si no se encoló."""
+    try:
+        return (Path(ruta) / clave_documento / _TRABAJO).read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def guardar_trabajo(ruta, clave_documento, trabajo):
+    """Recuerda el trabajo de la cola distribuida, para no encolarlo de nuevo al reanudar."""
+    carpeta = Path(ruta) / clave_documento
+    carpeta.mkdir(parents=True, exist_ok=True)
+    (carpeta / _TRABAJO).write_text(trabajo, encoding="utf-8")
+
+
+def guardar_estado(ruta, documentos):
+    """
+    Guarda el estado de la tanda (para revisarlo mientras corre o después de un corte).
+    Args:
+        ruta: Carpeta del almacén
+        documentos: Lista de dicts con 'archivo', 'estado' y 'mensaje'
+    """
+    Path(ruta).mkdir(parents=True, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=ruta, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(documentos, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, Path(ruta) / "tanda.json")
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+# Los almacenes en disco (plantillas, índices, costos) van a una carpeta temporal,
+# así las pruebas no dependen de lo aprendido en corridas anteriores
+_TEMPORAL = Path(tempfile.mkdtemp(prefix="extractor-pruebas-"))
+os.environ.setdefault("EXTRACTOR_PLANTILLAS", str(_TEMPORAL / "plantillas.json"))
+os.environ.setdefault("EXTRACTOR_INDICES", str(_TEMPORAL / "indices"))
+os.environ.setdefault("EXTRACTOR_COSTOS", str(_TEMPORAL / "costos.json"))
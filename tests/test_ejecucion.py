@@ -0,0 +1,54 @@
+import multiprocessing
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from procesadores import ejecucion, presupuesto
+
+# Consolidado sintético de BBVA (el de test_tanda.py): unos segundos de procesamiento
+PDF = Path(__file__).parent / "tanda" / "consolidado.pdf"
+ENTIDAD, TIPO = "BBVA", "Estado de cuenta"
+
+# Lo que puede tardar en terminar el trabajador después de la revisión que ve el aviso
+MARGEN = 1.0
+
+
+def test_cancelar_termina_al_trabajador():
+    en_curso = ejecucion.en_segundo_plano(ENTIDAD, TIPO, PDF.read_bytes(), trabajadores=2)
+    limite = time.monotonic() + 30
+    while not multiprocessing.active_children():
+        assert not en_curso.futuro.done() and time.monotonic() < limite, "no arrancó el proceso de trabajo"
+        time.sleep(0.05)
+    # Con el trabajador a mitad del documento
+    time.sleep(0.5)
+    assert not en_curso.futuro.done()
+
+    inicio = time.monotonic()
+    ejecucion.cancelar(en_curso)
+    with pytest.raises(presupuesto.Cancelado):
+        en_curso.futuro.result(timeout=30)
+    assert time.monotonic() - inicio < ejecucion.INTERVALO_REVISION + MARGEN
+    assert not multiprocessing.active_children()
+
+
+def test_cancelar_en_el_proceso_actual_entre_paginas():
+    cancelacion = ejecucion.nueva_cancelacion()
+    aviso = threading.Timer(0.5, cancelacion.set)
+    aviso.start()
+    inicio = time.monotonic()
+    try:
+        with pytest.raises(presupuesto.Cancelado):
+            ejecucion.procesar_aqui(ENTIDAD, TIPO, PDF.read_bytes(), cancelacion=cancelacion, trabajadores=2)
+    finally:
+        aviso.cancel()
+    assert time.monotonic() - inicio < 0.5 + ejecucion.INTERVALO_REVISION + MARGEN
+
+
+def test_cancelado_antes_de_empezar():
+    cancelacion = ejecucion.nueva_cancelacion()
+    cancelacion.set()
+    with pytest.raises(presupuesto.Cancelado):
+        ejecucion.procesar(ENTIDAD, TIPO, PDF.read_bytes(), cancelacion=cancelacion)
+    assert not multiprocessing.active_children()
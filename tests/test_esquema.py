@@ -0,0 +1,71 @@
+import pandas as pd
+
+from procesadores import esquema, registro
+
+FALABELLA = registro.buscar("FALABELLA", registro.ESTADO_DE_CUENTA)
+
+
+def _salida():
+    """Salida de falabella_estado_de_cuenta: 'Resumen' apila la cabecera y los movimientos como textos."""
+    filas = [
+        ["Cliente", "Periodo de Facturación", "Último Día de Pago", "Pago Mínimo", "Pago Total"],
+        ["ANA PÉREZ", "01/03 al 31/03", "15/04/2025", "S/ 120.50", "1,234.56"],
+        ["", "", "", "", ""],
+        ["Página", "Fecha Transacción", "Fecha Proceso", "Detalle", "Monto (S/)"],
+        ["1", "2025-03-02", "2025-03-03", "FARMACIA UNIVERSAL", "45.9"],
+        ["2", "2025-03-10", "2025-03-11", "PAGO RECIBIDO", "300.00-"],
+    ]
+    cuotas = pd.DataFrame({
+        "Página": [2], "Fecha Transacción": ["05/03/2025"], "Fecha Proceso": ["06/03/2025"],
+        "Detalle Transacción": ["TIENDA MÚLTIPLE"], "Monto (S/)": [600.0], "Nº Cuota Cargada": ["02/06"],
+        "%TEA (*)": [35.5], "Capital (S/)": [95.0], "Interés (S/)": [10.0], "Total": [105.0],
+    })
+    return {"Resumen": pd.DataFrame(filas), "Cuotas": cuotas}
+
+
+def test_canonico_tablas_columnas_y_tipos():
+    tablas = esquema.canonico(FALABELLA, _salida(), "marzo.pdf")
+    assert list(tablas) == [tabla.nombre for tabla in esquema.TABLAS]
+    for tabla in esquema.TABLAS:
+        df = tablas[tabla.nombre]
+        assert list(df.columns) == [campo.nombre for campo in tabla.campos]
+        assert [str(t) for t in df.dtypes] == [campo.tipo for campo in tabla.campos]
+    assert len(tablas["Cronograma"]) == 0
+
+
+def test_canonico_convierte_montos_fechas_y_enteros():
+    tablas = esquema.canonico(FALABELLA, _salida(), "marzo.pdf")
+    cabecera = tablas["Cabeceras"].iloc[0]
+    assert cabecera["cliente"] == "ANA PÉREZ"
+    assert cabecera["fecha_limite_pago"] == pd.Timestamp("2025-04-15")
+    assert (cabecera["pago_minimo_soles"], cabecera["pago_total_soles"]) == (120.5, 1234.56)
+
+    movimientos = tablas["Movimientos"]
+    assert movimientos["descripcion"].tolist() == ["FARMACIA UNIVERSAL", "PAGO RECIBIDO"]
+    assert movimientos["monto_soles"].tolist() == [45.9, -300.0]
+    assert movimientos["pagina"].tolist() == [1, 2]
+    assert movimientos["fecha_consumo"].tolist() == [pd.Timestamp("2025-03-02"), pd.Timestamp("2025-03-10")]
+    assert movimientos["monto_dolares"].isna().all()
+
+    cuota = tablas["Cuotas"].iloc[0]
+    assert (cuota["cuota"], cuota["total_cuotas"]) == (2, 6)
+    assert cuota["fecha_consumo"] == pd.Timestamp("2025-03-05")
+    assert (cuota["monto_original"], cuota["importe_soles"]) == (600.0, 105.0)
+
+
+def test_canonico_columnas_fijas_del_documento():
+    tablas = esquema.canonico(FALABELLA, _salida(), "marzo.pdf")
+    for df in tablas.values():
+        assert (df["documento"] == "marzo.pdf").all()
+        assert (df["entidad"] == "FALABELLA").all()
+        assert (df["producto"] == registro.ESTADO_DE_CUENTA).all()
+
+
+def test_concatenar_mantiene_tipos_y_documentos():
+    marzo = esquema.canonico(FALABELLA, _salida(), "marzo.pdf")
+    abril = esquema.canonico(FALABELLA, _salida(), "abril.pdf")
+    unidas = esquema.concatenar([marzo, abril])
+    movimientos = unidas["Movimientos"]
+    assert movimientos["documento"].tolist() == ["marzo.pdf"] * 2 + ["abril.pdf"] * 2
+    assert movimientos.dtypes.equals(marzo["Movimientos"].dtypes)
+    assert len(unidas["Cronograma"]) == 0
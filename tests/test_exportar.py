@@ -0,0 +1,57 @@
+import pandas as pd
+
+from procesadores import exportar
+
+
+def _filas(n):
+    return pd.DataFrame({"numero": range(1, n + 1), "texto": [f"fila {i}" for i in range(1, n + 1)]})
+
+
+def test_partir_hojas_reparte_solo_las_hojas_largas():
+    resultado = {"Resumen": _filas(3), "Movimientos": _filas(7)}
+    hojas, partes = exportar.partir_hojas(resultado, max_filas=3)
+    assert list(hojas) == ["Resumen", "Movimientos", "Movimientos_2", "Movimientos_3"]
+    assert hojas["Resumen"] is resultado["Resumen"]
+    assert [len(hojas[h]) for h in hojas] == [3, 3, 3, 1]
+    assert pd.concat([hojas["Movimientos"], hojas["Movimientos_2"], hojas["Movimientos_3"]]).equals(
+        resultado["Movimientos"])
+    assert partes == [
+        exportar.Parte("Movimientos", "Movimientos", 1, 3),
+        exportar.Parte("Movimientos", "Movimientos_2", 4, 6),
+        exportar.Parte("Movimientos", "Movimientos_3", 7, 7),
+    ]
+
+
+def test_partir_hojas_sin_desborde():
+    resultado = {"Resumen": _filas(3)}
+    assert exportar.partir_hojas(resultado, max_filas=3) == (resultado, [])
+
+
+def test_nombres_de_continuacion_no_repiten_ni_exceden_excel():
+    largo = "M" * exportar.MAX_NOMBRE_HOJA
+    resultado = {"Cuotas": _filas(4), "Cuotas_2": _filas(1), largo: _filas(4)}
+    hojas, _ = exportar.partir_hojas(resultado, max_filas=2)
+    assert list(hojas) == ["Cuotas", "Cuotas_3", "Cuotas_2", largo, "M" * 29 + "_2"]
+    assert all(len(hoja) <= exportar.MAX_NOMBRE_HOJA for hoja in hojas)
+
+
+def test_guardar_excel_con_hojas_de_continuacion(tmp_path):
+    destino = tmp_path / "salida.xlsx"
+    assert exportar.guardar({"Movimientos": _filas(5)}, exportar.EXCEL, destino, max_filas=2) == [destino]
+    libro = pd.read_excel(destino, sheet_name=None)
+    assert list(libro) == ["Movimientos", "Movimientos_2", "Movimientos_3", exportar.HOJA_PARTES]
+    assert pd.concat(libro[h] for h in ("Movimientos", "Movimientos_2", "Movimientos_3"))["numero"].tolist() \
+        == [1, 2, 3, 4, 5]
+    assert libro[exportar.HOJA_PARTES]["Hasta fila"].tolist() == [2, 4, 5]
+
+
+def test_guardar_excel_con_desborde_a_parquet(tmp_path):
+    destino = tmp_path / "salida.xlsx"
+    rutas = exportar.guardar({"Resumen": _filas(2), "Movimientos": _filas(5)}, exportar.EXCEL, destino,
+                             desborde=exportar.PARQUET, max_filas=2)
+    externo = tmp_path / "salida_Movimientos.parquet"
+    assert rutas == [destino, externo]
+    assert pd.read_parquet(externo)["numero"].tolist() == [1, 2, 3, 4, 5]
+    libro = pd.read_excel(destino, sheet_name=None)
+    assert list(libro) == ["Resumen", exportar.HOJA_PARTES]
+    assert libro[exportar.HOJA_PARTES].values.tolist() == [["Movimientos", externo.name, 1, 5]]
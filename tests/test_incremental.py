@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from procesadores import esquema, exportar, incremental, registro, tanda, trabajos
+
+FALABELLA = registro.buscar("FALABELLA", registro.ESTADO_DE_CUENTA)
+FORMATOS = [exportar.EXCEL, exportar.CSV, exportar.PARQUET]
+
+# Compras en cuotas (Fecha Transacción, Detalle Transacción, Monto, Nº Cuota Cargada) de dos cortes
+# consecutivos: el de marzo repite la cuota de la lavadora y la del celular, con la siguiente cuota
+FEBRERO = [("02/02/2025", "LAVADORA", 1200.0, "02/12"), ("09/02/2025", "CELULAR", 900.0, "01/06")]
+MARZO = [("02/02/2025", "LAVADORA", 1200.0, "02/12"), ("09/02/2025", "CELULAR", 900.0, "02/06"),
+         ("03/03/2025", "COLCHON", 800.0, "01/03"), ("03/03/2025", "COLCHON", 800.0, "01/03")]
+
+
+def _cuotas(filas):
+    df = pd.DataFrame(filas, columns=["Fecha Transacción", "Detalle Transacción", "Monto (S/)", "Nº Cuota Cargada"])
+    for columna, valor in (("Página", 1), ("Fecha Proceso", df["Fecha Transacción"]), ("%TEA (*)", 30.0),
+                           ("Capital (S/)", 90.0), ("Interés (S/)", 10.0), ("Total", 100.0)):
+        df[columna] = valor
+    return df
+
+
+def _tanda(archivo, filas, canonica):
+    """Hojas como las de tanda.unir_resultados (o unir_canonico) con un solo documento."""
+    salida = {"Cuotas": _cuotas(filas)}
+    if canonica:
+        hojas = esquema.canonico(FALABELLA, salida, archivo)
+    else:
+        hojas = {hoja: df.assign(Archivo=archivo)[["Archivo", *df.columns]] for hoja, df in salida.items()}
+    clave = trabajos.clave(FALABELLA, archivo.encode())
+    hojas[tanda.HOJA_DOCUMENTOS] = tanda._hoja_documentos([tanda.Documento(archivo, tanda.PROCESADO, "", clave)])
+    return hojas
+
+
+def _destino(tmp_path, formato):
+    return tmp_path / ("salida.xlsx" if not exportar.FORMATOS[formato].columnar else "salida")
+
+
+@pytest.mark.parametrize("canonica", [False, True], ids=["banco", "canonica"])
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_sin_repetidos_quita_solo_las_filas_ya_consolidadas(tmp_path, formato, canonica):
+    destino = _destino(tmp_path, formato)
+    exportar.guardar(_tanda("febrero.pdf", FEBRERO, canonica), formato, destino)
+
+    filtrado, quitadas = incremental.sin_repetidos(FALABELLA, _tanda("marzo.pdf", MARZO, canonica), destino, formato,
+                                                   canonica)
+    assert quitadas == 1
+    columna = "descripcion" if canonica else "Detalle Transacción"
+    # La cuota siguiente del celular es otra fila; las dos compras iguales del mismo corte se conservan
+    assert filtrado["Cuotas"][columna].tolist() == ["CELULAR", "COLCHON", "COLCHON"]
+    assert len(filtrado[tanda.HOJA_DOCUMENTOS]) == 1
+
+    exportar.agregar(filtrado, formato, destino)
+    guardada = exportar.leer_hoja(destino, formato, "Cuotas")
+    assert guardada[columna].tolist() == ["LAVADORA", "CELULAR", "CELULAR", "COLCHON", "COLCHON"]
+    # Volver a agregar el mismo corte ya no agrega nada
+    _, quitadas = incremental.sin_repetidos(FALABELLA, _tanda("marzo.pdf", MARZO, canonica), destino, formato,
+                                            canonica)
+    assert quitadas == len(MARZO)
+
+
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_pendientes_omite_los_pdf_ya_consolidados(tmp_path, formato):
+    pdfs = []
+    for nombre in ("febrero.pdf", "marzo.pdf", "abril.pdf"):
+        pdfs.append(tmp_path / nombre)
+        pdfs[-1].write_bytes(f"%PDF {nombre}".encode())
+    # marzo.pdf se consolidó con otro nombre; abril.pdf falló y se vuelve a procesar
+    documentos = tanda._hoja_documentos([
+        tanda.Documento("febrero.pdf", tanda.PROCESADO, "", trabajos.clave(FALABELLA, pdfs[0].read_bytes())),
+        tanda.Documento("renombrado.pdf", tanda.GUARDADO, "", trabajos.clave(FALABELLA, pdfs[1].read_bytes())),
+        tanda.Documento("abril.pdf", tanda.ERROR, "falló", trabajos.clave(FALABELLA, pdfs[2].read_bytes())),
+    ])
+    destino = _destino(tmp_path, formato)
+    exportar.guardar({tanda.HOJA_DOCUMENTOS: documentos}, formato, destino)
+
+    assert incremental.pendientes(pdfs, destino, formato) == ([pdfs[2]], pdfs[:2])
+
+
+def test_pendientes_por_nombre_en_salidas_sin_huella(tmp_path):
+    pdfs = [tmp_path / "febrero.pdf", tmp_path / "marzo.pdf"]
+    for pdf in pdfs:
+        pdf.write_bytes(b"%PDF")
+    destino = tmp_path / "salida.xlsx"
+    documentos = pd.DataFrame({"Archivo": ["febrero.pdf"], "Estado": [tanda.PROCESADO], "Mensaje": [""]})
+    exportar.guardar({tanda.HOJA_DOCUMENTOS: documentos}, exportar.EXCEL, destino)
+    assert incremental.pendientes(pdfs, destino, exportar.EXCEL) == ([pdfs[1]], [pdfs[0]])
@@ -0,0 +1,36 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from procesadores import bbva_estado_de_cuenta, indice, presupuesto
+
+# Consolidado sintético de BBVA: 60 páginas, 12 estados de cuenta
+PDF = Path(__file__).parent / "tanda" / "consolidado.pdf"
+
+
+def test_indice_con_pagina_omitida_no_se_guarda(monkeypatch, tmp_path):
+    # Sin los índices que hayan guardado otras pruebas
+    monkeypatch.setattr(indice, "_INDICES", {})
+    monkeypatch.setattr(indice, "RUTA_INDICES", tmp_path)
+    pdf_bytes = PDF.read_bytes()
+    original = bbva_estado_de_cuenta.pagina_de_indice
+
+    def lenta(page):
+        if page.page_number == 7:
+            time.sleep(3)
+        return original(page)
+
+    monkeypatch.setattr(bbva_estado_de_cuenta, "pagina_de_indice", lenta)
+    clave = indice._clave(bbva_estado_de_cuenta, pdf_bytes)
+    presupuesto.activar(presupuesto.Presupuesto(segundos_por_pagina=1))
+    try:
+        with pytest.raises(presupuesto.PresupuestoExcedido, match="7"):
+            indice.construir(bbva_estado_de_cuenta, pdf_bytes, trabajadores=1)
+    finally:
+        presupuesto.activar(None)
+    assert clave not in indice._INDICES
+    assert indice._leer_guardado(clave) is None
+
+    monkeypatch.setattr(bbva_estado_de_cuenta, "pagina_de_indice", original)
+    assert len(indice.construir(bbva_estado_de_cuenta, pdf_bytes, trabajadores=1)) == 12
@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+from procesadores import esquema, registro
+from procesadores.libro_mayor import LibroMayor
+
+FALABELLA = registro.buscar("FALABELLA", registro.ESTADO_DE_CUENTA)
+
+
+def _tablas(cliente, movimientos, documento="marzo.pdf"):
+    """Tablas canónicas de un estado de cuenta de Falabella con (fecha, detalle, monto) por movimiento."""
+    cabecera = pd.DataFrame({"Cliente": [cliente], "Periodo de Facturación": ["01/03 al 31/03"],
+                             "Último Día de Pago": ["15/04/2025"], "Pago Mínimo": ["50.00"],
+                             "Pago Total": ["500.00"]})
+    detalle = pd.DataFrame(movimientos, columns=["Fecha Transacción", "Detalle", "Monto (S/)"])
+    detalle.insert(0, "Página", 1)
+    detalle.insert(2, "Fecha Proceso", detalle["Fecha Transacción"])
+    return esquema.canonico(FALABELLA, {"General": cabecera, "Movimientos": detalle}, documento)
+
+
+@pytest.fixture
+def libro(tmp_path):
+    libro = LibroMayor(tmp_path / "libro.sqlite")
+    libro.guardar(FALABELLA, "a" * 64, _tablas("JOSÉ ÑAHUI", [
+        ("2025-03-02", "FARMACIA UNIVERSAL", 45.9),
+        ("2025-03-05", "MÚLTIPLE TIENDAS S.A.", 120.0),
+    ]), "marzo.pdf")
+    libro.guardar(FALABELLA, "b" * 64, _tablas("ANA PEREZ", [
+        ("2025-04-07", "CAFÉ DEL PUERTO", 15.5),
+    ], "abril.pdf"), "abril.pdf")
+    return libro
+
+
+def test_busqueda_sin_tildes_ni_mayusculas(libro):
+    for consulta in ("MULTIPLE", "múltiple", "multiple tiendas", "cafe", "CAFÉ", "jose nahui"):
+        assert len(libro.buscar(consulta)) == 1, consulta
+    assert libro.buscar("cafe")["texto"].tolist() == ["CAFÉ DEL PUERTO"]
+    assert libro.buscar("nahui")["campo"].tolist() == ["cliente"]
+
+
+def test_busqueda_por_prefijo(libro):
+    assert libro.buscar("farm")["texto"].tolist() == ["FARMACIA UNIVERSAL"]
+    assert libro.buscar("múlt tien")["texto"].tolist() == ["MÚLTIPLE TIENDAS S.A."]
+    # Cada palabra es el comienzo de una palabra, no cualquier parte de ella
+    assert libro.buscar("macia").empty
+    # Todas las palabras deben estar en el mismo texto
+    assert libro.buscar("farm tien").empty
+
+
+def test_busqueda_filtros_y_limite(libro):
+    assert libro.buscar("a", limite=None)["archivo"].nunique() == 2
+    assert set(libro.buscar("pu", entidad="FALABELLA")["archivo"]) == {"abril.pdf"}
+    assert libro.buscar("farm", entidad="RIPLEY").empty
+    assert len(libro.buscar("a", limite=1)) == 1
+    assert libro.buscar("  ¿? ").empty
+
+
+def test_volver_a_guardar_no_cambia_los_agregados(libro):
+    antes = libro.resumen_mensual()
+    assert antes["movimientos"].sum() == 3
+    assert antes["monto_soles"].sum() == pytest.approx(181.4)
+    # El mismo PDF (misma huella) procesado de nuevo, con otro nombre de archivo
+    libro.guardar(FALABELLA, "a" * 64, _tablas("JOSÉ ÑAHUI", [
+        ("2025-03-02", "FARMACIA UNIVERSAL", 45.9),
+        ("2025-03-05", "MÚLTIPLE TIENDAS S.A.", 120.0),
+    ]), "marzo (copia).pdf")
+    pd.testing.assert_frame_equal(libro.resumen_mensual(), antes)
+    assert len(libro.documentos()) == 2
+    assert len(libro.consultar()) == 3
+    assert len(libro.buscar("farm")) == 1
+
+
+def test_volver_a_guardar_reemplaza_los_agregados(libro):
+    # Una versión nueva del procesador que lee un movimiento menos
+    libro.guardar(FALABELLA, "a" * 64, _tablas("JOSÉ ÑAHUI", [("2025-03-02", "FARMACIA UNIVERSAL", 45.9)]),
+                  "marzo.pdf")
+    # Movimientos en el mes de consumo; el pago del estado de cuenta, en el de su último día de pago
+    resumen = libro.resumen_mensual(cliente="JOSÉ%").set_index("mes")
+    assert resumen.loc["2025-03", "movimientos"] == 1
+    assert resumen.loc["2025-03", "monto_soles"] == pytest.approx(45.9)
+    assert resumen.loc["2025-04", "pago_total_soles"] == pytest.approx(500.0)
+    assert (resumen["documentos"] == 1).all()
+    assert libro.buscar("tiendas").empty
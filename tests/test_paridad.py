@@ -0,0 +1,21 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks import paridad
+
+# Cronogramas sintéticos de los procesadores portados a especificacion.py y
+# sus salidas de referencia, generadas con los procesadores originales
+# (python benchmarks/paridad.py generar tests/paridad/pdfs tests/paridad/referencias)
+DATOS = Path(__file__).parent / "paridad"
+MODULOS = ["interbank_prestamo", "pichincha_prestamo", "scotiabank_prestamo"]
+
+
+@pytest.mark.parametrize("modulo", MODULOS)
+def test_especificacion_igual_a_referencia(modulo, tmp_path, capsys):
+    # comparar() recorre una carpeta con una subcarpeta por módulo
+    (tmp_path / modulo).symlink_to(DATOS / "pdfs" / modulo, target_is_directory=True)
+    codigo = paridad.comparar(tmp_path, DATOS / "referencias")
+    salida = capsys.readouterr().out
+    assert codigo == 0, salida
+    assert "SIN REFERENCIA" not in salida and "OK" in salida
@@ -0,0 +1,159 @@
+import random
+import re
+
+import pytest
+
+from procesadores import bcp_estado_de_cuenta, dinners_estado_de_cuenta, falabella_estado_de_cuenta
+from procesadores import scotiabank_estado_de_cuenta
+
+# Los patrones originales, antes de reescribirlos para evitar el retroceso
+# catastrófico (benchmarks/bench_regex.py). Cada reemplazo debe dar el mismo
+# resultado en las mismas líneas.
+BCP_MONTOS = re.compile(r'[\d,]+\.\d{2}')
+FALABELLA_MOVIMIENTO = re.compile(
+    r"""(?m)^
+        (\d{2}/\d{2}/\d{4})\s+          # fecha de transacción
+        (\d{2}/\d{2}/\d{4})\s+          # fecha de proceso
+        (                               # detalle
+            (?:(?!\b\d{2}/\d{2}\b).)+?  # NO debe contener NN/NN
+        )\s+
+        (-?\d{1,3}(?:,\d{3})*\.\d{2})   # monto
+        \s*$
+    """,
+    re.VERBOSE,
+)
+SCOTIABANK_CUOTA = re.compile(
+    r'^(.+?)\s+(\d{2}/\d{2}/\d{2})\s+([\d\.]+)\s+([\d,]+\.\d{2})\s+(\d{2}/\d{2})\s+([\d\.]+)\s+([\d,]+\.\d{2})'
+    r'\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})$'
+)
+DINNERS_MONTOS_FINALES = re.compile(r"([\s\-]*\(?-?[\d\.,]+\)?\s*)+$")
+
+# Corridas de dígitos largas: donde los patrones originales retrocedían
+DIGITOS = "1234567890" * 300
+
+# Semilla de las líneas aleatorias
+SEMILLA = 26
+
+
+def _bcp_original(texto):
+    return BCP_MONTOS.findall(texto.replace(',', ''))
+
+
+def _falabella_original(linea):
+    return next(iter(FALABELLA_MOVIMIENTO.findall(linea)), None)
+
+
+def _scotiabank_original(linea):
+    match = SCOTIABANK_CUOTA.match(linea.strip())
+    return match.groups() if match else None
+
+
+def _dinners_original(descripcion):
+    return DINNERS_MONTOS_FINALES.sub("", descripcion)
+
+
+def _id(texto):
+    return texto if len(texto) <= 40 else f"{texto[:20]}...({len(texto)})"
+
+
+def _aleatorias(alfabeto, cantidad, largo, semilla):
+    azar = random.Random(semilla)
+    return ["".join(azar.choice(alfabeto) for _ in range(azar.randint(0, largo))) for _ in range(cantidad)]
+
+
+@pytest.mark.parametrize("texto", [
+    "", "SALDO ANTERIOR 1,234.56 500.00", "12/03 COMPRA WONG 45.90", "1.2345.67", "12.3456.78", "1.5.67",
+    "-15.00 (3.50)", "S/ 1,000,000.00", "123.4", "12a34.56", DIGITOS, DIGITOS + ".99", DIGITOS + "x",
+    "1" + ",1" * 2000 + ".00",
+], ids=_id)
+def test_bcp_extraer_montos_igual_al_original(texto):
+    assert bcp_estado_de_cuenta.extraer_montos(texto) == _bcp_original(texto)
+
+
+def test_bcp_extraer_montos_aleatorio():
+    for texto in _aleatorias("12.,. a-", 3000, 25, SEMILLA):
+        assert bcp_estado_de_cuenta.extraer_montos(texto) == _bcp_original(texto), texto
+
+
+@pytest.mark.parametrize("linea", [
+    "01/03/2025 02/03/2025 FARMACIA UNIVERSAL 45.90",
+    "01/03/2025 02/03/2025 PAGO RECIBIDO -1,200.00  ",
+    "01/03/2025   02/03/2025   TIENDA 12 SUR    1,234,567.89",
+    "01/03/2025 02/03/2025 LAVADORA 1,200.00 02/12 35.50% 95.00 10.00 105.00",
+    "01/03/2025 02/03/2025 CUOTA 01/12 100.00",
+    "01/03/2025 02/03/2025 100.00",
+    "01/03/2025 02/03/2025   100.00",
+    "01/03/2025 02/03/2025 SIN MONTO",
+    "01/03/2025 02/03/2025 MONTO MAL 1234.56",
+    "01/03/2025 02/03/2025 NUMEROS 2025/03/01 15.00",
+    "DETALLE 01/03/2025 02/03/2025 15.00",
+    "01/03/2025 02/03/2025 " + DIGITOS + " 15.00",
+    "01/03/2025 02/03/2025 " + "A " * 3000 + "15.00",
+    "01/03/2025 02/03/2025 " + "A " * 3000,
+    "01/03/2025 02/03/2025 X " + DIGITOS,
+], ids=_id)
+def test_falabella_separar_movimiento_igual_al_original(linea):
+    assert falabella_estado_de_cuenta.separar_movimiento(linea) == _falabella_original(linea)
+
+
+def test_falabella_separar_movimiento_aleatorio():
+    azar = random.Random(SEMILLA)
+    palabras = _aleatorias("1234/,.-AB", 200, 8, SEMILLA) + ["01/12", "2025/03/01", "1,234.56", "-15.00", "  "]
+    montos = ["45.90", "-1,200.00", "1,234,567.89", "1234.56", "12.3", "01/12", "A"]
+    coincidencias = 0
+    for _ in range(3000):
+        # Las dos fechas, de 0 a 4 palabras de detalle y algo que puede ser un monto
+        detalle = [azar.choice(palabras) for _ in range(azar.randint(0, 4))]
+        linea = " ".join(["01/03/2025", "02/03/2025"] + detalle + [azar.choice(montos)]) + azar.choice(["", "  "])
+        coincidencias += _falabella_original(linea) is not None
+        assert falabella_estado_de_cuenta.separar_movimiento(linea) == _falabella_original(linea), linea
+    assert coincidencias > 100
+
+
+COLA_SCOTIABANK = "15/02/25 45.50 1,200.00 03/12 2.10 98.00 100.10 0.00"
+
+
+@pytest.mark.parametrize("linea", [
+    "TIENDA MULTIPLE " + COLA_SCOTIABANK,
+    "  TIENDA   MULTIPLE   " + COLA_SCOTIABANK.replace(" ", "   ") + "  ",
+    "A " + COLA_SCOTIABANK,
+    COLA_SCOTIABANK,
+    "TIENDA " + COLA_SCOTIABANK + " 5.00",
+    "TIENDA " + COLA_SCOTIABANK.replace("03/12", "3/12"),
+    "TIENDA " + COLA_SCOTIABANK.replace("1,200.00", "1200"),
+    "TIENDA 12/01/25 " + COLA_SCOTIABANK,
+    DIGITOS + " " + COLA_SCOTIABANK,
+    "A " * 3000 + COLA_SCOTIABANK,
+    "A " * 3000 + DIGITOS,
+    "TIENDA " + COLA_SCOTIABANK.replace("45.50", DIGITOS),
+], ids=_id)
+def test_scotiabank_separar_cuota_igual_al_original(linea):
+    assert scotiabank_estado_de_cuenta.separar_cuota(linea) == _scotiabank_original(linea)
+
+
+def test_scotiabank_separar_cuota_aleatorio():
+    azar = random.Random(SEMILLA)
+    fichas = COLA_SCOTIABANK.split() + ["TIENDA", "1.00", "12", "1,2", "01/02", "AB.C", "  "]
+    coincidencias = 0
+    for _ in range(3000):
+        # Una cola de cuota con algunas columnas cambiadas, después de 0 a 3 palabras
+        cola = [ficha if azar.random() < 0.8 else azar.choice(fichas) for ficha in COLA_SCOTIABANK.split()]
+        linea = " ".join([azar.choice(fichas) for _ in range(azar.randint(0, 3))] + cola)
+        coincidencias += _scotiabank_original(linea) is not None
+        assert scotiabank_estado_de_cuenta.separar_cuota(linea) == _scotiabank_original(linea), linea
+    assert coincidencias > 100
+
+
+@pytest.mark.parametrize("descripcion", [
+    "CONSUMO 1,234.50 (12.00)", "CONSUMO", "", "AB12 34", "PAGO - 15.00 -", "TIENDA (-3.00)  ", "12.00",
+    "CUOTA 3 DE 12", "MONTO )", "X (", "- 1", "CAFE " + DIGITOS, DIGITOS, "CAFE " + "1 " * 3000,
+], ids=_id)
+def test_dinners_quitar_montos_finales_igual_al_original(descripcion):
+    assert dinners_estado_de_cuenta._quitar_montos_finales(descripcion) == _dinners_original(descripcion)
+
+
+def test_dinners_quitar_montos_finales_aleatorio():
+    # Cortas: el original retrocede de forma exponencial cuando la línea no termina en montos
+    for descripcion in _aleatorias("1.,-() A", 3000, 12, SEMILLA):
+        assert dinners_estado_de_cuenta._quitar_montos_finales(descripcion) == _dinners_original(descripcion), \
+            descripcion
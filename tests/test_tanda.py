@@ -0,0 +1,83 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.paridad import salida_comparable
+from procesadores import presupuesto, reporte, tanda, trabajos
+from procesadores.libro_mayor import LibroMayor
+
+# Consolidado sintético de BBVA: 60 páginas, 12 estados de cuenta
+PDF = Path(__file__).parent / "tanda" / "consolidado.pdf"
+ENTIDAD, TIPO = "BBVA", "Estado de cuenta"
+
+# Con este máximo de páginas el documento se procesa en varios lotes de segmentos
+PAGINAS = 10
+
+_TANDA = """
+from procesadores import presupuesto, tanda
+tanda.procesar({entidad!r}, {tipo!r}, [{pdf!r}], {ruta!r}, presupuesto.Presupuesto(paginas={paginas}), trabajadores=1)
+"""
+
+
+def _salida(ruta, documentos):
+    hojas = tanda.unir_resultados(ruta, documentos)
+    del hojas[tanda.HOJA_DOCUMENTOS]
+    return salida_comparable(hojas)
+
+
+def _sin_cortes(ruta):
+    documentos = tanda.procesar(ENTIDAD, TIPO, [PDF], ruta, presupuesto.Presupuesto(paginas=PAGINAS), 1)
+    assert [d.estado for d in documentos] == [tanda.PROCESADO]
+    return _salida(ruta, documentos)
+
+
+def test_reanuda_despues_de_terminar_el_proceso(tmp_path):
+    ruta = tmp_path / "cortada"
+    codigo = _TANDA.format(entidad=ENTIDAD, tipo=TIPO, pdf=str(PDF), ruta=str(ruta), paginas=PAGINAS)
+    raiz = Path(__file__).resolve().parent.parent
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join([str(raiz), os.environ.get("PYTHONPATH", "")]))
+    proceso = subprocess.Popen([sys.executable, "-c", codigo], env=entorno, start_new_session=True)
+    try:
+        # Se termina el proceso apenas guarda el primer lote, con el documento a medias
+        limite = time.monotonic() + 120
+        while not list(ruta.glob("*/lote-*.pkl")):
+            assert proceso.poll() is None, "la tanda terminó antes de guardar un lote"
+            assert time.monotonic() < limite, "la tanda no guardó ningún lote"
+            time.sleep(0.05)
+        os.killpg(proceso.pid, signal.SIGKILL)
+    finally:
+        proceso.kill()
+        proceso.wait()
+    assert not list(ruta.glob(f"*/{trabajos._RESULTADO}"))
+
+    documentos = tanda.procesar(ENTIDAD, TIPO, [PDF], ruta, presupuesto.Presupuesto(paginas=PAGINAS), 1)
+    assert [d.estado for d in documentos] == [tanda.PROCESADO]
+    assert _salida(ruta, documentos) == _sin_cortes(tmp_path / "sin_cortes")
+
+
+def test_resultado_parcial_no_queda_terminado(tmp_path):
+    ruta = tmp_path / "parcial"
+    documentos = tanda.procesar(ENTIDAD, TIPO, [PDF], ruta, presupuesto.Presupuesto(segundos=0.001), 1)
+    assert [d.estado for d in documentos] == [tanda.ERROR]
+    assert not trabajos.terminado(ruta, documentos[0].clave)
+
+    documentos = tanda.procesar(ENTIDAD, TIPO, [PDF], ruta, presupuesto.Presupuesto(paginas=PAGINAS), 1)
+    assert [d.estado for d in documentos] == [tanda.PROCESADO]
+    assert _salida(ruta, documentos) == _sin_cortes(tmp_path / "sin_cortes")
+
+
+def test_libro_mayor_omite_documentos_con_paginas_omitidas(tmp_path):
+    ruta = tmp_path / "almacen"
+    documentos = tanda.procesar(ENTIDAD, TIPO, [PDF], ruta, presupuesto.Presupuesto(), 1)
+    clave = documentos[0].clave
+    # Como si el vigilante por página hubiera omitido la página 7
+    trabajos.guardar_resultado(ruta, clave, reporte.anotar(trabajos.leer_resultado(ruta, clave),
+                                                           paginas_sin_procesar=[7]))
+    libro = LibroMayor(tmp_path / "libro.sqlite")
+    guardados, incompletos = tanda.guardar_en_libro(ENTIDAD, TIPO, ruta, documentos, libro)
+    assert guardados == [] and [archivo for archivo, _ in incompletos] == [str(PDF)]
+    assert "7" in incompletos[0][1]
+    assert libro.documentos().empty